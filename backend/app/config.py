@@ -64,11 +64,69 @@ class Settings(BaseSettings):
     kafka_enriched_topic: str = Field(default="enriched-opportunities-stream", env="KAFKA_ENRICHED_TOPIC")
     kafka_consumer_group_id: str = Field(default="scholarstream-websocket-consumer", env="KAFKA_CONSUMER_GROUP_ID")
     
+    # Local Broker (in-process Kafka stand-in when Confluent is not configured)
+    local_broker_enabled: bool = Field(default=False, env="LOCAL_BROKER_ENABLED")
+    local_broker_dir: str = Field(default="", env="LOCAL_BROKER_DIR")  # Empty = memory only
+    local_broker_max_backlog: int = Field(default=10000, env="LOCAL_BROKER_MAX_BACKLOG")
+    local_broker_retention_seconds: int = Field(default=86400, env="LOCAL_BROKER_RETENTION_SECONDS")  # Topics nobody subscribes to
+    
     # Flink Configuration
     flink_app_name: str = Field(default="scholarstream-cortex", env="FLINK_APP_NAME")
     flink_parallelism: int = Field(default=1, env="FLINK_PARALLELISM")
     flink_checkpoint_interval: int = Field(default=60000, env="FLINK_CHECKPOINT_INTERVAL")
     
+    # Cortex Local State (dedup filter snapshots, checkpoints)
+    cortex_state_dir: str = Field(default=".cortex_state", env="CORTEX_STATE_DIR")
+    dedup_bloom_capacity: int = Field(default=100000, env="DEDUP_BLOOM_CAPACITY")
+    dedup_bloom_error_rate: float = Field(default=0.001, env="DEDUP_BLOOM_ERROR_RATE")
+    dedup_max_memory_mb: int = Field(default=16, env="DEDUP_MAX_MEMORY_MB")
+    dedup_snapshot_every: int = Field(default=500, env="DEDUP_SNAPSHOT_EVERY")
+    near_dup_max_distance: int = Field(default=3, env="NEAR_DUP_MAX_DISTANCE")  # SimHash bits
+    near_dup_index_size: int = Field(default=50000, env="NEAR_DUP_INDEX_SIZE")
+
+    # Crawler Browser Pool
+    browser_pool_max_contexts: int = Field(default=6, env="BROWSER_POOL_MAX_CONTEXTS")
+    browser_pool_context_mb: int = Field(default=150, env="BROWSER_POOL_CONTEXT_MB")  # Memory budget per context
+    browser_pool_max_uses: int = Field(default=25, env="BROWSER_POOL_MAX_USES")  # Leases before a context is recycled
+    browser_pool_warm: int = Field(default=2, env="BROWSER_POOL_WARM")
+
+    # Crawl Scheduling (global concurrency + per-host politeness)
+    crawler_global_concurrency: int = Field(default=8, env="CRAWLER_GLOBAL_CONCURRENCY")
+    crawler_per_host_concurrency: int = Field(default=2, env="CRAWLER_PER_HOST_CONCURRENCY")
+    crawler_host_rate_per_sec: float = Field(default=0.5, env="CRAWLER_HOST_RATE_PER_SEC")  # Token bucket refill
+    crawler_host_burst: float = Field(default=2, env="CRAWLER_HOST_BURST")
+    crawler_host_min_delay: float = Field(default=0.5, env="CRAWLER_HOST_MIN_DELAY")
+    crawler_host_max_delay: float = Field(default=60, env="CRAWLER_HOST_MAX_DELAY")
+    tiered_fetch_min_text_chars: int = Field(default=1500, env="TIERED_FETCH_MIN_TEXT_CHARS")  # Below this, render in the browser
+    tiered_fetch_timeout: float = Field(default=15.0, env="TIERED_FETCH_TIMEOUT")
+    crawl_cache_max_age_hours: float = Field(default=24, env="CRAWL_CACHE_MAX_AGE_HOURS")  # Re-send unchanged pages after this
+    crawler_worker_processes: int = Field(default=0, env="CRAWLER_WORKER_PROCESSES")  # 0 = drones run in the API process
+
+    # Crawl Frontier (yield-aware target selection)
+    frontier_patrol_budget_seconds: float = Field(default=600, env="FRONTIER_PATROL_BUDGET_SECONDS")  # Estimated crawl-seconds per cycle
+    frontier_patrol_max_targets: int = Field(default=40, env="FRONTIER_PATROL_MAX_TARGETS")
+    frontier_base_interval_minutes: float = Field(default=30, env="FRONTIER_BASE_INTERVAL_MINUTES")
+    frontier_max_backoff_hours: float = Field(default=24, env="FRONTIER_MAX_BACKOFF_HOURS")
+    
+    # Extraction: HTML cleaning pool + LLM result cache (unchanged content costs zero tokens)
+    html_cleaner_workers: int = Field(default=2, env="HTML_CLEANER_WORKERS")  # 0 = clean in a thread
+    llm_cache_ttl_hours: float = Field(default=72, env="LLM_CACHE_TTL_HOURS")
+    llm_cache_max_mb: int = Field(default=256, env="LLM_CACHE_MAX_MB")  # LRU eviction above this
+    llm_max_concurrency: int = Field(default=4, env="LLM_MAX_CONCURRENCY")  # In-flight background Gemini calls
+    llm_interactive_concurrency: int = Field(default=8, env="LLM_INTERACTIVE_CONCURRENCY")  # Chat, copilot
+    llm_field_mapping_concurrency: int = Field(default=4, env="LLM_FIELD_MAPPING_CONCURRENCY")
+    llm_tokens_per_minute: int = Field(default=1000000, env="LLM_TOKENS_PER_MINUTE")  # 0 = no token budget
+    llm_background_token_reserve: float = Field(default=0.2, env="LLM_BACKGROUND_TOKEN_RESERVE")  # Kept for users
+    llm_max_retries: int = Field(default=3, env="LLM_MAX_RETRIES")  # 429 retries with backoff
+    llm_retry_base_seconds: float = Field(default=2.0, env="LLM_RETRY_BASE_SECONDS")
+    llm_chunk_tokens: int = Field(default=8000, env="LLM_CHUNK_TOKENS")  # Page content per extraction call
+    llm_chunk_overlap_tokens: int = Field(default=200, env="LLM_CHUNK_OVERLAP_TOKENS")
+    llm_max_chunks_per_page: int = Field(default=8, env="LLM_MAX_CHUNKS_PER_PAGE")
+    llm_pack_tokens: int = Field(default=8000, env="LLM_PACK_TOKENS")  # Small pages share prompts up to this
+    llm_pack_max_pages: int = Field(default=6, env="LLM_PACK_MAX_PAGES")
+    enrichment_batch_max_messages: int = Field(default=8, env="ENRICHMENT_BATCH_MAX_MESSAGES")
+    enrichment_batch_wait_ms: int = Field(default=500, env="ENRICHMENT_BATCH_WAIT_MS")
+    
     # Cloud Function Configuration
     cloud_function_url: str = Field(default="", env="CLOUD_FUNCTION_URL")
     
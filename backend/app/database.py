@@ -4,6 +4,7 @@ Handles all database operations with proper error handling
 """
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.api_core.exceptions import NotFound
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import structlog
@@ -85,6 +86,23 @@ class FirebaseDB:
             logger.error("Failed to save scholarship", scholarship_id=scholarship.id, error=str(e))
             raise
     
+    async def update_scholarship_fields(self, scholarship_id: str, fields: Dict[str, Any]) -> bool:
+        """
+        Patch selected fields of an existing scholarship (no full rewrite).
+        Returns False if it was never stored: update() never creates a partial document.
+        """
+        try:
+            doc_ref = self.db.collection('scholarships').document(scholarship_id)
+            doc_ref.update(fields)
+            logger.info("Scholarship patched", scholarship_id=scholarship_id, fields=list(fields))
+            return True
+        except NotFound:
+            logger.info("Skipping patch for unstored scholarship", scholarship_id=scholarship_id)
+            return False
+        except Exception as e:
+            logger.error("Failed to patch scholarship", scholarship_id=scholarship_id, error=str(e))
+            raise
+    
     async def get_scholarship(self, scholarship_id: str) -> Optional[Scholarship]:
         """Fetch single scholarship by ID"""
         try:
@@ -4,7 +4,7 @@ Main application entry point
 """
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -128,6 +128,14 @@ async def health_check():
     }
 
 
+# Pipeline metrics (Prometheus scrape target)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Consumer lag, throughput, latency and error metrics in Prometheus text format"""
+    from app.services.pipeline_metrics import pipeline_metrics
+    return PlainTextResponse(pipeline_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -136,7 +144,8 @@ async def root():
         "message": "ScholarStream API",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "metrics": "/metrics"
     }
 
 
@@ -178,11 +187,26 @@ async def startup_event():
     # except Exception as e:
     #     logger.warning("Crawler Scheduler failed to start", error=str(e))
 
+    # Start CRAWLER WORKER PROCESSES (browsers off the API event loop)
+    if settings.crawler_worker_processes > 0:
+        from app.services.crawler_workers import crawler_workers
+        crawler_workers.start()
+        asyncio.create_task(crawler_workers.recover_spool())
+
     # Start AI REFINERY WORKER (Phase 4)
     from app.services.enrichment_worker import enrichment_worker
     asyncio.create_task(enrichment_worker.start())
     logger.info("AI Refinery Worker initialized")
 
+    # Start RETRY WORKER (delayed redelivery of failed messages)
+    from app.services.retry_router import retry_worker
+    asyncio.create_task(retry_worker.start())
+    logger.info("Retry Worker initialized")
+
+    # Restore CORTEX PROCESSOR state (shards + last checkpoint) before consumers need it
+    from app.services.flink_processor import cortex_processor
+    asyncio.create_task(cortex_processor.start())
+
     # Start Kafka consumer for real-time streaming (Non-Blocking)
     try:
         from app.routes.websocket import start_kafka_consumer_task
@@ -291,6 +315,16 @@ async def shutdown_event():
 
     from app.services.enrichment_worker import enrichment_worker
     enrichment_worker.stop()
+
+    from app.services.crawler_workers import crawler_workers
+    await asyncio.to_thread(crawler_workers.stop)
+
+    from app.services.retry_router import retry_worker
+    retry_worker.stop()
+
+    # Final stream processor checkpoint
+    from app.services.flink_processor import cortex_processor
+    await cortex_processor.stop()
     
     # from app.services.background_jobs import stop_scheduler
     # stop_scheduler()
@@ -299,6 +333,16 @@ async def shutdown_event():
     from app.services.scraper_service import scraper_service
     await scraper_service.close()
 
+    # Persist per-domain fetch tier memory and close the pooled HTTP client
+    from app.services.tiered_fetcher import tiered_fetcher
+    await tiered_fetcher.close()
+
+    from app.services.page_readiness import page_readiness
+    page_readiness.save()
+
+    from app.utils.html_cleaner import shutdown_pool
+    shutdown_pool()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -3,8 +3,10 @@ Chat API endpoints
 Real-time AI assistant for ScholarStream
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
+import json
 import structlog
 
 from app.services.chat_service import chat_service
@@ -26,6 +28,21 @@ class ChatResponse(BaseModel):
     actions: List[Dict[str, Any]] = []
 
 
+def format_sse(event: str, data: Any) -> str:
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _add_user_context(request: ChatRequest):
+    """Profile and matched-opportunity count the assistant answers against"""
+    user_profile = await db.get_user_profile(request.user_id)
+    if user_profile:
+        request.context['user_profile'] = user_profile
+    
+    matched = await db.get_user_matched_scholarships(request.user_id)
+    request.context['matched_count'] = len(matched) if matched else 0
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(request: ChatRequest):
     """
@@ -38,15 +55,7 @@ async def chat_with_ai(request: ChatRequest):
     """
     try:
         logger.info("Chat request received", user_id=request.user_id, message_preview=request.message[:50])
-        
-        # Get user profile for context
-        user_profile = await db.get_user_profile(request.user_id)
-        if user_profile:
-            request.context['user_profile'] = user_profile
-        
-        # Get matched opportunities count
-        matched = await db.get_user_matched_scholarships(request.user_id)
-        request.context['matched_count'] = len(matched) if matched else 0
+        await _add_user_context(request)
         
         # Process chat
         response = await chat_service.chat(
@@ -68,6 +77,41 @@ async def chat_with_ai(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
 
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat over Server-Sent Events.
+    
+    Events, in order: thinking (repeated), opportunities, token (repeated), done.
+    An error event replaces the rest of the stream if the turn fails.
+    The first thinking line goes out before the profile lookups, so the client
+    sees the stream open without waiting on Firestore.
+    """
+    logger.info("Chat stream requested", user_id=request.user_id, message_preview=request.message[:50])
+    
+    async def events():
+        yield format_sse('thinking', {'lines': ["👤 **Loading your profile...**"]})
+        try:
+            await _add_user_context(request)
+        except Exception as e:
+            logger.error("Chat context lookup failed", error=str(e))
+            yield format_sse('error', {'message': chat_service.ERROR_MESSAGE})
+            return
+        
+        async for event in chat_service.chat_stream(
+            user_id=request.user_id,
+            message=request.message,
+            context=request.context
+        ):
+            yield format_sse(event['event'], event['data'])
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/chat/history/{user_id}")
 async def get_chat_history(user_id: str, limit: int = 50):
     """
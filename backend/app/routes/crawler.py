@@ -87,7 +87,6 @@ class SentinelManager:
                     key=url,
                     value=payload
                 )
-                kafka_producer_manager.flush()
         else:
             logger.warning("Crawler Job Failed", job_id=job_id, status=status, url=url)
 
@@ -237,7 +237,7 @@ Return a valid JSON object containing ONLY the mappings.
 }}
 """
 
-        result = await ai_service.generate_content_async(prompt)
+        result = await ai_service.generate_content_async(prompt, priority="field_mapping")
 
         import re
         
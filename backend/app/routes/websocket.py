@@ -5,15 +5,19 @@ Consumes enriched opportunities from Confluent Kafka and pushes matches to conne
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends
 from typing import Dict, List, Optional, Any
 import json
+import time
 import asyncio
 import structlog
-from confluent_kafka import Consumer, KafkaError, KafkaException
+from confluent_kafka import KafkaError, KafkaException
 from firebase_admin import auth
 from datetime import datetime
 
 from app.database import get_user_profile, FirebaseDB
 from app.services.personalization_engine import PersonalizationEngine
 from app.services.kafka_config import KafkaConfig
+from app.services.retry_router import retry_router
+from app.services.pipeline_metrics import ConsumerMetrics
+from app.services.flink_processor import cortex_processor
 from app.models import (
     Scholarship, ScholarshipEligibility, ScholarshipRequirements
 )
@@ -97,6 +101,8 @@ class ConnectionManager:
 manager = ConnectionManager()
 personalization_engine = PersonalizationEngine()
 firebase_db = FirebaseDB()  # For persisting opportunities to Firestore
+consumer_metrics = ConsumerMetrics('scholarstream-websocket-consumers-v1')
+update_metrics = ConsumerMetrics('scholarstream-update-consumers-v1')
 
 
 async def verify_firebase_token(token: str) -> Optional[str]:
@@ -121,11 +127,11 @@ async def consume_kafka_stream():
         logger.warning("Kafka streaming disabled - WebSocket will not receive real-time updates")
         return
 
-    consumer_config = kafka_config.get_consumer_config(group_id='scholarstream-websocket-consumers-v1')
-    consumer = Consumer(consumer_config)
+    consumer = kafka_config.create_consumer('scholarstream-websocket-consumers-v1')
 
     # Subscribing to the new Refinery Output
     consumer.subscribe([KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED])
+    consumer_metrics.track(consumer)
 
     logger.info("Kafka Lifeline Consumer Started", topic=KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED)
 
@@ -143,17 +149,22 @@ async def consume_kafka_stream():
                 else:
                     # Exponential Backoff for Connection Errors
                     logger.error("Kafka error", error=str(msg.error()))
+                    consumer_metrics.error("poll")
                     await asyncio.sleep(5.0) # Sleep to prevent log spam
                 continue
 
+            consumer_metrics.consumed(msg)
+            started = time.perf_counter()
             try:
                 raw_value = msg.value().decode('utf-8')
                 # Try to parse the initial message
                 try:
                     raw_message = json.loads(raw_value)
-                except json.JSONDecodeError:
-                    logger.error("Skipping non-JSON Kafka message", raw=raw_value[:100])
-                    consumer.commit(asynchronous=False) # Skip poison pill
+                except json.JSONDecodeError as e:
+                    logger.error("Dead-lettering non-JSON Kafka message", raw=raw_value[:100])
+                    consumer_metrics.error("decode")
+                    consumer_metrics.processed("dead_letter")
+                    await retry_router.handle_failure(consumer, msg, e, source="websocket-consumer", permanent=True)
                     continue
 
                 # FIX: Recursive Unwrapping (The "Matryoshka" Unwrap)
@@ -189,7 +200,8 @@ async def consume_kafka_stream():
                         type=type(final_data).__name__,
                         preview=str(final_data)[:100]
                     )
-                    consumer.commit(asynchronous=False) # Skip poison pill
+                    consumer_metrics.processed("skipped")
+                    consumer_metrics.commit(consumer, asynchronous=False) # Skip poison pill
                     continue
 
                 logger.info(
@@ -198,16 +210,29 @@ async def consume_kafka_stream():
                     source=final_data.get('source', 'unknown')
                 )
 
+                # Cortex Shield: exact + near-duplicate filtering before Firestore and fan-out.
+                # Marked as seen only after persistence, so a retried write isn't dropped.
+                processed = await cortex_processor.process_event(final_data, mark_seen=False)
+                if processed is None:
+                    consumer_metrics.processed("duplicate")
+                    consumer_metrics.commit(consumer, asynchronous=False)
+                    continue
+
                 # Process
-                await process_and_route_opportunity(final_data)
+                await process_and_route_opportunity(processed)
+                await cortex_processor.mark_seen(processed)
 
                 # Commit ONLY after successful processing (or explicit skip above)
-                consumer.commit(asynchronous=False)
+                consumer_metrics.processed("ok", seconds=time.perf_counter() - started)
+                consumer_metrics.commit(consumer, asynchronous=False)
 
             except Exception as e:
-                # Catch-all for processing errors
+                # Processing failed (e.g. transient Firestore error): park it on a
+                # retry tier and move on, instead of committing it away.
                 logger.error("Error processing opportunity", error=str(e), traceback=True)
-                consumer.commit(asynchronous=False)
+                consumer_metrics.error("process")
+                consumer_metrics.processed("retry", seconds=time.perf_counter() - started)
+                await retry_router.handle_failure(consumer, msg, e, source="websocket-consumer")
 
     except KafkaException as e:
         logger.error("Kafka consumer error", error=str(e))
@@ -216,6 +241,108 @@ async def consume_kafka_stream():
         logger.info("Kafka consumer closed")
 
 
+async def consume_update_stream():
+    """
+    Background task that applies opportunity.updated.v1 deltas (Cortex CDC):
+    patches the changed fields in Firestore and tells connected clients, instead of
+    re-running the full persist + match path for a known opportunity.
+    """
+    kafka_config = KafkaConfig()
+
+    if not kafka_config.enabled:
+        return
+
+    consumer = kafka_config.create_consumer('scholarstream-update-consumers-v1')
+    consumer.subscribe([KafkaConfig.TOPIC_OPPORTUNITY_UPDATED])
+    update_metrics.track(consumer)
+
+    logger.info("Opportunity update consumer started", topic=KafkaConfig.TOPIC_OPPORTUNITY_UPDATED)
+
+    try:
+        while True:
+            msg = await asyncio.to_thread(consumer.poll, 1.0)
+
+            if msg is None:
+                continue
+
+            if msg.error():
+                if msg.error().code() != KafkaError._PARTITION_EOF:
+                    logger.error("Kafka error", error=str(msg.error()))
+                    update_metrics.error("poll")
+                    await asyncio.sleep(5.0)
+                continue
+
+            update_metrics.consumed(msg)
+            started = time.perf_counter()
+            try:
+                update = json.loads(msg.value().decode('utf-8'))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                update_metrics.error("decode")
+                update_metrics.processed("dead_letter")
+                await retry_router.handle_failure(consumer, msg, e, source="update-consumer", permanent=True)
+                continue
+
+            try:
+                await apply_opportunity_update(update)
+                update_metrics.processed("ok", seconds=time.perf_counter() - started)
+                update_metrics.commit(consumer, msg, asynchronous=False)
+            except Exception as e:
+                logger.error("Error applying opportunity update", error=str(e), opportunity_id=update.get('id'))
+                update_metrics.error("process")
+                update_metrics.processed("retry", seconds=time.perf_counter() - started)
+                await retry_router.handle_failure(consumer, msg, e, source="update-consumer")
+
+    except KafkaException as e:
+        logger.error("Kafka update consumer error", error=str(e))
+    finally:
+        consumer.close()
+
+
+def build_scholarship_patch(patch: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a CDC patch onto Scholarship document fields (keeps derived fields in sync)"""
+    fields: Dict[str, Any] = {}
+    if 'amount' in patch:
+        amount = float(patch['amount'] or 0)
+        fields['amount'] = amount
+        if 'amount_display' not in patch:
+            fields['amount_display'] = f"${amount:,.0f}"
+    if patch.get('amount_display'):
+        fields['amount_display'] = patch['amount_display']
+    if patch.get('deadline'):
+        deadline = str(patch['deadline'])
+        fields['deadline'] = deadline
+        try:
+            dt = datetime.strptime(deadline, "%Y-%m-%d") if len(deadline) == 10 \
+                else datetime.fromisoformat(deadline.replace('Z', '+00:00'))
+            fields['deadline_timestamp'] = int(dt.timestamp())
+        except ValueError:
+            pass
+    for key in ('status', 'type_tags', 'geo_tags'):
+        if key in patch:
+            fields[key] = patch[key]
+    fields['last_verified'] = datetime.utcnow().isoformat()
+    return fields
+
+
+async def apply_opportunity_update(update: Dict[str, Any]):
+    """Patch Firestore and notify connected clients about a changed opportunity"""
+    opportunity_id = update.get('id')
+    if not opportunity_id:
+        return
+
+    fields = build_scholarship_patch(update.get('patch') or {})
+    if not await firebase_db.update_scholarship_fields(opportunity_id, fields):
+        return  # Never persisted (rejected on conversion, or its write failed): nothing to patch
+
+    await manager.broadcast({
+        'type': 'opportunity_updated',
+        'opportunity_id': opportunity_id,
+        'changes': update.get('changes', {}),
+        'fields': fields,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+
 def normalize_opportunity(data: Any) -> Dict:
     """
     SELF-HEALING MECHANISM
@@ -384,18 +511,16 @@ async def process_and_route_opportunity(enriched_opportunity: Dict):
     3. Send to users with match score > 60
     """
     # STEP 1: Persist to Firestore (critical for /api/scholarships/matched)
-    try:
-        scholarship = convert_to_scholarship(enriched_opportunity)
-        if scholarship:
-            await firebase_db.save_scholarship(scholarship)
-            logger.info(
-                "Opportunity persisted to Firestore",
-                scholarship_id=scholarship.id,
-                name=scholarship.title
-            )
-    except Exception as e:
-        logger.error("Failed to persist opportunity to Firestore", error=str(e))
-        # Continue with routing even if persistence fails
+    # A persistence failure propagates to the consumer, which parks the message on a
+    # retry tier; routing happens on the successful redelivery, so users aren't pushed twice.
+    scholarship = convert_to_scholarship(enriched_opportunity)
+    if scholarship:
+        await firebase_db.save_scholarship(scholarship)
+        logger.info(
+            "Opportunity persisted to Firestore",
+            scholarship_id=scholarship.id,
+            name=scholarship.title
+        )
     
     # STEP 2: Route to connected users
     connected_users = manager.get_all_user_ids()
@@ -567,4 +692,5 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
 async def start_kafka_consumer_task():
     """Start background Kafka consumer task"""
     asyncio.create_task(consume_kafka_stream())
+    asyncio.create_task(consume_update_stream())
     logger.info("Kafka consumer background task started")
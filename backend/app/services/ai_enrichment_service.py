@@ -2,99 +2,214 @@
 AI Enrichment Service (Consolidated V2)
 Batch enrichment of opportunities using Gemini with specialized platform rules.
 """
-import google.generativeai as genai
-from typing import List, Dict, Any, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
-import json
 import asyncio
 import structlog
 from urllib.parse import urlparse
-from bs4 import BeautifulSoup
 
 from app.config import settings
-from app.utils.json_utils import robust_json_loads
+from app.utils.json_utils import JSONArrayStream
+from app.utils.html_cleaner import clean_html as fast_clean_html, clean_html_async
+from app.services.llm_cache import llm_cache
+from app.services.llm_gateway import llm_gateway
+from app.services.pipeline_metrics import pipeline_metrics
+from app.utils.page_chunker import CHARS_PER_TOKEN, chunk_text, estimate_tokens, merge_fields, pack_chunks
 
 logger = structlog.get_logger()
 
+
+class ExtractionUnavailableError(Exception):
+    """Gemini could not be reached (rate limit, network, API error) - safe to retry later"""
+
+
+class ExtractionOutputError(Exception):
+    """Gemini answered but the output was unusable (e.g. invalid JSON) - retrying the same prompt won't help"""
+
+
+PACKING = pipeline_metrics.counter(
+    "cortex_llm_packing_total", "Discovery prompts, packed chunks and re-splits", ("outcome",))
+
+
 class AIEnrichmentService:
     """
     Enriches raw opportunity data using Gemini AI.
     Optimized for high-density discovery from specific hubs (HackerOne, Superteam, etc.)
     """
+
+    PROMPT_VERSION = "discovery-v2"  # Bump when the prompt changes: cached extractions are keyed by it
     
     def __init__(self):
-        genai.configure(api_key=settings.gemini_api_key)
-        self.model = genai.GenerativeModel(settings.gemini_model)
         self.batch_size = 10 
     
     def clean_html(self, html_content: str) -> str:
-        """Aggressively clean HTML to reduce token usage"""
-        if not html_content: return ""
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-
-            # Decompose heavy tags, but PRESERVE hydration JSON for SPAs.
-            # Many of our targets (DoraHacks, HackQuest, TAIKAI, Superteam) are Next.js/SPAs where
-            # the opportunity data lives inside <script id="__NEXT_DATA__" type="application/json">...</script>.
-            # If we delete all scripts we destroy the only structured data on the page.
-            for tag in soup(['style', 'svg', 'path', 'noscript', 'meta', 'link', 'iframe', 'footer', 'nav']):
-                tag.decompose()
-
-            # Remove scripts except allowlisted ones (__NEXT_DATA__, ld+json, and common SPA hydration blobs)
-            for script in soup.find_all('script'):
-                sid = (script.get('id') or '').strip()
-                stype = (script.get('type') or '').strip().lower()
-                keep = False
-
-                if sid == '__NEXT_DATA__':
-                    keep = True
-                elif stype in ['application/ld+json', 'application/json']:
-                    # Some sites embed structured data as JSON-LD or app state as application/json.
-                    keep = True
-                else:
-                    # Nuxt hydration (common fallback)
-                    text = (script.string or '')
-                    if 'window.__NUXT__' in text or '__NUXT__' in text:
-                        keep = True
-
-                if not keep:
-                    script.decompose()
-
-            body = soup.body
-            cleaned = str(body)[:60000] if body else str(soup)[:60000]
-
-            # Diagnostic: Log content density
-            if len(cleaned) < 500:
-                logger.info("Content density low", length=len(cleaned), url=getattr(self, '_last_url', 'unknown'))
-
-            return cleaned
-        except Exception as e:
-            logger.warning("HTML Clean failed", error=str(e))
-            return html_content[:60000]
+        """Aggressively clean HTML to reduce token usage (text with links + hydration JSON)"""
+        cleaned = fast_clean_html(html_content)
+        # Diagnostic: Log content density
+        if html_content and len(cleaned) < 500:
+            logger.info("Content density low", length=len(cleaned), url=getattr(self, '_last_url', 'unknown'))
+        return cleaned
 
     async def extract_opportunities_from_html_batch(self, items: List[Dict[str, str]]) -> List[Dict[str, Any]]:
         """Batch process multiple HTML pages with platform-specific context"""
-        if not items: return []
-            
-        cleaned_items = []
-        for item in items:
-            self._last_url = item.get('url') # For logging context
-            clean = self.clean_html(item.get('html', ''))
-            if len(clean) > 50: # Lowered threshold for lean SPA cards
-                cleaned_items.append({'url': item.get('url'), 'content': clean})
-        
-        if not cleaned_items:
+        return [opp for page in await self.extract_pages(items) for opp in page]
+
+    async def extract_pages(self, items: List[Dict[str, str]]) -> List[List[Dict[str, Any]]]:
+        """
+        Opportunities per page (aligned with items) in as few Gemini calls as the budget allows.
+        Big pages are split into chunks; small pages and chunks are packed into shared prompts.
+        """
+        per_page: List[Dict[int, Dict[str, Any]]] = [{} for _ in items]
+        async for index, item in self.stream_pages(items):
+            per_page[index][id(item)] = item  # An update yields the same dict again
+        return [list(found.values()) for found in per_page]
+
+    async def stream_pages(self, items: List[Dict[str, str]]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        extract_pages as a pipeline: (page index, opportunity) as soon as each object closes
+        in the streamed model output. A card read twice (chunk overlap, re-split) is merged
+        into the first copy, which is yielded again if that filled empty fields.
+        """
+        if not items: return
+
+        # Pages are read whole: cleaned up to the chunk budget, then split at card boundaries
+        chunk_tokens = settings.llm_chunk_tokens
+        max_chunks = settings.llm_max_chunks_per_page
+        page_chars = chunk_tokens * CHARS_PER_TOKEN * max_chunks
+
+        # CPU-heavy parsing runs in the cleaner's worker pool, pages in parallel
+        cleaned_pages = await asyncio.gather(*(clean_html_async(item.get('html', ''), page_chars) for item in items))
+        units = []  # (page index, url, chunk, part label)
+        for index, (item, clean) in enumerate(zip(items, cleaned_pages)):
+            if len(clean) <= 50: # Lowered threshold for lean SPA cards
+                logger.info("Content density low", length=len(clean), url=item.get('url'))
+                continue
+            chunks = chunk_text(clean, chunk_tokens, settings.llm_chunk_overlap_tokens, max_chunks)
+            for part, chunk in enumerate(chunks):
+                label = f" PART {part+1}/{len(chunks)}" if len(chunks) > 1 else ""
+                units.append((index, item.get('url'), chunk, label))
+
+        if not units:
             logger.warning("Batch processing aborted: No valid content found", total_items=len(items))
-            return []
+            return
+
+        # Bin-pack into prompts; bins stream concurrently under the global LLM slots into one queue
+        bins = pack_chunks(
+            [estimate_tokens(unit[2]) for unit in units], settings.llm_pack_tokens, settings.llm_pack_max_pages
+        )
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump(batch: List[tuple]):
+            try:
+                await self._extract_packed(batch, queue.put)
+            except Exception as e:
+                queue.put_nowait(e)
+            finally:
+                queue.put_nowait(None)
+
+        tasks = [asyncio.create_task(pump([units[i] for i in indexes])) for indexes in bins]
+        merged: List[Dict[Any, Dict[str, Any]]] = [{} for _ in items]
+        failure: Optional[Exception] = None
+        try:
+            pending = len(tasks)
+            while pending:
+                placed = await queue.get()
+                if placed is None:
+                    pending -= 1
+                    continue
+                if isinstance(placed, Exception):
+                    failure = failure or placed
+                    continue
+                index, item = placed
+                key = self._merge_key(item)
+                first = merged[index].get(key)
+                if first is None:
+                    merged[index][key] = item
+                    yield index, item
+                elif merge_fields(first, item):
+                    yield index, first
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
+        if failure is not None:
+            # Retried whole later; prompts that completed are cached, so the retry only pays for the rest
+            raise failure
+        if len(units) > 1:
+            logger.info("Packed extraction complete", pages=len(items), chunks=len(units), prompts=len(bins))
+
+    @staticmethod
+    def _merge_key(item: Dict[str, Any]):
+        return (item['url'].rstrip('/').lower(), item['title'].strip().lower())
+
+    async def _extract_packed(self, units: List[tuple], emit: Callable[[Tuple[int, Dict[str, Any]]], Awaitable[None]]):
+        """
+        One prompt over packed chunks, emitting (page index, opportunity) as items arrive.
+        If an item can't be attributed to its page, or a multi-page answer is unusable, the
+        prompt is abandoned and each half extracted on its own (emitted items merge downstream).
+        """
         context_str = ""
-        for i, item in enumerate(cleaned_items):
-            context_str += f"\n\n=== START PAGE {i+1} URL: {item['url']} ===\n{item['content']}\n=== END PAGE {i+1} ===\n"
+        for n, (_, url, chunk, label) in enumerate(units, 1):
+            context_str += f"\n\n=== START PAGE {n}{label} URL: {url} ===\n{chunk}\n=== END PAGE {n}{label} ===\n"
+        PACKING.inc(outcome="prompt")
+        PACKING.inc(len(units), outcome="chunk")
+
+        stream = self._stream_context(context_str, page_count=len(units))
+        reason = None
+        try:
+            async for item in stream:
+                claimed = item.pop('page', None)
+                slot = 0 if len(units) == 1 else self._attribute(item, claimed, units)
+                if slot is None:
+                    reason = "unattributed items"
+                    break
+                await emit((units[slot][0], item))
+        except ExtractionOutputError as e:
+            if len(units) == 1:
+                return
+            reason = str(e)
+        finally:
+            await stream.aclose()
+        if reason is None:
+            return
+
+        PACKING.inc(outcome="resplit")
+        logger.warning("Packed prompt failed, re-splitting", chunks=len(units), reason=reason[:200])
+        half = len(units) // 2
+        await asyncio.gather(self._extract_packed(units[:half], emit), self._extract_packed(units[half:], emit))
+
+    def _attribute(self, item: Dict[str, Any], claimed: Any, units: List[tuple]) -> Optional[int]:
+        """
+        The packed chunk an item came from: the model's page number, checked against the
+        item's url (same host, or linked from that chunk). None if it can't be placed with confidence.
+        """
+        def matches(url: str, unit: tuple) -> bool:
+            host = urlparse(url).netloc.lower()
+            return (bool(host) and host == urlparse(unit[1] or '').netloc.lower()) or url.rstrip('/') in unit[2]
 
+        try:
+            claimed = int(claimed) - 1
+        except (TypeError, ValueError):
+            claimed = -1
+        candidates = [n for n, unit in enumerate(units) if matches(item['url'], unit)]
+        if 0 <= claimed < len(units) and (claimed in candidates or not candidates):
+            return claimed
+        if len(candidates) == 1:
+            return candidates[0]  # Wrong page number, but the url settles it
+        logger.debug("Unattributable packed item", url=item.get('url'), claimed=claimed + 1)
+        return None
+
+    async def _stream_context(self, context_str: str, page_count: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        One discovery prompt over framed page content, yielding items as they close (cached;
+        the gateway retries rate limits). Raises ExtractionOutputError after the last usable
+        item if the answer was cut short or never contained an array.
+        """
         prompt = f"""
 You are a high-speed financial discovery engine. 
 Extract EVERY distinct opportunity (Scholarship, Grant, Hackathon, Bounty) from the provided HTML.
-Combined JSON list of objects: title, organization, amount_value (int), amount_display, deadline (YYYY-MM-DD), description, url (absolute), type, eligibility.
+Combined JSON list of objects: page (the PAGE number it was found on), title, organization, amount_value (int), amount_display, deadline (YYYY-MM-DD), description, url (absolute), type, eligibility.
 
 Rules:
 - HackerOne: Each bug bounty program is one opportunity.
@@ -107,64 +222,72 @@ DATA:
 
 RETURN JSON ARRAY ONLY.
 """
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Diagnostic: Log prompt size
-                logger.info("Sending Discovery Mission to Gemini", 
-                            page_count=len(cleaned_items), 
-                            payload_size=len(context_str),
-                            attempt=attempt+1)
-                            
-                response = await self.model.generate_content_async(prompt)
-                text = response.text.strip()
-                
-                # Diagnostic: Log response size
-                logger.info("Gemini Analysis Received", response_size=len(text))
-                
-                if "```json" in text:
-                    text = text.split("```json")[1].split("```")[0].strip()
-                elif "```" in text:
-                    text = text.split("```")[1].split("```")[0].strip()
-                    
-                extracted = robust_json_loads(text)
-                if not isinstance(extracted, (list, dict)): return []
-                if isinstance(extracted, dict): extracted = [extracted]
-                
-                valid_opportunities = []
-                for item in extracted:
-                    try:
-                        if not item.get('title') or not item.get('url'): continue
-                        
-                        # Apply URL Normalization & Fix DevPost 404s
-                        item['url'] = self._normalize_url(item['url'])
-                        
-                        # CRITICAL FIX: Map amount_value → amount (the field the model expects)
-                        if item.get('amount_value') is not None:
-                            item['amount'] = float(item.get('amount_value', 0))
-                        elif item.get('amount') is None:
-                            item['amount'] = 0.0
-                        
-                        # Generate amount_display if missing
-                        if not item.get('amount_display') and item.get('amount'):
-                            item['amount_display'] = f"${item['amount']:,.0f}"
-                        
-                        if not item.get('eligibility'): item['eligibility'] = "Open to all users."
-                        if item.get('deadline') in ["Unknown", "TBD", "None"]: item['deadline'] = None
-
-                        valid_opportunities.append(item)
-                    except Exception: continue
-
-                logger.info("Batch extraction complete", total_found=len(valid_opportunities), attempt=attempt+1)
-                return valid_opportunities
+        # Byte-identical cleaned pages (re-patrols) reuse the last extraction: zero tokens
+        cache_key = llm_cache.key("discovery", self.PROMPT_VERSION, settings.gemini_model, context_str)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Discovery cache hit", page_count=page_count, total_found=len(cached))
+            for item in cached:
+                yield item
+            return
 
-            except Exception as e:
-                if any(x in str(e) for x in ["429", "RESOURCE_EXHAUSTED"]):
-                    await asyncio.sleep(20 * (attempt + 1))
-                    continue
-                logger.error("Batch Extraction failed", error=str(e)[:500])
-                return []
-        return []
+        # Diagnostic: Log prompt size
+        logger.info("Sending Discovery Mission to Gemini", 
+                    page_count=page_count, 
+                    payload_size=len(context_str))
+
+        parser = JSONArrayStream()
+        valid_opportunities = []
+        response_size = 0
+        # The gateway retries rate limits with backoff; what escapes it is a real outage
+        stream = llm_gateway.stream(prompt, priority="background")
+        try:
+            async for text in stream:
+                response_size += len(text)
+                for item in parser.feed(text):
+                    item = self._normalize_item(item)
+                    if item is not None:
+                        valid_opportunities.append(dict(item))  # Callers pop 'page' from what they get
+                        yield item
+        except Exception as e:
+            logger.error("Batch Extraction failed", error=str(e)[:500])
+            raise ExtractionUnavailableError(str(e)) from e
+        finally:
+            await stream.aclose()
+
+        # Diagnostic: Log response size
+        logger.info("Gemini Analysis Received", response_size=response_size)
+
+        if not parser.complete:
+            # Deterministic bad output: retrying the same prompt won't help
+            logger.error("Batch Extraction returned invalid JSON", streamed=len(valid_opportunities))
+            raise ExtractionOutputError("response ended without a complete JSON array")
+
+        logger.info("Batch extraction complete", total_found=len(valid_opportunities))
+        llm_cache.put(cache_key, valid_opportunities, prompt_chars=len(prompt))
+
+    def _normalize_item(self, item: Any) -> Optional[Dict[str, Any]]:
+        """A discovery item with normalized url and amount fields, or None if unusable"""
+        try:
+            if not isinstance(item, dict) or not item.get('title') or not item.get('url'): return None
+            
+            # Apply URL Normalization & Fix DevPost 404s
+            item['url'] = self._normalize_url(item['url'])
+            
+            # CRITICAL FIX: Map amount_value → amount (the field the model expects)
+            if item.get('amount_value') is not None:
+                item['amount'] = float(item.get('amount_value', 0))
+            elif item.get('amount') is None:
+                item['amount'] = 0.0
+            
+            # Generate amount_display if missing
+            if not item.get('amount_display') and item.get('amount'):
+                item['amount_display'] = f"${item['amount']:,.0f}"
+            
+            if not item.get('eligibility'): item['eligibility'] = "Open to all users."
+            if item.get('deadline') in ["Unknown", "TBD", "None"]: item['deadline'] = None
+            return item
+        except Exception: return None
 
     def _normalize_url(self, url: str) -> str:
         """Surgical URL stability layer"""
@@ -2,7 +2,6 @@
 Google Gemini AI Service
 Handles AI-powered scholarship enrichment and matching
 """
-import google.generativeai as genai
 from typing import Dict, List, Optional, Any
 import json
 import asyncio
@@ -18,6 +17,7 @@ except ImportError:
     Redis = None
 
 from app.config import settings
+from app.services.llm_gateway import llm_gateway
 from app.models import (
     ScrapedScholarship,
     UserProfile,
@@ -37,8 +37,8 @@ class GeminiAIService:
     
     def __init__(self):
         """Initialize Gemini AI with Upstash Redis support"""
-        genai.configure(api_key=settings.gemini_api_key)
-        self.model = genai.GenerativeModel(settings.gemini_model)
+        # Shared model from the gateway; only the sync compat path calls it directly
+        self.model = llm_gateway.model()
         
         # Initialize Upstash Redis for rate limiting and caching
         self.redis_client = None
@@ -128,7 +128,7 @@ class GeminiAIService:
         return True
 
     def generate_content(self, prompt: str) -> Any:
-        # ... (keep existing sync for compat)
+        # ... (keep existing sync for compat; scripts only - it bypasses the LLM gateway)
         if not self._check_rate_limit():
             raise Exception("Rate limit exceeded")
         try:
@@ -137,15 +137,13 @@ class GeminiAIService:
             logger.error("Gemini generation failed", error=str(e))
             raise e
 
-    async def generate_content_async(self, prompt: str) -> Any:
-        """Async wrapper for generate_content"""
+    async def generate_content_async(self, prompt: str, priority: str = "background") -> Any:
+        """Async generate through the LLM gateway (priority: interactive, field_mapping or background)"""
         if not self._check_rate_limit():
             raise Exception("Rate limit exceeded")
         
         try:
-            # Use run_in_executor or the library's async method if available
-            # Gemini 1.5 library has generate_content_async
-            response = await self.model.generate_content_async(prompt)
+            response = await llm_gateway.generate(prompt, priority=priority)
             return response.text
         except Exception as e:
             logger.error("Gemini async generation failed", error=str(e))
@@ -174,7 +172,7 @@ class GeminiAIService:
         
         try:
             prompt = self._build_enrichment_prompt(scholarship, user_profile)
-            response = self.model.generate_content(prompt)
+            response = await llm_gateway.generate(prompt, priority="background")
             
             # Parse AI response
             enriched_data = self._parse_ai_response(response.text)
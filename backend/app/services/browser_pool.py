@@ -0,0 +1,227 @@
+"""
+Browser Context Pool
+Warm, pre-configured Playwright contexts for the Hunter Drones.
+
+Creating a stealth context per URL (and per retry) re-runs the init script and
+re-registers route handlers every time. The pool keeps contexts warm instead:
+- stealth init script and the route handler are installed once per context
+- each lease gets a fresh fingerprint (user agent via CDP, viewport) on a warm page
+- contexts are health-checked on release and recycled after max_uses
+- pool size is bounded by settings and by available memory
+"""
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import structlog
+
+from app.config import settings
+from app.services.pipeline_metrics import pipeline_metrics
+
+logger = structlog.get_logger()
+
+HEALTH_CHECK_TIMEOUT = 5.0
+
+
+def available_memory_mb() -> Optional[int]:
+    """MemAvailable from /proc/meminfo, else physical memory via sysconf (None if unknown)"""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def pool_size_for_memory(max_contexts: int, mb_per_context: int, reserve_mb: int = 512) -> int:
+    """Largest pool that fits in available memory (at least 1, at most max_contexts)"""
+    free_mb = available_memory_mb()
+    if free_mb is None:
+        return max_contexts
+    return max(1, min(max_contexts, (free_mb - reserve_mb) // max(1, mb_per_context)))
+
+
+class PooledContext:
+    """A warm context with its page, route policy slot and usage accounting"""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.cdp = None
+        self.profile = "default"  # Read by the context-level route handler
+        self.uses = 0
+        self.created_at = time.time()
+        self.failed = False
+
+
+class BrowserPool:
+    """
+    Lease warm pages: `async with pool.lease("drone") as page: ...`
+    The route handler receives (profile, route) and decides what to block per lease profile.
+    """
+
+    def __init__(
+        self,
+        context_factory: Callable[[], Awaitable[Any]],
+        route_handler: Callable[[str, Any], Awaitable[None]],
+        user_agents: List[str],
+        viewports: List[Dict[str, int]],
+        max_contexts: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        mb_per_context: Optional[int] = None
+    ):
+        self.context_factory = context_factory
+        self.route_handler = route_handler
+        self.user_agents = user_agents
+        self.viewports = viewports
+        self.max_uses = max_uses or settings.browser_pool_max_uses
+        self.size = pool_size_for_memory(
+            max_contexts or settings.browser_pool_max_contexts,
+            mb_per_context or settings.browser_pool_context_mb
+        )
+
+        self._idle: List[PooledContext] = []
+        self._slots = asyncio.Semaphore(self.size)
+        self._live = 0
+
+        self.stats = {
+            'leases': 0,
+            'warm_hits': 0,
+            'contexts_created': 0,
+            'contexts_recycled': 0,
+            'health_check_failures': 0,
+            'lease_setup_ms_total': 0.0,
+        }
+        logger.info("Browser pool sized", size=self.size, max_uses=self.max_uses,
+                    available_mb=available_memory_mb())
+
+    async def _create(self) -> PooledContext:
+        context = await self.context_factory()
+        page = await context.new_page()
+        pooled = PooledContext(context, page)
+
+        async def _route(route):
+            await self.route_handler(pooled.profile, route)
+
+        # Registered once per context, policy switches per lease via pooled.profile
+        await context.route("**/*", _route)
+        self._live += 1
+        self.stats['contexts_created'] += 1
+        return pooled
+
+    async def _destroy(self, pooled: PooledContext):
+        self._live -= 1
+        self.stats['contexts_recycled'] += 1
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    async def _apply_fingerprint(self, pooled: PooledContext):
+        """Rotate user agent (header and navigator.userAgent) and viewport for this lease"""
+        user_agent = random.choice(self.user_agents)
+        await pooled.page.set_viewport_size(random.choice(self.viewports))
+        try:
+            if pooled.cdp is None:
+                pooled.cdp = await pooled.context.new_cdp_session(pooled.page)
+            await pooled.cdp.send("Network.setUserAgentOverride", {
+                "userAgent": user_agent,
+                "acceptLanguage": "en-US,en;q=0.9",
+            })
+        except Exception:
+            # Non-Chromium engines: header-only rotation
+            await pooled.page.set_extra_http_headers({"User-Agent": user_agent})
+
+    async def _healthy(self, pooled: PooledContext) -> bool:
+        if pooled.failed or pooled.page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(pooled.page.goto("about:blank"), timeout=HEALTH_CHECK_TIMEOUT)
+            await asyncio.wait_for(pooled.page.evaluate("1"), timeout=HEALTH_CHECK_TIMEOUT)
+            await pooled.context.clear_cookies()
+            await pooled.page.set_extra_http_headers({})  # Drop the previous lease's headers
+            return True
+        except Exception:
+            self.stats['health_check_failures'] += 1
+            return False
+
+    @asynccontextmanager
+    async def lease(self, profile: str = "default"):
+        """Yield a ready page; the context returns to the pool (or is recycled) afterwards"""
+        await self._slots.acquire()
+        started = time.perf_counter()
+        pooled: Optional[PooledContext] = None
+        try:
+            while self._idle and pooled is None:
+                candidate = self._idle.pop()
+                if candidate.page.is_closed():
+                    await self._destroy(candidate)
+                else:
+                    pooled = candidate
+                    self.stats['warm_hits'] += 1
+            if pooled is None:
+                pooled = await self._create()
+
+            pooled.profile = profile
+            await self._apply_fingerprint(pooled)
+            self.stats['leases'] += 1
+            self.stats['lease_setup_ms_total'] += (time.perf_counter() - started) * 1000
+        except BaseException:
+            if pooled is not None:
+                await self._destroy(pooled)
+            self._slots.release()
+            raise
+
+        try:
+            yield pooled.page
+        except BaseException:
+            pooled.failed = pooled.page.is_closed()
+            raise
+        finally:
+            pooled.uses += 1
+            try:
+                if pooled.uses >= self.max_uses or not await self._healthy(pooled):
+                    await self._destroy(pooled)
+                else:
+                    pooled.profile = "default"
+                    self._idle.append(pooled)
+            finally:
+                self._slots.release()
+
+    async def warm(self, count: Optional[int] = None):
+        """Pre-create contexts so the first leases skip setup"""
+        count = min(self.size, count if count is not None else settings.browser_pool_warm)
+        while len(self._idle) < count:
+            self._idle.append(await self._create())
+
+    async def drain(self):
+        """Close idle contexts (browser restart or shutdown)"""
+        idle, self._idle = self._idle, []
+        for pooled in idle:
+            await self._destroy(pooled)
+
+    def get_stats(self) -> Dict[str, Any]:
+        leases = self.stats['leases']
+        return {
+            **{k: v for k, v in self.stats.items() if k != 'lease_setup_ms_total'},
+            'size': self.size,
+            'live_contexts': self._live,
+            'idle_contexts': len(self._idle),
+            'avg_lease_setup_ms': round(self.stats['lease_setup_ms_total'] / leases, 2) if leases else 0.0,
+        }
+
+    def register_metrics(self, name: str):
+        gauge = pipeline_metrics.gauge("cortex_browser_pool", "Browser context pool state", ("pool", "stat"))
+
+        def collect():
+            for stat, value in self.get_stats().items():
+                gauge.set(value, pool=name, stat=stat)
+
+        pipeline_metrics.register_collector(collect)
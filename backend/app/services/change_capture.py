@@ -0,0 +1,88 @@
+"""
+Opportunity Change Data Capture
+A repeat of a known opportunity id is not always a duplicate: prize pools grow and
+deadlines move. The processor keeps the material fields it last saw per id and emits
+a compact delta on opportunity.updated.v1 when one of them changes.
+
+Fields missing from a new sighting are treated as "not observed", not as cleared,
+so a sparse re-extraction never produces a spurious change.
+"""
+import hashlib
+import json
+import time
+from typing import Dict, Any, Optional, Tuple
+
+# Name, organization and URL are part of the opportunity id, so they can't change under one
+MATERIAL_FIELDS = (
+    'amount',
+    'amount_display',
+    'deadline',
+    'status',
+    'type_tags',
+    'geo_tags',
+)
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.lower().strip().split())
+
+
+def _normalize_value(field: str, value: Any) -> Any:
+    if value is None or value == '' or value == []:
+        return None
+    if field == 'amount':
+        try:
+            amount = round(float(value), 2)
+        except (TypeError, ValueError):
+            return None
+        return amount if amount > 0 else None
+    if field == 'deadline':
+        return str(value)[:10]
+    if isinstance(value, list):
+        return sorted({_normalize_text(str(v)) for v in value if v})
+    return _normalize_text(str(value))
+
+
+def material_fields(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized material fields present in this sighting"""
+    fields = {}
+    for field in MATERIAL_FIELDS:
+        value = _normalize_value(field, event.get(field))
+        if value is not None:
+            fields[field] = value
+    return fields
+
+
+def fields_digest(fields: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def diff_fields(previous: Dict[str, Any], current: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Merge a new sighting into the stored fields.
+    Returns (merged_fields, changes) where changes maps field -> {'old', 'new'}.
+    """
+    merged = dict(previous)
+    changes: Dict[str, Dict[str, Any]] = {}
+    for field, value in current.items():
+        if previous.get(field) != value:
+            changes[field] = {'old': previous.get(field), 'new': value}
+            merged[field] = value
+    return merged, changes
+
+
+def build_update_event(
+    opportunity_id: str,
+    event: Dict[str, Any],
+    changes: Dict[str, Dict[str, Any]],
+    detected_at: Optional[float] = None
+) -> Dict[str, Any]:
+    """Compact delta for opportunity.updated.v1; `patch` carries the raw new values"""
+    patch = {field: event.get(field) for field in changes}
+    return {
+        'id': opportunity_id,
+        'changes': changes,
+        'patch': patch,
+        'source_url': event.get('source_url') or event.get('url'),
+        'detected_at': detected_at or time.time(),
+    }
@@ -2,15 +2,16 @@
 AI Chat Service for ScholarStream Assistant
 Real-time conversational AI powered by Gemini
 """
-import google.generativeai as genai
+import asyncio
 import json
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional
 import structlog
 from datetime import datetime, timedelta
 
 from app.models import UserProfile, Scholarship
 from app.database import db
 from app.config import settings
+from app.services.llm_gateway import llm_gateway
 from app.services.matching_service import matching_service
 from app.services.personalization_engine import personalization_engine
 from app.services.cortex.navigator import scout
@@ -21,13 +22,13 @@ logger = structlog.get_logger()
 class ChatService:
     """AI Chat Assistant powered by Gemini"""
     
+    ERROR_MESSAGE = "❌ I encountered an error while processing your request. Please try rephrasing your question or contact support if the issue persists."
+    
     def __init__(self):
         """Initialize Gemini using settings"""
         if not settings.gemini_api_key:
             raise Exception("GEMINI_API_KEY not configured in settings")
         
-        genai.configure(api_key=settings.gemini_api_key)
-        self.model = genai.GenerativeModel(settings.gemini_model)
         logger.info("Chat service initialized", model=settings.gemini_model)
     
     async def chat(
@@ -40,119 +41,186 @@ class ChatService:
         Process chat message with enhanced transparency and markdown formatting
         """
         try:
-            # Build context-rich prompt
-            system_prompt = self._build_system_prompt(context)
-            
-            # Check for Emergency Mode
-            is_emergency = self._detect_emergency_mode(message)
-            
-            # FIX: Detect if user wants to search for opportunities
-            needs_search = self._detect_search_intent(message)
-            
-            opportunities = []
-            thinking_process = []
-            search_stats = None
-            
-            if needs_search or is_emergency:
-                # TRANSPARENCY: Log search process
-                if is_emergency:
-                    thinking_process.append("🚨 **EMERGENCY MODE ACTIVATED**")
-                    thinking_process.append("- prioritizing deadlines < 14 days")
-                    thinking_process.append("- prioritizing quick-apply formats")
-                else:
-                    thinking_process.append("🔍 **Analyzing your request...**")
-                
-                # Extract search criteria
-                search_criteria = await self._extract_search_criteria(message, context.get('user_profile', {}))
-                
-                # Override for Emergency
-                if is_emergency:
-                    search_criteria['urgency'] = 'immediate'
-                    
-                thinking_process.append(f"\n📋 **Search Criteria Identified:**")
-                thinking_process.append(f"- **Types**: {', '.join(search_criteria['types'])}")
-                if search_criteria['urgency'] != 'any':
-                    thinking_process.append(f"- **Urgency**: {search_criteria['urgency']}")
-                thinking_process.append(f"- **Location**: {context.get('user_profile', {}).get('state', 'Any')}, {context.get('user_profile', {}).get('country', 'Any')}")
-                
-                # Search with detailed statistics
-                opportunities, search_stats = await self._search_opportunities_with_stats(
-                    search_criteria, 
-                    context.get('user_profile', {})
-                )
-                
-                # Check if it was broadened
-                if search_criteria.get('broadened'):
-                    thinking_process.append("\n⚠️ **Broadening search to find more potential matches...**")
-                
-                # TRANSPARENCY: Show filtering results
-                thinking_process.append(f"\n📊 **Search Results:**")
-                thinking_process.append(f"- Total opportunities scanned: **{search_stats['total_scanned']}**")
-                thinking_process.append(f"- Expired (filtered out): {search_stats['expired']}")
-                thinking_process.append(f"- Location mismatch (filtered out): {search_stats['location_filtered']}")
-                thinking_process.append(f"- Type mismatch (filtered out): {search_stats['type_filtered']}")
-                if search_stats.get('urgency_filtered', 0) > 0:
-                    thinking_process.append(f"- Urgency mismatch (filtered out): {search_stats['urgency_filtered']}")
-                thinking_process.append(f"- **✅ Final matches: {len(opportunities)}**")
-                
-                # Add opportunities to prompt for AI context
-                if opportunities:
-                    system_prompt += f"\n\nSEARCH RESULTS ({len(opportunities)} found):\n"
-                    # UPGRADED: Show MORE results in emergency to give the student more options
-                    limit = 10 if is_emergency else 8
-                    for i, opp in enumerate(opportunities[:limit], 1):
-                        system_prompt += f"\n{i}. **{opp.get('name')}** - {opp.get('amount_display', '$0')}\n"
-                        system_prompt += f"   - Organization: {opp.get('organization')}\n"
-                        system_prompt += f"   - Match Score: {opp.get('match_score')}%\n"
-                        system_prompt += f"   - Deadline: {opp.get('deadline') or 'Check listing'}\n"
-                        system_prompt += f"   - Link: {opp.get('source_url')}\n"
-                        system_prompt += f"   - Type: {opp.get('type')}\n"
-                        system_prompt += f"   - Location: {opp.get('location_eligibility')}\n"
-            
-            # Generate AI response with enhanced prompt
-            prompt_suffix = "\n\nUSER MESSAGE: {message}\n\nProvide a helpful, well-formatted markdown response:"
-            if is_emergency:
-                 prompt_suffix = """
-                 \n\nUSER MESSAGE: {message}
-                 \n\nCRITICAL INSTRUCTION - EMERGENCY MODE:
-                 The user is stressed. Use the 'Empathy Sandwich' technique:
-                 1. Top Slice: Validate their stress briefly ("I hear you, and we can fix this.").
-                 2. Meat: Present the solution clearly and actionably.
-                 3. Bottom Slice: Reassure them ("You've got this.").
-                 Keep it concise.
-                 """
+            turn = {}
+            async for event in self._prepare_turn(message, context):
+                if event['type'] == 'prompt':
+                    turn = event
             
-            full_prompt = system_prompt + prompt_suffix.format(message=message)
-            
-            response = await self.model.generate_content_async(full_prompt)
+            response = await llm_gateway.generate(turn['prompt'], priority="interactive")
             ai_message = response.text
             
-            # V2 FIX: Separate thinking process from recommendation for better UX
-            # The frontend will render these as separate collapsible sections
-            thinking_section = ""
-            if thinking_process:
-                thinking_section = "\n".join(thinking_process)
-            
             # Save conversation
             await self._save_message(user_id, "user", message)
             await self._save_message(user_id, "assistant", ai_message)
             
+            opportunities = turn['opportunities']
             return {
                 'message': ai_message,
-                'thinking_process': thinking_section,  # V2: Separate for frontend streaming
+                'thinking_process': turn['thinking'],  # V2: Separate for frontend streaming
                 'opportunities': opportunities[:10] if opportunities else [],
                 'actions': self._generate_actions(opportunities, message),
-                'search_stats': search_stats
+                'search_stats': turn['search_stats']
             }
             
         except Exception as e:
             logger.error("Chat failed", error=str(e))
             return {
-                'message': "❌ I encountered an error while processing your request. Please try rephrasing your question or contact support if the issue persists.",
+                'message': self.ERROR_MESSAGE,
                 'opportunities': [],
                 'actions': [],
                 'search_stats': None
             }
+
+    async def chat_stream(
+        self,
+        user_id: str,
+        message: str,
+        context: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        The same turn as chat(), as events: thinking lines while the search runs, the
+        matched opportunities, then the answer token by token. History is saved once
+        the answer is complete.
+        """
+        try:
+            turn = {}
+            async for event in self._prepare_turn(message, context):
+                if event['type'] == 'thinking':
+                    if event['lines']:
+                        yield {'event': 'thinking', 'data': {'lines': event['lines']}}
+                else:
+                    turn = event
+            
+            opportunities = turn['opportunities']
+            yield {'event': 'opportunities', 'data': {
+                'opportunities': opportunities[:10] if opportunities else [],
+                'search_stats': turn['search_stats'],
+            }}
+            
+            parts = []
+            async for text in llm_gateway.stream(turn['prompt'], priority="interactive"):
+                parts.append(text)
+                yield {'event': 'token', 'data': {'text': text}}
+            ai_message = "".join(parts)
+            
+            # Save conversation
+            await self._save_message(user_id, "user", message)
+            await self._save_message(user_id, "assistant", ai_message)
+            
+            yield {'event': 'done', 'data': {
+                'thinking_process': turn['thinking'],
+                'actions': self._generate_actions(opportunities, message),
+            }}
+            
+        except Exception as e:
+            logger.error("Chat stream failed", error=str(e))
+            yield {'event': 'error', 'data': {'message': self.ERROR_MESSAGE}}
+
+    async def _prepare_turn(self, message: str, context: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Search and prompt building for one chat turn. Yields thinking lines as they are
+        produced, then a final 'prompt' event with the prompt, thinking section and results.
+        """
+        # Build context-rich prompt
+        system_prompt = self._build_system_prompt(context)
+        
+        # Check for Emergency Mode
+        is_emergency = self._detect_emergency_mode(message)
+        
+        # FIX: Detect if user wants to search for opportunities
+        needs_search = self._detect_search_intent(message)
+        
+        opportunities = []
+        thinking_process = []
+        sent = 0  # Lines already yielded
+        search_stats = None
+        
+        if needs_search or is_emergency:
+            # TRANSPARENCY: Log search process
+            if is_emergency:
+                thinking_process.append("🚨 **EMERGENCY MODE ACTIVATED**")
+                thinking_process.append("- prioritizing deadlines < 14 days")
+                thinking_process.append("- prioritizing quick-apply formats")
+            else:
+                thinking_process.append("🔍 **Analyzing your request...**")
+            yield {'type': 'thinking', 'lines': thinking_process[sent:]}
+            sent = len(thinking_process)
+            
+            # Extract search criteria
+            search_criteria = await self._extract_search_criteria(message, context.get('user_profile', {}))
+            
+            # Override for Emergency
+            if is_emergency:
+                search_criteria['urgency'] = 'immediate'
+                
+            thinking_process.append(f"\n📋 **Search Criteria Identified:**")
+            thinking_process.append(f"- **Types**: {', '.join(search_criteria['types'])}")
+            if search_criteria['urgency'] != 'any':
+                thinking_process.append(f"- **Urgency**: {search_criteria['urgency']}")
+            thinking_process.append(f"- **Location**: {context.get('user_profile', {}).get('state', 'Any')}, {context.get('user_profile', {}).get('country', 'Any')}")
+            yield {'type': 'thinking', 'lines': thinking_process[sent:]}
+            sent = len(thinking_process)
+            
+            # Search with detailed statistics
+            opportunities, search_stats = await self._search_opportunities_with_stats(
+                search_criteria, 
+                context.get('user_profile', {})
+            )
+            
+            # Check if it was broadened
+            if search_criteria.get('broadened'):
+                thinking_process.append("\n⚠️ **Broadening search to find more potential matches...**")
+            
+            # TRANSPARENCY: Show filtering results
+            thinking_process.append(f"\n📊 **Search Results:**")
+            thinking_process.append(f"- Total opportunities scanned: **{search_stats['total_scanned']}**")
+            thinking_process.append(f"- Expired (filtered out): {search_stats['expired']}")
+            thinking_process.append(f"- Location mismatch (filtered out): {search_stats['location_filtered']}")
+            thinking_process.append(f"- Type mismatch (filtered out): {search_stats['type_filtered']}")
+            if search_stats.get('urgency_filtered', 0) > 0:
+                thinking_process.append(f"- Urgency mismatch (filtered out): {search_stats['urgency_filtered']}")
+            thinking_process.append(f"- **✅ Final matches: {len(opportunities)}**")
+            yield {'type': 'thinking', 'lines': thinking_process[sent:]}
+            sent = len(thinking_process)
+            
+            # Add opportunities to prompt for AI context
+            if opportunities:
+                system_prompt += f"\n\nSEARCH RESULTS ({len(opportunities)} found):\n"
+                # UPGRADED: Show MORE results in emergency to give the student more options
+                limit = 10 if is_emergency else 8
+                for i, opp in enumerate(opportunities[:limit], 1):
+                    system_prompt += f"\n{i}. **{opp.get('name')}** - {opp.get('amount_display', '$0')}\n"
+                    system_prompt += f"   - Organization: {opp.get('organization')}\n"
+                    system_prompt += f"   - Match Score: {opp.get('match_score')}%\n"
+                    system_prompt += f"   - Deadline: {opp.get('deadline') or 'Check listing'}\n"
+                    system_prompt += f"   - Link: {opp.get('source_url')}\n"
+                    system_prompt += f"   - Type: {opp.get('type')}\n"
+                    system_prompt += f"   - Location: {opp.get('location_eligibility')}\n"
+        
+        # Generate AI response with enhanced prompt
+        prompt_suffix = "\n\nUSER MESSAGE: {message}\n\nProvide a helpful, well-formatted markdown response:"
+        if is_emergency:
+             prompt_suffix = """
+             \n\nUSER MESSAGE: {message}
+             \n\nCRITICAL INSTRUCTION - EMERGENCY MODE:
+             The user is stressed. Use the 'Empathy Sandwich' technique:
+             1. Top Slice: Validate their stress briefly ("I hear you, and we can fix this.").
+             2. Meat: Present the solution clearly and actionably.
+             3. Bottom Slice: Reassure them ("You've got this.").
+             Keep it concise.
+             """
+        
+        full_prompt = system_prompt + prompt_suffix.format(message=message)
+        
+        # V2 FIX: Separate thinking process from recommendation for better UX
+        # The frontend will render these as separate collapsible sections
+        yield {
+            'type': 'prompt',
+            'prompt': full_prompt,
+            'thinking': "\n".join(thinking_process),
+            'opportunities': opportunities,
+            'search_stats': search_stats,
+        }
     
     def _detect_emergency_mode(self, message: str) -> bool:
         """Detect high-stress/urgent keywords"""
@@ -257,17 +325,13 @@ If NO SEARCH RESULTS are found:
         depth: int = 0
     ) -> tuple[List[Dict[str, Any]], Dict[str, int]]:
         """
-<<<<<<< Updated upstream
         Search opportunities with detailed statistics for transparency
         V2 FIXES:
         - Recalculate match scores in real-time
         - Broadened location logic (global = accessible)
         - Software devs match hackathons/bounties
+        - Crisis recovery: an urgent search with no results is retried once without the urgency filter
         Returns: (opportunities_list, statistics_dict)
-=======
-        Search opportunities with detailed statistics and real-time matching
-        Recursive broadening for emergency situations.
->>>>>>> Stashed changes
         """
         from app.services.personalization_engine import personalization_engine
         from app.models import UserProfile
@@ -295,15 +359,7 @@ If NO SEARCH RESULTS are found:
             now = datetime.now()
             user_profile_obj = UserProfile(**profile) if profile else None
             
-<<<<<<< Updated upstream
             user_country = (profile.get('country') or '').lower()
-=======
-            # Detect Nigeran context for UI/Ibadan
-            school_str = str(profile.get('school', '')).lower()
-            is_nigeria = 'nigeria' in str(profile.get('country', '')).lower() or 'ibadan' in school_str or 'nigeria' in school_str
-            
-            user_country = (profile.get('country') or ('Nigeria' if is_nigeria else 'United States')).lower()
->>>>>>> Stashed changes
             user_state = (profile.get('state') or '').lower()
             user_interests = [i.lower() for i in (profile.get('interests') or [])]
             
@@ -315,13 +371,11 @@ If NO SEARCH RESULTS are found:
                 pass
             
             for opp in all_opps:
-<<<<<<< Updated upstream
-                # 1. EXPIRATION CHECK (lenient - include today)
+                # 1. EXPIRATION CHECK (lenient - 1 day grace for timezones)
                 if opp.deadline:
                     try:
                         deadline_date = datetime.fromisoformat(opp.deadline.replace('Z', '+00:00'))
-                        # Filter only if deadline was BEFORE today
-                        if deadline_date.date() < now.date():
+                        if deadline_date.date() < now.date() - timedelta(days=1):
                             stats['expired'] += 1
                             continue
                     except (ValueError, AttributeError):
@@ -329,23 +383,9 @@ If NO SEARCH RESULTS are found:
                         pass
                 
                 # 2. TYPE FILTER (BROADENED: Software devs match hackathons/bounties/competitions)
-=======
-                # STRICT EXPIRATION CHECK
-                if opp.deadline:
-                    try:
-                        deadline_date = datetime.fromisoformat(opp.deadline.replace('Z', '+00:00'))
-                        if deadline_date.date() < now.date() - timedelta(days=1): # 1 day grace for timezones
-                            stats['expired'] += 1
-                            continue
-                    except:
-                        pass
-                
-                # TYPE FILTER
->>>>>>> Stashed changes
                 opp_type = self._infer_type(opp)
                 requested_types = criteria.get('types') or []
                 
-<<<<<<< Updated upstream
                 # V2 FIX: If user has software/coding/tech interests, auto-include hackathons/bounties
                 tech_keywords = ['software', 'coding', 'programming', 'developer', 'tech', 'ai', 'web', 'mobile', 'computer']
                 user_is_tech = any(kw in ' '.join(user_interests) for kw in tech_keywords)
@@ -392,32 +432,14 @@ If NO SEARCH RESULTS are found:
                     stats['location_filtered'] += 1
                     continue
                 
-                # 4. URGENCY FILTER (unchanged)
-=======
-                # LOCATION FILTER
-                location_str = self._get_location_string(opp).lower()
-                is_global = any(kw in location_str for kw in ['global', 'international', 'worldwide', 'anywhere', 'remote'])
-                
-                if not is_global:
-                    if user_country not in location_str and user_state not in location_str:
-                        # Hard match for Nigeria/Africa keywords
-                        if not (is_nigeria and any(kw in location_str for kw in ['nigeria', 'africa', 'developing'])):
-                            stats['location_filtered'] += 1
-                            continue
-                
-                # URGENCY FILTER
->>>>>>> Stashed changes
+                # 4. URGENCY FILTER
                 urgency = criteria.get('urgency', 'any')
                 if urgency != 'any' and opp.deadline:
                     try:
                         deadline_date = datetime.fromisoformat(opp.deadline.replace('Z', '+00:00'))
                         days_until = (deadline_date - now).days
                         
-<<<<<<< Updated upstream
-                        if urgency == 'immediate' and days_until > 7:
-=======
                         if urgency == 'immediate' and days_until > 10: # Expanded from 7 to 10
->>>>>>> Stashed changes
                             stats['urgency_filtered'] += 1
                             continue
                         if urgency == 'this_week' and days_until > 20: # Expanded from 14 to 20
@@ -428,7 +450,6 @@ If NO SEARCH RESULTS are found:
                 
                 filtered_opps.append(opp)
             
-<<<<<<< Updated upstream
             # V2 FIX: Real-time match score recalculation
             results = []
             for opp in filtered_opps[:30]:  # Limit to 30
@@ -463,12 +484,6 @@ If NO SEARCH RESULTS are found:
                         fresh_score = opp.match_score or 50
                 elif opp.match_score:
                     fresh_score = opp.match_score
-=======
-            # REAL-TIME PERSONALIZATION & RANKING
-            results = []
-            for opp in filtered_opps:
-                real_score = personalization_engine.calculate_personalized_score(opp.model_dump(), user_profile_obj)
->>>>>>> Stashed changes
                 
                 results.append({
                     'id': opp.id,
@@ -478,11 +493,7 @@ If NO SEARCH RESULTS are found:
                     'amount_display': opp.amount_display,
                     'deadline': opp.deadline,
                     'type': self._infer_type(opp),
-<<<<<<< Updated upstream
                     'match_score': int(round(fresh_score)),  # V2: Fresh score
-=======
-                    'match_score': int(real_score),
->>>>>>> Stashed changes
                     'source_url': opp.source_url,
                     'tags': opp.tags,
                     'description': opp.description,
@@ -490,15 +501,10 @@ If NO SEARCH RESULTS are found:
                     'priority_level': opp.priority_level
                 })
             
-<<<<<<< Updated upstream
             # Sort by fresh match score
-=======
-            # SORT BY MATCH SCORE
->>>>>>> Stashed changes
             results.sort(key=lambda x: x.get('match_score', 0), reverse=True)
             results = results[:15]
             
-<<<<<<< Updated upstream
             logger.info(
                 "Search V2 completed",
                 total_scanned=stats['total_scanned'],
@@ -507,16 +513,13 @@ If NO SEARCH RESULTS are found:
                 location_filtered=stats['location_filtered']
             )
             
-=======
-            # EMERGENCY RECOVERY: If 0 results for crisis, broaden and retry ONCE
-            if not results and depth == 0 and (criteria.get('urgency') != 'any' or criteria.get('location') != 'any'):
+            # EMERGENCY RECOVERY: If 0 results for an urgent search, broaden and retry ONCE
+            if not results and depth == 0 and criteria.get('urgency', 'any') != 'any':
                 logger.info("CRISIS RECOVERY: Broadening search criteria")
-                broader_criteria = criteria.copy()
-                broader_criteria['urgency'] = 'any'
-                broader_criteria['broadened'] = True # Flag for the thinking process
+                criteria['broadened'] = True  # Flag for the caller's thinking process
+                broader_criteria = dict(criteria, urgency='any')
                 return await self._search_opportunities_with_stats(broader_criteria, profile, depth=1)
                 
->>>>>>> Stashed changes
             return results, stats
             
         except Exception as e:
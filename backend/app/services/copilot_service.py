@@ -192,7 +192,7 @@ You are an elite AI agent with deep expertise in: {platform_persona.get('experti
 }}
 """
         try:
-            result = await ai_service.generate_content_async(prompt)
+            result = await ai_service.generate_content_async(prompt, priority="interactive")
             
             if not result:
                 raise ValueError("Empty response from AI Service")
@@ -275,7 +275,7 @@ OUTPUT JSON:
 }}
 """
         try:
-            result = await ai_service.generate_content_async(prompt)
+            result = await ai_service.generate_content_async(prompt, priority="interactive")
             
             # Simple cleanup for JSON
             cleaned = result.strip()
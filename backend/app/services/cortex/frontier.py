@@ -0,0 +1,227 @@
+"""
+Cortex Crawl Frontier
+Persistent, yield-aware priority queue over the Sentinel's targets.
+
+Every target carries what past crawls taught us:
+- yield: new (never seen) opportunities per crawl, as an EWMA
+- change rate: how often the page differed from the last transmission
+- cost: browser/HTTP seconds per crawl
+- deadline urgency: opportunities on the page closing soon
+
+priority = (yield + change bonus + deadline urgency) / cost, so each patrol spends its
+budget where new opportunities per browser-second (and per LLM token) are highest.
+Targets that keep producing nothing back off exponentially; a productive crawl resets them.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+EWMA_ALPHA = 0.3
+DEFAULT_COST_SECONDS = 10.0
+URGENT_DEADLINE_SECONDS = 14 * 86400
+
+COLUMNS = (
+    "url", "source", "crawls", "new_total", "yield_ewma", "change_ewma", "cost_ewma",
+    "deadline_ts", "failures", "backoff_level", "next_due_at", "last_crawled_at",
+)
+
+
+def _ewma(previous: Optional[float], sample: float) -> float:
+    return sample if previous is None else EWMA_ALPHA * sample + (1 - EWMA_ALPHA) * previous
+
+
+def priority(target: Dict[str, Any], now: Optional[float] = None) -> float:
+    """Expected value per second of crawling this target now (never-crawled targets first)"""
+    now = now if now is not None else time.time()
+    if not target.get('crawls'):
+        return float('inf')  # Explore before exploiting
+
+    value = (target.get('yield_ewma') or 0.0) + 0.5 * (target.get('change_ewma') or 0.0)
+    deadline = target.get('deadline_ts')
+    if deadline and now < deadline < now + URGENT_DEADLINE_SECONDS:
+        # Closer deadlines matter more: up to +1 for one closing now
+        value += 1.0 - (deadline - now) / URGENT_DEADLINE_SECONDS
+    return value / max(target.get('cost_ewma') or DEFAULT_COST_SECONDS, 0.5)
+
+
+class CrawlFrontier:
+    """SQLite-backed frontier; only registered URLs are tracked"""
+
+    def __init__(
+        self,
+        state_dir: Optional[str] = None,
+        base_interval_seconds: Optional[float] = None,
+        max_backoff_seconds: Optional[float] = None
+    ):
+        self.state_dir = state_dir if state_dir is not None else settings.cortex_state_dir
+        self.base_interval = base_interval_seconds if base_interval_seconds is not None else settings.frontier_base_interval_minutes * 60
+        self.max_backoff = max_backoff_seconds if max_backoff_seconds is not None else settings.frontier_max_backoff_hours * 3600
+        self.db_path = os.path.join(self.state_dir, "frontier.sqlite")
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Opened on first use so importing the module touches no files"""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    os.makedirs(self.state_dir, exist_ok=True)
+                    conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS targets ("
+                        "url TEXT PRIMARY KEY, source TEXT, crawls INTEGER DEFAULT 0, new_total INTEGER DEFAULT 0, "
+                        "yield_ewma REAL, change_ewma REAL, cost_ewma REAL, deadline_ts REAL, "
+                        "failures INTEGER DEFAULT 0, backoff_level INTEGER DEFAULT 0, "
+                        "next_due_at REAL DEFAULT 0, last_crawled_at REAL)"
+                    )
+                    self._db = conn
+        return self._db
+
+    def register(self, urls: Iterable[str], source: str):
+        """Add targets (existing history is kept)"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO targets (url, source) VALUES (?, ?)",
+                [(url, source) for url in urls]
+            )
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM targets WHERE url = ?", (url,)
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def targets(self, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(COLUMNS)} FROM targets"
+        params: tuple = ()
+        if source:
+            query += " WHERE source = ?"
+            params = (source,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def _update(self, url: str, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE targets SET {assignments} WHERE url = ?", (*fields.values(), url))
+
+    def _reschedule(self, target: Dict[str, Any], productive: bool, now: float) -> Dict[str, Any]:
+        level = 0 if productive else min((target.get('backoff_level') or 0) + 1, 16)
+        delay = min(self.base_interval * (2 ** level), max(self.max_backoff, self.base_interval))
+        return {'backoff_level': level, 'next_due_at': now + delay}
+
+    def select(
+        self,
+        budget_seconds: Optional[float] = None,
+        max_targets: Optional[int] = None,
+        source: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> List[str]:
+        """Highest-priority due targets whose estimated cost fits the budget"""
+        now = now if now is not None else time.time()
+        budget = budget_seconds if budget_seconds is not None else settings.frontier_patrol_budget_seconds
+        limit = max_targets or settings.frontier_patrol_max_targets
+
+        # Slack so a target crawled one patrol ago is due again at the next patrol
+        horizon = now + self.base_interval * 0.1
+        due = [t for t in self.targets(source) if (t['next_due_at'] or 0) <= horizon]
+        due.sort(key=lambda t: priority(t, now), reverse=True)
+
+        selected: List[str] = []
+        spent = 0.0
+        for target in due:
+            cost = target['cost_ewma'] or DEFAULT_COST_SECONDS
+            if selected and spent + cost > budget:
+                continue  # A cheaper target further down may still fit
+            selected.append(target['url'])
+            spent += cost
+            if len(selected) >= limit:
+                break
+        logger.info("Frontier selected targets", selected=len(selected), due=len(due), est_seconds=round(spent, 1))
+        return selected
+
+    def rank(self, urls: List[str], now: Optional[float] = None) -> List[str]:
+        """Order explicit targets by priority (unknown URLs first)"""
+        now = now if now is not None else time.time()
+        known = {t['url']: t for t in self.targets()}
+        return sorted(urls, key=lambda u: priority(known.get(u, {}), now), reverse=True)
+
+    def record_crawl(self, url: str, cost_seconds: float, ok: bool, now: Optional[float] = None):
+        """A crawl attempt finished (ok=False: crashed, blocked or throttled)"""
+        target = self.get(url)
+        if target is None:
+            return
+        now = now if now is not None else time.time()
+        fields: Dict[str, Any] = {'crawls': target['crawls'] + 1, 'last_crawled_at': now}
+        if ok:
+            fields['cost_ewma'] = _ewma(target['cost_ewma'], cost_seconds)
+        else:
+            fields['failures'] = target['failures'] + 1
+            fields.update(self._reschedule(target, productive=False, now=now))
+        if ok and (target['next_due_at'] or 0) <= now:
+            fields['next_due_at'] = now + self.base_interval  # Provisional until yield/change arrive
+        self._update(url, **fields)
+
+    def record_change(self, url: str, changed: bool, now: Optional[float] = None):
+        """Whether the page differed from its last transmission; unchanged pages back off"""
+        target = self.get(url)
+        if target is None:
+            return
+        now = now if now is not None else time.time()
+        fields: Dict[str, Any] = {'change_ewma': _ewma(target['change_ewma'], 1.0 if changed else 0.0)}
+        if not changed:
+            fields.update(self._reschedule(target, productive=False, now=now))
+        self._update(url, **fields)
+
+    def record_yield(self, url: str, new_count: int, nearest_deadline_ts: Optional[float] = None,
+                     now: Optional[float] = None):
+        """Refinery outcome for a crawled page: how many opportunities were new"""
+        target = self.get(url)
+        if target is None:
+            return
+        now = now if now is not None else time.time()
+        fields: Dict[str, Any] = {
+            'yield_ewma': _ewma(target['yield_ewma'], float(new_count)),
+            'new_total': target['new_total'] + new_count,
+        }
+        if nearest_deadline_ts:
+            fields['deadline_ts'] = nearest_deadline_ts
+        fields.update(self._reschedule(target, productive=new_count > 0, now=now))
+        self._update(url, **fields)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        targets = self.targets()
+        return {
+            'targets': len(targets),
+            'due': sum(1 for t in targets if (t['next_due_at'] or 0) <= now),
+            'backed_off': sum(1 for t in targets if t['backoff_level']),
+            'new_total': sum(t['new_total'] for t in targets),
+            'top': [
+                {'url': t['url'], 'priority': round(p, 4) if p != float('inf') else None,
+                 'yield': t['yield_ewma'], 'backoff_level': t['backoff_level']}
+                for p, t in sorted(((priority(t, now), t) for t in targets), key=lambda x: x[0], reverse=True)[:10]
+            ],
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Global instance
+crawl_frontier = CrawlFrontier()
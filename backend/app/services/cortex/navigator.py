@@ -5,6 +5,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 
 from app.services.crawler_service import crawler_service
+from app.services.cortex.frontier import crawl_frontier
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
 from app.services.discovery_pulse import discovery_pulse
 import random
@@ -89,14 +90,19 @@ class Sentinel:
     async def patrol(self):
         """Deploy Hunter Drones to patrol targets"""
         mission_id = "patrol_" + "".join(random.choices(string.ascii_lowercase + string.digits, k=6))
-        logger.info("Sentinel deploying Hunter Drones", target_count=len(self.TARGETS), mission_id=mission_id)
+
+        # Yield-aware selection: highest value per crawl-second within the patrol budget
+        crawl_frontier.register(self.TARGETS, source="patrol")
+        targets = crawl_frontier.select(source="patrol")
+        logger.info("Sentinel deploying Hunter Drones", target_count=len(targets),
+                    registered=len(self.TARGETS), mission_id=mission_id)
         
         discovery_pulse.announce_mission(mission_id, "Target Selection", "active")
         
         try:
             # Delegate to the robust Universal Crawler (Playwright)
-            await crawler_service.crawl_and_stream(self.TARGETS, intent="patrol")
-            discovery_pulse.complete_mission(mission_id, found_count=len(self.TARGETS))
+            await crawler_service.crawl_and_stream(targets, intent="patrol")
+            discovery_pulse.complete_mission(mission_id, found_count=len(targets))
         except Exception as e:
             logger.error("Sentinel patrol mission failed", error=str(e))
             discovery_pulse.complete_mission(mission_id, found_count=0)
@@ -130,6 +136,9 @@ class Sentinel:
                 if isinstance(urls, list): targets.extend(urls)
                 else: targets.append(urls)
                 
+        # Explicitly requested hunts crawl every target, most valuable first
+        crawl_frontier.register(targets, source="heavy_hunt")
+        targets = crawl_frontier.rank(targets)
         logger.info("Sentinel initiating HEAVY HUNT", targets=targets)
         try:
             # Run with high priority intent
@@ -1,21 +1,19 @@
 
 import structlog
-import google.generativeai as genai
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 from app.config import settings
 from app.models import OpportunitySchema
-from app.utils.json_utils import robust_json_loads
-import json
+from app.utils.json_utils import JSONArrayStream
+from app.services.llm_cache import llm_cache
+from app.services.llm_gateway import llm_gateway
+from app.utils.html_cleaner import clean_html_async
+from app.utils.page_chunker import CHARS_PER_TOKEN, chunk_text, merge_fields
 import asyncio
 import re
 from urllib.parse import urlparse, urljoin
 
 logger = structlog.get_logger()
 
-# Configure Gemini
-if settings.gemini_api_key:
-    genai.configure(api_key=settings.gemini_api_key)
-
 class ReaderLLM:
     """
     The 'Reader' V2: Turns Raw HTML/Text into Structured JSON.
@@ -24,6 +22,7 @@ class ReaderLLM:
     """
     
     MODEL_NAME = settings.gemini_model or "gemini-1.5-flash"  # Use configured model
+    PROMPT_VERSION = "reader-v3"  # Bump when the prompt changes: cached extractions are keyed by it
 
     async def parse_opportunity(self, raw_text: str, source_url: str) -> Optional[OpportunitySchema]:
         """
@@ -43,16 +42,123 @@ class ReaderLLM:
         V2 CORE: Extracts MULTIPLE opportunities from list/aggregator pages.
         This is critical for DevPost, DoraHacks, etc. that show many items per page.
         """
+        latest: Dict[str, OpportunitySchema] = {}
+        async for opp in self.stream_multiple(raw_text, source_url, max_items):
+            latest[opp.id] = opp  # Updates replace the earlier copy in place
+        return list(latest.values())
+
+    async def stream_multiple(
+        self,
+        raw_text: str,
+        source_url: str,
+        max_items: int = 50
+    ) -> AsyncIterator[OpportunitySchema]:
+        """
+        parse_multiple as a pipeline: each opportunity is validated and yielded as soon as
+        its object closes in the streamed model output, instead of after the whole array.
+        A card read twice through chunk overlap is merged into the first copy; if that
+        fills empty fields, the merged opportunity is yielded again (same id) as an update.
+        A chunk whose Gemini call fails raises once the other chunks are drained, so the
+        caller retries the page instead of settling it as empty.
+        """
         if not settings.gemini_api_key:
             logger.warning("Gemini API key not configured")
-            return []
+            return
 
-        # Truncate text to avoid token limits but be generous for list pages
-        truncated_text = raw_text[:80000]
-        
-        # Detect platform for specialized parsing
+        # Read the whole page: clean it, then split at card boundaries into chunks
+        # that are extracted in parallel (bounded by the global LLM slots)
+        chunk_tokens = settings.llm_chunk_tokens
+        max_chunks = settings.llm_max_chunks_per_page
+        text = await clean_html_async(raw_text, max_chars=chunk_tokens * CHARS_PER_TOKEN * max_chunks)
+        chunks = chunk_text(text, chunk_tokens, settings.llm_chunk_overlap_tokens, max_chunks)
+        if not chunks:
+            return
+
+        # Detect platform for specialized parsing hints
         platform_hint = self._detect_platform(source_url)
 
+        # Chunks stream concurrently into one queue; None marks a finished chunk
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump(chunk: str):
+            try:
+                async for item in self._stream_chunk(chunk, source_url, max_items, platform_hint):
+                    await queue.put(item)
+            except Exception as e:
+                queue.put_nowait(e)
+            finally:
+                queue.put_nowait(None)
+
+        tasks = [asyncio.create_task(pump(chunk)) for chunk in chunks]
+        merged: Dict[str, Dict[str, Any]] = {}  # First copy of each card, by stable id
+        yielded = set()
+        extracted = 0
+        failure: Optional[Exception] = None
+        try:
+            pending = len(tasks)
+            while pending and extracted < max_items:
+                item = await queue.get()
+                if item is None:
+                    pending -= 1
+                    continue
+                if isinstance(item, Exception):
+                    failure = failure or item
+                    continue
+                first = merged.get(item['id'])
+                if first is None:
+                    merged[item['id']] = first = item
+                elif not merge_fields(first, item):
+                    continue
+
+                opp = self._to_schema(first)
+                if opp:
+                    if opp.id not in yielded:
+                        yielded.add(opp.id)
+                        extracted += 1
+                    yield opp
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if failure is not None:
+            # Chunks that completed are cached, so the retry only pays for the rest
+            raise failure
+        logger.info(
+            "Reader LLM extraction complete",
+            source=source_url[:50],
+            extracted=extracted,
+            chunks=len(chunks),
+            platform=platform_hint
+        )
+
+    def _to_schema(self, item: Dict[str, Any]) -> Optional[OpportunitySchema]:
+        try:
+            # Map 'title' to 'name' for schema compatibility
+            if 'title' in item and 'name' not in item:
+                item['name'] = item['title']
+            elif 'name' in item and 'title' not in item:
+                item['title'] = item['name']
+
+            # Validate with Pydantic
+            return OpportunitySchema(**item)
+
+        except Exception as parse_error:
+            logger.warning(
+                "Failed to parse individual opportunity",
+                error=str(parse_error),
+                item=str(item)[:100]
+            )
+            return None
+
+    async def _stream_chunk(
+        self,
+        chunk: str,
+        source_url: str,
+        max_items: int,
+        platform_hint: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """One chunk through Gemini: raw items with normalized source_url and stable id, as they arrive"""
         prompt = f"""
         You are a Data Extraction Specialist for {platform_hint}.
         
@@ -93,79 +199,64 @@ class ReaderLLM:
         Source Page URL: {source_url}
         
         Page Content:
-        {truncated_text}
+        {chunk}
         
         Return ONLY a valid JSON array. No markdown, no explanations.
         """
 
+        # Same content, prompt and model as a previous crawl: reuse that extraction
+        cache_key = llm_cache.key("reader", self.PROMPT_VERSION, self.MODEL_NAME, chunk, source_url, max_items)
+        data = llm_cache.get(cache_key)
+        if data is not None:
+            logger.info("Reader LLM cache hit", url=source_url, items=len(data))
+            for item in data[:max_items]:
+                identified = self._identify(item, source_url)
+                if identified:
+                    yield identified
+            return
+
+        parser = JSONArrayStream()
+        data = []
         try:
-            model = genai.GenerativeModel(self.MODEL_NAME)
-            response = await model.generate_content_async(
-                prompt, 
+            async for text in llm_gateway.stream(
+                prompt,
+                priority="background",
+                model=self.MODEL_NAME,
                 generation_config={"response_mime_type": "application/json"}
-            )
-            
-            # Parse JSON response
-            raw_response = response.text.strip()
-            
-            # Handle potential JSON issues
-            if raw_response.startswith("```"):
-                raw_response = raw_response.split("```")[1]
-                if raw_response.startswith("json"):
-                    raw_response = raw_response[4:]
-            
-            data = robust_json_loads(raw_response)
-            
-            # Ensure it's a list
-            if isinstance(data, dict):
-                data = [data]
-            
-            opportunities = []
-            for item in data[:max_items]:
-                try:
-                    # Generate stable ID
-                    item_url = item.get('source_url') or item.get('url') or source_url
-                    
-                    # NORMALIZE URL to prevent 404s and duplication
-                    item_url = self._normalize_url(item_url, source_url)
-                    item['source_url'] = item_url
-                    
-                    from app.services.flink_processor import generate_opportunity_id
-                    item['id'] = generate_opportunity_id(item)
-                    
-                    # Map 'title' to 'name' for schema compatibility
-                    if 'title' in item and 'name' not in item:
-                        item['name'] = item['title']
-                    elif 'name' in item and 'title' not in item:
-                        item['title'] = item['name']
-                    
-                    # Validate with Pydantic
-                    opp = OpportunitySchema(**item)
-                    opportunities.append(opp)
-                    
-                except Exception as parse_error:
-                    logger.warning(
-                        "Failed to parse individual opportunity", 
-                        error=str(parse_error),
-                        item=str(item)[:100]
-                    )
-                    continue
-            
-            logger.info(
-                "Reader LLM extraction complete",
-                source=source_url[:50],
-                extracted=len(opportunities),
-                platform=platform_hint
-            )
-            
-            return opportunities
+            ):
+                for item in parser.feed(text):
+                    data.append(item)
+                    if len(data) > max_items:
+                        continue
+                    identified = self._identify(dict(item) if isinstance(item, dict) else item, source_url)
+                    if identified:
+                        yield identified
+        except Exception as e:
+            # Rate limit or outage the gateway gave up on: items already yielded stand, the
+            # partial answer is not cached, and the page is retried rather than treated as empty
+            logger.error("Reader LLM extraction failed", url=source_url, error=str(e), streamed=len(data))
+            raise
+
+        if parser.complete:
+            llm_cache.put(cache_key, data, prompt_chars=len(prompt))
+        else:
+            logger.warning("Reader LLM output ended mid-array", url=source_url, streamed=len(data))
+
+    def _identify(self, item: Any, source_url: str) -> Optional[Dict[str, Any]]:
+        if not isinstance(item, dict):
+            return None
+        from app.services.flink_processor import generate_opportunity_id
+        try:
+            # NORMALIZE URL to prevent 404s and duplication
+            item_url = item.get('source_url') or item.get('url') or source_url
+            item['source_url'] = self._normalize_url(item_url, source_url)
 
-        except json.JSONDecodeError as je:
-            logger.error("Reader LLM JSON parse error", url=source_url, error=str(je))
-            return []
+            # Stable ID: the same card read by two overlapping chunks merges on it
+            item['id'] = generate_opportunity_id(item)
+            return item
         except Exception as e:
-            logger.error("Reader LLM extraction failed", url=source_url, error=str(e))
-            return []
+            logger.warning("Failed to identify extracted item", error=str(e), item=str(item)[:100])
+            return None
 
     def _detect_platform(self, url: str) -> str:
         """Detect platform for specialized parsing hints"""
@@ -1,10 +1,13 @@
 
+import asyncio
 import structlog
 import json
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
 from app.services.cortex.reader_llm import reader_llm
+from app.services.network_capture import structured_from_event
 from app.models import OpportunitySchema
 from app.config import settings
 from app.database import db
@@ -30,47 +33,98 @@ class RefineryService:
         logger.info("Refinery V2: Processing Raw Event", url=url, source=source)
         
         # 1. Extract Data (Use Reader LLM V2 - Multi-extraction)
-        if not raw_html:
+        if not raw_html and not value.get("structured_opportunities"):
             logger.warning("Empty HTML in raw event", url=url)
             return
 
-        # V2: Extract MULTIPLE opportunities from list pages
-        opportunities: List[OpportunitySchema] = await reader_llm.parse_multiple(raw_html, url, max_items=50)
+        # Captured network JSON or hydration state: no LLM pass needed when it resolves
+        structured: List[OpportunitySchema] = structured_from_event(value)
+        if structured:
+            logger.info("Refinery resolved page without LLM", url=url, count=len(structured))
+            opportunities = self._iterate(structured)
+        else:
+            # V2: Extract MULTIPLE opportunities from list pages. Streamed: each one is
+            # verified and enqueued while the model is still writing the rest of the list
+            opportunities = reader_llm.stream_multiple(raw_html, url, max_items=50)
         
-        if not opportunities:
+        # 2. Process each opportunity as it arrives
+        extracted = 0
+        verified: List[OpportunitySchema] = []
+        verified_ids = set()
+        futures = []
+        new_count = 0
+        try:
+            async for opportunity in opportunities:
+                update = opportunity.id in verified_ids  # Overlapping chunk filled fields of a card already sent
+                if not update:
+                    extracted += 1
+                try:
+                    # 2.1 Strict Expiration Gate
+                    if self._is_expired(opportunity.deadline_timestamp):
+                        logger.debug("Dropped Expired", title=opportunity.title[:30] if opportunity.title else "N/A")
+                        continue
+
+                    # 2.2 Geo-Tagging
+                    opportunity.geo_tags = self._enrich_geo_tags(opportunity)
+                
+                    # 2.3 Type-Tagging
+                    opportunity.type_tags = self._enrich_type_tags(opportunity)
+                
+                    # 2.4 Skip Vectorization for speed (can be done async later)
+                    # from app.services.vectorization_service import vectorization_service
+                    # opportunity.embedding = await vectorization_service.vectorize_opportunity(opportunity)
+
+                except Exception as e:
+                    logger.error("Failed to process opportunity", error=str(e))
+                    continue
+
+                # 2.5 Novelty is checked before publishing, so the page never sees its own output
+                if not update and await self._is_new(opportunity):
+                    new_count += 1
+                verified.append(opportunity)
+                verified_ids.add(opportunity.id)
+
+                # 2.6 Enqueue to the Verified Stream now (an update re-publishes the merged copy,
+                # which the Cortex processor turns into a delta); delivery reports are awaited per page
+                futures.extend(self._enqueue_verified([opportunity]))
+        except Exception:
+            # Gemini failed partway: settle what was already enqueued, then let the caller retry the page
+            await self._await_delivery(verified, futures)
+            raise
+        
+        if not extracted:
             logger.warning("No opportunities extracted", url=url)
             return
+
+        # 3. Feed the crawl frontier: how many of these are genuinely new
+        self._record_yield(url, verified, new_count)
+
+        # 4. Settle delivery (Heartbeat fallback for anything Kafka dropped)
+        await self._await_delivery(verified, futures)
         
-        logger.info(f"Extracted {len(opportunities)} opportunities from {url[:50]}")
-        
-        # 2. Process each opportunity
-        processed_count = 0
+        logger.info(f"Refinery Complete: {len(verified_ids)}/{extracted} opportunities processed from {url[:40]}")
+
+    @staticmethod
+    async def _iterate(opportunities: List[OpportunitySchema]) -> AsyncIterator[OpportunitySchema]:
         for opportunity in opportunities:
-            try:
-                # 2.1 Strict Expiration Gate
-                if self._is_expired(opportunity.deadline_timestamp):
-                    logger.debug("Dropped Expired", title=opportunity.title[:30] if opportunity.title else "N/A")
-                    continue
+            yield opportunity
 
-                # 2.2 Geo-Tagging
-                opportunity.geo_tags = self._enrich_geo_tags(opportunity)
-                
-                # 2.3 Type-Tagging
-                opportunity.type_tags = self._enrich_type_tags(opportunity)
-                
-                # 2.4 Skip Vectorization for speed (can be done async later)
-                # from app.services.vectorization_service import vectorization_service
-                # opportunity.embedding = await vectorization_service.vectorize_opportunity(opportunity)
+    async def _is_new(self, opp: OpportunitySchema) -> bool:
+        from app.services.flink_processor import cortex_processor
+        try:
+            return not await cortex_processor.is_duplicate(opp.model_dump())
+        except Exception as e:
+            logger.debug("Yield check failed", error=str(e))
+            return False
 
-                # 3. Publish to Verified Stream
-                await self._publish_verified(opportunity)
-                processed_count += 1
-                
-            except Exception as e:
-                logger.error("Failed to process opportunity", error=str(e))
-                continue
-        
-        logger.info(f"Refinery Complete: {processed_count}/{len(opportunities)} opportunities processed from {url[:40]}")
+    def _record_yield(self, url: str, opportunities: List[OpportunitySchema], new_count: int):
+        """New-opportunity yield and nearest deadline for the page, for target prioritization"""
+        from app.services.cortex.frontier import crawl_frontier
+
+        now_ts = datetime.now().timestamp()
+        upcoming = [opp.deadline_timestamp for opp in opportunities
+                    if opp.deadline_timestamp and opp.deadline_timestamp > now_ts]
+        crawl_frontier.record_yield(url, new_count, min(upcoming) if upcoming else None)
 
     def _is_expired(self, deadline_ts: int) -> bool:
         """Strict Expiration Logic"""
@@ -108,17 +162,33 @@ class RefineryService:
         
         return list(tags)
 
-    async def _publish_verified(self, opp: OpportunitySchema):
-        # Fallback Strategy: If Kafka is down, save directly to DB (The Heartbeat)
-        success = kafka_producer_manager.publish_to_stream(
-            topic=KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED,
-            key=opp.id, # Hash ID
-            value=opp.model_dump() # Use model_dump() for Pydantic v2 consistency
+    def _enqueue_verified(self, opportunities: List[OpportunitySchema]) -> List[Future]:
+        """Enqueue without waiting for acks; settle the futures with _await_delivery"""
+        return kafka_producer_manager.publish_many(
+            KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED,
+            [(opp.id, opp.model_dump()) for opp in opportunities]  # Hash ID key; model_dump() for Pydantic v2 consistency
         )
-        
-        if success:
-            logger.info("Verified Opportunity Published to Stream", title=opp.title, tags=opp.geo_tags)
-        else:
+
+    async def _await_delivery(self, opportunities: List[OpportunitySchema], futures: List[Future]):
+        """
+        Await delivery reports for the enqueued batch.
+        Fallback Strategy: anything Kafka could not deliver is saved directly to DB (The Heartbeat)
+        """
+        if not opportunities:
+            return
+
+        results = await asyncio.gather(
+            *(asyncio.wrap_future(f) for f in futures),
+            return_exceptions=True
+        )
+
+        failed = [opp for opp, result in zip(opportunities, results) if isinstance(result, Exception)]
+        logger.info(
+            "Verified Opportunities Published to Stream",
+            delivered=len(opportunities) - len(failed),
+            failed=len(failed)
+        )
+        for opp in failed:
             logger.warning("Kafka Stream Failed - Engaging Heartbeat Fallback", title=opp.title)
             await self._persist_fallback(opp)
 
@@ -0,0 +1,179 @@
+"""
+Crawl Cache
+Per-URL validators and content hashes so patrols only pay for pages that changed.
+
+- ETag / Last-Modified from the last processed response are sent back as
+  If-None-Match / If-Modified-Since; a 304 ends the mission before any rendering.
+- Pages without validators (or rendered in the browser) are compared by a hash of
+  their normalized visible content; an unchanged page never reaches Kafka or the LLM.
+- Entries older than max_age are re-sent anyway, so downstream state self-heals.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+import structlog
+
+from app.config import settings
+from app.services.pipeline_metrics import pipeline_metrics
+
+logger = structlog.get_logger()
+
+STRIP_BLOCKS = re.compile(r'<(script|style|noscript|svg)[^>]*>.*?</\1>', re.IGNORECASE | re.DOTALL)
+STRIP_TAGS = re.compile(r'<[^>]+>')
+STRIP_COMMENTS = re.compile(r'<!--.*?-->', re.DOTALL)
+
+
+def normalize_content(content: str) -> str:
+    """Visible text only: scripts, styles, comments, markup and whitespace runs removed"""
+    text = STRIP_COMMENTS.sub(" ", content)
+    text = STRIP_BLOCKS.sub(" ", text)
+    text = STRIP_TAGS.sub(" ", text)
+    return " ".join(text.split())
+
+
+def content_hash(content: str) -> str:
+    return hashlib.blake2b(normalize_content(content).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CrawlCache:
+    """SQLite-backed validator and content-hash cache keyed by URL"""
+
+    def __init__(self, state_dir: Optional[str] = None, max_age_seconds: Optional[float] = None):
+        self.state_dir = state_dir if state_dir is not None else settings.cortex_state_dir
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else settings.crawl_cache_max_age_hours * 3600
+        self.db_path = os.path.join(self.state_dir, "crawl_cache.sqlite")
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats = {'not_modified': 0, 'unchanged': 0, 'changed': 0, 'expired': 0}
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Opened on first use so importing the module touches no files"""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    os.makedirs(self.state_dir, exist_ok=True)
+                    conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS pages ("
+                        "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT, "
+                        "sent_at REAL, checked_at REAL, unchanged_hits INTEGER DEFAULT 0)"
+                    )
+                    self._db = conn
+        return self._db
+
+    def _row(self, url: str) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, content_hash, sent_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _fresh(self, sent_at: Optional[float]) -> bool:
+        return sent_at is not None and time.time() - sent_at < self.max_age_seconds
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for a conditional request (empty when stale or unknown)"""
+        row = self._row(url)
+        if not row or not self._fresh(row[3]):
+            return {}
+        headers = {}
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def mark_not_modified(self, url: str):
+        """Server answered 304 to our validators"""
+        self.stats['not_modified'] += 1
+        self._touch(url)
+
+    def is_unchanged(self, url: str, content: str) -> bool:
+        """True when the normalized content matches what was last sent (and the entry is fresh)"""
+        row = self._row(url)
+        if not row or row[2] != content_hash(content):
+            self.stats['changed'] += 1
+            return False
+        if not self._fresh(row[3]):
+            self.stats['expired'] += 1
+            return False
+        self.stats['unchanged'] += 1
+        self._touch(url)
+        return True
+
+    def _touch(self, url: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET checked_at = ?, unchanged_hits = unchanged_hits + 1 WHERE url = ?",
+                (time.time(), url)
+            )
+
+    def record_sent(self, url: str, content: str, validators: Optional[Dict[str, Optional[str]]] = None):
+        """Remember what was published for url, with the response validators if any"""
+        self.record_hash(url, content_hash(content), validators)
+
+    def record_hash(self, url: str, digest: str, validators: Optional[Dict[str, Optional[str]]] = None):
+        """record_sent with the content hash computed elsewhere (spooled worker results)"""
+        validators = validators or {}
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pages (url, etag, last_modified, content_hash, sent_at, checked_at, unchanged_hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0) "
+                "ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified, "
+                "content_hash = excluded.content_hash, sent_at = excluded.sent_at, "
+                "checked_at = excluded.checked_at, unchanged_hits = 0",
+                (url, validators.get('etag'), validators.get('last_modified'), digest, now, now)
+            )
+
+    def forget(self, url: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            urls = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        skipped = self.stats['not_modified'] + self.stats['unchanged']
+        seen = skipped + self.stats['changed'] + self.stats['expired']
+        return {
+            **self.stats,
+            'urls': urls,
+            'skip_rate': round(skipped / seen, 4) if seen else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def response_validators(headers: Any) -> Dict[str, Optional[str]]:
+    """ETag / Last-Modified from an httpx or Playwright response header mapping"""
+    if not headers:
+        return {}
+    return {
+        'etag': headers.get('etag'),
+        'last_modified': headers.get('last-modified'),
+    }
+
+
+# Global instance
+crawl_cache = CrawlCache()
+
+
+_CACHE_GAUGE = pipeline_metrics.gauge("cortex_crawl_cache", "Conditional re-crawl outcomes", ("stat",))
+
+
+def _collect_cache_metrics():
+    for stat, value in crawl_cache.stats.items():
+        _CACHE_GAUGE.set(value, stat=stat)
+
+
+pipeline_metrics.register_collector(_collect_cache_metrics)
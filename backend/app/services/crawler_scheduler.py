@@ -6,6 +6,7 @@ from typing import List
 
 from app.services.crawler_service import crawler_service
 from app.services.seeds import SEED_URLS
+from app.services.cortex.frontier import crawl_frontier
 
 logger = structlog.get_logger()
 
@@ -63,9 +64,11 @@ class CrawlerScheduler:
                     await asyncio.sleep(60)
                     continue
 
-                logger.info("Starting distributed crawl cycle", url_count=len(SEED_URLS))
+                crawl_frontier.register(SEED_URLS, source="seed")
+                seeds = crawl_frontier.select(source="seed")
+                logger.info("Starting distributed crawl cycle", url_count=len(seeds), registered=len(SEED_URLS))
                 
-                for url in SEED_URLS:
+                for url in seeds:
                     await self._dispatch_job(url, sentinel_manager)
                     
                 wait_time = 120 # 2 minutes between cycles
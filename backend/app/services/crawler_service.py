@@ -2,10 +2,18 @@
 import httpx
 import asyncio
 import structlog
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import time
 
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
+from app.services.browser_pool import BrowserPool
+from app.services.host_scheduler import host_scheduler
+from app.services.tiered_fetcher import tiered_fetcher
+from app.services.page_readiness import page_readiness
+from app.services.crawl_cache import crawl_cache, content_hash, response_validators
+from app.services.cortex.frontier import crawl_frontier
+from app.services.network_capture import NetworkCapture, map_json_document
+from app.services.crawler_workers import crawler_workers, write_spool
 
 logger = structlog.get_logger()
 
@@ -18,25 +26,62 @@ class UniversalCrawlerService:
     Universal Crawler Service (Hunter Drones)
     Powered by Playwright for stealth, JS-execution, and dynamic interactions.
     """
-    
+
+    # Rotate user agents for anti-detection
+    USER_AGENTS = [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ]
+
+    # Randomize viewport slightly for fingerprint variance
+    VIEWPORTS = [
+        {'width': 1920, 'height': 1080},
+        {'width': 1536, 'height': 864},
+        {'width': 1440, 'height': 900},
+        {'width': 1366, 'height': 768},
+    ]
+
+    # RADICAL PURGE: Block heavy tracking & social scripts to prevent networkidle hangs
+    BLOCKED_DOMAINS = [
+        "google-analytics.com", "googletagmanager.com", "facebook.net",
+        "clarity.ms", "hotjar.com", "linkedin.com", "doubleclick.net",
+        "quantserve.com", "scorecardresearch.com", "intercom.io"
+    ]
+    # Mission-critical APIs that are never blocked
+    SAFE_DOMAINS = ["api.", "graphql", "cdn-cgi", "dorahacks.io", "hackquest.io", "superteam.fun", "taikai.network"]
+
     def __init__(self):
         self.kafka_initialized = kafka_producer_manager.initialize()
         self.browser = None
         self.playwright = None
+        self.pool: Optional[BrowserPool] = None
+        # Worker processes without a shared broker spool payloads for the API process to transmit
+        self.spool_dir: Optional[str] = None
+        self._spooled: List[Tuple[str, str]] = []
         # Prevent concurrent initialization races (multiple scrapers booting at once)
         self._browser_lock = asyncio.Lock()
 
     async def _init_browser(self):
         """Initialize Playwright Engine if not running (race-safe)"""
         # Fast path: already initialized
-        if self.playwright and self.browser:
+        if self._browser_alive():
             return
 
         async with self._browser_lock:
             # Re-check after acquiring lock
-            if self.playwright and self.browser:
+            if self._browser_alive():
                 return
 
+            if self.browser:
+                # Browser crashed: its pooled contexts are dead too
+                logger.warning("Browser disconnected, relaunching")
+                self.browser = None
+                if self.pool:
+                    await self.pool.drain()
+
             try:
                 if not self.playwright:
                     self.playwright = await async_playwright().start()
@@ -67,32 +112,57 @@ class UniversalCrawlerService:
                 self.browser = None
                 self.playwright = None
                 raise
-            
+
+    def _browser_alive(self) -> bool:
+        return bool(self.playwright and self.browser and self.browser.is_connected())
+
+    async def _get_pool(self) -> BrowserPool:
+        """Warm context pool (created on first use, after the browser is up)"""
+        await self._init_browser()
+        if self.pool is None:
+            self.pool = BrowserPool(
+                context_factory=self.create_stealth_context,
+                route_handler=self._route_policy,
+                user_agents=self.USER_AGENTS,
+                viewports=self.VIEWPORTS,
+            )
+            self.pool.register_metrics("crawler")
+            await self.pool.warm()
+        return self.pool
+
+    async def _route_policy(self, profile: str, route):
+        """Request blocking per lease profile: 'drone' (missions) or 'fetch' (direct fetch)"""
+        request = route.request
+        url = request.url.lower()
+        resource_type = request.resource_type
+
+        if profile == "fetch":
+            # Basic route blocking for speed (allow JSON API responses)
+            if resource_type in ["image", "media", "font", "stylesheet"]:
+                return await route.abort()
+            return await route.continue_()
+
+        # 1. Block heavy resource types
+        if resource_type in ["image", "media", "font"]:
+            return await route.abort()
+
+        # 2. Block tracking/social scripts (Exclude mission-critical APIs)
+        if any(domain in url for domain in self.BLOCKED_DOMAINS):
+            # Only block if it's NOT a safe API/data domain
+            if not any(safe in url for safe in self.SAFE_DOMAINS):
+                return await route.abort()
+
+        return await route.continue_()
+
     async def create_stealth_context(self) -> BrowserContext:
         """Create a new incognito context with advanced stealth overrides"""
         await self._init_browser()
         if not self.browser:
             raise RuntimeError("Playwright browser not initialized")
-        # Rotate user agents for anti-detection
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        ]
-        
-        # Randomize viewport slightly for fingerprint variance
-        viewports = [
-            {'width': 1920, 'height': 1080},
-            {'width': 1536, 'height': 864},
-            {'width': 1440, 'height': 900},
-            {'width': 1366, 'height': 768},
-        ]
-        
+
         context = await self.browser.new_context(
-            user_agent=random.choice(user_agents),
-            viewport=random.choice(viewports),
+            user_agent=random.choice(self.USER_AGENTS),
+            viewport=random.choice(self.VIEWPORTS),
             locale='en-US',
             timezone_id=random.choice(['America/New_York', 'America/Los_Angeles', 'Europe/London']),
             color_scheme='light',
@@ -151,148 +221,168 @@ class UniversalCrawlerService:
         
         return context
 
-    async def crawl_and_stream(self, urls: List[str], intent: str = "general"):
+    async def crawl_and_stream(self, urls: List[str], intent: str = "general") -> Dict[str, Any]:
         """
-        Deploy Hunter Drones to target URLs in parallel batches.
+        Deploy Hunter Drones to target URLs.
+        The host scheduler keeps a global number of drones busy while staying polite per host.
+        With crawler worker processes running, the squad is dispatched to them instead.
         """
+        if crawler_workers.running:
+            summary = await crawler_workers.crawl(urls, intent)
+            logger.info("Hunter Drone Squad returned from workers", intent=intent, **summary)
+            return summary
+
         logger.info("Deploying Hunter Drone Squad", target_count=len(urls), intent=intent)
-        
-        # Process in batches to not overwhelm local resources but keep speed
-        batch_size = 5
-        for i in range(0, len(urls), batch_size):
-            batch = urls[i:i + batch_size]
-            tasks = [self._crawl_single_target(url, intent) for url in batch]
-            await asyncio.gather(*tasks)
-            # Stagger between batches
-            await asyncio.sleep(random.uniform(2.0, 4.0))
-
-    async def _crawl_single_target(self, url: str, intent: str):
-        """Individual drone mission"""
-        context = await self.create_stealth_context()
-        try:
-            # BLOCKED BLACKLIST: Hard stop for dead/zombie URLs
-            if "chegg.com" in url or "chegg.com" in url.lower():
-                logger.warning("Drone ignoring dead target (Chegg Blacklist)", url=url)
-                return
 
-            page = await context.new_page()
-            # RADICAL PURGE: Block heavy tracking & social scripts to prevent networkidle hangs
-            BLOCKED_DOMAINS = [
-                "google-analytics.com", "googletagmanager.com", "facebook.net", 
-                "clarity.ms", "hotjar.com", "linkedin.com", "doubleclick.net", 
-                "quantserve.com", "scorecardresearch.com", "intercom.io"
-            ]
-            
-            async def _handle_route(route):
-                request = route.request
-                url = request.url.lower()
-                resource_type = request.resource_type
-                
-                # 1. Block heavy resource types
-                if resource_type in ["image", "media", "font"]:
-                    return await route.abort()
-                
-                # 2. Block tracking/social scripts (Exclude mission-critical APIs)
-                SAFE_DOMAINS = ["api.", "graphql", "cdn-cgi", "dorahacks.io", "hackquest.io", "superteam.fun", "taikai.network"]
-                if any(domain in url for domain in BLOCKED_DOMAINS):
-                    # Only block if it's NOT a safe API/data domain
-                    if not any(safe in url for safe in SAFE_DOMAINS):
-                        return await route.abort()
-                
-                return await route.continue_()
-
-            await page.route("**/*", _handle_route)
-
-            # SET REALISTIC HEADERS
-            await page.set_extra_http_headers({
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                "Sec-Ch-Ua-Mobile": "?0",
-                "Sec-Ch-Ua-Platform": '"Windows"',
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "none",
-                "Sec-Fetch-User": "?1",
-                "Upgrade-Insecure-Requests": "1"
-            })
-
-            logger.info("Drone approaching target", url=url)
-            
-            # SMART NAVIGATION
-            try:
-                # Use domcontentloaded for faster, less brittle navigation
-                # Only use networkidle if strictly necessary (it fails on sites with constant polling)
-                await page.goto(url, wait_until="domcontentloaded", timeout=90000)
-            except Exception as e:
-                logger.debug("Drone primary approach failed (networkidle), retrying with lenient wait", url=url)
-                try:
-                    await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                except:
-                    # Last resort: just wait for the request to commit
-                    await page.goto(url, wait_until="commit", timeout=60000)
-            
-            # HUMAN INTERACTION LAYER (The "Wiggle")
-            # Move mouse randomly to simulate presence
-            await page.mouse.move(random.randint(100, 500), random.randint(100, 500))
-            await asyncio.sleep(random.uniform(0.5, 1.5))
-            
-            # DEEP SCROLL (For Infinite Scroll sites like DoraHacks/DevPost)
-            # We scroll in 3 intervals to trigger lazy loads
-            for _ in range(3):
-                await page.evaluate("window.scrollBy(0, 1500)")
-                await asyncio.sleep(1.5)
-            
-            # Wait for content to stabilize
-            try:
-                # RADICAL: Added a 2s 'Snap Wait' for SPA hydration stabilization
-                await asyncio.sleep(2.0)
-                await page.wait_for_load_state("networkidle", timeout=10000)
-            except:
-                pass 
+        async def mission(url: str) -> Optional[int]:
+            return await self._crawl_single_target(url, intent)
+
+        summary = await host_scheduler.run(urls, mission)
+        logger.info("Hunter Drone Squad returned", intent=intent, **summary)
+        return summary
 
-            # EXTRACT with retry logic for navigation errors (TAIKAI fix)
-            content = None
-            title = None
-            for attempt in range(3):
+    async def _crawl_single_target(self, url: str, intent: str) -> Optional[int]:
+        """Individual drone mission; returns the HTTP status (None if the drone crashed)"""
+        # BLOCKED BLACKLIST: Hard stop for dead/zombie URLs
+        if "chegg.com" in url.lower():
+            logger.warning("Drone ignoring dead target (Chegg Blacklist)", url=url)
+            return None
+
+        # TIER 1: plain HTTP (API endpoints and server-rendered pages)
+        fetched, reason = await tiered_fetcher.try_http(url, conditional=True)
+        if fetched is not None:
+            crawl_frontier.record_crawl(url, fetched.elapsed_ms / 1000, ok=True)
+            if fetched.not_modified:
+                logger.info("Drone skipped target (304 Not Modified)", url=url)
+                crawl_frontier.record_change(url, changed=False)
+                return fetched.status
+            logger.info("Drone served by HTTP tier", url=url, ms=round(fetched.elapsed_ms))
+            structured = map_json_document(url, fetched.text) if 'json' in fetched.content_type else []
+            await self._process_success(url, fetched.text, fetched.title, intent, fetched.validators, structured)
+            return fetched.status
+        if reason == "throttled":
+            crawl_frontier.record_crawl(url, 0.0, ok=False)
+            return 429  # The browser would be throttled too; let the scheduler back off
+
+        # TIER 2: full browser mission
+        started = time.perf_counter()
+        status = None
+        try:
+            pool = await self._get_pool()
+            async with pool.lease("drone") as page:
+                # Record the platform's listing XHR/GraphQL JSON while the page loads
+                capture = NetworkCapture.attach(page, url)
                 try:
-                    content = await page.content()
-                    title = await page.title()
-                    break
-                except Exception as nav_error:
-                    if "navigating" in str(nav_error).lower():
-                        logger.debug("Page still navigating, retrying...", url=url, attempt=attempt+1)
-                        await asyncio.sleep(0.5 + random.random())  # 500-1500ms jitter
-                        await page.wait_for_load_state("domcontentloaded", timeout=5000)
-                    else:
-                        raise
-            
-            if not content:
-                logger.warning("Drone mission aborted: Failed to extract content after retries", url=url)
-                return
-            
-            # CONTENT GUARD: Don't transmit shells or error pages
-            if "Page Not Found" in title or "404" in title:
-                logger.warning("Drone mission aborted: 404/Not Found", url=url, title=title)
-                return
-            
-            # SMART CONTENT GUARD: Allow thin content for JSON API endpoints
-            is_api_endpoint = '/api/' in url or '/graphql' in url
-                
-            if len(content) < 5000 and not is_api_endpoint:
-                logger.warning("Drone mission aborted: Content too thin (Potential Loading Shell)", url=url, size=len(content))
-                return
-            
-            await self._process_success(url, content, title, intent)
-            
+                    status = await self._run_drone_mission(page, url, intent, capture)
+                finally:
+                    if capture:
+                        capture.detach()  # Pooled page: never leave a listener behind
+                return status
         except Exception as e:
             logger.error("Drone crash", url=url, error=str(e))
+            return None
         finally:
-            await context.close()
+            elapsed = time.perf_counter() - started
+            ok = status is not None and status < 400
+            tiered_fetcher.record_browser(url, ok, elapsed * 1000)
+            crawl_frontier.record_crawl(url, elapsed, ok=ok)
+
+    async def _run_drone_mission(self, page: Page, url: str, intent: str,
+                                 capture: Optional[NetworkCapture] = None) -> int:
+        """Navigate, interact and transmit one target on a leased page; returns the HTTP status"""
+        # SET REALISTIC HEADERS
+        await page.set_extra_http_headers({
+            "Accept-Language": "en-US,en;q=0.9",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+            "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+            "Sec-Ch-Ua-Mobile": "?0",
+            "Sec-Ch-Ua-Platform": '"Windows"',
+            "Sec-Fetch-Dest": "document",
+            "Sec-Fetch-Mode": "navigate",
+            "Sec-Fetch-Site": "none",
+            "Sec-Fetch-User": "?1",
+            "Upgrade-Insecure-Requests": "1"
+        })
+
+        logger.info("Drone approaching target", url=url)
+        
+        # SMART NAVIGATION
+        try:
+            # Use domcontentloaded for faster, less brittle navigation
+            # Only use networkidle if strictly necessary (it fails on sites with constant polling)
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+        except Exception as e:
+            logger.debug("Drone primary approach failed (networkidle), retrying with lenient wait", url=url)
+            try:
+                response = await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            except:
+                # Last resort: just wait for the request to commit
+                response = await page.goto(url, wait_until="commit", timeout=60000)
+        status = response.status if response else 200
+        validators = response_validators(response.headers) if response else {}
+
+        if status in (429, 503):
+            # Throttled: report back so the scheduler backs off this host
+            logger.warning("Drone throttled by target", url=url, status=status)
+            return status
+        
+        # HUMAN INTERACTION LAYER (The "Wiggle")
+        # Move mouse randomly to simulate presence
+        await page.mouse.move(random.randint(100, 500), random.randint(100, 500))
+
+        # EVENT-DRIVEN READINESS: content selector, DOM quiescence, scroll-until-no-new-cards
+        await page_readiness.wait_until_ready(page, url)
+
+        # EXTRACT with retry logic for navigation errors (TAIKAI fix)
+        content = None
+        title = None
+        for attempt in range(3):
+            try:
+                content = await page.content()
+                title = await page.title()
+                break
+            except Exception as nav_error:
+                if "navigating" in str(nav_error).lower():
+                    logger.debug("Page still navigating, retrying...", url=url, attempt=attempt+1)
+                    await asyncio.sleep(0.5 + random.random())  # 500-1500ms jitter
+                    await page.wait_for_load_state("domcontentloaded", timeout=5000)
+                else:
+                    raise
+        
+        if not content:
+            logger.warning("Drone mission aborted: Failed to extract content after retries", url=url)
+            return status
+        
+        # CONTENT GUARD: Don't transmit shells or error pages
+        if "Page Not Found" in title or "404" in title:
+            logger.warning("Drone mission aborted: 404/Not Found", url=url, title=title)
+            return status
+        
+        # STRUCTURED CAPTURE: listings mapped from the page's own JSON (no LLM needed)
+        structured = await capture.collect() if capture else []
+
+        # SMART CONTENT GUARD: Allow thin content for JSON API endpoints
+        is_api_endpoint = '/api/' in url or '/graphql' in url
             
-    async def _process_success(self, url: str, html_content: str, title: str, intent: str):
-        """Process successful extraction"""
+        if len(content) < 5000 and not is_api_endpoint and not structured:
+            logger.warning("Drone mission aborted: Content too thin (Potential Loading Shell)", url=url, size=len(content))
+            return status
         
+        await self._process_success(url, content, title, intent, validators, structured)
+        return status
+            
+    async def _process_success(self, url: str, html_content: str, title: str, intent: str,
+                               validators: Optional[Dict[str, Optional[str]]] = None,
+                               structured: Optional[List[Any]] = None):
+        """Process successful extraction (structured: listings already mapped from captured JSON)"""
+
+        # 0. Unchanged since the last transmission: skip Kafka and the LLM entirely
+        if crawl_cache.is_unchanged(url, html_content):
+            logger.info("Drone skipped unchanged page", url=url)
+            crawl_frontier.record_change(url, changed=False)
+            return
+        crawl_frontier.record_change(url, changed=True)
+
         # 1. Clean / Minify HTML (basic) to save bandwidth
         # remove scripts/styles for raw storage if desired, but we keep raw for now
         
@@ -305,23 +395,52 @@ class UniversalCrawlerService:
             "intent": intent,
             "agent_type": "HunterDrone-V1"
         }
+        if structured:
+            # The refinery uses these instead of asking the LLM to re-parse the DOM
+            payload["structured_opportunities"] = [opp.model_dump(mode="json") for opp in structured]
         
+        if self.spool_dir:
+            # The API process transmits it and records it in the crawl cache once Kafka acks
+            payload["crawl_cache"] = {"content_hash": content_hash(html_content), "validators": validators or {}}
+            ref = await asyncio.to_thread(write_spool, self.spool_dir, payload)
+            self._spooled.append((url, ref))
+            return
+
+        # Only remembered once Kafka acked it, so a failed or fallback transmission is retried next patrol
+        if await self.transmit(url, payload):
+            crawl_cache.record_sent(url, html_content, validators)
+
+    async def transmit(self, url: str, payload: Dict[str, Any]) -> bool:
+        """
+        Publish a raw page to the stream (or straight to the refinery when Kafka is down).
+        True only once the broker has acknowledged delivery.
+        """
+        size = len(payload.get("html") or "")
         if self.kafka_initialized:
-            success = kafka_producer_manager.publish_to_stream(
-                topic=KafkaConfig.TOPIC_RAW_HTML,
-                key=url,
-                value=payload
-            )
-            if success:
-                logger.info("Drone transmitted payload", url=url, size=len(html_content))
-            else:
-                logger.error("Transmission jammed (Kafka fail) - Engaging Heartbeat Fallback", url=url)
-                from app.services.cortex.refinery import refinery_service
-                await refinery_service.process_raw_event(key=url, value=payload) # Direct Heartbeat Injection
+            future = kafka_producer_manager.publish_many(KafkaConfig.TOPIC_RAW_HTML, [(url, payload)])[0]
+            try:
+                await asyncio.wrap_future(future)
+                logger.info("Drone transmitted payload", url=url, size=size)
+                return True
+            except Exception as e:
+                logger.error("Transmission jammed (Kafka fail) - Engaging Heartbeat Fallback", url=url, error=str(e))
         else:
-             logger.warning("Kafka offline - Engaging Heartbeat Fallback", url=url)
-             from app.services.cortex.refinery import refinery_service
-             await refinery_service.process_raw_event(key=url, value=payload) # Direct Heartbeat Injection
+            logger.warning("Kafka offline - Engaging Heartbeat Fallback", url=url)
+
+        from app.services.cortex.refinery import refinery_service
+        try:
+            await refinery_service.process_raw_event(key=url, value=payload) # Direct Heartbeat Injection
+        except Exception as e:
+            # No broker to park it on: left out of the crawl cache, so the next patrol retries it
+            logger.error("Heartbeat extraction failed", url=url, error=str(e))
+        return False
+
+    def take_spooled(self, urls: List[str]) -> List[str]:
+        """Spool files written for these urls (handed back to the API process)"""
+        wanted = set(urls)
+        taken = [ref for url, ref in self._spooled if url in wanted]
+        self._spooled = [(url, ref) for url, ref in self._spooled if url not in wanted]
+        return taken
 
     def _extract_domain(self, url: str) -> str:
         from urllib.parse import urlparse
@@ -329,105 +448,89 @@ class UniversalCrawlerService:
     
     async def fetch_content(self, url: str, max_retries: int = 3) -> Optional[str]:
         """
-        Direct fetch of a single URL using stealth context. 
-        Returns HTML content or None on failure.
+        Direct fetch of a single URL: plain HTTP first, pooled stealth page if the
+        response is a JS shell, WAF challenge or too thin.
+        Returns HTML (or JSON) content or None on failure.
+        """
+        async def browser_fetch(target: str) -> Optional[str]:
+            return await self._browser_fetch_content(target, max_retries)
+
+        fetched = await tiered_fetcher.fetch(url, browser_fetch)
+        if fetched is None:
+            return None
+        logger.info("Direct fetch served", url=url, tier=fetched.tier, ms=round(fetched.elapsed_ms))
+        return fetched.text
+
+    async def _browser_fetch_content(self, url: str, max_retries: int = 3) -> Optional[str]:
+        """
+        Browser tier of fetch_content.
         
         Enhanced with:
         - Exponential backoff retry logic
         - Multiple wait strategies for SPAs
-        - Extended timeout for slow sites (MLH, TAIKAI)
+        - Per-domain readiness profiles instead of fixed sleeps
         """
         last_error = None
         
+        pool = await self._get_pool()
+
         for attempt in range(max_retries):
-            context = await self.create_stealth_context()
-            page = None
             try:
-                page = await context.new_page()
-                
-                # Basic route blocking for speed (allow JSON API responses)
-                async def route_handler(route):
-                    if route.request.resource_type in ["image", "media", "font", "stylesheet"]:
-                        await route.abort()
-                    else:
-                        await route.continue_()
-                        
-                await page.route("**/*", route_handler)
-                
-                logger.info("Direct fetch approaching", url=url, attempt=attempt + 1)
-                
-                # Try multiple loading strategies
-                loaded = False
-                
-                # Strategy 1: domcontentloaded (fast, good for SPAs)
-                try:
-                    await page.goto(url, wait_until="domcontentloaded", timeout=45000)
-                    loaded = True
-                except Exception as e1:
-                    logger.debug("domcontentloaded failed, trying networkidle", url=url, error=str(e1)[:50])
-                    
-                    # Strategy 2: networkidle (slower but more complete for SPAs)
-                    try:
-                        await page.goto(url, wait_until="networkidle", timeout=60000)
-                        loaded = True
-                    except Exception as e2:
-                        logger.debug("networkidle failed, trying commit", url=url, error=str(e2)[:50])
-                        
-                        # Strategy 3: commit (minimal, just wait for first response)
-                        try:
-                            await page.goto(url, wait_until="commit", timeout=30000)
-                            loaded = True
-                        except Exception as e3:
-                            last_error = e3
-                            logger.warning("All load strategies failed", url=url, attempt=attempt + 1)
-                            
-                if not loaded:
-                    continue  # Retry with fresh context
-                
-                # Wait for dynamic content to render (SPAs like DoraHacks, TAIKAI)
-                await asyncio.sleep(3)
-                
-                # Additional wait for specific slow sites
-                SPA_HEAVY_SITES = ['taikai.network', 'mlh.io', 'hackquest.io', 'dorahacks.io', 'kaggle.com', 'devfolio.co']
-                if any(domain in url for domain in SPA_HEAVY_SITES):
-                    await asyncio.sleep(4)  # Extra 4s for heavy SPAs to fully hydrate
-                    # Extra scroll to trigger lazy loading
-                    try:
-                        await page.evaluate("window.scrollBy(0, document.body.scrollHeight)")
-                        await asyncio.sleep(1.5)
-                    except:
-                        pass
-                
-                content = await page.content()
-                
-                # Validate content isn't empty/shell
-                if len(content) > 1000:
+                content = await self._fetch_on_leased_page(pool, url, attempt)
+                if content is not None:
                     return content
-                else:
-                    logger.warning("Content too thin, retrying", url=url, length=len(content))
-                    
             except Exception as e:
                 last_error = e
                 logger.warning("Direct fetch attempt failed", url=url, attempt=attempt + 1, error=str(e)[:100])
-            finally:
-                if page: 
-                    try:
-                        await page.close()
-                    except:
-                        pass
-                try:
-                    await context.close()
-                except:
-                    pass
-            
+
             # Exponential backoff between retries
             if attempt < max_retries - 1:
                 await asyncio.sleep(2 ** attempt)
-        
+
         logger.error("Direct fetch failed after all retries", url=url, error=str(last_error) if last_error else "Unknown")
         return None
 
+    async def _fetch_on_leased_page(self, pool: BrowserPool, url: str, attempt: int) -> Optional[str]:
+        """One fetch attempt; an unhealthy context is recycled by the pool on release"""
+        async with pool.lease("fetch") as page:
+            logger.info("Direct fetch approaching", url=url, attempt=attempt + 1)
+            
+            # Try multiple loading strategies
+            
+            # Strategy 1: domcontentloaded (fast, good for SPAs)
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=45000)
+            except Exception as e1:
+                logger.debug("domcontentloaded failed, trying networkidle", url=url, error=str(e1)[:50])
+                
+                # Strategy 2: networkidle (slower but more complete for SPAs)
+                try:
+                    await page.goto(url, wait_until="networkidle", timeout=60000)
+                except Exception as e2:
+                    logger.debug("networkidle failed, trying commit", url=url, error=str(e2)[:50])
+                    
+                    # Strategy 3: commit (minimal, just wait for first response)
+                    try:
+                        await page.goto(url, wait_until="commit", timeout=30000)
+                    except Exception:
+                        logger.warning("All load strategies failed", url=url, attempt=attempt + 1)
+                        raise  # Retry on a fresh lease
+            
+            # Wait for dynamic content to render (SPAs like DoraHacks, TAIKAI)
+            await page_readiness.wait_until_ready(page, url)
+            
+            content = await page.content()
+            
+            # Validate content isn't empty/shell
+            if len(content) > 1000:
+                return content
+            logger.warning("Content too thin, retrying", url=url, length=len(content))
+            return None
+
     async def close(self):
+        await tiered_fetcher.close()
+        if self.pool:
+            await self.pool.drain()
         if self.browser:
             await self.browser.close()
         if self.playwright:
@@ -0,0 +1,342 @@
+"""
+Crawler Worker Processes
+Moves Playwright out of the API process: N spawned workers, each owning its own browser.
+
+- Jobs are sharded by host (stable hash), so every host's politeness state lives in
+  exactly one worker's host scheduler and a patrol spreads across all cores.
+- Results come back by reference: with Confluent configured, workers publish raw
+  pages themselves; with the in-process local broker (or no broker) they spool each
+  payload to a file and return its path, and the API process transmits it.
+- A worker that dies fails its in-flight jobs and is restarted.
+"""
+import asyncio
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import structlog
+
+from app.config import settings
+from app.services.pipeline_metrics import pipeline_metrics
+
+logger = structlog.get_logger()
+
+DEFAULT_JOB_TARGET = "app.services.crawler_workers:crawl_in_worker"
+
+
+def shard_by_host(urls: List[str], shards: int) -> List[List[str]]:
+    """Split urls into shards; all urls of a host land in the same shard"""
+    buckets: List[List[str]] = [[] for _ in range(max(1, shards))]
+    for url in urls:
+        host = urlparse(url).netloc.lower()
+        buckets[zlib.crc32(host.encode('utf-8')) % len(buckets)].append(url)
+    return buckets
+
+
+def merge_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-worker crawl summaries (workers run in parallel: seconds is the max)"""
+    return {
+        'urls': sum(s.get('urls', 0) for s in summaries),
+        'hosts': sum(s.get('hosts', 0) for s in summaries),
+        'seconds': max((s.get('seconds', 0) for s in summaries), default=0),
+    }
+
+
+def write_spool(spool_dir: str, payload: Dict[str, Any]) -> str:
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, f"{uuid.uuid4().hex}.json")
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)  # Readers never see a partial file
+    return path
+
+
+def read_spool(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Spooled crawl result unreadable", path=path, error=str(e))
+        return None
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def crawl_in_worker(urls: List[str], intent: str, spool_dir: Optional[str]) -> Tuple[Dict[str, Any], List[str]]:
+    """Default job: run the drones in this process, return (summary, spooled refs)"""
+    from app.services.crawler_service import crawler_service
+    crawler_service.spool_dir = spool_dir
+    summary = await crawler_service.crawl_and_stream(urls, intent)
+    return summary or {}, crawler_service.take_spooled(urls)
+
+
+def _resolve(target: str) -> Callable:
+    module_name, func_name = target.split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _worker_main(index: int, jobs, results, job_target: str, spool_dir: Optional[str]):
+    """Process entry point: one event loop (and browser) per worker"""
+    asyncio.run(_worker_loop(index, jobs, results, job_target, spool_dir))
+
+
+async def _worker_loop(index: int, jobs, results, job_target: str, spool_dir: Optional[str]):
+    job_fn = _resolve(job_target)
+    loop = asyncio.get_running_loop()
+    running = set()
+
+    async def run(job_id: int, urls: List[str], intent: str):
+        try:
+            summary, refs = await job_fn(urls, intent, spool_dir)
+            results.put((job_id, index, summary, refs, None))
+        except Exception as e:
+            results.put((job_id, index, None, [], str(e)))
+
+    while True:
+        job = await loop.run_in_executor(None, jobs.get)
+        if job is None:
+            break
+        # Concurrent jobs (patrol + hunt) share this worker's host scheduler
+        task = asyncio.create_task(run(*job))
+        running.add(task)
+        task.add_done_callback(running.discard)
+
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
+    if job_target == DEFAULT_JOB_TARGET:
+        from app.services.crawler_service import crawler_service
+        await crawler_service.close()
+
+
+class WorkerHandle:
+    """One worker process and its job queue"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.Process] = None
+        self.jobs = None
+        self.sent = 0
+        self.done = 0
+        self.failed = 0
+        self.restarts = 0
+
+
+class CrawlerWorkerPool:
+    """Dispatches crawl jobs to worker processes and gathers their results"""
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        job_target: str = DEFAULT_JOB_TARGET,
+        spool_dir: Optional[str] = None,
+        shared_broker: Optional[bool] = None
+    ):
+        self.processes = processes if processes is not None else settings.crawler_worker_processes
+        self.job_target = job_target
+        self.spool_dir = spool_dir if spool_dir is not None else os.path.join(settings.cortex_state_dir, "crawl_spool")
+        self.shared_broker = shared_broker
+        self._ctx = multiprocessing.get_context("spawn")  # Never fork a process holding a browser/event loop
+        self._results = None
+        self._workers: List[WorkerHandle] = []
+        self._pending: Dict[int, Tuple[int, asyncio.Future, asyncio.AbstractEventLoop]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers) and not self._stopping.is_set()
+
+    def _broker_is_shared(self) -> bool:
+        if self.shared_broker is None:
+            # Only Confluent is reachable from other processes; the local broker lives in this one
+            from app.services.kafka_config import kafka_producer_manager
+            self.shared_broker = kafka_producer_manager.config.confluent_enabled
+        return self.shared_broker
+
+    def _spawn(self, handle: WorkerHandle):
+        handle.jobs = self._ctx.Queue()
+        handle.process = self._ctx.Process(
+            target=_worker_main,
+            args=(handle.index, handle.jobs, self._results, self.job_target,
+                  None if self._broker_is_shared() else self.spool_dir),
+            name=f"crawler-worker-{handle.index}",
+            daemon=True,
+        )
+        handle.process.start()
+        logger.info("Crawler worker started", worker=handle.index, pid=handle.process.pid)
+
+    def start(self):
+        if self.running or self.processes < 1:
+            return
+        self._stopping.clear()
+        self._results = self._ctx.Queue()
+        self._workers = [WorkerHandle(i) for i in range(self.processes)]
+        for handle in self._workers:
+            self._spawn(handle)
+        self._reader = threading.Thread(target=self._read_results, name="crawler-worker-results", daemon=True)
+        self._reader.start()
+        logger.info("Crawler worker pool started", processes=self.processes,
+                    results="broker" if self._broker_is_shared() else "spool")
+
+    def _read_results(self):
+        """Resolve job futures from worker results; restart workers that died"""
+        while not self._stopping.is_set():
+            try:
+                job_id, index, summary, refs, error = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                entry = self._pending.pop(job_id, None)
+            handle = self._workers[index]
+            if error:
+                handle.failed += 1
+            else:
+                handle.done += 1
+            if entry:
+                _, future, loop = entry
+                loop.call_soon_threadsafe(_settle, future, (summary, refs), error)
+
+    def _check_workers(self):
+        for handle in self._workers:
+            if self._stopping.is_set() or handle.process is None or handle.process.is_alive():
+                continue
+            logger.error("Crawler worker died, restarting", worker=handle.index, exitcode=handle.process.exitcode)
+            with self._lock:
+                lost = [job_id for job_id, entry in self._pending.items() if entry[0] == handle.index]
+                entries = [self._pending.pop(job_id) for job_id in lost]
+            for _, future, loop in entries:
+                loop.call_soon_threadsafe(_settle, future, None, f"worker {handle.index} died")
+            handle.failed += len(entries)
+            handle.restarts += 1
+            self._spawn(handle)
+
+    async def _submit(self, index: int, urls: List[str], intent: str) -> Tuple[Dict[str, Any], List[str]]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job_id = next(self._ids)
+        handle = self._workers[index]
+        with self._lock:
+            self._pending[job_id] = (index, future, loop)
+        handle.jobs.put((job_id, urls, intent))
+        handle.sent += 1
+        return await future
+
+    async def crawl(self, urls: List[str], intent: str = "general") -> Dict[str, Any]:
+        """Crawl urls across the workers; spooled results are transmitted from here"""
+        shards = shard_by_host(urls, len(self._workers))
+        jobs = [self._submit(i, shard, intent) for i, shard in enumerate(shards) if shard]
+        outcomes = await asyncio.gather(*jobs, return_exceptions=True)
+
+        summaries = []
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                logger.error("Crawler worker job failed", error=str(outcome))
+                continue
+            summary, refs = outcome
+            summaries.append(summary)
+            await self._transmit_spooled(refs)
+        return merge_summaries(summaries)
+
+    async def _transmit_spooled(self, refs: List[str]):
+        if not refs:
+            return
+        from app.services.crawl_cache import crawl_cache
+        from app.services.crawler_service import crawler_service
+        for ref in refs:
+            payload = await asyncio.to_thread(read_spool, ref)
+            if not payload:
+                continue
+            sent = payload.pop('crawl_cache', None)
+            if await crawler_service.transmit(payload['url'], payload) and sent:
+                crawl_cache.record_hash(payload['url'], sent['content_hash'], sent.get('validators'))
+
+    async def recover_spool(self):
+        """Transmit results spooled before a crash/restart of the API process"""
+        try:
+            names = [n for n in os.listdir(self.spool_dir) if n.endswith(".json")]
+        except OSError:
+            return
+        if names:
+            logger.info("Recovering spooled crawl results", count=len(names))
+            await self._transmit_spooled([os.path.join(self.spool_dir, n) for n in names])
+
+    def stop(self, timeout: float = 10.0):
+        if not self._workers:
+            return
+        self._stopping.set()  # Exiting workers must not be restarted
+        for handle in self._workers:
+            try:
+                handle.jobs.put(None)
+            except (OSError, ValueError):
+                pass
+        deadline = time.monotonic() + timeout
+        for handle in self._workers:
+            handle.process.join(max(0.0, deadline - time.monotonic()))
+            if handle.process.is_alive():
+                handle.process.terminate()
+        if self._reader:
+            self._reader.join(timeout=2.0)
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for _, future, loop in pending:
+            loop.call_soon_threadsafe(_settle, future, None, "worker pool stopped")
+        self._workers = []
+        logger.info("Crawler worker pool stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'processes': len(self._workers),
+            'pending_jobs': len(self._pending),
+            'workers': [
+                {
+                    'worker': h.index,
+                    'pid': h.process.pid if h.process else None,
+                    'alive': bool(h.process and h.process.is_alive()),
+                    'sent': h.sent, 'done': h.done, 'failed': h.failed, 'restarts': h.restarts,
+                }
+                for h in self._workers
+            ],
+        }
+
+
+def _settle(future: asyncio.Future, result: Any, error: Optional[str]):
+    if future.done():
+        return
+    if error:
+        future.set_exception(RuntimeError(error))
+    else:
+        future.set_result(result)
+
+
+# Global instance (started from app startup when CRAWLER_WORKER_PROCESSES > 0)
+crawler_workers = CrawlerWorkerPool()
+
+
+_WORKER_GAUGE = pipeline_metrics.gauge("cortex_crawler_workers", "Crawler worker process counters", ("worker", "stat"))
+
+
+def _collect_worker_metrics():
+    _WORKER_GAUGE.clear()
+    for worker in crawler_workers.get_stats()['workers']:
+        for stat in ('alive', 'sent', 'done', 'failed', 'restarts'):
+            _WORKER_GAUGE.set(float(worker[stat]), worker=str(worker['worker']), stat=stat)
+
+
+pipeline_metrics.register_collector(_collect_worker_metrics)
@@ -0,0 +1,397 @@
+"""
+Cortex Dedup Store
+Compact, persistent "have we seen this opportunity id" state for the stream processor.
+
+- A scalable Bloom filter answers the common case (new id) from memory without touching disk.
+- An exact SQLite id set confirms Bloom positives, so false positives never drop real events.
+- The filter is snapshotted to local disk and restored at startup; ids added after the last
+  snapshot are replayed from the exact set, so a cold start never scans Firestore.
+"""
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import struct
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+SNAPSHOT_MAGIC = b"CBF1"
+
+
+def _hash_pair(key: str) -> Tuple[int, int]:
+    """Two independent 64-bit hashes for Kirsch-Mitzenmacher double hashing"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    h1, h2 = struct.unpack("<QQ", digest)
+    return h1, h2 | 1
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over a bytearray"""
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, count: int = 0):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, hashes: Tuple[int, int]):
+        h1, h2 = hashes
+        m = self.num_bits
+        return ((h1 + i * h2) % m for i in range(self.num_hashes))
+
+    def add(self, hashes: Tuple[int, int]):
+        for pos in self._positions(hashes):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def contains(self, hashes: Tuple[int, int]) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(hashes))
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+    def fill_ratio_fp_rate(self) -> float:
+        """Estimated false positive rate from the current fill, (1 - e^(-kn/m))^k"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class ScalableBloomFilter:
+    """
+    Chain of Bloom filters with geometrically growing capacity and tightening error rates,
+    so the compound false positive rate stays near the target as the id set grows.
+    Growth stops at max_bytes; past that the last slice keeps absorbing ids (its false
+    positive rate rises, which only costs extra exact-set lookups, never correctness).
+    """
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, initial_capacity: int, error_rate: float, max_bytes: int):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.max_bytes = max_bytes
+        self.slices: List[BloomFilter] = []
+        self._add_slice()
+
+    def _next_slice_params(self) -> Tuple[int, float]:
+        n = len(self.slices)
+        return (self.initial_capacity * (self.GROWTH ** n),
+                self.error_rate * (1 - self.TIGHTENING) * (self.TIGHTENING ** n))
+
+    def _add_slice(self) -> bool:
+        capacity, error_rate = self._next_slice_params()
+        candidate_bytes = BloomFilter(capacity, error_rate, bits=bytearray(0)).num_bits // 8 + 1
+        if self.slices and self.size_bytes + candidate_bytes > self.max_bytes:
+            return False
+        self.slices.append(BloomFilter(capacity, error_rate))
+        return True
+
+    def add(self, key: str):
+        hashes = _hash_pair(key)
+        current = self.slices[-1]
+        if current.is_full and self._add_slice():
+            current = self.slices[-1]
+        current.add(hashes)
+
+    def __contains__(self, key: str) -> bool:
+        hashes = _hash_pair(key)
+        return any(s.contains(hashes) for s in reversed(self.slices))
+
+    @property
+    def count(self) -> int:
+        return sum(s.count for s in self.slices)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(s.size_bytes for s in self.slices)
+
+    def estimated_fp_rate(self) -> float:
+        miss = 1.0
+        for s in self.slices:
+            miss *= 1 - s.fill_ratio_fp_rate()
+        return 1 - miss
+
+    def to_bytes(self, extra: Optional[Dict[str, Any]] = None) -> bytes:
+        header = json.dumps({
+            'initial_capacity': self.initial_capacity,
+            'error_rate': self.error_rate,
+            'slices': [{'capacity': s.capacity, 'error_rate': s.error_rate, 'count': s.count}
+                       for s in self.slices],
+            **(extra or {})
+        }).encode('utf-8')
+        return b"".join([SNAPSHOT_MAGIC, struct.pack("<I", len(header)), header] +
+                        [bytes(s.bits) for s in self.slices])
+
+    @classmethod
+    def from_bytes(cls, data: bytes, max_bytes: int) -> Tuple["ScalableBloomFilter", Dict[str, Any]]:
+        if data[:4] != SNAPSHOT_MAGIC:
+            raise ValueError("Not a dedup filter snapshot")
+        (header_len,) = struct.unpack("<I", data[4:8])
+        header = json.loads(data[8:8 + header_len].decode('utf-8'))
+
+        sbf = cls.__new__(cls)
+        sbf.initial_capacity = header['initial_capacity']
+        sbf.error_rate = header['error_rate']
+        sbf.max_bytes = max_bytes
+        sbf.slices = []
+        offset = 8 + header_len
+        for meta in header['slices']:
+            template = BloomFilter(meta['capacity'], meta['error_rate'], bits=bytearray(0))
+            size = (template.num_bits + 7) // 8
+            bits = bytearray(data[offset:offset + size])
+            if len(bits) != size:
+                raise ValueError("Truncated dedup filter snapshot")
+            sbf.slices.append(BloomFilter(meta['capacity'], meta['error_rate'], bits=bits, count=meta['count']))
+            offset += size
+        return sbf, header
+
+
+class DedupStore:
+    """
+    Seen-id set: Bloom filter in memory, exact ids in SQLite, snapshot on local disk.
+    Not tied to any sliding window: ids are remembered for the lifetime of the state dir.
+    """
+
+    def __init__(
+        self,
+        state_dir: Optional[str] = None,
+        name: str = "dedup",
+        capacity: Optional[int] = None,
+        error_rate: Optional[float] = None,
+        max_memory_bytes: Optional[int] = None,
+        snapshot_every: Optional[int] = None
+    ):
+        self.state_dir = state_dir or settings.cortex_state_dir
+        self.capacity = capacity or settings.dedup_bloom_capacity
+        self.error_rate = error_rate or settings.dedup_bloom_error_rate
+        self.max_memory_bytes = max_memory_bytes or settings.dedup_max_memory_mb * 1024 * 1024
+        self.snapshot_every = snapshot_every or settings.dedup_snapshot_every
+
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.db_path = os.path.join(self.state_dir, f"{name}.sqlite3")
+        self.snapshot_path = os.path.join(self.state_dir, f"{name}.bloom")
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (rowid INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, first_seen REAL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        # Last-seen material fields per id (change data capture)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS digests (id TEXT PRIMARY KEY, digest TEXT, fields TEXT)")
+
+        self.exact_lookups = 0
+        self.false_positives = 0
+        self._adds_since_snapshot = 0
+        self.restore_ms = 0.0
+        self._restore()
+
+    # --- Persistence ---
+
+    def _restore(self):
+        """Load the filter snapshot and replay ids added after it; rebuild if missing or corrupt"""
+        started = time.perf_counter()
+        last_rowid = 0
+        source = "empty"
+        self.bloom = None
+
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'rb') as f:
+                    self.bloom, header = ScalableBloomFilter.from_bytes(f.read(), self.max_memory_bytes)
+                last_rowid = int(header.get('last_rowid', 0))
+                source = "snapshot"
+            except Exception as e:
+                logger.warning("Dedup snapshot unreadable, rebuilding from exact set", error=str(e))
+                self.bloom = None
+
+        if self.bloom is None:
+            self.bloom = ScalableBloomFilter(self.capacity, self.error_rate, self.max_memory_bytes)
+
+        replayed = 0
+        with self._lock:
+            for (key,) in self._conn.execute("SELECT id FROM seen WHERE rowid > ? ORDER BY rowid", (last_rowid,)):
+                self.bloom.add(key)
+                replayed += 1
+
+        self.restore_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            "Dedup state restored",
+            source=source,
+            ids=self.bloom.count,
+            replayed=replayed,
+            memory_kb=self.bloom.size_bytes // 1024,
+            restore_ms=round(self.restore_ms, 2)
+        )
+        if replayed:
+            self.snapshot()
+
+    def snapshot(self):
+        """Write the filter to disk atomically (tmp file + rename)"""
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM seen").fetchone()
+            data = self.bloom.to_bytes({'last_rowid': row[0], 'written_at': time.time()})
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            self._adds_since_snapshot = 0
+
+    def close(self):
+        with self._lock:
+            self.snapshot()
+            self._conn.close()
+
+    # --- Membership ---
+
+    def contains(self, key: str) -> bool:
+        if key not in self.bloom:
+            return False
+        with self._lock:
+            self.exact_lookups += 1
+            found = self._conn.execute("SELECT 1 FROM seen WHERE id = ?", (key,)).fetchone() is not None
+            if not found:
+                self.false_positives += 1
+            return found
+
+    def add(self, key: str) -> bool:
+        """Record an id. Returns True if it was new."""
+        if self.contains(key):
+            return False
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO seen (id, first_seen) VALUES (?, ?)", (key, time.time())
+            )
+            if cursor.rowcount == 0:
+                return False
+            self.bloom.add(key)
+            self._adds_since_snapshot += 1
+            if self._adds_since_snapshot >= self.snapshot_every:
+                self.snapshot()
+        return True
+
+    def seed(self, keys: Iterable[str]) -> int:
+        """Bulk-load ids (one-off migration from an external source)"""
+        added = 0
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for key in keys:
+                    cursor = self._conn.execute("INSERT OR IGNORE INTO seen (id, first_seen) VALUES (?, ?)", (key, now))
+                    if cursor.rowcount:
+                        self.bloom.add(key)
+                        added += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.snapshot()
+        return added
+
+    def iter_ids(self, batch_size: int = 5000) -> Iterable[str]:
+        """Every id in the exact set, in insertion order"""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, id FROM seen WHERE rowid > ? ORDER BY rowid LIMIT ?", (last_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, key in rows:
+                yield key
+            last_rowid = rows[-1][0]
+
+    def destroy(self):
+        """Close and delete all files of this store"""
+        with self._lock:
+            self._conn.close()
+            for path in (self.db_path, self.db_path + "-wal", self.db_path + "-shm", self.snapshot_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def iter_digests(self, batch_size: int = 5000) -> Iterable[Tuple[str, str, str]]:
+        """Every (id, digest, fields JSON) row, for moving change-capture state between stores"""
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, digest, fields FROM digests WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def seed_digests(self, rows: Iterable[Tuple[str, str, str]]) -> int:
+        """Bulk-load rows from iter_digests (existing digests for an id are kept)"""
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    added += self._conn.execute(
+                        "INSERT OR IGNORE INTO digests (id, digest, fields) VALUES (?, ?, ?)", row
+                    ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def get_digest(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(digest, fields) last recorded for an id"""
+        with self._lock:
+            row = self._conn.execute("SELECT digest, fields FROM digests WHERE id = ?", (key,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def set_digest(self, key: str, digest: str, fields: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO digests (id, digest, fields) VALUES (?, ?, ?)",
+                (key, digest, json.dumps(fields, sort_keys=True))
+            )
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def __len__(self) -> int:
+        return self.bloom.count
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'ids': self.bloom.count,
+            'filter_slices': len(self.bloom.slices),
+            'memory_bytes': self.bloom.size_bytes,
+            'memory_limit_bytes': self.max_memory_bytes,
+            'estimated_fp_rate': round(self.bloom.estimated_fp_rate(), 6),
+            'exact_lookups': self.exact_lookups,
+            'false_positives': self.false_positives,
+            'restore_ms': round(self.restore_ms, 2),
+        }
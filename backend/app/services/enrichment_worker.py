@@ -2,17 +2,38 @@
 import asyncio
 import json
 import time
-from typing import List, Dict, Any
-from confluent_kafka import Consumer, KafkaError, Message
+from concurrent.futures import Future
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from confluent_kafka import KafkaError
 import structlog
 
 from app.config import settings
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
 from app.services.ai_enrichment_service import ai_enrichment_service
+from app.services.cortex.frontier import crawl_frontier
 from app.services.discovery_pulse import discovery_pulse
+from app.services.retry_router import retry_router
+from app.services.network_capture import structured_from_event
+from app.services.pipeline_metrics import ConsumerMetrics
 
 logger = structlog.get_logger()
 
+
+def deadline_timestamp(item: Dict[str, Any]) -> Optional[float]:
+    """Unix deadline of an extracted opportunity: deadline_timestamp, else an ISO deadline date"""
+    ts = item.get('deadline_timestamp')
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    deadline = item.get('deadline')
+    if isinstance(deadline, str):
+        try:
+            return datetime.fromisoformat(deadline.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
 class EnrichmentWorker:
     """
     AI REQUEST CONSUMER (The "Refinery")
@@ -23,12 +44,13 @@ class EnrichmentWorker:
     
     def __init__(self):
         self.config = KafkaConfig()
-        self.consumer_config = self.config.get_consumer_config(group_id="ai-refinery-v1")
+        self.group_id = "ai-refinery-v1"
         self.running = False
+        self.metrics = ConsumerMetrics(self.group_id)
         
     async def start(self):
         """Start the AI processing loop"""
-        if not self.consumer_config:
+        if not self.config.enabled:
             logger.error("Kafka configuration missing, cannot start worker")
             return
             
@@ -40,8 +62,9 @@ class EnrichmentWorker:
             return
             
         # Initialize consumer
-        consumer = Consumer(self.consumer_config)
+        consumer = self.config.create_consumer(self.group_id)
         consumer.subscribe([KafkaConfig.TOPIC_RAW_HTML])
+        self.metrics.track(consumer)
         
         self.running = True
         logger.info(f"Subscribed to {KafkaConfig.TOPIC_RAW_HTML}")
@@ -49,84 +72,67 @@ class EnrichmentWorker:
         
         try:
             while self.running:
-                # BATCH COLLECTION: Standardized to 1 for Maximum Reliability
-                batch_messages = []
-                start_collect = time.time()
-                
-                # Consume single message (Serial mode for absolute yield)
+                # BATCH COLLECTION: whatever arrives within a short window, packed into shared prompts
                 # We use asyncio.to_thread for Kafka polling
-                msg = await asyncio.to_thread(consumer.poll, 1.0)
+                polled = await asyncio.to_thread(self._poll_batch, consumer)
                 
-                if msg is None:
+                if not polled:
                     await asyncio.sleep(0.1)
                     continue
-                    
-                if msg.error():
-                    if msg.error().code() != KafkaError._PARTITION_EOF:
-                        logger.error(f"Consumer error: {msg.error()}")
-                    continue
-                    
-                try:
-                    payload = json.loads(msg.value().decode('utf-8'))
-                    # Check for pre-extracted data first
-                    if payload.get("extracted_data"):
-                        batch_messages.append(payload)
-                    elif payload.get("html") and payload.get("url"):
-                        batch_messages.append(payload)
-                except Exception as e:
-                    logger.error("Failed to decode message", error=str(e))
-
-                if not batch_messages:
-                    continue
-                
-                # HARD DEAD-LETTER FILTER: Drop any Chegg messages from the queue
-                # This clears old Kafka logs without spamming warnings
-                if any("chegg.com" in (m.get("url") or "") for m in batch_messages):
-                    logger.debug("Queue Flush: Dropped dead Chegg message")
-                    continue
 
-                # PROCESS PAYLOAD
-                start_time = time.time()
-                opportunities = []
-                
-                # Check for pre-extracted data in batch
-                pre_extracted = [m.get("extracted_data") for m in batch_messages if m.get("extracted_data")]
-                
-                if pre_extracted:
-                    logger.info("Using pre-extracted data (Deep Scraper Bypass)", count=len(pre_extracted))
-                    opportunities = pre_extracted
-                else:
-                    # Extract using AI Enrichment Service
-                    opportunities = await ai_enrichment_service.extract_opportunities_from_html_batch(batch_messages)
-                
-                duration = time.time() - start_time
-                
-                if not opportunities:
-                    logger.warning(f"No opportunities extracted from target", duration=f"{duration:.2f}s", url=urls[0])
-                    discovery_pulse.complete_mission(mission_id, found_count=0)
-                    continue
-                    
-                logger.info(f"Discovery Yield: {len(opportunities)} items", duration=f"{duration:.2f}s", url=urls[0], source="pre-extracted" if pre_extracted else "ai")
-                discovery_pulse.complete_mission(mission_id, found_count=len(opportunities))
-
-                # PUBLISH RESULTS
-                for opp in opportunities:
-                    enriched_message = {
-                        'source': "multi-batch", 
-                        'enriched_data': opp,
-                        'raw_data': {}, 
-                        'enriched_at': time.time(),
-                        'ai_model': settings.gemini_model,
-                        'origin_url': opp.get('url') or urls[0]
-                    }
+                messages = []       # Every message that must be settled (committed or parked)
+                batch_messages = [] # Payloads to process
+                batch_index = []    # Their positions in messages
+                failures = {}       # Position -> (error, permanent)
+                for msg in polled:
+                    if msg.error():
+                        if msg.error().code() != KafkaError._PARTITION_EOF:
+                            logger.error(f"Consumer error: {msg.error()}")
+                            self.metrics.error("poll")
+                        continue
+
+                    self.metrics.consumed(msg)
+                    messages.append(msg)
                     
-                    kafka_producer_manager.publish_to_stream(
-                        topic=KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED,
-                        key="ai-refinery",
-                        value=enriched_message
+                    try:
+                        payload = json.loads(msg.value().decode('utf-8'))
+                    except Exception as e:
+                        # Undecodable payloads will never succeed: straight to the DLQ
+                        logger.error("Failed to decode message", error=str(e))
+                        self.metrics.error("decode")
+                        self.metrics.processed("dead_letter")
+                        failures[len(messages) - 1] = (e, True)
+                        continue
+
+                    usable = payload.get("extracted_data") or (
+                        (payload.get("html") or payload.get("structured_opportunities")) and payload.get("url")
                     )
-                
-                kafka_producer_manager.flush()
+                    # HARD DEAD-LETTER FILTER: Drop any Chegg messages from the queue
+                    # This clears old Kafka logs without spamming warnings
+                    if "chegg.com" in (payload.get("url") or ""):
+                        logger.debug("Queue Flush: Dropped dead Chegg message")
+                        usable = False
+                    if not usable:
+                        self.metrics.processed("skipped")
+                        continue
+                    batch_messages.append(payload)
+                    batch_index.append(len(messages) - 1)
+
+                if batch_messages:
+                    started = time.perf_counter()
+                    try:
+                        await self._process_batch(batch_messages)
+                        self.metrics.processed("ok", seconds=time.perf_counter() - started, batch_size=len(batch_messages))
+                    except Exception as e:
+                        # Transient Gemini/Kafka failure: park on a retry tier, keep the partition moving
+                        logger.error("Refinery processing failed", error=str(e), url=batch_messages[0].get("url"),
+                                     batch=len(batch_messages))
+                        self.metrics.error("process")
+                        self.metrics.processed("retry", seconds=time.perf_counter() - started)
+                        failures.update({index: (e, False) for index in batch_index})
+
+                if messages:
+                    await retry_router.settle_batch(consumer, messages, failures, source="ai-refinery")
                         
         except Exception as e:
             logger.error("Worker lifecycle crashed", error=str(e))
@@ -134,8 +140,138 @@ class EnrichmentWorker:
         except KeyboardInterrupt:
             logger.info("Stopping worker...")
         finally:
+            consumer.close()
             self.close()
 
+    def _poll_batch(self, consumer) -> List[Any]:
+        """Block for the first message, then take what else arrives within the batch window"""
+        msg = consumer.poll(1.0)
+        if msg is None:
+            return []
+        polled = [msg]
+        deadline = time.monotonic() + settings.enrichment_batch_wait_ms / 1000
+        while len(polled) < settings.enrichment_batch_max_messages:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            msg = consumer.poll(remaining)
+            if msg is None:
+                break
+            polled.append(msg)
+        return polled
+
+    async def _process_batch(self, batch_messages: List[Dict[str, Any]]):
+        """Extract and publish opportunities for one consumed batch, each as soon as it is known"""
+        # PROCESS PAYLOAD
+        start_time = time.time()
+        per_message: List[Dict[int, Dict[str, Any]]] = [{} for _ in batch_messages]
+        new_counts = [0] * len(batch_messages)
+        deliveries: List[Future] = []
+        needs_llm = []
+        pre_extracted = 0
+        
+        for index, message in enumerate(batch_messages):
+            # Pre-extracted data (Deep Scraper Bypass), then captured JSON or hydration state:
+            # those pages never reach Gemini
+            if message.get("extracted_data"):
+                found = [message["extracted_data"]]
+                pre_extracted += 1
+            else:
+                structured = structured_from_event(message)
+                if not structured:
+                    needs_llm.append(index)
+                    continue
+                found = [opp.model_dump(mode="json") for opp in structured]
+            for opp in found:
+                await self._emit(index, message, opp, per_message, new_counts, deliveries)
+
+        resolved = len(batch_messages) - len(needs_llm)
+        if resolved:
+            logger.info("Resolved without LLM (structured data)", pages=resolved, pre_extracted=pre_extracted)
+        if needs_llm:
+            # Extract using AI Enrichment Service: small pages share prompts, and every
+            # opportunity is published while the model is still writing the rest.
+            # A card merged from an overlapping chunk is published again as an update.
+            async for position, opp in ai_enrichment_service.stream_pages([batch_messages[i] for i in needs_llm]):
+                index = needs_llm[position]
+                await self._emit(index, batch_messages[index], opp, per_message, new_counts, deliveries)
+        found_per_message = [list(found.values()) for found in per_message]
+
+        # The raw pages are only settled once every enriched message is on the broker
+        await self._await_delivery(deliveries)
+        
+        duration = time.time() - start_time
+
+        # Mission yields are reported per crawl mission, not per batch
+        found_by_mission: Dict[str, int] = {}
+        for message, found in zip(batch_messages, found_per_message):
+            mission_id = message.get("mission_id")
+            if mission_id:
+                found_by_mission[mission_id] = found_by_mission.get(mission_id, 0) + len(found)
+        for mission_id, found_count in found_by_mission.items():
+            discovery_pulse.complete_mission(mission_id, found_count=found_count)
+
+        self._record_yields(batch_messages, found_per_message, new_counts)
+
+        total = sum(len(found) for found in found_per_message)
+        if not total:
+            logger.warning(f"No opportunities extracted from target", duration=f"{duration:.2f}s",
+                           url=batch_messages[0].get("url"), pages=len(batch_messages))
+            return
+            
+        logger.info(f"Discovery Yield: {total} items", duration=f"{duration:.2f}s", pages=len(batch_messages),
+                    url=batch_messages[0].get("url"), llm_pages=len(needs_llm))
+
+    async def _emit(self, index: int, message: Dict[str, Any], opp: Dict[str, Any],
+                    per_message: List[Dict[int, Dict[str, Any]]], new_counts: List[int], deliveries: List[Future]):
+        """Count a first sighting's novelty, then publish (an update re-publishes the same dict)"""
+        if id(opp) not in per_message[index]:
+            per_message[index][id(opp)] = opp
+            # Novelty is checked before publishing, so the page never sees its own output
+            if await self._is_new(opp):
+                new_counts[index] += 1
+        deliveries.extend(self._publish(message, opp))
+
+    async def _await_delivery(self, deliveries: List[Future]):
+        """Raise if any enriched message failed delivery, so the batch is retried instead of committed"""
+        results = await asyncio.gather(*(asyncio.wrap_future(f) for f in deliveries), return_exceptions=True)
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            raise RuntimeError(f"{len(failed)}/{len(deliveries)} enriched messages not delivered: {failed[0]}")
+
+    async def _is_new(self, opp: Dict[str, Any]) -> bool:
+        from app.services.flink_processor import cortex_processor
+        try:
+            return not await cortex_processor.is_duplicate(opp)
+        except Exception as e:
+            logger.debug("Yield check failed", error=str(e))
+            return False
+
+    def _publish(self, message: Dict[str, Any], opp: Dict[str, Any]) -> List[Future]:
+        """Enqueue one opportunity; the future resolves from the producer's delivery report"""
+        return kafka_producer_manager.publish_many(
+            KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED,
+            [("ai-refinery", {
+                'source': "multi-batch",
+                'enriched_data': opp,
+                'raw_data': {},
+                'enriched_at': time.time(),
+                'ai_model': settings.gemini_model,
+                'origin_url': opp.get('url') or message.get('url')
+            })]
+        )
+
+    def _record_yields(self, batch_messages: List[Dict[str, Any]], per_message: List[List[Dict[str, Any]]],
+                       new_counts: List[int]):
+        """New-opportunity yield and nearest deadline per crawled page, for target prioritization"""
+        now_ts = time.time()
+        for message, found, new_count in zip(batch_messages, per_message, new_counts):
+            url = message.get("url")
+            if not url:
+                continue
+            upcoming = [ts for ts in map(deadline_timestamp, found) if ts and ts > now_ts]
+            crawl_frontier.record_yield(url, new_count, min(upcoming) if upcoming else None)
+
     def stop(self):
         """Stop the worker gracefully"""
         self.running = False
@@ -1,12 +1,14 @@
 
 import asyncio
 import json
+import time
 import structlog
 from typing import Dict, Any, List
-from confluent_kafka import Consumer, KafkaException
 
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
 from app.services.ai_enrichment_service import ai_enrichment_service
+from app.services.retry_router import retry_router
+from app.services.pipeline_metrics import ConsumerMetrics
 
 logger = structlog.get_logger()
 
@@ -18,8 +20,9 @@ class ExtractionWorker:
 
     def __init__(self):
         self.config = KafkaConfig()
-        self.consumer_config = self.config.get_consumer_config(group_id='html-extractor-group-v1')
+        self.group_id = 'html-extractor-group-v1'
         self.running = False
+        self.metrics = ConsumerMetrics(self.group_id)
         
     async def start(self):
         """Start the extraction worker loop"""
@@ -28,7 +31,8 @@ class ExtractionWorker:
             return
 
         self.running = True
-        consumer = Consumer(self.consumer_config)
+        consumer = self.config.create_consumer(self.group_id)
+        self.metrics.track(consumer)
         
         try:
             consumer.subscribe([KafkaConfig.RAW_HTML_TOPIC])
@@ -43,8 +47,11 @@ class ExtractionWorker:
                     
                 if msg.error():
                     logger.error(f"Consumer error: {msg.error()}")
+                    self.metrics.error("poll")
                     continue
 
+                self.metrics.consumed(msg)
+                started = time.perf_counter()
                 try:
                     # Parse message
                     payload = json.loads(msg.value().decode('utf-8'))
@@ -53,6 +60,8 @@ class ExtractionWorker:
                     
                     if not url or not html:
                         logger.warning("Invalid message payload", payload_keys=payload.keys())
+                        self.metrics.processed("skipped")
+                        self.metrics.commit(consumer, msg)
                         continue
 
                     logger.info(f"Processing HTML from {url}", size=len(html))
@@ -62,37 +71,40 @@ class ExtractionWorker:
                     
                     if not extracted_opps:
                         logger.warning(f"No opportunities extracted from {url}")
+                        self.metrics.processed("empty", seconds=time.perf_counter() - started)
+                        self.metrics.commit(consumer, msg)
                         continue
                         
                     logger.info(f"Extracted {len(extracted_opps)} opportunities from {url}")
 
                     # 2. Publish to Raw Opportunities Stream
-                    # We publish each opportunity individually or as a batch?
-                    # The EnrichmentWorker expects individual messages usually, or does it?
-                    # Let's check. My EnrichmentWorker consumes raw-opportunities-stream.
-                    # Usually consumers handle one message at a time.
-                    # However, to be efficient, let's publish individually so they can be load balanced.
-                    
-                    kafka_producer_manager.initialize() # Ensure initialized
-                    
+                    # Individually keyed messages so they can be load balanced; enqueued as
+                    # one batch and left to linger.ms instead of flushing per page.
                     for opp in extracted_opps:
                         # Add metadata
                         opp['params'] = {
                             'source_url': url,
                             'extracted_at': payload.get('crawled_at')
                         }
-                        
-                        kafka_producer_manager.publish_to_stream(
-                            topic=KafkaConfig.RAW_OPPORTUNITIES_TOPIC,
-                            key=opp.get('url', url), # Use opp URL as key for partitioning
-                            value=opp
-                        )
-                        
-                    kafka_producer_manager.flush()
+
+                    kafka_producer_manager.publish_many(
+                        KafkaConfig.RAW_OPPORTUNITIES_TOPIC,
+                        [(opp.get('url', url), opp) for opp in extracted_opps]  # Use opp URL as key for partitioning
+                    )
                     logger.info(f"Published {len(extracted_opps)} opportunities to stream")
+                    self.metrics.processed("ok", seconds=time.perf_counter() - started, batch_size=len(extracted_opps))
+                    self.metrics.commit(consumer, msg)
 
+                except json.JSONDecodeError as e:
+                    logger.error("Undecodable message", error=str(e))
+                    self.metrics.error("decode")
+                    self.metrics.processed("dead_letter")
+                    await retry_router.handle_failure(consumer, msg, e, source="html-extractor", permanent=True)
                 except Exception as e:
                     logger.error("Error processing message", error=str(e))
+                    self.metrics.error("process")
+                    self.metrics.processed("retry", seconds=time.perf_counter() - started)
+                    await retry_router.handle_failure(consumer, msg, e, source="html-extractor")
         
         except Exception as e:
             logger.critical("Extraction Worker failed", error=str(e))
@@ -1,11 +1,18 @@
 import structlog
 import time
 import hashlib
-from typing import Dict, List, Any, Optional
-from collections import deque
+import json
+import os
+from typing import Dict, List, Any, Optional, Tuple
 import asyncio
 
 from app.config import settings
+from app.services.dedup_store import DedupStore
+from app.services.near_duplicate import NearDuplicateIndex, simhash, opportunity_features
+from app.services.stream_windows import StreamAggregator
+from app.services.change_capture import material_fields, fields_digest, diff_fields, build_update_event
+from app.services.kafka_config import KafkaConfig, kafka_producer_manager
+from app.services.pipeline_metrics import pipeline_metrics
 
 logger = structlog.get_logger()
 
@@ -48,33 +55,341 @@ def generate_opportunity_id(opportunity: Dict[str, Any]) -> str:
     return f"opp_{hash_digest}"
 
 
+def shard_for(content_id: str, parallelism: int) -> int:
+    """Stable shard index for an opportunity id"""
+    digest = hashlib.blake2b(content_id.encode('utf-8'), digest_size=4).digest()
+    return int.from_bytes(digest, 'little') % parallelism
+
+
+def _shard_store_name(index: int, parallelism: int) -> str:
+    # Single-shard layout keeps the pre-sharding store name, so no migration is needed
+    return "cortex_seen" if parallelism == 1 else f"cortex_seen_{index}_of_{parallelism}"
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ProcessorShard:
+    """
+    One partition of processor state: exact dedup ids and outcome counters for the
+    ids that hash to it. Operations are serialized through the shard's own worker task
+    and run off the event loop, so SQLite I/O on different shards overlaps.
+    """
+
+    def __init__(self, index: int, parallelism: int, state_dir: str):
+        self.index = index
+        self.name = _shard_store_name(index, parallelism)
+        self.state_dir = state_dir
+        self.dedup: Optional[DedupStore] = None
+        self.total_processed = 0
+        self.duplicates_dropped = 0
+        self.queue: Optional[asyncio.Queue] = None
+
+    def open(self) -> DedupStore:
+        if self.dedup is None:
+            self.dedup = DedupStore(state_dir=self.state_dir, name=self.name)
+        return self.dedup
+
+    async def submit(self, fn, *args):
+        """Run fn(*args) on this shard's worker and wait for the result"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((fn, args, future))
+        return await future
+
+    async def run(self):
+        while True:
+            fn, args, future = await self.queue.get()
+            try:
+                result = await asyncio.to_thread(fn, *args)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+    def lookup(self, content_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(seen, last material fields) for an id"""
+        if not self.dedup.contains(content_id):
+            return False, None
+        stored = self.dedup.get_digest(content_id)
+        return True, (stored[1] if stored else None)
+
+    def remember(self, content_id: str, fields: Dict[str, Any]):
+        """Record an id and its material fields"""
+        self.dedup.add(content_id)
+        if fields:
+            self.dedup.set_digest(content_id, fields_digest(fields), fields)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'total_processed': self.total_processed,
+            'duplicates_dropped': self.duplicates_dropped,
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        self.total_processed += state.get('total_processed', 0)
+        self.duplicates_dropped += state.get('duplicates_dropped', 0)
+
+
 class CortexFlinkProcessor:
     """
-    The Cortex Stream Processor (Python Native V3)
+    The Cortex Stream Processor (Python Native V4)
     
-    ENHANCED DEDUPLICATION WITH FIRESTORE PERSISTENCE:
+    ENHANCED DEDUPLICATION WITH LOCAL PERSISTENT STATE:
     1. Content-based hashing (URL + Title + Organization)
-    2. Sliding window expiration (1 hour for memory, permanent in Firestore)
-    3. Firestore-backed state for cross-restart deduplication
+    2. Tumbling/sliding window aggregations (StreamAggregator), permanent dedup memory
+    3. Bloom filter + exact on-disk id set (DedupStore) for cross-restart deduplication
+    4. Near-duplicate stage (SimHash + LSH) for the same opportunity listed on several sites
+    5. Change data capture: a known id whose material fields changed emits a delta on
+       opportunity.updated.v1 instead of being dropped as a duplicate
+    6. State sharded by id hash across FLINK_PARALLELISM worker tasks, checkpointed to
+       local disk every FLINK_CHECKPOINT_INTERVAL ms and recovered on restart
     """
     
-    def __init__(self):
-        self.window_size_seconds = 3600  # 1 Hour
-        self.seen_opportunities = {}  # Map[content_hash, timestamp]
-        self.processing_queue = deque()
-        self.total_processed = 0
-        self.duplicates_dropped = 0
-        self._firestore_loaded = False
-        logger.info("Cortex Processor Online (Engine: Native Python V3 - Firestore Persistence)")
+    CHECKPOINT_VERSION = 1
+    STATS_TICK_SECONDS = 5
+
+    def __init__(
+        self,
+        state_dir: Optional[str] = None,
+        parallelism: Optional[int] = None,
+        checkpoint_interval_ms: Optional[int] = None
+    ):
+        self.state_dir = state_dir or settings.cortex_state_dir
+        self.parallelism = max(1, parallelism or settings.flink_parallelism)
+        self.checkpoint_interval = (checkpoint_interval_ms or settings.flink_checkpoint_interval) / 1000
+        self.checkpoint_path = os.path.join(self.state_dir, "cortex_checkpoint.json")
+        self.manifest_path = os.path.join(self.state_dir, "cortex_shards.json")
+
+        self.shards = [ProcessorShard(i, self.parallelism, self.state_dir) for i in range(self.parallelism)]
+        # Near-duplicates span ids (and therefore shards), so this stage stays global
+        self.near_duplicates = NearDuplicateIndex(
+            max_distance=settings.near_dup_max_distance,
+            max_entries=settings.near_dup_index_size
+        )
+        self.near_duplicates_dropped = 0
+        self.updates_emitted = 0
+        # Windowed yield/outcome stats; closed tumbling windows go to the stats topic
+        self.stats = StreamAggregator(on_window_closed=self._publish_window)
+
+        self._restored = False
+        self._tasks: List[asyncio.Task] = []
+        self._start_lock = asyncio.Lock()
+        self.checkpoints_written = 0
+        self.last_checkpoint_at: Optional[float] = None
+        logger.info(
+            "Cortex Processor Online (Engine: Native Python V4 - Sharded, Checkpointed)",
+            parallelism=self.parallelism,
+            checkpoint_interval_s=self.checkpoint_interval
+        )
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        """Restore state and launch shard workers and the checkpointer (idempotent)"""
+        if self._tasks:
+            return
+        async with self._start_lock:
+            if self._tasks:
+                return
+            await asyncio.to_thread(self.restore)
+            for shard in self.shards:
+                shard.queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(shard.run()) for shard in self.shards]
+            self._tasks.append(asyncio.create_task(self._checkpoint_loop()))
+            self._tasks.append(asyncio.create_task(self._stats_loop()))
+
+    def restore(self):
+        """Open shard stores and recover window/near-dup state from the last checkpoint"""
+        if self._restored:
+            return
+        started = time.perf_counter()
+        checkpoint = self._read_checkpoint()
+
+        # The manifest names the shard layout the stores are in; it is rewritten only after a
+        # reshard has fully copied the ids, so an interrupted reshard is simply redone
+        manifest = self._read_manifest()
+        if manifest:
+            previous_parallelism = manifest['parallelism']
+            self._destroy_layout(manifest.get('retired'))  # Copied before the manifest moved on
+        else:
+            # State from before the manifest existed
+            previous_parallelism = checkpoint.get('parallelism') if checkpoint else None
+            if previous_parallelism is None and os.path.exists(os.path.join(self.state_dir, "cortex_seen.sqlite3")):
+                previous_parallelism = 1
+        for shard in self.shards:
+            shard.open()
+        if previous_parallelism and previous_parallelism != self.parallelism:
+            self._reshard(previous_parallelism)
+        elif not manifest:
+            self._write_manifest(retired=None)
+
+        if checkpoint:
+            shard_states = checkpoint.get('shards', [])
+            if len(shard_states) == self.parallelism:
+                for shard, state in zip(self.shards, shard_states):
+                    shard.load_state(state)
+            else:
+                for state in shard_states:
+                    self.shards[0].load_state(state)
+            self.near_duplicates.load_state(checkpoint.get('near_duplicates', {}))
+            self.near_duplicates_dropped = checkpoint.get('near_duplicates_dropped', 0)
+            self.updates_emitted = checkpoint.get('updates_emitted', 0)
+            self.stats.load_state(checkpoint.get('windows', {}))
+
+        if not any(shard.dedup.get_meta("firestore_seeded") for shard in self.shards):
+            self._load_persisted_state()
+
+        self._restored = True
+        logger.info(
+            "Cortex state recovered",
+            from_checkpoint=bool(checkpoint),
+            checkpoint_age_s=round(time.time() - checkpoint['written_at'], 1) if checkpoint else None,
+            ids=sum(len(shard.dedup) for shard in self.shards),
+            near_dup_indexed=len(self.near_duplicates),
+            restore_ms=round((time.perf_counter() - started) * 1000, 2)
+        )
+
+    def _reshard(self, previous_parallelism: int):
+        """
+        Redistribute exact ids after FLINK_PARALLELISM changed.
+        Old stores are copied (idempotently), then the manifest is switched, then the old
+        stores are removed, so a crash at any point leaves one consistent layout.
+        """
+        moved = 0
+        for index in range(previous_parallelism):
+            name = _shard_store_name(index, previous_parallelism)
+            if not os.path.exists(os.path.join(self.state_dir, f"{name}.sqlite3")):
+                continue
+            old = DedupStore(state_dir=self.state_dir, name=name)
+            seeded = old.get_meta("firestore_seeded")
+            batches: Dict[int, List[str]] = {}
+            for content_id in old.iter_ids():
+                batches.setdefault(shard_for(content_id, self.parallelism), []).append(content_id)
+            # Material-field digests move with their ids, or every known id would look changed
+            digests: Dict[int, List[Tuple[str, str, str]]] = {}
+            for row in old.iter_digests():
+                digests.setdefault(shard_for(row[0], self.parallelism), []).append(row)
+            old.close()
+            for shard_index, ids in batches.items():
+                moved += self.shards[shard_index].dedup.seed(ids)
+            for shard_index, rows in digests.items():
+                self.shards[shard_index].dedup.seed_digests(rows)
+            if seeded:
+                for shard in self.shards:
+                    shard.dedup.set_meta("firestore_seeded", seeded)
+        for shard in self.shards:
+            shard.dedup.snapshot()
+        self._write_manifest(retired=previous_parallelism)
+        self._destroy_layout(previous_parallelism)
+        logger.info("Resharded dedup state", previous=previous_parallelism, current=self.parallelism, moved=moved)
+
+    def _destroy_layout(self, parallelism: Optional[int]):
+        """Remove the stores of a shard layout the manifest no longer uses"""
+        if not parallelism or parallelism == self.parallelism:
+            return
+        for index in range(parallelism):
+            name = _shard_store_name(index, parallelism)
+            if os.path.exists(os.path.join(self.state_dir, f"{name}.sqlite3")):
+                DedupStore(state_dir=self.state_dir, name=name).destroy()
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.manifest_path):
+            return None
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return manifest if manifest.get('parallelism') else None
+        except Exception as e:
+            logger.warning("Ignoring unreadable shard manifest", error=str(e))
+            return None
+
+    def _write_manifest(self, retired: Optional[int]):
+        _write_json_atomic(self.manifest_path, {'parallelism': self.parallelism, 'retired': retired})
+
+    def _read_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('version') != self.CHECKPOINT_VERSION:
+                raise ValueError(f"unsupported checkpoint version {checkpoint.get('version')}")
+            return checkpoint
+        except Exception as e:
+            logger.warning("Ignoring unreadable Cortex checkpoint", error=str(e))
+            return None
+
+    def _capture_checkpoint(self) -> Dict[str, Any]:
+        """Consistent in-memory copy of window and near-dup state (taken on the event loop)"""
+        return {
+            'version': self.CHECKPOINT_VERSION,
+            'written_at': time.time(),
+            'parallelism': self.parallelism,
+            'shards': [shard.to_state() for shard in self.shards],
+            'near_duplicates': self.near_duplicates.to_state(),
+            'near_duplicates_dropped': self.near_duplicates_dropped,
+            'updates_emitted': self.updates_emitted,
+            'windows': self.stats.to_state(),
+        }
+
+    def _write_checkpoint(self, checkpoint: Dict[str, Any]):
+        """Snapshot shard filters and write the checkpoint file atomically"""
+        for shard in self.shards:
+            if shard.dedup:
+                shard.dedup.snapshot()
+        _write_json_atomic(self.checkpoint_path, checkpoint)
+        self.checkpoints_written += 1
+        self.last_checkpoint_at = checkpoint['written_at']
+
+    def checkpoint(self):
+        """Synchronous checkpoint (shutdown path)"""
+        if self._restored:
+            self._write_checkpoint(self._capture_checkpoint())
+
+    async def _checkpoint_loop(self):
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                started = time.perf_counter()
+                await asyncio.to_thread(self._write_checkpoint, self._capture_checkpoint())
+                logger.debug("Cortex checkpoint written", duration_ms=round((time.perf_counter() - started) * 1000, 2))
+            except Exception as e:
+                logger.error("Cortex checkpoint failed", error=str(e))
+
+    async def _stats_loop(self):
+        """Close due tumbling windows during quiet periods"""
+        while True:
+            await asyncio.sleep(self.STATS_TICK_SECONDS)
+            self.stats.tick()
+
+    def _publish_window(self, summary: Dict[str, Any]):
+        """Publish a closed tumbling window to the stats topic"""
+        logger.info(
+            "Cortex window closed",
+            window=summary['window'],
+            events=summary['events'],
+            new=summary['new'],
+            new_rate=summary['new_rate']
+        )
+        kafka_producer_manager.publish_to_stream(
+            KafkaConfig.TOPIC_CORTEX_STATS,
+            key=summary['window'],
+            value=summary
+        )
         
     def _load_persisted_state(self):
         """
-        Load existing scholarship IDs from Firestore for cross-restart deduplication.
-        Called lazily on first process_event to avoid startup overhead.
+        One-off migration: import existing scholarship IDs from Firestore into the dedup store.
+        Runs only when the local state dir is new; every later start restores from disk.
         """
-        if self._firestore_loaded:
-            return
-            
         try:
             import firebase_admin
             from firebase_admin import firestore as fs
@@ -83,61 +398,123 @@ class CortexFlinkProcessor:
             try:
                 app = firebase_admin.get_app()
             except ValueError:
-                logger.warning("Firebase not initialized, skipping state load")
-                self._firestore_loaded = True
+                logger.warning("Firebase not initialized, skipping state seed")
                 return
                 
             db = fs.client()
             
-            # Load existing scholarship IDs (just the IDs, not full docs)
-            docs = db.collection('scholarships').stream()
-            now = time.time()
-            
-            count = 0
+            # Field mask: document IDs only, not full docs
+            docs = db.collection('scholarships').select([]).stream()
+            batches: Dict[int, List[str]] = {}
             for doc in docs:
-                # Use document ID as the seen key
-                self.seen_opportunities[doc.id] = now
-                count += 1
-                
-            self._firestore_loaded = True
-            logger.info("🔄 Loaded persisted state from Firestore", 
-                       existing_count=count, 
-                       cache_size=len(self.seen_opportunities))
+                batches.setdefault(shard_for(doc.id, self.parallelism), []).append(doc.id)
+            count = sum(self.shards[index].dedup.seed(ids) for index, ids in batches.items())
+
+            seeded_at = str(time.time())
+            for shard in self.shards:
+                shard.dedup.set_meta("firestore_seeded", seeded_at)
+            logger.info("🔄 Seeded dedup state from Firestore (one-off)", existing_count=count)
                        
         except Exception as e:
-            logger.error("Failed to load persisted state", error=str(e))
-            self._firestore_loaded = True  # Mark as loaded to prevent retry loops
+            logger.error("Failed to seed dedup state", error=str(e))
+
+    # --- Processing ---
+
+    async def _capture_change(
+        self,
+        shard: ProcessorShard,
+        content_id: str,
+        event: Dict[str, Any],
+        previous_fields: Optional[Dict[str, Any]],
+        now: float
+    ) -> bool:
+        """
+        Compare a repeat sighting with the stored material fields.
+        Emits opportunity.updated.v1 and returns True if something material changed.
+        Ids recorded before digests existed get their baseline stored silently.
+        """
+        current_fields = material_fields(event)
+        if previous_fields is None:
+            if current_fields:
+                await shard.submit(shard.remember, content_id, current_fields)
+            return False
+
+        merged, changes = diff_fields(previous_fields, current_fields)
+        if not changes:
+            return False
+
+        update = build_update_event(content_id, event, changes, detected_at=now)
+        if not kafka_producer_manager.publish_to_stream(KafkaConfig.TOPIC_OPPORTUNITY_UPDATED, key=content_id, value=update):
+            return False  # Digest left as-is so the change is detected again next sighting
+
+        await shard.submit(shard.remember, content_id, merged)
+        self.updates_emitted += 1
+        self.stats.record(event, 'updated', now)
+        logger.info(
+            "Opportunity Updated (Cortex CDC)",
+            content_id=content_id[:8],
+            changed=list(changes)
+        )
+        return True
+
+    def _shard(self, content_id: str) -> ProcessorShard:
+        return self.shards[shard_for(content_id, self.parallelism)]
         
-    async def process_event(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def process_event(self, event: Dict[str, Any], mark_seen: bool = True) -> Optional[Dict[str, Any]]:
         """
         Ingest and process a single raw opportunity event.
         Returns None if duplicate, otherwise returns the enriched event.
+        With mark_seen=False the caller records the event via mark_seen() once it has
+        been persisted, so a failed write that gets retried isn't dropped as its own duplicate.
         """
-        # Lazy-load persisted state from Firestore (runs once)
-        self._load_persisted_state()
+        await self.start()
         
         # Generate stable content-based ID
         content_id = generate_opportunity_id(event)
         url = event.get('url') or event.get('source_url') or ''
+        shard = self._shard(content_id)
         
         now = time.time()
         
-        # 1. DEDUPLICATION LOGIC (Permanent Content-based)
-        if content_id in self.seen_opportunities:
-            self.duplicates_dropped += 1
+        # 1. DEDUPLICATION LOGIC (Permanent Content-based, on the owning shard)
+        seen, previous_fields = await shard.submit(shard.lookup, content_id)
+        if seen:
+            # Known id: emit a delta if material fields changed, otherwise it's a duplicate
+            if await self._capture_change(shard, content_id, event, previous_fields, now):
+                return None
+            shard.duplicates_dropped += 1
+            self.stats.record(event, 'duplicate', now)
             logger.debug(
                 "Duplicate Dropped (Cortex Shield)", 
                 content_id=content_id[:8],
+                shard=shard.index,
                 url=url[:50] if url else 'N/A',
-                total_dropped=self.duplicates_dropped
+                total_dropped=shard.duplicates_dropped
             )
             return None  # Drop duplicate
-            
-        # Update state with stable ID
-        self.seen_opportunities[content_id] = now
+
+        # 1b. NEAR-DUPLICATE LOGIC (same opportunity, different URL/site)
+        # Untitled events carry too little signal to compare, they only get exact dedup
+        fingerprint, signature, canonical_id = None, None, None
+        if event.get('name') or event.get('title'):
+            fingerprint = generate_content_fingerprint(event)
+            signature = simhash(opportunity_features(event))
+            canonical_id = self.near_duplicates.find(event, fingerprint=fingerprint, signature=signature)
+        if canonical_id is not None:
+            event['canonical_id'] = canonical_id  # The listing this one duplicates; its own id is untouched
+            self.near_duplicates_dropped += 1
+            self.stats.record(event, 'near_duplicate', now)
+            logger.debug(
+                "Near-Duplicate Dropped (Cortex Shield)",
+                content_id=content_id[:8],
+                duplicate_of=canonical_id[:12],
+                url=url[:50] if url else 'N/A',
+                total_dropped=self.near_duplicates_dropped
+            )
+            return None
         
         # 2. ENRICH EVENT WITH STABLE ID & STANDARDIZE SCHEMA
-        event['id'] = content_id  # Assign stable ID
+        event.setdefault('id', content_id)  # Keep an upstream stable id; content_id is the dedup key
         event['cortex_processed_at'] = now
         
         # Standardize 'name' (New Schema Compliance)
@@ -147,66 +524,129 @@ class CortexFlinkProcessor:
         # Standardize 'source_url'
         if 'source_url' not in event and 'url' in event:
              event['source_url'] = event['url']
+
+        if mark_seen:
+            await self.mark_seen(event, fingerprint=fingerprint, signature=signature)
         
-        # 3. WINDOW MANAGEMENT
-        self._cleanup_window(now)
-        self.processing_queue.append((now, event))
-        self.total_processed += 1
+        # 3. WINDOWED AGGREGATIONS
+        self.stats.record(event, 'new', now)
+        shard.total_processed += 1
         
         logger.info(
             "Cortex Processed Event", 
             content_id=content_id[:8],
+            shard=shard.index,
             url=url[:50] if url else 'N/A',
-            window_count=len(self.processing_queue),
-            total_processed=self.total_processed,
-            duplicates_dropped=self.duplicates_dropped
+            total_processed=sum(s.total_processed for s in self.shards)
         )
         
         return event
 
-    def _cleanup_window(self, current_time: float):
-        """Slide the window (Evict old events and stale seen entries)"""
-        # Clean processing queue (only for windowed stats)
-        while self.processing_queue:
-            timestamp, _ = self.processing_queue[0]
-            if (current_time - timestamp) > self.window_size_seconds:
-                self.processing_queue.popleft()
-            else:
-                break
-        
-        # NOTE: We DO NOT evict from self.seen_opportunities anymore.
-        # This fixes the bug where persistent history was lost every 2 hours,
-        # causing 6-hour scrape intervals to re-add everything as duplicates.
-        # 100k IDs = ~5MB RAM, which is acceptable for lifetime dedup.
-        
-        # stale_ids = [
-        #     cid for cid, ts in self.seen_opportunities.items()
-        #     if (current_time - ts) > self.window_size_seconds * 2
-        # ]
-        # if stale_ids:
-        #    logger.debug("Evicted stale entries", count=len(stale_ids))
+    async def mark_seen(self, event: Dict[str, Any], fingerprint: Optional[str] = None,
+                        signature: Optional[int] = None):
+        """Record a processed event in the exact and near-duplicate state"""
+        await self.start()
+        content_id = generate_opportunity_id(event)
+        shard = self._shard(content_id)
+        await shard.submit(shard.remember, content_id, material_fields(event))
+        if event.get('name') or event.get('title'):
+            self.near_duplicates.add(
+                content_id,
+                event,
+                fingerprint=fingerprint or generate_content_fingerprint(event),
+                signature=signature
+            )
 
     def get_stats(self) -> Dict[str, Any]:
         """Get processor statistics"""
+        total_processed = sum(s.total_processed for s in self.shards)
+        duplicates_dropped = sum(s.duplicates_dropped for s in self.shards)
         return {
-            'total_processed': self.total_processed,
-            'duplicates_dropped': self.duplicates_dropped,
-            'unique_in_window': len(self.processing_queue),
-            'seen_cache_size': len(self.seen_opportunities),
-            'deduplication_rate': f"{(self.duplicates_dropped / max(1, self.total_processed + self.duplicates_dropped)) * 100:.1f}%"
+            'total_processed': total_processed,
+            'duplicates_dropped': duplicates_dropped,
+            'near_duplicates_dropped': self.near_duplicates_dropped,
+            'updates_emitted': self.updates_emitted,
+            'unique_in_window': self.stats.query('1h')['new'],
+            'seen_cache_size': sum(len(s.dedup) for s in self.shards if s.dedup),
+            'deduplication_rate': f"{(duplicates_dropped / max(1, total_processed + duplicates_dropped)) * 100:.1f}%",
+            'parallelism': self.parallelism,
+            'checkpoints_written': self.checkpoints_written,
+            'last_checkpoint_at': self.last_checkpoint_at,
+            'shards': [
+                {
+                    'shard': s.index,
+                    'processed': s.total_processed,
+                    'duplicates_dropped': s.duplicates_dropped,
+                    'queue_depth': s.queue.qsize() if s.queue else 0,
+                    'dedup_state': s.dedup.get_stats() if s.dedup else {},
+                }
+                for s in self.shards
+            ],
+            'near_duplicate_index': self.near_duplicates.get_stats(),
+            'windows': {name: self.stats.query(name) for name in self.stats.sliding}
         }
 
-    def is_duplicate(self, opportunity: Dict[str, Any]) -> bool:
+    async def is_duplicate(self, opportunity: Dict[str, Any]) -> bool:
         """Quick check if opportunity is a duplicate without processing"""
+        await self.start()
         content_id = generate_opportunity_id(opportunity)
-        now = time.time()
-        last_seen = self.seen_opportunities.get(content_id, 0)
-        return (now - last_seen) < self.window_size_seconds
+        shard = self._shard(content_id)
+        return await shard.submit(shard.dedup.contains, content_id)
+
+    async def stop(self):
+        """Cancel shard workers and the checkpointer, wait for them to finish, then close()"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.close()
+
+    def close(self):
+        """Stop workers, write a final checkpoint and close shard stores"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        try:
+            self.checkpoint()
+        except Exception as e:
+            logger.error("Final Cortex checkpoint failed", error=str(e))
+        for shard in self.shards:
+            if shard.dedup:
+                shard.dedup.close()
+                shard.dedup = None
+            shard.queue = None
+        self._restored = False
 
 
 # Singleton for the app to use
 cortex_processor = CortexFlinkProcessor()
 
+
+def _collect_window_metrics():
+    """Expose the singleton's sliding windows on /metrics"""
+    events = pipeline_metrics.gauge(
+        "cortex_window_events", "Processed events in the sliding window", ("window", "dimension", "key"))
+    amounts = pipeline_metrics.gauge(
+        "cortex_window_amount_total", "Sum of new opportunity amounts in the sliding window", ("window", "source"))
+    events.clear()
+    amounts.clear()
+    for name in cortex_processor.stats.sliding:
+        summary = cortex_processor.stats.query(name)
+        for dimension, field in (('outcome_new', 'new'), ('outcome_duplicate', 'duplicates'),
+                                 ('outcome_near_duplicate', 'near_duplicates'), ('outcome_updated', 'updates')):
+            events.set(summary[field], window=name, dimension=dimension, key='all')
+        for source, count in summary['by_source'].items():
+            events.set(count, window=name, dimension='source', key=source)
+        for source, count in summary['new_by_source'].items():
+            events.set(count, window=name, dimension='source_new', key=source)
+        for opp_type, count in summary['by_type'].items():
+            events.set(count, window=name, dimension='type', key=opp_type)
+        for source, total in summary['amount_total'].items():
+            amounts.set(total, window=name, source=source)
+
+
+pipeline_metrics.register_collector(_collect_window_metrics)
+
 if __name__ == "__main__":
     # Test Loop
     processor = CortexFlinkProcessor()
@@ -225,5 +665,6 @@ if __name__ == "__main__":
         print(f"Event 3: {'Processed' if result3 else 'Dropped'}")
         
         print(f"\nStats: {processor.get_stats()}")
+        processor.close()
     
     asyncio.run(test())
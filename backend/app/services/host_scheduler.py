@@ -0,0 +1,241 @@
+"""
+Host-Aware Crawl Scheduler
+Runs crawl jobs with a global concurrency limit and per-host politeness instead of
+fixed batches: idle workers take the next URL from any host that is ready, so one
+slow SPA never holds the rest of the patrol.
+
+Per host:
+- concurrency limit and a token bucket (sustained rate + burst)
+- adaptive delay between requests, driven by an EWMA of response times
+- multiplicative backoff on 429/503, decaying again on healthy responses
+
+Not to be confused with CrawlerScheduler (crawler_scheduler.py), which decides *when*
+patrols run; this decides how the URLs of one patrol are spread over time.
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+import structlog
+
+from app.config import settings
+from app.services.pipeline_metrics import pipeline_metrics
+
+logger = structlog.get_logger()
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def host_of(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now: Optional[float] = None) -> bool:
+        now = now if now is not None else time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Seconds until a token is available"""
+        now = now if now is not None else time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class HostState:
+    """Politeness state learned for one host (kept across patrols)"""
+
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, rate: float, burst: float, min_delay: float, max_delay: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min_delay
+        self.ewma_seconds: Optional[float] = None
+        self.next_allowed = 0.0
+        self.active = 0
+        self.completed = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def ready_in(self, now: float) -> float:
+        return max(self.next_allowed - now, self.bucket.wait_time(now), 0.0)
+
+    def record(self, status: Optional[int], elapsed: float, now: float):
+        self.completed += 1
+        if status in THROTTLE_STATUSES:
+            # Back off hard; the delay also gates the next request of any worker
+            self.throttled += 1
+            self.delay = min(self.max_delay, max(self.delay * 2, 1.0))
+            self.next_allowed = max(self.next_allowed, now + self.delay)
+            return
+        if status is None:
+            self.errors += 1
+            return
+
+        self.ewma_seconds = elapsed if self.ewma_seconds is None else (
+            self.EWMA_ALPHA * elapsed + (1 - self.EWMA_ALPHA) * self.ewma_seconds
+        )
+        # Slow hosts get proportionally more room; recover gradually after throttling
+        target = min(self.max_delay, max(self.min_delay, self.ewma_seconds * 0.5))
+        self.delay = target if self.delay <= target else max(target, self.delay * 0.75)
+
+
+class HostAwareScheduler:
+    """
+    `await host_scheduler.run(urls, job)` where job(url) returns the HTTP status
+    (or None on failure). Host state persists across runs; the global limit is
+    shared by concurrent runs.
+    """
+
+    def __init__(
+        self,
+        global_limit: Optional[int] = None,
+        per_host_limit: Optional[int] = None,
+        host_rate: Optional[float] = None,
+        host_burst: Optional[float] = None,
+        min_delay: Optional[float] = None,
+        max_delay: Optional[float] = None
+    ):
+        self.global_limit = global_limit or settings.crawler_global_concurrency
+        self.per_host_limit = per_host_limit or settings.crawler_per_host_concurrency
+        self.host_rate = host_rate if host_rate is not None else settings.crawler_host_rate_per_sec
+        self.host_burst = host_burst if host_burst is not None else settings.crawler_host_burst
+        self.min_delay = min_delay if min_delay is not None else settings.crawler_host_min_delay
+        self.max_delay = max_delay if max_delay is not None else settings.crawler_host_max_delay
+
+        self.hosts: Dict[str, HostState] = {}
+        self._global: Optional[asyncio.Semaphore] = None
+        self.jobs_run = 0
+
+    def host(self, name: str) -> HostState:
+        state = self.hosts.get(name)
+        if state is None:
+            state = HostState(self.host_rate, self.host_burst, self.min_delay, self.max_delay)
+            self.hosts[name] = state
+        return state
+
+    def _claim(self, pending: "OrderedDict[str, Deque[str]]") -> Tuple[Optional[Tuple[str, str]], float]:
+        """Next (host, url) that may start now, else the shortest wait until one might"""
+        now = time.monotonic()
+        wait = float('inf')
+        for name, queue in pending.items():
+            state = self.host(name)
+            if state.active >= self.per_host_limit:
+                continue  # Woken by a completion
+            ready_in = state.ready_in(now)
+            if ready_in > 0 or not state.bucket.try_take(now):
+                wait = min(wait, ready_in or 0.05)
+                continue
+            url = queue.popleft()
+            if not queue:
+                del pending[name]
+            else:
+                pending.move_to_end(name)  # Round-robin across hosts
+            state.active += 1
+            state.next_allowed = now + state.delay
+            return (name, url), 0.0
+        return None, wait
+
+    async def run(self, urls: Iterable[str], job: Callable[[str], Awaitable[Optional[int]]]) -> Dict[str, Any]:
+        """Run job over urls; returns a summary of the run"""
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.global_limit)
+
+        pending: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        total = 0
+        for url in urls:
+            pending.setdefault(host_of(url), deque()).append(url)
+            total += 1
+        if not total:
+            return {'urls': 0, 'hosts': 0, 'seconds': 0.0}
+
+        hosts = len(pending)
+        changed = asyncio.Event()
+        started = time.monotonic()
+
+        async def execute(name: str, url: str):
+            state = self.hosts[name]
+            t0 = time.monotonic()
+            status = None
+            try:
+                async with self._global:
+                    t0 = time.monotonic()  # Response time excludes queueing for a global slot
+                    status = await job(url)
+            except Exception as e:
+                logger.error("Crawl job failed", url=url, error=str(e))
+            finally:
+                now = time.monotonic()
+                state.active -= 1
+                state.record(status, now - t0, now)
+                self.jobs_run += 1
+                changed.set()
+
+        async def worker():
+            # Exits once nothing is left to start; in-flight jobs finish on their own workers
+            while pending:
+                claim, wait = self._claim(pending)
+                if claim is None:
+                    changed.clear()
+                    try:
+                        await asyncio.wait_for(changed.wait(), timeout=None if wait == float('inf') else wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await execute(*claim)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.global_limit, total))))
+        return {'urls': total, 'hosts': hosts, 'seconds': round(time.monotonic() - started, 2)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'jobs_run': self.jobs_run,
+            'hosts': {
+                name: {
+                    'active': s.active,
+                    'completed': s.completed,
+                    'throttled': s.throttled,
+                    'errors': s.errors,
+                    'delay_seconds': round(s.delay, 3),
+                    'ewma_seconds': round(s.ewma_seconds, 3) if s.ewma_seconds is not None else None,
+                }
+                for name, s in self.hosts.items()
+            }
+        }
+
+
+# Global instance
+host_scheduler = HostAwareScheduler()
+
+
+_HOST_GAUGE = pipeline_metrics.gauge("cortex_crawl_host", "Per-host crawl politeness state", ("host", "stat"))
+
+
+def _collect_host_metrics():
+    for name, stats in host_scheduler.get_stats()['hosts'].items():
+        for stat in ('active', 'completed', 'throttled', 'errors', 'delay_seconds'):
+            _HOST_GAUGE.set(stats[stat], host=name, stat=stat)
+
+
+pipeline_metrics.register_collector(_collect_host_metrics)
@@ -4,8 +4,12 @@ Handles event streaming to Confluent Cloud topics
 """
 import os
 import json
-from typing import Optional, Dict, Any
-from confluent_kafka import Producer, KafkaError, KafkaException
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+from confluent_kafka import Producer, Consumer, KafkaError, KafkaException
 from confluent_kafka.admin import AdminClient, NewTopic
 import structlog
 
@@ -29,6 +33,7 @@ class KafkaConfig:
     
     # 4. Intelligence & Delivery
     TOPIC_OPPORTUNITY_ENRICHED = "opportunity.enriched.v1"
+    TOPIC_OPPORTUNITY_UPDATED = "opportunity.updated.v1"  # Material-field deltas (CDC)
     
     # 5. System Health
     TOPIC_SYSTEM_ALERTS = "system.alerts.v1"
@@ -36,14 +41,38 @@ class KafkaConfig:
     # 6. User Notifications
     TOPIC_USER_MATCHES = "user.matches.v1"
 
+    # 7. Delayed Redelivery (tiered retries, then dead letters)
+    TOPIC_RETRY_30S = "cortex.retry.30s.v1"
+    TOPIC_RETRY_5M = "cortex.retry.5m.v1"
+    TOPIC_RETRY_1H = "cortex.retry.1h.v1"
+    TOPIC_DEAD_LETTER = "cortex.dlq.v1"
+
+    # 8. Windowed pipeline stats (closed tumbling windows from the Cortex processor)
+    TOPIC_CORTEX_STATS = "cortex.stats.v1"
+
+    # (topic, delay_seconds) in escalation order
+    RETRY_TIERS = [
+        (TOPIC_RETRY_30S, 30),
+        (TOPIC_RETRY_5M, 300),
+        (TOPIC_RETRY_1H, 3600),
+    ]
+
     def __init__(self):
         """Initialize Kafka configuration from settings"""
         self.bootstrap_servers = settings.confluent_bootstrap_servers
         self.api_key = settings.confluent_api_key
         self.api_secret = settings.confluent_api_secret
-        self.enabled = all([self.bootstrap_servers, self.api_key, self.api_secret])
+        self.confluent_enabled = all([self.bootstrap_servers, self.api_key, self.api_secret])
+        self.use_local_broker = not self.confluent_enabled and settings.local_broker_enabled
+        self.enabled = self.confluent_enabled or self.use_local_broker
 
-        if not self.enabled:
+        if self.use_local_broker:
+            logger.info(
+                "Kafka Lifeline running on local broker",
+                persistence_dir=settings.local_broker_dir or None,
+                max_backlog=settings.local_broker_max_backlog
+            )
+        elif not self.enabled:
             logger.warning(
                 "Kafka streaming disabled - missing Confluent credentials",
                 bootstrap_servers=bool(self.bootstrap_servers),
@@ -66,8 +95,8 @@ class KafkaConfig:
 
     def ensure_topics_exist(self):
         """Create V1 topics if they don't exist"""
-        if not self.enabled:
-            return
+        if not self.confluent_enabled:
+            return  # Local broker topics are created on first use
 
         admin_client = AdminClient({
             'bootstrap.servers': self.bootstrap_servers,
@@ -82,7 +111,13 @@ class KafkaConfig:
             NewTopic(self.TOPIC_CORTEX_COMMANDS, num_partitions=1, replication_factor=3),
             NewTopic(self.TOPIC_RAW_HTML, num_partitions=1, replication_factor=3),
             NewTopic(self.TOPIC_OPPORTUNITY_ENRICHED, num_partitions=1, replication_factor=3),
-            NewTopic(self.TOPIC_SYSTEM_ALERTS, num_partitions=1, replication_factor=3)
+            NewTopic(self.TOPIC_OPPORTUNITY_UPDATED, num_partitions=1, replication_factor=3),
+            NewTopic(self.TOPIC_SYSTEM_ALERTS, num_partitions=1, replication_factor=3),
+            NewTopic(self.TOPIC_RETRY_30S, num_partitions=1, replication_factor=3),
+            NewTopic(self.TOPIC_RETRY_5M, num_partitions=1, replication_factor=3),
+            NewTopic(self.TOPIC_RETRY_1H, num_partitions=1, replication_factor=3),
+            NewTopic(self.TOPIC_DEAD_LETTER, num_partitions=1, replication_factor=3),
+            NewTopic(self.TOPIC_CORTEX_STATS, num_partitions=1, replication_factor=3)
         ]
 
         # Call create_topics to asynchronously create topics.
@@ -99,9 +134,23 @@ class KafkaConfig:
                     continue
                 logger.warning(f"Failed to create topic {topic}: {e}")
 
+    def create_producer(self):
+        """Producer for the active backend (Confluent Cloud or local broker)"""
+        if self.use_local_broker:
+            from app.services.local_broker import local_broker
+            return local_broker.producer()
+        return Producer(self.get_producer_config())
+
+    def create_consumer(self, group_id: str):
+        """Consumer for the active backend (Confluent Cloud or local broker)"""
+        if self.use_local_broker:
+            from app.services.local_broker import local_broker
+            return local_broker.consumer(group_id)
+        return Consumer(self.get_consumer_config(group_id=group_id))
+
     def get_producer_config(self) -> Dict[str, Any]:
         """Get Confluent Kafka producer configuration"""
-        if not self.enabled:
+        if not self.confluent_enabled:
             return {}
 
         return {
@@ -125,7 +174,7 @@ class KafkaConfig:
 
     def get_consumer_config(self, group_id: str = 'scholarstream-consumers') -> Dict[str, Any]:
         """Get Confluent Kafka consumer configuration"""
-        if not self.enabled:
+        if not self.confluent_enabled:
             return {}
 
         return {
@@ -148,16 +197,78 @@ class KafkaConfig:
         }
 
 
+class ProducerMetrics:
+    """
+    Delivery counters for the shared producer.
+    Updated from librdkafka delivery callbacks (poller thread), read from the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.messages_enqueued = 0
+        self.messages_delivered = 0
+        self.messages_failed = 0
+        self.bytes_produced = 0
+        self.buffer_full_events = 0
+        self.delivery_latency_sum = 0.0
+        self.delivery_latency_max = 0.0
+
+    def record_enqueued(self, size: int):
+        with self._lock:
+            self.messages_enqueued += 1
+            self.bytes_produced += size
+
+    def record_buffer_full(self):
+        with self._lock:
+            self.buffer_full_events += 1
+
+    def record_delivery(self, latency: float, failed: bool):
+        with self._lock:
+            if failed:
+                self.messages_failed += 1
+                return
+            self.messages_delivered += 1
+            self.delivery_latency_sum += latency
+            self.delivery_latency_max = max(self.delivery_latency_max, latency)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'messages_enqueued': self.messages_enqueued,
+                'messages_delivered': self.messages_delivered,
+                'messages_failed': self.messages_failed,
+                'bytes_produced': self.bytes_produced,
+                'buffer_full_events': self.buffer_full_events,
+                'delivery_latency_avg_ms': round(
+                    (self.delivery_latency_sum / max(1, self.messages_delivered)) * 1000, 2
+                ),
+                'delivery_latency_max_ms': round(self.delivery_latency_max * 1000, 2),
+            }
+
+
 class KafkaProducerManager:
     """
     Manages Kafka producer lifecycle and message publishing
     Thread-safe, reusable producer instance
+
+    Delivery reports are served by a background poller thread, so callers never
+    need to flush() per message: publish and rely on linger.ms batching.
+    When the local queue is full, messages are parked in order and the poller
+    thread produces them as delivery reports free up room.
     """
 
+    POLL_INTERVAL_SECONDS = 0.1
+    MAX_BACKLOG = 10000
+
     def __init__(self):
         self.config = KafkaConfig()
         self._producer: Optional[Producer] = None
         self._is_initialized = False
+        self._poller: Optional[threading.Thread] = None
+        self._poller_stop = threading.Event()
+        self._backlog: deque = deque()  # (produce kwargs, size, future) waiting for queue room
+        self._backlog_lock = threading.Lock()
+        self.metrics = ProducerMetrics()
 
     def initialize(self) -> bool:
         """
@@ -172,9 +283,9 @@ class KafkaProducerManager:
             return True
 
         try:
-            producer_config = self.config.get_producer_config()
-            self._producer = Producer(producer_config)
+            self._producer = self.config.create_producer()
             self._is_initialized = True
+            self._start_poller()
             logger.info("Kafka producer initialized successfully")
             return True
 
@@ -182,12 +293,117 @@ class KafkaProducerManager:
             logger.error("Failed to initialize Kafka producer", error=str(e))
             return False
 
+    def _start_poller(self):
+        """Serve delivery callbacks off the event loop"""
+        if self._poller and self._poller.is_alive():
+            return
+        self._poller_stop.clear()
+        self._poller = threading.Thread(
+            target=self._poll_loop,
+            name="kafka-producer-poller",
+            daemon=True
+        )
+        self._poller.start()
+
+    def _poll_loop(self):
+        while not self._poller_stop.is_set():
+            producer = self._producer
+            if producer is None:
+                break
+            try:
+                producer.poll(self.POLL_INTERVAL_SECONDS)
+                self._drain_backlog()
+            except Exception as e:
+                logger.warning("Kafka producer poll failed", error=str(e))
+                time.sleep(self.POLL_INTERVAL_SECONDS)
+
+    def _drain_backlog(self):
+        """Produce parked messages, oldest first, until the local queue is full again"""
+        with self._backlog_lock:
+            while self._backlog:
+                kwargs, size, future = self._backlog[0]
+                try:
+                    self._producer.produce(**kwargs)
+                except BufferError:
+                    return
+                except KafkaException as e:
+                    # Rejected outright (e.g. too large): no delivery report will come
+                    self.metrics.record_delivery(0.0, failed=True)
+                    logger.error("Kafka publish error", topic=kwargs['topic'], error=str(e))
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                else:
+                    self.metrics.record_enqueued(size)
+                self._backlog.popleft()
+
+    def _tracking_callback(self, future: Optional[Future], size: int, user_callback: Optional[callable]):
+        """Build a delivery callback that records metrics and resolves the future"""
+        enqueued_at = time.monotonic()
+
+        def on_delivery(err, msg):
+            self.metrics.record_delivery(time.monotonic() - enqueued_at, failed=err is not None)
+            # Resolve first: a raising callback must not leave awaiting callers hanging
+            if future is not None and not future.done():
+                if err is not None:
+                    future.set_exception(KafkaException(err))
+                else:
+                    future.set_result((msg.partition(), msg.offset()))
+            try:
+                if user_callback is not None:
+                    user_callback(err, msg)
+                else:
+                    self._default_delivery_callback(err, msg)
+            except Exception as e:
+                logger.error("Kafka delivery callback failed", topic=msg.topic(), error=str(e))
+
+        return on_delivery
+
+    def _produce(
+        self,
+        topic: str,
+        key: str,
+        value: Dict[str, Any],
+        callback: Optional[callable] = None,
+        future: Optional[Future] = None,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        """
+        Enqueue one message. On a full local queue it is parked for the poller
+        thread instead of blocking the caller; later messages queue behind it
+        so per-key order holds. Raises BufferError once the backlog is full too.
+        """
+        message_value = json.dumps(value).encode('utf-8')
+        message_key = key.encode('utf-8') if key else None
+        kwargs = {
+            'topic': topic,
+            'key': message_key,
+            'value': message_value,
+            'callback': self._tracking_callback(future, len(message_value), callback),
+        }
+        if headers:
+            kwargs['headers'] = list(headers.items())
+
+        with self._backlog_lock:
+            if not self._backlog:
+                try:
+                    self._producer.produce(**kwargs)
+                    self.metrics.record_enqueued(len(message_value))
+                    return len(message_value)
+                except BufferError:
+                    self.metrics.record_buffer_full()
+                    logger.warning("Kafka buffer full - parking messages for the poller thread", topic=topic)
+            if len(self._backlog) >= self.MAX_BACKLOG:
+                raise BufferError("Kafka producer queue and backlog are full")
+            self._backlog.append((kwargs, len(message_value), future))
+        return len(message_value)
+
     def publish_to_stream(
         self,
         topic: str,
         key: str,
         value: Dict[str, Any],
-        callback: Optional[callable] = None
+        callback: Optional[callable] = None,
+        headers: Optional[Dict[str, str]] = None
     ) -> bool:
         """
         Publish message to Kafka topic
@@ -197,6 +413,7 @@ class KafkaProducerManager:
             key: Message key (typically source name)
             value: Message payload as dictionary
             callback: Optional delivery callback
+            headers: Optional message headers
 
         Returns:
             True if message queued successfully, False otherwise
@@ -207,48 +424,16 @@ class KafkaProducerManager:
                 return False
 
         try:
-            message_value = json.dumps(value).encode('utf-8')
-            message_key = key.encode('utf-8')
-
-            self._producer.produce(
-                topic=topic,
-                key=message_key,
-                value=message_value,
-                callback=callback or self._default_delivery_callback
-            )
-
-            self._producer.poll(0)
-
-            logger.info(
+            payload_size = self._produce(topic, key, value, callback=callback, headers=headers)
+            logger.debug(
                 "Message published to Kafka",
                 topic=topic,
                 key=key,
-                payload_size=len(message_value)
+                payload_size=payload_size
             )
             return True
 
-        except BufferError:
-            logger.warning(
-                "Kafka buffer full - flushing and retrying",
-                topic=topic,
-                key=key
-            )
-            self._producer.flush()
-
-            try:
-                self._producer.produce(
-                    topic=topic,
-                    key=message_key,
-                    value=message_value,
-                    callback=callback or self._default_delivery_callback
-                )
-                self._producer.poll(0)
-                return True
-            except Exception as retry_error:
-                logger.error("Failed to publish after buffer flush", error=str(retry_error))
-                return False
-
-        except KafkaException as e:
+        except (KafkaException, BufferError) as e:
             logger.error(
                 "Kafka publish error",
                 topic=topic,
@@ -257,6 +442,46 @@ class KafkaProducerManager:
             )
             return False
 
+    def publish_many(
+        self,
+        topic: str,
+        messages: Iterable[Tuple[str, Dict[str, Any]]],
+        headers: Optional[Dict[str, str]] = None
+    ) -> List[Future]:
+        """
+        Enqueue a batch of (key, value) messages without waiting for acks.
+
+        Batching on the wire is left to linger.ms. Each message gets a
+        concurrent.futures.Future resolved from its delivery report with
+        (partition, offset), or failed with the KafkaException. Await them
+        from async code with asyncio.wrap_future, or ignore them.
+
+        Messages that could not be enqueued get an already-failed future.
+        """
+        futures: List[Future] = []
+        available = self._is_initialized or self.initialize()
+
+        for key, value in messages:
+            future: Future = Future()
+            futures.append(future)
+            if not available:
+                future.set_exception(RuntimeError("Kafka producer not available"))
+                continue
+            try:
+                self._produce(topic, key, value, future=future, headers=headers)
+            except (KafkaException, BufferError) as e:
+                future.set_exception(e)
+
+        if futures:
+            logger.debug("Batch enqueued to Kafka", topic=topic, count=len(futures))
+        return futures
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Producer counters plus the current local queue depth"""
+        stats = self.metrics.snapshot()
+        stats['queue_depth'] = len(self._producer) if self._producer and self._is_initialized else 0
+        return stats
+
     def _default_delivery_callback(self, err, msg):
         """Default callback for message delivery confirmation"""
         if err is not None:
@@ -280,7 +505,13 @@ class KafkaProducerManager:
         Blocks until all messages are delivered or timeout
         """
         if self._producer and self._is_initialized:
-            pending = self._producer.flush(timeout)
+            deadline = time.monotonic() + timeout
+            while True:
+                self._drain_backlog()
+                pending = self._producer.flush(max(0.0, deadline - time.monotonic()))
+                if not self._backlog or time.monotonic() >= deadline:
+                    break
+            pending += len(self._backlog)
             if pending > 0:
                 logger.warning(f"{pending} messages still pending after flush")
             else:
@@ -291,6 +522,7 @@ class KafkaProducerManager:
         if self._producer and self._is_initialized:
             logger.info("Closing Kafka producer")
             self.flush()
+            self._poller_stop.set()
             self._is_initialized = False
 
 
@@ -0,0 +1,163 @@
+"""
+LLM Result Cache
+Persistent cache of Gemini extraction results so unchanged pages cost zero tokens.
+
+Keyed by (namespace, prompt version, model, hash of the exact content sent). Bumping
+a prompt version or switching models naturally misses; entries expire after a TTL and
+the least recently used ones are evicted once the cache exceeds its size budget.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+import structlog
+
+from app.config import settings
+from app.services.pipeline_metrics import pipeline_metrics
+
+logger = structlog.get_logger()
+
+
+class LLMResultCache:
+    """SQLite-backed extraction result cache with TTL and LRU size eviction"""
+
+    EVICT_EVERY = 50  # Stores between eviction passes
+
+    def __init__(
+        self,
+        state_dir: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        self.state_dir = state_dir if state_dir is not None else settings.cortex_state_dir
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.llm_cache_ttl_hours * 3600
+        self.max_bytes = max_bytes if max_bytes is not None else settings.llm_cache_max_mb * 1024 * 1024
+        self.db_path = os.path.join(self.state_dir, "llm_cache.sqlite")
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stores_since_evict = 0
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0, 'saved_prompt_chars': 0}
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Opened on first use so importing the module touches no files"""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    os.makedirs(self.state_dir, exist_ok=True)
+                    conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS results ("
+                        "key TEXT PRIMARY KEY, value TEXT, size INTEGER, prompt_chars INTEGER, "
+                        "created_at REAL, last_used_at REAL, hits INTEGER DEFAULT 0)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used_at)")
+                    self._db = conn
+        return self._db
+
+    @staticmethod
+    def key(namespace: str, prompt_version: str, model: str, content: str, *extra: Any) -> str:
+        """Cache key for one extraction call; extra covers other prompt inputs (url, limits)"""
+        digest = hashlib.blake2b(digest_size=20)
+        for part in (namespace, prompt_version, model, *[str(e) for e in extra], content):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return f"{namespace}:{digest.hexdigest()}"
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Any]:
+        """Cached result, or None on a miss (expired entries are dropped)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, prompt_chars, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            value, prompt_chars, created_at = row
+            if now - created_at >= self.ttl_seconds:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute(
+                "UPDATE results SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+        self.stats['hits'] += 1
+        self.stats['saved_prompt_chars'] += prompt_chars or 0
+        return json.loads(value)
+
+    def put(self, key: str, value: Any, prompt_chars: int = 0, now: Optional[float] = None):
+        """Store a successful extraction (prompt_chars: size of the call a hit will save)"""
+        now = now if now is not None else time.time()
+        encoded = json.dumps(value, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, prompt_chars, created_at, last_used_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, encoded, len(encoded), prompt_chars, now, now)
+            )
+            self.stats['stores'] += 1
+            self._stores_since_evict += 1
+            if self._stores_since_evict >= self.EVICT_EVERY:
+                self.evict(now)
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Drop expired entries, then least recently used ones until under the size budget"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._stores_since_evict = 0
+            removed = self._conn.execute(
+                "DELETE FROM results WHERE created_at <= ?", (now - self.ttl_seconds,)
+            ).rowcount
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                victims = []
+                for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY last_used_at ASC"):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM results WHERE key = ?", victims)
+                removed += len(victims)
+        if removed:
+            self.stats['evictions'] += removed
+            logger.info("LLM cache evicted entries", removed=removed)
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': entries,
+            'bytes': size,
+            'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Global instance
+llm_cache = LLMResultCache()
+
+
+_LLM_CACHE_GAUGE = pipeline_metrics.gauge("cortex_llm_cache", "LLM extraction cache outcomes", ("stat",))
+
+
+def _collect_llm_cache_metrics():
+    for stat, value in llm_cache.stats.items():
+        _LLM_CACHE_GAUGE.set(value, stat=stat)
+
+
+pipeline_metrics.register_collector(_collect_llm_cache_metrics)
@@ -0,0 +1,331 @@
+"""
+LLM Gateway
+The single in-process path to Gemini. Every generate call is admitted by priority class:
+
+- interactive   (chat, copilot)          - a user is waiting on the answer
+- field_mapping (extension map-fields)   - a user is waiting, but on a form fill
+- background    (refinery, enrichment, scoring)
+
+Each class has its own concurrency cap, so an extraction burst can't occupy the slots
+chat needs. All classes draw on one token-per-minute bucket: when tokens run short,
+waiting requests are admitted strictly by class, and background work may not dip into
+the reserve kept for user-facing classes. 429s are retried with jittered exponential
+backoff outside the slot, and a 429 empties the bucket so the other callers slow down too.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+import structlog
+
+from app.config import settings
+from app.services.pipeline_metrics import pipeline_metrics
+
+logger = structlog.get_logger()
+
+PRIORITIES = ("interactive", "field_mapping", "background")
+CHARS_PER_TOKEN = 4
+DEFAULT_OUTPUT_TOKENS = 1024  # Admission estimate for the response; reconciled from usage metadata
+
+REQUESTS = pipeline_metrics.counter(
+    "cortex_llm_requests_total", "Gemini calls through the gateway", ("priority", "outcome"))
+TOKENS = pipeline_metrics.counter(
+    "cortex_llm_tokens_total", "Gemini tokens used", ("priority", "kind"))
+LATENCY = pipeline_metrics.histogram(
+    "cortex_llm_latency_seconds", "Gemini call latency (excluding queueing)", ("priority",))
+QUEUE_WAIT = pipeline_metrics.histogram(
+    "cortex_llm_queue_wait_seconds", "Time spent waiting for admission", ("priority",))
+STATE = pipeline_metrics.gauge(
+    "cortex_llm_gateway", "Gateway slots and token bucket", ("priority", "stat"))
+
+
+def is_rate_limited(error: Exception) -> bool:
+    text = str(error)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text or "quota" in text.lower()
+
+
+def _chunk_text(chunk: Any) -> str:
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""  # A chunk without text parts (e.g. only finish/safety metadata)
+
+
+def _default_model_factory(name: str):
+    import google.generativeai as genai
+    genai.configure(api_key=settings.gemini_api_key)
+    return genai.GenerativeModel(name)
+
+
+class LLMGateway:
+    """Priority admission, token budget and 429 backoff for every Gemini call"""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        tokens_per_minute: Optional[int] = None,
+        background_reserve: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_base_seconds: Optional[float] = None,
+        model_factory: Optional[Callable[[str], Any]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.limits = limits if limits is not None else {
+            'interactive': settings.llm_interactive_concurrency,
+            'field_mapping': settings.llm_field_mapping_concurrency,
+            'background': settings.llm_max_concurrency,
+        }
+        self.tokens_per_minute = tokens_per_minute if tokens_per_minute is not None else settings.llm_tokens_per_minute
+        reserve = background_reserve if background_reserve is not None else settings.llm_background_token_reserve
+        self.reserve_tokens = self.tokens_per_minute * reserve
+        self.max_retries = max_retries if max_retries is not None else settings.llm_max_retries
+        self.retry_base_seconds = retry_base_seconds if retry_base_seconds is not None else settings.llm_retry_base_seconds
+        self._model_factory = model_factory or _default_model_factory
+        self._models: Dict[str, Any] = {}
+        self._clock = clock
+
+        self._tokens = float(self.tokens_per_minute)
+        self._refilled_at = clock()
+        self._in_flight = {p: 0 for p in PRIORITIES}
+        self._waiters: Dict[str, Deque[Tuple[asyncio.Future, int]]] = {p: deque() for p in PRIORITIES}
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self.stats = {p: {'calls': 0, 'rate_limited': 0, 'failed': 0, 'tokens': 0} for p in PRIORITIES}
+
+    def model(self, name: Optional[str] = None):
+        """Shared GenerativeModel per model name"""
+        name = name or settings.gemini_model
+        if name not in self._models:
+            self._models[name] = self._model_factory(name)
+        return self._models[name]
+
+    # --- Admission -------------------------------------------------------
+
+    def _refill(self):
+        if not self.tokens_per_minute:
+            return
+        now = self._clock()
+        elapsed, self._refilled_at = now - self._refilled_at, now
+        self._tokens = min(float(self.tokens_per_minute), self._tokens + elapsed * self.tokens_per_minute / 60.0)
+
+    def _token_shortfall(self, priority: str, tokens: int) -> float:
+        """Tokens still missing before this request may start (0 = admissible now)"""
+        if not self.tokens_per_minute:
+            return 0.0
+        floor = self.reserve_tokens if priority == 'background' else 0.0
+        return max(0.0, tokens + floor - self._tokens)
+
+    def _admit(self, priority: str, tokens: int):
+        self._in_flight[priority] += 1
+        if self.tokens_per_minute:
+            self._tokens -= tokens
+
+    def _dispatch(self):
+        """Admit waiters in class order; once a class is short of tokens, lower classes wait too"""
+        self._refill()
+        shortfall = 0.0
+        for priority in PRIORITIES:
+            queue = self._waiters[priority]
+            while queue:
+                future, tokens = queue[0]
+                if future.done():  # Cancelled while waiting
+                    queue.popleft()
+                    continue
+                if self._in_flight[priority] >= self.limits[priority]:
+                    break
+                missing = self._token_shortfall(priority, tokens)
+                if missing:
+                    shortfall = missing
+                    break
+                queue.popleft()
+                self._admit(priority, tokens)
+                future.set_result(None)
+            if shortfall:
+                break
+        if shortfall and self._wakeup is None:
+            delay = shortfall * 60.0 / self.tokens_per_minute
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+    def _cost(self, tokens: int, priority: str = 'background') -> int:
+        # A single request larger than the bucket it may draw on would never be admitted:
+        # background can only use what's above the reserve
+        if not self.tokens_per_minute:
+            return tokens
+        floor = self.reserve_tokens if priority == 'background' else 0.0
+        return min(tokens, int(self.tokens_per_minute - floor))
+
+    @asynccontextmanager
+    async def slot(self, priority: str = 'background', tokens: int = 0):
+        """Hold one of the class's slots, with tokens reserved from the per-minute budget"""
+        if priority not in self._waiters:
+            raise ValueError(f"Unknown LLM priority class: {priority}")
+        tokens = self._cost(tokens, priority)
+        started = self._clock()
+        self._refill()
+        higher_waiting = any(self._waiters[p] for p in PRIORITIES[:PRIORITIES.index(priority) + 1])
+        if (not higher_waiting and self._in_flight[priority] < self.limits[priority]
+                and not self._token_shortfall(priority, tokens)):
+            self._admit(priority, tokens)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[priority].append((future, tokens))
+            self._dispatch()
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release(priority)  # Admitted just as we were cancelled
+                raise
+        QUEUE_WAIT.observe(self._clock() - started, priority=priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def _release(self, priority: str):
+        self._in_flight[priority] -= 1
+        if any(self._waiters.values()):
+            self._dispatch()
+
+    def _reconcile(self, priority: str, estimated: int, response: Any):
+        """Charge the bucket for actual usage and record token metrics"""
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None) or 0
+        output_tokens = getattr(usage, 'candidates_token_count', None) or 0
+        total = getattr(usage, 'total_token_count', None) or (prompt_tokens + output_tokens) or estimated
+        if self.tokens_per_minute:
+            self._tokens -= total - estimated
+        self.stats[priority]['tokens'] += total
+        if prompt_tokens or output_tokens:
+            TOKENS.inc(prompt_tokens, priority=priority, kind="prompt")
+            TOKENS.inc(output_tokens, priority=priority, kind="output")
+        else:
+            TOKENS.inc(total, priority=priority, kind="estimated")
+
+    # --- Calls -----------------------------------------------------------
+
+    def _succeeded(self, priority: str, started: float, estimated: int, response: Any):
+        LATENCY.observe(self._clock() - started, priority=priority)
+        self.stats[priority]['calls'] += 1
+        REQUESTS.inc(priority=priority, outcome="ok")
+        self._reconcile(priority, estimated, response)
+
+    def _failed(self, priority: str, started: float, error: Exception, retryable: bool = True) -> bool:
+        """Record a failed call; True if it was a rate limit worth retrying"""
+        LATENCY.observe(self._clock() - started, priority=priority)
+        if not (retryable and is_rate_limited(error)):
+            self.stats[priority]['failed'] += 1
+            REQUESTS.inc(priority=priority, outcome="error")
+            return False
+        self.stats[priority]['rate_limited'] += 1
+        REQUESTS.inc(priority=priority, outcome="rate_limited")
+        self._tokens = min(self._tokens, 0.0)  # Gemini's quota is tighter than ours: slow everyone
+        return True
+
+    async def _backoff(self, priority: str, attempt: int):
+        # Outside the slot, so other classes keep moving
+        delay = self.retry_base_seconds * (2 ** attempt) * (0.5 + random.random())
+        logger.warning("Gemini rate limited, backing off", priority=priority, attempt=attempt + 1,
+                       delay=round(delay, 2))
+        await asyncio.sleep(delay)
+
+    async def generate(
+        self,
+        prompt: Any,
+        priority: str = 'background',
+        model: Optional[str] = None,
+        output_tokens: int = DEFAULT_OUTPUT_TOKENS,
+        **kwargs
+    ) -> Any:
+        """generate_content_async through admission control, retrying 429s with backoff"""
+        estimated = self._cost(len(str(prompt)) // CHARS_PER_TOKEN + output_tokens, priority)
+        gemini = self.model(model)
+        for attempt in range(self.max_retries + 1):
+            async with self.slot(priority, estimated):
+                started = self._clock()
+                try:
+                    response = await gemini.generate_content_async(prompt, **kwargs)
+                except Exception as e:
+                    if not self._failed(priority, started, e):
+                        raise
+                    error = e
+                else:
+                    self._succeeded(priority, started, estimated, response)
+                    return response
+            if attempt < self.max_retries:
+                await self._backoff(priority, attempt)
+        self.stats[priority]['failed'] += 1
+        raise error
+
+    async def stream(
+        self,
+        prompt: Any,
+        priority: str = 'background',
+        model: Optional[str] = None,
+        output_tokens: int = DEFAULT_OUTPUT_TOKENS,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Text of a streamed generate_content_async as it arrives; the slot is held until the
+        stream ends. A 429 is retried only before the first chunk has been yielded.
+        """
+        estimated = self._cost(len(str(prompt)) // CHARS_PER_TOKEN + output_tokens, priority)
+        gemini = self.model(model)
+        for attempt in range(self.max_retries + 1):
+            async with self.slot(priority, estimated):
+                started = self._clock()
+                yielded = False
+                try:
+                    response = await gemini.generate_content_async(prompt, stream=True, **kwargs)
+                    async for chunk in response:
+                        text = _chunk_text(chunk)
+                        if text:
+                            yielded = True
+                            yield text
+                except Exception as e:
+                    if not self._failed(priority, started, e, retryable=not yielded):
+                        raise
+                    error = e
+                else:
+                    self._succeeded(priority, started, estimated, response)
+                    return
+            if attempt < self.max_retries:
+                await self._backoff(priority, attempt)
+        self.stats[priority]['failed'] += 1
+        raise error
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            'tokens_per_minute': self.tokens_per_minute,
+            'tokens_available': int(self._tokens),
+            'classes': {
+                p: {
+                    **self.stats[p],
+                    'limit': self.limits[p],
+                    'in_flight': self._in_flight[p],
+                    'waiting': sum(1 for future, _ in self._waiters[p] if not future.done()),
+                }
+                for p in PRIORITIES
+            },
+        }
+
+
+# Global instance
+llm_gateway = LLMGateway()
+
+
+def _collect_gateway_metrics():
+    stats = llm_gateway.get_stats()
+    STATE.set(stats['tokens_available'], priority="all", stat="tokens_available")
+    for priority, values in stats['classes'].items():
+        for stat in ('in_flight', 'waiting', 'limit'):
+            STATE.set(values[stat], priority=priority, stat=stat)
+
+
+pipeline_metrics.register_collector(_collect_gateway_metrics)
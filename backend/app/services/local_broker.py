@@ -0,0 +1,470 @@
+"""
+Local Broker (Kafka stand-in)
+In-process topic logs with consumer groups, committed offsets and optional on-disk segments.
+Implements the subset of the confluent_kafka Producer/Consumer API the pipeline uses, so the
+Sentinel -> Refinery -> WebSocket topology stays decoupled when Confluent is not configured.
+"""
+import json
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple, Callable
+from confluent_kafka import TopicPartition
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+PARTITION = 0  # Every local topic has a single partition
+
+
+class LocalMessage:
+    """Mirrors the read API of confluent_kafka.Message"""
+
+    __slots__ = ('_topic', '_offset', '_key', '_value', '_headers', '_timestamp')
+
+    def __init__(self, topic: str, offset: int, key: Optional[bytes], value: Optional[bytes],
+                 headers: Optional[List[Tuple[str, bytes]]], timestamp: float):
+        self._topic = topic
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self._headers = headers
+        self._timestamp = timestamp
+
+    def topic(self) -> str:
+        return self._topic
+
+    def partition(self) -> int:
+        return PARTITION
+
+    def offset(self) -> int:
+        return self._offset
+
+    def key(self) -> Optional[bytes]:
+        return self._key
+
+    def value(self) -> Optional[bytes]:
+        return self._value
+
+    def headers(self) -> Optional[List[Tuple[str, bytes]]]:
+        return self._headers
+
+    def timestamp(self) -> Tuple[int, int]:
+        return (1, int(self._timestamp * 1000))  # (TIMESTAMP_CREATE_TIME, ms)
+
+    def error(self):
+        return None
+
+
+def _to_bytes(data) -> Optional[bytes]:
+    if data is None or isinstance(data, bytes):
+        return data
+    return str(data).encode('utf-8')
+
+
+def _encode_record(msg: LocalMessage) -> str:
+    # surrogateescape keeps arbitrary bytes lossless through the JSON line
+    def text(b: Optional[bytes]) -> Optional[str]:
+        return b.decode('utf-8', 'surrogateescape') if b is not None else None
+
+    return json.dumps({
+        'o': msg._offset,
+        'k': text(msg._key),
+        'v': text(msg._value),
+        'h': [[k, text(v)] for k, v in (msg._headers or [])],
+        't': msg._timestamp,
+    })
+
+
+def _decode_record(topic: str, line: str) -> LocalMessage:
+    def raw(s: Optional[str]) -> Optional[bytes]:
+        return s.encode('utf-8', 'surrogateescape') if s is not None else None
+
+    rec = json.loads(line)
+    headers = [(k, raw(v)) for k, v in rec.get('h') or []] or None
+    return LocalMessage(topic, rec['o'], raw(rec.get('k')), raw(rec.get('v')), headers, rec.get('t', 0.0))
+
+
+class _TopicLog:
+    """Append-only log for one topic; messages below `base_offset` have been retired"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.messages: List[LocalMessage] = []
+        self.base_offset = 0
+        self.segment_file = None
+        self.segment_count = 0
+
+    @property
+    def next_offset(self) -> int:
+        return self.base_offset + len(self.messages)
+
+    def get(self, offset: int) -> Optional[LocalMessage]:
+        index = offset - self.base_offset
+        if 0 <= index < len(self.messages):
+            return self.messages[index]
+        return None
+
+
+class LocalBroker:
+    """
+    Thread-safe in-process broker.
+
+    - Bounded: a topic whose unconsumed backlog reaches `max_backlog` rejects produce()
+      with BufferError, exactly like a full librdkafka queue, so producers get backpressure.
+    - Consumer groups: members of a group share one fetch cursor per topic (queue semantics);
+      committed offsets are tracked per group and survive restarts when persisted.
+    - Persistence (optional): JSON-lines segments per topic plus an offsets file.
+      Messages every group has committed past are retired from memory.
+    - Retention: a topic no group subscribes to (stats, DLQ) keeps only its newest
+      `retention_messages` messages from the last `retention_seconds`, so it never fills up.
+    """
+
+    SEGMENT_MAX_MESSAGES = 5000
+
+    def __init__(self, data_dir: Optional[str] = None, max_backlog: int = 10000,
+                 retention_messages: Optional[int] = None, retention_seconds: float = 86400.0):
+        self.data_dir = data_dir
+        self.max_backlog = max_backlog
+        self.retention_messages = min(retention_messages or max(1, max_backlog // 2), max_backlog - 1)
+        self.retention_seconds = retention_seconds
+        self._lock = threading.RLock()
+        self._cond = threading.Condition(self._lock)
+        self._topics: Dict[str, _TopicLog] = {}
+        self._committed: Dict[str, Dict[str, int]] = {}   # group -> topic -> offset
+        self._cursors: Dict[str, Dict[str, int]] = {}     # group -> topic -> next fetch offset
+        self._subscriptions: Dict[str, set] = {}          # topic -> groups
+        self._members: Dict[str, int] = {}                # group -> open consumers
+
+        if self.data_dir:
+            os.makedirs(self.data_dir, exist_ok=True)
+            self._load()
+
+    # --- Log management ---
+
+    def _topic(self, name: str) -> _TopicLog:
+        log = self._topics.get(name)
+        if log is None:
+            log = _TopicLog(name)
+            self._topics[name] = log
+        return log
+
+    def _min_committed(self, topic: str) -> Optional[int]:
+        groups = self._subscriptions.get(topic)
+        if not groups:
+            return None
+        return min(self._committed.get(g, {}).get(topic, self._topic(topic).base_offset) for g in groups)
+
+    def backlog(self, topic: str) -> int:
+        with self._lock:
+            log = self._topic(topic)
+            floor = self._min_committed(topic)
+            return log.next_offset - (floor if floor is not None else log.base_offset)
+
+    def append(self, topic: str, key: Optional[bytes], value: Optional[bytes],
+               headers: Optional[List[Tuple[str, bytes]]] = None) -> LocalMessage:
+        with self._cond:
+            if self.backlog(topic) >= self.max_backlog:
+                raise BufferError(f"Local broker backlog full for {topic}")
+
+            log = self._topic(topic)
+            msg = LocalMessage(topic, log.next_offset, key, value, headers, time.time())
+            log.messages.append(msg)
+            if self.data_dir:
+                self._write_record(log, msg)
+            if not self._subscriptions.get(topic):
+                self._retire(topic)
+            self._cond.notify_all()
+            return msg
+
+    def fetch(self, group: str, topics: List[str], paused: set) -> Optional[LocalMessage]:
+        """Next unread message for the group across its topics (round-robin by oldest)"""
+        with self._lock:
+            best = None
+            for topic in topics:
+                if topic in paused:
+                    continue
+                log = self._topic(topic)
+                cursor = self._cursor(group, topic)
+                msg = log.get(max(cursor, log.base_offset))
+                if msg is not None and (best is None or msg._timestamp < best._timestamp):
+                    best = msg
+            if best is not None:
+                self._cursors[group][best._topic] = best._offset + 1
+            return best
+
+    def _cursor(self, group: str, topic: str) -> int:
+        cursors = self._cursors.setdefault(group, {})
+        if topic not in cursors:
+            # auto.offset.reset = earliest
+            cursors[topic] = self._committed.get(group, {}).get(topic, self._topic(topic).base_offset)
+        return cursors[topic]
+
+    def wait(self, timeout: float):
+        with self._cond:
+            self._cond.wait(timeout)
+
+    def subscribe(self, group: str, topics: List[str]):
+        with self._lock:
+            self._members[group] = self._members.get(group, 0) + 1
+            for topic in topics:
+                self._subscriptions.setdefault(topic, set()).add(group)
+                self._cursor(group, topic)
+
+    def leave(self, group: str, topics: List[str]):
+        """
+        A consumer closed. Once a group has no open consumers, topics it never committed
+        on stop counting it, so a throwaway group (e.g. a DLQ dry run) can't pin them.
+        """
+        with self._lock:
+            self._members[group] = max(0, self._members.get(group, 0) - 1)
+            if self._members[group]:
+                return
+            for topic in topics:
+                if topic not in self._committed.get(group, {}):
+                    self._subscriptions.get(topic, set()).discard(group)
+                    self._cursors.get(group, {}).pop(topic, None)
+            if self.data_dir:
+                self._write_offsets()
+
+    def seek(self, group: str, topic: str, offset: int):
+        with self._cond:
+            self._cursor(group, topic)
+            self._cursors[group][topic] = offset
+            self._cond.notify_all()
+
+    def commit(self, group: str, topic: str, offset: int):
+        with self._cond:
+            offsets = self._committed.setdefault(group, {})
+            offsets[topic] = max(offsets.get(topic, 0), offset)
+            self._retire(topic)
+            if self.data_dir:
+                self._write_offsets()
+            self._cond.notify_all()  # Wake producers waiting for backlog space
+
+    def position(self, group: str, topic: str) -> int:
+        with self._lock:
+            return self._cursor(group, topic)
+
+    def committed(self, group: str, topic: str) -> Optional[int]:
+        with self._lock:
+            return self._committed.get(group, {}).get(topic)
+
+    def watermarks(self, topic: str) -> Tuple[int, int]:
+        with self._lock:
+            log = self._topic(topic)
+            return log.base_offset, log.next_offset
+
+    def topics(self) -> List[str]:
+        with self._lock:
+            return list(self._topics.keys())
+
+    def groups(self, topic: str) -> List[str]:
+        with self._lock:
+            return sorted(self._subscriptions.get(topic, set()))
+
+    def _retire(self, topic: str):
+        """Drop messages every subscribed group has committed past (or past retention if none subscribe)"""
+        floor = self._min_committed(topic)
+        log = self._topic(topic)
+        if floor is None:
+            floor = self._retention_floor(log)
+        if floor <= log.base_offset:
+            return
+        drop = min(floor, log.next_offset) - log.base_offset
+        del log.messages[:drop]
+        log.base_offset += drop
+
+    def _retention_floor(self, log: _TopicLog) -> int:
+        index = max(0, len(log.messages) - self.retention_messages)
+        cutoff = time.time() - self.retention_seconds
+        while index < len(log.messages) and log.messages[index]._timestamp < cutoff:
+            index += 1
+        return log.base_offset + index
+
+    # --- Persistence ---
+
+    def _topic_dir(self, topic: str) -> str:
+        return os.path.join(self.data_dir, topic)
+
+    def _write_record(self, log: _TopicLog, msg: LocalMessage):
+        if log.segment_file is None or log.segment_count >= self.SEGMENT_MAX_MESSAGES:
+            if log.segment_file is not None:
+                log.segment_file.close()
+            os.makedirs(self._topic_dir(log.name), exist_ok=True)
+            path = os.path.join(self._topic_dir(log.name), f"{msg._offset:020d}.log")
+            log.segment_file = open(path, 'a', encoding='utf-8')
+            log.segment_count = 0
+            self._delete_retired_segments(log)
+        log.segment_file.write(_encode_record(msg) + "\n")
+        log.segment_file.flush()
+        log.segment_count += 1
+
+    def _delete_retired_segments(self, log: _TopicLog):
+        """A segment is removable once the next segment starts at or below the retired floor"""
+        segments = sorted(os.listdir(self._topic_dir(log.name)))
+        for current, following in zip(segments, segments[1:]):
+            if int(following.split('.')[0]) <= log.base_offset:
+                os.remove(os.path.join(self._topic_dir(log.name), current))
+
+    def _write_offsets(self):
+        path = os.path.join(self.data_dir, "offsets.json")
+        tmp = path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'committed': self._committed,
+                       'subscriptions': {t: sorted(g) for t, g in self._subscriptions.items()}}, f)
+        os.replace(tmp, path)
+
+    def _load(self):
+        started = time.time()
+        offsets_path = os.path.join(self.data_dir, "offsets.json")
+        if os.path.exists(offsets_path):
+            with open(offsets_path, encoding='utf-8') as f:
+                state = json.load(f)
+            self._committed = state.get('committed', {})
+            self._subscriptions = {t: set(g) for t, g in state.get('subscriptions', {}).items()}
+
+        restored = 0
+        for topic in os.listdir(self.data_dir):
+            topic_dir = self._topic_dir(topic)
+            if not os.path.isdir(topic_dir):
+                continue
+            log = self._topic(topic)
+            for segment in sorted(os.listdir(topic_dir)):
+                with open(os.path.join(topic_dir, segment), encoding='utf-8') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        msg = _decode_record(topic, line)
+                        if not log.messages:
+                            log.base_offset = msg._offset
+                        log.messages.append(msg)
+                        restored += 1
+            self._retire(topic)
+
+        if restored:
+            logger.info("Local broker restored from disk", messages=restored,
+                        topics=len(self._topics), duration_ms=int((time.time() - started) * 1000))
+
+    # --- Client factories ---
+
+    def producer(self) -> "LocalProducer":
+        return LocalProducer(self)
+
+    def consumer(self, group_id: str) -> "LocalConsumer":
+        return LocalConsumer(self, group_id)
+
+
+class LocalProducer:
+    """confluent_kafka.Producer look-alike: produce() enqueues, poll()/flush() serve delivery callbacks"""
+
+    def __init__(self, broker: LocalBroker):
+        self.broker = broker
+        self._pending: List[Tuple[Callable, LocalMessage]] = []
+        self._pending_lock = threading.Lock()
+
+    def produce(self, topic: str, value=None, key=None, callback: Optional[Callable] = None,
+                headers=None, **kwargs):
+        if isinstance(headers, dict):
+            headers = list(headers.items())
+        headers = [(k, _to_bytes(v)) for k, v in headers] if headers else None
+        msg = self.broker.append(topic, _to_bytes(key), _to_bytes(value), headers)
+        if callback is not None:
+            with self._pending_lock:
+                self._pending.append((callback, msg))
+
+    def poll(self, timeout: float = 0) -> int:
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        for callback, msg in pending:
+            callback(None, msg)
+        if not pending and timeout:
+            # Nothing to report: wait for broker activity (e.g. a commit freeing backlog)
+            self.broker.wait(timeout)
+        return len(pending)
+
+    def flush(self, timeout: float = None) -> int:
+        self.poll(0)
+        return 0
+
+    def __len__(self) -> int:
+        with self._pending_lock:
+            return len(self._pending)
+
+
+class LocalConsumer:
+    """confluent_kafka.Consumer look-alike bound to one consumer group"""
+
+    def __init__(self, broker: LocalBroker, group_id: str):
+        self.broker = broker
+        self.group_id = group_id
+        self._topics: List[str] = []
+        self._paused: set = set()
+        self._closed = False
+
+    def subscribe(self, topics: List[str]):
+        self._topics = list(topics)
+        self.broker.subscribe(self.group_id, self._topics)
+
+    def poll(self, timeout: float = -1) -> Optional[LocalMessage]:
+        if self._closed:
+            return None
+        deadline = time.time() + max(0.0, timeout if timeout is not None and timeout >= 0 else 3600.0)
+        while True:
+            msg = self.broker.fetch(self.group_id, self._topics, self._paused)
+            remaining = deadline - time.time()
+            if msg is not None or remaining <= 0:
+                return msg
+            self.broker.wait(remaining)
+
+    def commit(self, message: Optional[LocalMessage] = None, offsets=None, asynchronous: bool = True):
+        if message is not None:
+            self.broker.commit(self.group_id, message.topic(), message.offset() + 1)
+        elif offsets:
+            for tp in offsets:
+                self.broker.commit(self.group_id, tp.topic, tp.offset)
+        else:
+            for topic in self._topics:
+                self.broker.commit(self.group_id, topic, self.broker.position(self.group_id, topic))
+
+    def seek(self, partition: TopicPartition):
+        self.broker.seek(self.group_id, partition.topic, partition.offset)
+
+    def assignment(self) -> List[TopicPartition]:
+        return [TopicPartition(topic, PARTITION) for topic in self._topics]
+
+    def pause(self, partitions: List[TopicPartition]):
+        self._paused.update(tp.topic for tp in partitions)
+
+    def resume(self, partitions: List[TopicPartition]):
+        self._paused.difference_update(tp.topic for tp in partitions)
+
+    def position(self, partitions: List[TopicPartition]) -> List[TopicPartition]:
+        return [TopicPartition(tp.topic, PARTITION, self.broker.position(self.group_id, tp.topic))
+                for tp in partitions]
+
+    def committed(self, partitions: List[TopicPartition], timeout: float = None) -> List[TopicPartition]:
+        result = []
+        for tp in partitions:
+            offset = self.broker.committed(self.group_id, tp.topic)
+            result.append(TopicPartition(tp.topic, PARTITION, offset if offset is not None else -1001))
+        return result
+
+    def get_watermark_offsets(self, partition: TopicPartition, timeout: float = None,
+                              cached: bool = False) -> Tuple[int, int]:
+        return self.broker.watermarks(partition.topic)
+
+    def close(self):
+        if not self._closed and self._topics:
+            self.broker.leave(self.group_id, self._topics)
+        self._closed = True
+
+
+# Global instance (used only when Confluent is not configured and LOCAL_BROKER_ENABLED is set)
+local_broker = LocalBroker(
+    data_dir=settings.local_broker_dir or None,
+    max_backlog=settings.local_broker_max_backlog,
+    retention_seconds=settings.local_broker_retention_seconds
+)
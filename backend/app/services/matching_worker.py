@@ -1,11 +1,13 @@
 
 import asyncio
+import time
 import structlog
 import json
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
 from app.services.matching_engine import matching_engine
 from app.database import db
 from app.models import Scholarship, DeepUserProfile
+from app.services.pipeline_metrics import ConsumerMetrics
 
 logger = structlog.get_logger()
 
@@ -15,6 +17,9 @@ class MatchingWorker:
     Action: Matches opportunities against Active Users
     Produces: user.notifications.v1 (via WebSocket logic)
     """
+
+    def __init__(self):
+        self.metrics = ConsumerMetrics("matching-worker")
     
     async def start(self):
         logger.info("Matching Worker Started")
@@ -27,6 +32,7 @@ class MatchingWorker:
         Process a single Enriched Opportunity.
         Find users who match this opportunity.
         """
+        started = time.perf_counter()
         try:
             # 1. Parse Opportunity
             opp = Scholarship(**value)
@@ -58,9 +64,12 @@ class MatchingWorker:
                     matched_count += 1
             
             logger.info("Matching Complete", opp_id=opp.id, matched_users=matched_count)
+            self.metrics.processed("ok", seconds=time.perf_counter() - started, batch_size=len(users))
 
         except Exception as e:
             logger.error("Matching Worker failed", error=str(e), key=key)
+            self.metrics.error("process")
+            self.metrics.processed("error", seconds=time.perf_counter() - started)
 
     def _ensure_deep_profile(self, user_data) -> DeepUserProfile:
         """Helper to cast DB user to DeepUserProfile"""
@@ -0,0 +1,193 @@
+"""
+Near-Duplicate Detection (SimHash + LSH)
+The same hackathon listed on DevPost, MLH and an aggregator gets a different
+generate_opportunity_id per URL. This index catches those copies by content:
+
+1. Exact fast path: generate_content_fingerprint (title|org|amount|deadline).
+2. 64-bit SimHash over weighted features of title, org, amount, deadline and description.
+3. LSH banding: the signature is split into (max_distance + 1) bands, so any two
+   signatures within max_distance bits share at least one band exactly (pigeonhole).
+   Candidates come from band buckets instead of a scan over every known opportunity.
+"""
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+SIGNATURE_BITS = 64
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "the", "a", "an", "of", "for", "and", "in", "on", "to", "by", "with", "at", "is", "are",
+    "this", "that", "be", "or", "from", "your", "you", "our", "we", "will",
+}
+DESCRIPTION_TOKEN_LIMIT = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens without stopwords"""
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(str(text).lower()) if t not in _STOPWORDS]
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(features: Iterable[Tuple[str, int]]) -> int:
+    """64-bit SimHash of (feature, weight) pairs"""
+    vector = [0] * SIGNATURE_BITS
+    for feature, weight in features:
+        h = _feature_hash(feature)
+        for bit in range(SIGNATURE_BITS):
+            vector[bit] += weight if (h >> bit) & 1 else -weight
+    signature = 0
+    for bit, value in enumerate(vector):
+        if value > 0:
+            signature |= 1 << bit
+    return signature
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _amount_bucket(amount: Any) -> Optional[str]:
+    """Coarse amount bucket so $10,000 and $10,000.00 (or 9,950) compare equal"""
+    try:
+        value = float(amount or 0)
+    except (TypeError, ValueError):
+        return None
+    if value <= 0:
+        return None
+    return f"{int(round(value, -max(0, len(str(int(value))) - 2)))}"
+
+
+def opportunity_features(data: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """Weighted SimHash features; identity fields outweigh free-text description"""
+    features: List[Tuple[str, int]] = []
+    title = tokenize(data.get('name') or data.get('title') or '')
+    features += [(f"t:{tok}", 4) for tok in title]
+    features += [(f"tb:{a}_{b}", 4) for a, b in zip(title, title[1:])]
+    features += [(f"o:{tok}", 3) for tok in tokenize(data.get('organization') or data.get('org') or '')]
+
+    amount = _amount_bucket(data.get('amount'))
+    if amount:
+        features.append((f"amt:{amount}", 3))
+    deadline = str(data.get('deadline') or '')[:10]
+    if deadline:
+        features.append((f"dl:{deadline}", 3))
+
+    description = tokenize(data.get('description') or '')[:DESCRIPTION_TOKEN_LIMIT]
+    features += [(f"d:{a}_{b}", 1) for a, b in zip(description, description[1:])]
+    return features
+
+
+class NearDuplicateIndex:
+    """
+    Bounded in-memory LSH index of recently accepted opportunities.
+    Oldest entries are evicted first once max_entries is reached.
+    """
+
+    def __init__(self, max_distance: int = 3, max_entries: int = 50000):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.num_bands = max_distance + 1
+        self.band_bits = SIGNATURE_BITS // self.num_bands
+        self._band_mask = (1 << self.band_bits) - 1
+
+        # id -> (signature, fingerprint, deadline)
+        self._entries: "OrderedDict[str, Tuple[int, Optional[str], str]]" = OrderedDict()
+        self._bands: List[Dict[int, Set[str]]] = [dict() for _ in range(self.num_bands)]
+        self._fingerprints: Dict[str, str] = {}
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.candidates_checked = 0
+
+    def _band_keys(self, signature: int) -> List[int]:
+        return [(signature >> (i * self.band_bits)) & self._band_mask for i in range(self.num_bands)]
+
+    def find(self, data: Dict[str, Any], fingerprint: Optional[str] = None,
+             signature: Optional[int] = None) -> Optional[str]:
+        """Id of an indexed near-duplicate of this opportunity, or None"""
+        if fingerprint:
+            canonical = self._fingerprints.get(fingerprint)
+            if canonical is not None:
+                self.exact_hits += 1
+                return canonical
+
+        if signature is None:
+            signature = simhash(opportunity_features(data))
+        deadline = str(data.get('deadline') or '')[:10]
+
+        candidates: Set[str] = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._bands[band].get(key, ()))
+
+        best_id, best_distance = None, self.max_distance + 1
+        for candidate in candidates:
+            self.candidates_checked += 1
+            cand_signature, _, cand_deadline = self._entries[candidate]
+            # Different explicit deadlines = different editions/cycles, never merged
+            if deadline and cand_deadline and deadline != cand_deadline:
+                continue
+            distance = hamming_distance(signature, cand_signature)
+            if distance < best_distance:
+                best_id, best_distance = candidate, distance
+
+        if best_id is not None:
+            self.near_hits += 1
+        return best_id
+
+    def add(self, opp_id: str, data: Dict[str, Any], fingerprint: Optional[str] = None,
+            signature: Optional[int] = None):
+        if opp_id in self._entries:
+            return
+        if signature is None:
+            signature = simhash(opportunity_features(data))
+        deadline = str(data.get('deadline') or '')[:10]
+
+        self._entries[opp_id] = (signature, fingerprint, deadline)
+        for band, key in enumerate(self._band_keys(signature)):
+            self._bands[band].setdefault(key, set()).add(opp_id)
+        if fingerprint:
+            self._fingerprints.setdefault(fingerprint, opp_id)
+
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        opp_id, (signature, fingerprint, _) = self._entries.popitem(last=False)
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._bands[band].get(key)
+            if bucket is not None:
+                bucket.discard(opp_id)
+                if not bucket:
+                    del self._bands[band][key]
+        if fingerprint and self._fingerprints.get(fingerprint) == opp_id:
+            del self._fingerprints[fingerprint]
+
+    def to_state(self) -> Dict[str, Any]:
+        """Serializable snapshot (oldest first, so eviction order survives a restore)"""
+        return {
+            'entries': [[opp_id, sig, fp, dl] for opp_id, (sig, fp, dl) in self._entries.items()],
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        for opp_id, signature, fingerprint, deadline in state.get('entries', []):
+            self.add(opp_id, {'deadline': deadline}, fingerprint=fingerprint, signature=signature)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'indexed': len(self._entries),
+            'exact_hits': self.exact_hits,
+            'near_hits': self.near_hits,
+            'candidates_checked': self.candidates_checked,
+        }
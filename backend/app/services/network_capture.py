@@ -0,0 +1,231 @@
+"""
+Network Capture
+Structured listings straight from the XHR/GraphQL JSON a page loads, instead of
+serializing the DOM and asking Gemini to parse it back.
+
+While a drone navigates, JSON responses whose URL matches the platform's patterns are
+recorded. Deterministic per-platform mappers (the same transforms the platform
+scrapers use) turn them into OpportunitySchema objects, which travel with the raw
+payload as `structured_opportunities` so the refinery can skip the LLM.
+
+The same mappers run over a page's hydration blobs (__NEXT_DATA__, Nuxt state, JSON-LD)
+before any Gemini call, so server-rendered listings resolve without the LLM too.
+"""
+import asyncio
+import importlib
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern
+from urllib.parse import urlparse
+import structlog
+
+from app.models import OpportunitySchema
+from app.utils.hydration import extract_hydration, find_objects
+
+logger = structlog.get_logger()
+
+MAX_PAYLOADS = 20
+MAX_PAYLOAD_BYTES = 5 * 1024 * 1024
+
+
+class PlatformMapper:
+    """URL patterns to capture for a platform and how to map one listing item"""
+
+    def __init__(
+        self,
+        name: str,
+        hosts: Iterable[str],
+        url_patterns: Iterable[str],
+        item_keys: Iterable[str],
+        transform: str,
+        id_keys: Iterable[str] = ('slug', 'alias', 'uname', 'id')
+    ):
+        self.name = name
+        self.hosts = tuple(hosts)
+        self.url_patterns: List[Pattern] = [re.compile(p, re.IGNORECASE) for p in url_patterns]
+        self.item_keys = set(item_keys)  # A listing item has at least one of these...
+        self.id_keys = set(id_keys)  # ...and at least one of these
+        self.transform_path = transform  # "module:function", imported on first use
+        self._transform: Optional[Callable[[Dict[str, Any]], Optional[OpportunitySchema]]] = None
+
+    def handles_page(self, url: str) -> bool:
+        host = urlparse(url).netloc.lower()
+        return any(host == h or host.endswith("." + h) for h in self.hosts)
+
+    def captures(self, response_url: str) -> bool:
+        return any(p.search(response_url) for p in self.url_patterns)
+
+    def looks_like_item(self, obj: Any) -> bool:
+        return isinstance(obj, dict) and bool(self.item_keys & obj.keys()) and bool(self.id_keys & obj.keys())
+
+    @property
+    def transform(self) -> Callable[[Dict[str, Any]], Optional[OpportunitySchema]]:
+        if self._transform is None:
+            module_name, func_name = self.transform_path.split(":")
+            self._transform = getattr(importlib.import_module(module_name), func_name)
+        return self._transform
+
+
+MAPPERS: List[PlatformMapper] = [
+    PlatformMapper(
+        "dorahacks",
+        hosts=["dorahacks.io"],
+        url_patterns=[r"dorahacks\.io/api/.*hackathon"],
+        item_keys=["name", "title"],
+        id_keys=["slug", "uname", "alias"],
+        transform="app.services.scrapers.bounties.multi_platform_scraper:transform_dorahacks_hackathon",
+    ),
+    PlatformMapper(
+        "superteam",
+        hosts=["earn.superteam.fun", "superteam.fun"],
+        url_patterns=[r"superteam\.fun/api/(listings|bounties|grants)"],
+        item_keys=["title", "name"],
+        id_keys=["slug", "listingSlug", "url"],
+        transform="app.services.scrapers.bounties.multi_platform_scraper:transform_superteam_bounty",
+    ),
+    PlatformMapper(
+        "taikai",
+        hosts=["taikai.network"],
+        url_patterns=[r"taikai\.network/.*(graphql|/api/)", r"api\.taikai\.network"],
+        item_keys=["name", "title"],
+        id_keys=["slug"],
+        transform="app.services.scrapers.hackathons.taikai_scraper:transform_taikai_event",
+    ),
+    PlatformMapper(
+        "hackquest",
+        hosts=["hackquest.io"],
+        url_patterns=[r"hackquest\.io/.*(graphql|/api/)", r"api\.hackquest\.io"],
+        item_keys=["name"],
+        id_keys=["alias"],
+        transform="app.services.scrapers.hackathons.hackquest_scraper:transform_hackquest_event",
+    ),
+]
+
+
+def mapper_for(url: str) -> Optional[PlatformMapper]:
+    for mapper in MAPPERS:
+        if mapper.handles_page(url):
+            return mapper
+    return None
+
+
+def find_items(payload: Any, mapper: PlatformMapper) -> List[Dict[str, Any]]:
+    """Every listing-shaped dict anywhere in a JSON payload"""
+    return find_objects(payload, mapper.looks_like_item)
+
+
+def map_payloads(mapper: PlatformMapper, payloads: Iterable[Any]) -> List[OpportunitySchema]:
+    """Deterministic mapping of captured payloads; duplicate listings collapse by id"""
+    opportunities: Dict[str, OpportunitySchema] = {}
+    for payload in payloads:
+        for item in find_items(payload, mapper):
+            try:
+                opportunity = mapper.transform(item)
+            except Exception as e:
+                logger.debug("Structured mapping failed", platform=mapper.name, error=str(e))
+                continue
+            if opportunity is not None and opportunity.id not in opportunities:
+                opportunities[opportunity.id] = opportunity
+    return list(opportunities.values())
+
+
+def map_json_document(url: str, text: str) -> List[OpportunitySchema]:
+    """Map a JSON API response fetched directly (HTTP tier) if a platform mapper covers it"""
+    mapper = mapper_for(url)
+    if mapper is None or not mapper.captures(url):
+        return []
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return []
+    return map_payloads(mapper, [payload])
+
+
+def map_html_document(url: str, html: str) -> List[OpportunitySchema]:
+    """Map the listings in a page's hydration blobs if a platform mapper covers the page"""
+    mapper = mapper_for(url)
+    if mapper is None or not html:
+        return []
+    blobs = extract_hydration(html)
+    return map_payloads(mapper, blobs.values()) if blobs else []
+
+
+def structured_from_event(value: Dict[str, Any]) -> List[OpportunitySchema]:
+    """
+    Opportunities resolvable without the LLM for a raw page event:
+    listings captured from the network by the drone, else the page's hydration state.
+    """
+    url = value.get("url") or ""
+    captured = value.get("structured_opportunities")
+    if captured:
+        opportunities = []
+        for item in captured:
+            try:
+                opportunities.append(OpportunitySchema(**item))
+            except Exception as e:
+                logger.debug("Invalid structured opportunity", url=url, error=str(e))
+        return opportunities
+    try:
+        return map_html_document(url, value.get("html") or "")
+    except Exception as e:
+        logger.warning("Hydration mapping failed", url=url, error=str(e))
+        return []
+
+
+class NetworkCapture:
+    """
+    Records matching JSON responses on a page during one mission.
+    Detaches on collect(), so pooled pages don't accumulate listeners.
+    """
+
+    def __init__(self, page, mapper: PlatformMapper):
+        self.page = page
+        self.mapper = mapper
+        self.payloads: List[Any] = []
+        self._tasks: List[asyncio.Task] = []
+        self._bytes = 0
+        page.on("response", self._on_response)
+
+    @classmethod
+    def attach(cls, page, url: str) -> Optional["NetworkCapture"]:
+        mapper = mapper_for(url)
+        return cls(page, mapper) if mapper else None
+
+    def _on_response(self, response):
+        if len(self._tasks) >= MAX_PAYLOADS or not self.mapper.captures(response.url):
+            return
+        content_type = (response.headers or {}).get('content-type', '')
+        if 'json' not in content_type:
+            return
+        self._tasks.append(asyncio.ensure_future(self._read(response)))
+
+    async def _read(self, response):
+        try:
+            body = await response.body()
+            if self._bytes + len(body) > MAX_PAYLOAD_BYTES:
+                return
+            self._bytes += len(body)
+            self.payloads.append(json.loads(body))
+        except Exception as e:
+            # Redirects, aborted requests and non-JSON bodies are simply skipped
+            logger.debug("Captured response unreadable", url=response.url, error=str(e))
+
+    def detach(self):
+        """Stop recording responses (idempotent)"""
+        if self.page is None:
+            return
+        try:
+            self.page.remove_listener("response", self._on_response)
+        except Exception:
+            pass
+        self.page = None
+
+    async def collect(self) -> List[OpportunitySchema]:
+        """Stop capturing and map what was recorded"""
+        self.detach()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        opportunities = map_payloads(self.mapper, self.payloads)
+        logger.info("Network capture mapped", platform=self.mapper.name,
+                    payloads=len(self.payloads), opportunities=len(opportunities))
+        return opportunities
@@ -0,0 +1,304 @@
+"""
+Page Readiness
+Event-driven "is the content there yet?" for the Hunter Drones, replacing fixed sleeps.
+
+A page is ready when, in order:
+1. the domain's content selector is present (if the profile has one)
+2. the DOM has gone quiet (no mutations for quiet_ms, via a MutationObserver)
+3. scrolling no longer adds cards/height (capped at max_scrolls)
+
+Each step returns as soon as its condition holds. Profiles are configured per domain
+below and refined from observation: a selector that keeps missing is dropped, and
+the scroll cap follows how many scrolls actually produced new content.
+Time-to-ready is reported per domain.
+"""
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlparse
+import structlog
+
+from app.config import settings
+from app.services.pipeline_metrics import pipeline_metrics
+
+logger = structlog.get_logger()
+
+TIME_TO_READY = pipeline_metrics.histogram(
+    "cortex_page_time_to_ready_seconds", "Navigation-to-ready time per domain", ("domain",),
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+)
+
+# Resolves once no DOM mutation happened for quietMs (or after timeoutMs)
+QUIESCENCE_JS = """
+(args) => new Promise((resolve) => {
+    const started = performance.now();
+    let quietTimer = null;
+    let capTimer = null;
+    let observer = null;
+    const done = (reason) => {
+        if (observer) observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve({ reason, ms: performance.now() - started });
+    };
+    const arm = () => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done('quiet'), args.quietMs);
+    };
+    observer = new MutationObserver(arm);
+    observer.observe(document.documentElement || document, {
+        childList: true, subtree: true, characterData: true
+    });
+    arm();
+    capTimer = setTimeout(() => done('timeout'), args.timeoutMs);
+})
+"""
+
+# Cards matched by the item selector, else page height as a growth proxy
+CONTENT_SIZE_JS = """
+(selector) => selector
+    ? document.querySelectorAll(selector).length
+    : (document.body ? document.body.scrollHeight : 0)
+"""
+
+
+def domain_of(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class ReadinessProfile:
+    """How to tell a domain's page is ready"""
+
+    def __init__(
+        self,
+        selector: Optional[str] = None,
+        item_selector: Optional[str] = None,
+        scroll: bool = True,
+        max_scrolls: int = 3,
+        quiet_ms: int = 500,
+        timeout_ms: int = 8000
+    ):
+        self.selector = selector  # Present once the listing has rendered
+        self.item_selector = item_selector  # One match per card, for scroll growth
+        self.scroll = scroll
+        self.max_scrolls = max_scrolls
+        self.quiet_ms = quiet_ms
+        self.timeout_ms = timeout_ms
+
+    def copy(self) -> "ReadinessProfile":
+        return ReadinessProfile(self.selector, self.item_selector, self.scroll,
+                                self.max_scrolls, self.quiet_ms, self.timeout_ms)
+
+
+DEFAULT_PROFILE = ReadinessProfile()
+
+# Configured profiles for the heavy SPA targets (infinite scroll / late hydration)
+PROFILES: Dict[str, ReadinessProfile] = {
+    "devpost.com": ReadinessProfile(selector=".hackathon-tile", item_selector=".hackathon-tile", max_scrolls=5),
+    "dorahacks.io": ReadinessProfile(selector="a[href*='/hackathon/']", item_selector="a[href*='/hackathon/']",
+                                     max_scrolls=5, timeout_ms=12000),
+    "taikai.network": ReadinessProfile(selector="a[href*='/hackathons/']", item_selector="a[href*='/hackathons/']",
+                                       timeout_ms=12000),
+    "hackquest.io": ReadinessProfile(selector="a[href*='/hackathons/']", item_selector="a[href*='/hackathons/']",
+                                     timeout_ms=12000),
+    "mlh.io": ReadinessProfile(selector=".event", item_selector=".event", max_scrolls=2),
+    "devfolio.co": ReadinessProfile(quiet_ms=700, timeout_ms=12000),
+    "kaggle.com": ReadinessProfile(quiet_ms=700, timeout_ms=12000),
+    "earn.superteam.fun": ReadinessProfile(quiet_ms=600, max_scrolls=4),
+}
+
+
+class DomainReadiness:
+    """Observed readiness behaviour for one domain"""
+
+    SAMPLES = 100
+
+    def __init__(self):
+        self.samples: Deque[float] = deque(maxlen=self.SAMPLES)
+        self.selector_hits = 0
+        self.selector_misses = 0
+        self.useful_scrolls: Deque[int] = deque(maxlen=20)
+        self.timeouts = 0
+
+    def record(self, seconds: float, selector_hit: Optional[bool], useful_scrolls: int, timed_out: bool):
+        self.samples.append(seconds)
+        if selector_hit is True:
+            self.selector_hits += 1
+        elif selector_hit is False:
+            self.selector_misses += 1
+        self.useful_scrolls.append(useful_scrolls)
+        if timed_out:
+            self.timeouts += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'selector_hits': self.selector_hits,
+            'selector_misses': self.selector_misses,
+            'useful_scrolls': list(self.useful_scrolls),
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        self.selector_hits = state.get('selector_hits', 0)
+        self.selector_misses = state.get('selector_misses', 0)
+        self.useful_scrolls.extend(state.get('useful_scrolls', []))
+
+
+class PageReadiness:
+    """Waits for content instead of sleeping; learns per-domain profiles"""
+
+    SELECTOR_MISS_LIMIT = 3  # Drop a configured selector after this many misses without a hit
+    SAVE_EVERY = 20
+
+    def __init__(self, state_dir: Optional[str] = None):
+        self.state_dir = state_dir if state_dir is not None else settings.cortex_state_dir
+        self.domains: Dict[str, DomainReadiness] = {}
+        self._dirty = 0
+        self._load()
+
+    @property
+    def _state_path(self) -> str:
+        return os.path.join(self.state_dir, "readiness.json")
+
+    def _load(self):
+        try:
+            with open(self._state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, domain_state in state.get('domains', {}).items():
+            self.stats_for(name).load_state(domain_state)
+
+    def save(self):
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            tmp = self._state_path + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump({'domains': {n: d.to_state() for n, d in self.domains.items()}}, f)
+            os.replace(tmp, self._state_path)
+            self._dirty = 0
+        except OSError as e:
+            logger.warning("Readiness state save failed", error=str(e))
+
+    def stats_for(self, domain: str) -> DomainReadiness:
+        if domain not in self.domains:
+            self.domains[domain] = DomainReadiness()
+        return self.domains[domain]
+
+    def profile_for(self, url: str) -> ReadinessProfile:
+        """Configured profile adjusted by what was observed for the domain"""
+        domain = domain_of(url)
+        profile = (PROFILES.get(domain) or DEFAULT_PROFILE).copy()
+        observed = self.domains.get(domain)
+        if observed is None:
+            return profile
+
+        if profile.selector and observed.selector_hits == 0 and observed.selector_misses >= self.SELECTOR_MISS_LIMIT:
+            profile.selector = None  # Selector never matched (site changed): rely on quiescence
+            profile.item_selector = None
+        if profile.scroll and len(observed.useful_scrolls) >= 3:
+            # Learn the cap: one more than the most scrolls that ever produced new content
+            profile.max_scrolls = max(1, min(profile.max_scrolls, max(observed.useful_scrolls) + 1))
+        return profile
+
+    async def _quiesce(self, page, quiet_ms: int, timeout_ms: int) -> str:
+        try:
+            result = await page.evaluate(QUIESCENCE_JS, {'quietMs': quiet_ms, 'timeoutMs': timeout_ms})
+            return result.get('reason', 'quiet') if isinstance(result, dict) else 'quiet'
+        except Exception:
+            return 'error'  # Navigation replaced the document; treat as settled
+
+    async def _content_size(self, page, item_selector: Optional[str]) -> int:
+        try:
+            return int(await page.evaluate(CONTENT_SIZE_JS, item_selector))
+        except Exception:
+            return 0
+
+    async def wait_until_ready(self, page, url: str, scroll: Optional[bool] = None) -> Dict[str, Any]:
+        """Return as soon as the page's content is present; reports what happened"""
+        profile = self.profile_for(url)
+        domain = domain_of(url)
+        started = time.perf_counter()
+        deadline = started + profile.timeout_ms / 1000
+        selector_hit: Optional[bool] = None
+        timed_out = False
+
+        def remaining_ms() -> int:
+            return max(0, int((deadline - time.perf_counter()) * 1000))
+
+        # 1. Content selector
+        if profile.selector:
+            try:
+                await page.wait_for_selector(profile.selector, state="attached", timeout=remaining_ms() or 1)
+                selector_hit = True
+            except Exception:
+                selector_hit = False
+
+        # 2. DOM quiescence. A page that never goes quiet (feeds, tickers) is often the
+        # infinite-scroll page that needs step 3, so half the budget is kept for scrolling
+        should_scroll = profile.scroll if scroll is None else scroll
+        if remaining_ms():
+            budget = remaining_ms() // 2 if should_scroll else remaining_ms()
+            timed_out = await self._quiesce(page, profile.quiet_ms, budget or 1) == 'timeout'
+
+        # 3. Scroll until no new cards (or height) appear, whatever step 2 concluded
+        useful_scrolls = 0
+        if should_scroll:
+            size = await self._content_size(page, profile.item_selector)
+            for _ in range(profile.max_scrolls):
+                if not remaining_ms():
+                    timed_out = True
+                    break
+                try:
+                    await page.evaluate("window.scrollBy(0, Math.max(window.innerHeight * 2, 1500))")
+                except Exception:
+                    break
+                await self._quiesce(page, min(profile.quiet_ms, 400), min(remaining_ms(), 3000) or 1)
+                new_size = await self._content_size(page, profile.item_selector)
+                if new_size <= size:
+                    break
+                size = new_size
+                useful_scrolls += 1
+
+        seconds = time.perf_counter() - started
+        self.stats_for(domain).record(seconds, selector_hit, useful_scrolls, timed_out)
+        TIME_TO_READY.observe(seconds, domain=domain)
+        self._dirty += 1
+        if self._dirty >= self.SAVE_EVERY:
+            self.save()
+
+        report = {
+            'domain': domain,
+            'seconds': round(seconds, 3),
+            'selector_hit': selector_hit,
+            'scrolls': useful_scrolls,
+            'timed_out': timed_out,
+        }
+        logger.debug("Page ready", url=url, **report)
+        return report
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            domain: {
+                'pages': len(d.samples),
+                'p50_seconds': d.percentile(0.5),
+                'p95_seconds': d.percentile(0.95),
+                'selector_hits': d.selector_hits,
+                'selector_misses': d.selector_misses,
+                'timeouts': d.timeouts,
+                'max_scrolls': self.profile_for(f"https://{domain}/").max_scrolls,
+            }
+            for domain, d in self.domains.items()
+        }
+
+
+# Global instance
+page_readiness = PageReadiness()
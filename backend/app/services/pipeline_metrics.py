@@ -0,0 +1,320 @@
+"""
+Pipeline Metrics (Prometheus text exposition)
+Lightweight in-process registry for the Cortex pipeline: consumer lag, throughput,
+batch sizes, processing/commit latency and error counts per topic and consumer group.
+Served at GET /metrics.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Tuple, Callable, Optional, Iterable
+import structlog
+
+logger = structlog.get_logger()
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DEFAULT_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def clear(self):
+        """Drop all label sets (for collectors that re-publish a full view each scrape)"""
+        with self._lock:
+            self._values.clear()
+
+    def value(self, **labels) -> Optional[float]:
+        return self._values.get(self._key(labels))
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), []))
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class ThroughputMeter:
+    """Messages per second over a trailing window, from per-second buckets (O(1) per event)"""
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self._buckets: deque = deque()  # (second, count)
+        self._lock = threading.Lock()
+
+    def record(self, count: int = 1, now: Optional[float] = None):
+        second = int(now if now is not None else time.time())
+        with self._lock:
+            if self._buckets and self._buckets[-1][0] == second:
+                self._buckets[-1] = (second, self._buckets[-1][1] + count)
+            else:
+                self._buckets.append((second, count))
+            self._expire(second)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        second = int(now if now is not None else time.time())
+        with self._lock:
+            self._expire(second)
+            return sum(c for _, c in self._buckets) / self.window_seconds
+
+    def _expire(self, second: int):
+        while self._buckets and self._buckets[0][0] <= second - self.window_seconds:
+            self._buckets.popleft()
+
+
+class MetricsRegistry:
+    """Holds metrics and pull-time collectors; renders Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Callback run before each render to refresh pull-time gauges"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning("Metrics collector failed", error=str(e))
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+pipeline_metrics = MetricsRegistry()
+
+# --- Consumer-side pipeline metrics ---
+MESSAGES_CONSUMED = pipeline_metrics.counter(
+    "cortex_messages_consumed_total", "Messages polled from Kafka", ("topic", "group"))
+MESSAGES_PROCESSED = pipeline_metrics.counter(
+    "cortex_messages_processed_total", "Messages fully handled, by outcome", ("group", "outcome"))
+PROCESSING_SECONDS = pipeline_metrics.histogram(
+    "cortex_processing_seconds", "Time spent processing one consumed batch", ("group",))
+BATCH_SIZE = pipeline_metrics.histogram(
+    "cortex_batch_size", "Items per processed batch", ("group",), buckets=DEFAULT_SIZE_BUCKETS)
+COMMIT_SECONDS = pipeline_metrics.histogram(
+    "cortex_commit_seconds", "Offset commit latency", ("group",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+ERRORS = pipeline_metrics.counter(
+    "cortex_errors_total", "Processing errors by stage", ("group", "stage"))
+CONSUMER_LAG = pipeline_metrics.gauge(
+    "cortex_consumer_lag", "High watermark minus consumer position", ("topic", "group"))
+CONSUME_RATE = pipeline_metrics.gauge(
+    "cortex_messages_per_second", "Consumed messages per second over the last minute", ("topic", "group"))
+
+
+class ConsumerMetrics:
+    """
+    Per-consumer-group instrumentation used by the worker loops.
+    Lag is read from the consumer at scrape time (cached watermarks, non-blocking).
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._meters: Dict[str, ThroughputMeter] = {}
+        self._consumer = None
+        pipeline_metrics.register_collector(self._collect)
+
+    def track(self, consumer):
+        """Attach the live consumer so lag can be reported"""
+        self._consumer = consumer
+
+    def consumed(self, msg):
+        topic = msg.topic()
+        MESSAGES_CONSUMED.inc(topic=topic, group=self.group)
+        meter = self._meters.get(topic)
+        if meter is None:
+            meter = self._meters[topic] = ThroughputMeter()
+        meter.record()
+
+    def processed(self, outcome: str, seconds: Optional[float] = None, batch_size: Optional[int] = None):
+        MESSAGES_PROCESSED.inc(group=self.group, outcome=outcome)
+        if seconds is not None:
+            PROCESSING_SECONDS.observe(seconds, group=self.group)
+        if batch_size is not None:
+            BATCH_SIZE.observe(batch_size, group=self.group)
+
+    def error(self, stage: str):
+        ERRORS.inc(group=self.group, stage=stage)
+
+    def commit(self, consumer, msg=None, asynchronous: bool = True):
+        """Commit and record how long it took"""
+        started = time.perf_counter()
+        if msg is not None:
+            consumer.commit(message=msg, asynchronous=asynchronous)
+        else:
+            consumer.commit(asynchronous=asynchronous)
+        COMMIT_SECONDS.observe(time.perf_counter() - started, group=self.group)
+
+    def _collect(self):
+        for topic, meter in self._meters.items():
+            CONSUME_RATE.set(meter.rate(), topic=topic, group=self.group)
+
+        consumer = self._consumer
+        if consumer is None:
+            return
+        try:
+            assignment = consumer.assignment()
+            if not assignment:
+                return
+            positions = consumer.position(assignment)
+        except Exception:
+            return  # Consumer closed or rebalancing
+
+        lag_by_topic: Dict[str, int] = {}
+        for tp in positions:
+            try:
+                low, high = consumer.get_watermark_offsets(tp, cached=True)
+            except Exception:
+                continue
+            if high is None or high < 0:
+                continue
+            position = tp.offset if tp.offset is not None and tp.offset >= 0 else low
+            lag_by_topic[tp.topic] = lag_by_topic.get(tp.topic, 0) + max(0, high - position)
+
+        for topic, lag in lag_by_topic.items():
+            CONSUMER_LAG.set(lag, topic=topic, group=self.group)
+
+
+def _collect_producer_metrics():
+    """Expose the shared producer's delivery counters (see KafkaProducerManager.get_metrics)"""
+    from app.services.kafka_config import kafka_producer_manager
+
+    stats = kafka_producer_manager.get_metrics()
+    gauge = pipeline_metrics.gauge("cortex_producer", "Shared Kafka producer counters", ("stat",))
+    for stat, value in stats.items():
+        gauge.set(value, stat=stat)
+
+
+pipeline_metrics.register_collector(_collect_producer_metrics)
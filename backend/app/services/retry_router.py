@@ -0,0 +1,355 @@
+"""
+Retry Topics & Dead-Letter Queue
+Failed messages are parked on delayed retry topics instead of being committed and dropped.
+The main partition keeps flowing: the failing message leaves it immediately and is
+redelivered to its original topic later (30s -> 5m -> 1h), then lands in the DLQ.
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import Callable, Optional, Dict, Any, List, Tuple
+from confluent_kafka import KafkaError, TopicPartition
+import structlog
+
+from app.services.kafka_config import KafkaConfig, kafka_producer_manager
+from app.services.pipeline_metrics import pipeline_metrics
+
+logger = structlog.get_logger()
+
+ATTEMPT_HEADER = "x-retry-attempt"
+
+ROUTED = pipeline_metrics.counter(
+    "cortex_retry_routed_total", "Failed messages parked on a retry tier or the DLQ", ("destination", "failed_by"))
+TIER_RESTARTS = pipeline_metrics.counter(
+    "cortex_retry_tier_restarts_total", "Retry tier consumers restarted after an unexpected error", ("topic",))
+
+
+def get_attempt(msg) -> int:
+    """How many times this message has already been redelivered"""
+    for key, value in (msg.headers() or []):
+        if key == ATTEMPT_HEADER:
+            try:
+                return int(value.decode('utf-8') if isinstance(value, bytes) else value)
+            except (ValueError, AttributeError):
+                return 0
+    return 0
+
+
+def _decode(raw: Optional[bytes]) -> Any:
+    """Best-effort payload decode (JSON if possible, else text)"""
+    if raw is None:
+        return None
+    text = raw.decode('utf-8', errors='replace')
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+class RetryRouter:
+    """
+    Routes failed messages to the next retry tier, or to the DLQ once tiers are exhausted.
+    Used by every consumer loop in place of commit-and-drop.
+    """
+
+    DELIVERY_TIMEOUT_SECONDS = 15.0
+    REROUTE_BACKOFF_SECONDS = 5.0
+
+    def __init__(self, tiers: Optional[List[Tuple[str, int]]] = None):
+        self.tiers = tiers if tiers is not None else KafkaConfig.RETRY_TIERS
+        self.routed: Dict[str, int] = {topic: 0 for topic, _ in self.tiers}
+        self.routed[KafkaConfig.TOPIC_DEAD_LETTER] = 0
+
+    def next_destination(self, attempt: int, permanent: bool = False) -> Tuple[str, int]:
+        """(topic, delay_seconds) for a message that has already been retried `attempt` times"""
+        if permanent or attempt >= len(self.tiers):
+            return KafkaConfig.TOPIC_DEAD_LETTER, 0
+        return self.tiers[attempt]
+
+    def build_envelope(self, msg, error: Exception, source: str, delay: int) -> Dict[str, Any]:
+        now = time.time()
+        key = msg.key()
+        return {
+            'original_topic': msg.topic(),
+            'original_key': key.decode('utf-8', errors='replace') if key else None,
+            'payload': _decode(msg.value()),
+            'attempt': get_attempt(msg) + 1,
+            'error': str(error)[:1000],
+            'failed_by': source,
+            'failed_at': now,
+            'not_before': now + delay,
+        }
+
+    async def route_failure(self, msg, error: Exception, source: str, permanent: bool = False) -> bool:
+        """
+        Publish the failed message to its next tier and wait for the broker ack.
+        Returns False if the message could not be parked (caller must not skip it).
+        """
+        topic, delay = self.next_destination(get_attempt(msg), permanent=permanent)
+        envelope = self.build_envelope(msg, error, source, delay)
+
+        futures = kafka_producer_manager.publish_many(topic, [(envelope['original_key'] or '', envelope)])
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(futures[0]), timeout=self.DELIVERY_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.error("Failed to park message for retry", destination=topic, error=str(e))
+            return False
+
+        self.routed[topic] = self.routed.get(topic, 0) + 1
+        ROUTED.inc(destination=topic, failed_by=source)
+        logger.warning(
+            "Message parked for retry" if topic != KafkaConfig.TOPIC_DEAD_LETTER else "Message dead-lettered",
+            destination=topic,
+            original_topic=envelope['original_topic'],
+            attempt=envelope['attempt'],
+            failed_by=source,
+            error=envelope['error'][:200]
+        )
+        return True
+
+    async def handle_failure(self, consumer, msg, error: Exception, source: str, permanent: bool = False):
+        """
+        Consumer-side entry point: park the message and commit past it.
+        If it cannot be parked, rewind to it so it is not lost, and back off.
+        """
+        if await self.route_failure(msg, error, source, permanent=permanent):
+            consumer.commit(message=msg, asynchronous=False)
+            return
+
+        consumer.seek(TopicPartition(msg.topic(), msg.partition(), msg.offset()))
+        await asyncio.sleep(self.REROUTE_BACKOFF_SECONDS)
+
+    async def settle_batch(
+        self,
+        consumer,
+        messages: List[Any],
+        failures: Dict[int, Tuple[Exception, bool]],
+        source: str
+    ):
+        """
+        Batch counterpart of handle_failure, for consumers that process several polled
+        messages at once. failures maps an index in messages to (error, permanent); those
+        are parked, then each partition is committed past its last settled message. A
+        partition whose failure cannot be parked is rewound to it instead, and nothing
+        from that offset on is committed.
+        """
+        settled: Dict[Tuple[str, int], Any] = {}
+        rewound = set()
+        for index, msg in enumerate(messages):
+            tp = (msg.topic(), msg.partition())
+            if tp in rewound:
+                continue  # Redelivered after the seek
+            if index in failures:
+                error, permanent = failures[index]
+                if not await self.route_failure(msg, error, source, permanent=permanent):
+                    consumer.seek(TopicPartition(msg.topic(), msg.partition(), msg.offset()))
+                    rewound.add(tp)
+                    continue
+            settled[tp] = msg
+
+        for msg in settled.values():
+            consumer.commit(message=msg, asynchronous=not failures)
+        if rewound:
+            await asyncio.sleep(self.REROUTE_BACKOFF_SECONDS)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.routed)
+
+
+class RetryWorker:
+    """
+    Redelivers parked messages once they are due.
+    One consumer per tier: every message in a tier has the same delay, so the head of
+    the tier is always the next one due and waiting on it never reorders the tier.
+    Waiting is done with the partition paused, so group membership stays alive.
+    """
+
+    RESTART_BACKOFF_SECONDS = 1.0
+    MAX_RESTART_BACKOFF_SECONDS = 60.0
+
+    def __init__(self):
+        self.config = KafkaConfig()
+        self.running = False
+
+    async def start(self):
+        if not self.config.enabled:
+            logger.warning("Kafka disabled, retry worker not starting")
+            return
+
+        self.running = True
+        logger.info("Retry Worker starting", tiers=[topic for topic, _ in KafkaConfig.RETRY_TIERS])
+        await asyncio.gather(*(self._supervise_tier(topic) for topic, _ in KafkaConfig.RETRY_TIERS))
+
+    def stop(self):
+        self.running = False
+
+    async def _supervise_tier(self, topic: str):
+        """
+        Keep a tier running until stopped. A crashed tier gets a fresh consumer after a
+        backoff and resumes from its committed offset, so the in-flight message is redelivered.
+        """
+        backoff = self.RESTART_BACKOFF_SECONDS
+        while self.running:
+            started = time.monotonic()
+            try:
+                await self._run_tier(topic)
+            except Exception as e:
+                TIER_RESTARTS.inc(topic=topic)
+                if time.monotonic() - started > self.MAX_RESTART_BACKOFF_SECONDS:
+                    backoff = self.RESTART_BACKOFF_SECONDS  # It had been healthy for a while
+                logger.error("Retry tier crashed, restarting", topic=topic, error=str(e), retry_in=backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_RESTART_BACKOFF_SECONDS)
+
+    async def _run_tier(self, topic: str):
+        consumer = self.config.create_consumer(f"cortex-retry-{topic}")
+        consumer.subscribe([topic])
+
+        try:
+            while self.running:
+                msg = await asyncio.to_thread(consumer.poll, 1.0)
+
+                if msg is None:
+                    continue
+
+                if msg.error():
+                    if msg.error().code() != KafkaError._PARTITION_EOF:
+                        logger.error("Retry consumer error", topic=topic, error=str(msg.error()))
+                        await asyncio.sleep(5.0)
+                    continue
+
+                envelope = _decode(msg.value())
+                if not isinstance(envelope, dict) or 'original_topic' not in envelope:
+                    logger.error("Dropping malformed retry envelope", topic=topic)
+                    consumer.commit(message=msg, asynchronous=False)
+                    continue
+
+                await self._wait_until_due(consumer, float(envelope.get('not_before') or 0))
+                if not self.running:
+                    break  # Not committed: redelivered after restart
+
+                while self.running and not await self._redeliver(envelope):
+                    await asyncio.sleep(RetryRouter.REROUTE_BACKOFF_SECONDS)
+
+                if self.running:
+                    consumer.commit(message=msg, asynchronous=False)
+        finally:
+            consumer.close()
+
+    async def _wait_until_due(self, consumer, due_at: float):
+        """Hold the current message with the partition paused until it is due"""
+        if due_at <= time.time():
+            return
+
+        assignment = consumer.assignment()
+        consumer.pause(assignment)
+        try:
+            while self.running and time.time() < due_at:
+                await asyncio.sleep(min(1.0, max(0.0, due_at - time.time())))
+                # Keep the consumer alive in its group; nothing is fetched while paused
+                stray = await asyncio.to_thread(consumer.poll, 0)
+                if stray is not None and not stray.error():
+                    consumer.seek(TopicPartition(stray.topic(), stray.partition(), stray.offset()))
+        finally:
+            consumer.resume(assignment)
+
+    async def _redeliver(self, envelope: Dict[str, Any]) -> bool:
+        futures = kafka_producer_manager.publish_many(
+            envelope['original_topic'],
+            [(envelope.get('original_key') or '', envelope.get('payload'))],
+            headers={ATTEMPT_HEADER: str(envelope.get('attempt', 1))}
+        )
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(futures[0]), timeout=RetryRouter.DELIVERY_TIMEOUT_SECONDS)
+            logger.info(
+                "Retried message redelivered",
+                original_topic=envelope['original_topic'],
+                attempt=envelope.get('attempt')
+            )
+            return True
+        except Exception as e:
+            logger.error("Redelivery failed", original_topic=envelope['original_topic'], error=str(e))
+            return False
+
+
+async def replay_dead_letters(
+    execute: bool = False,
+    topic_filter: Optional[str] = None,
+    limit: Optional[int] = None,
+    idle_timeout: float = 10.0,
+    on_message: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, int]:
+    """
+    Drain the DLQ and republish matching messages to their original topic
+    with a fresh retry budget. Dry run (default) only lists them, through on_message.
+
+    A dry run reads with a throwaway consumer group, so it never moves the replay
+    group's offsets. A filtered run commits a partition only while nothing before the
+    replayed message was skipped by the filter, so skipped dead letters stay visible to
+    later replays (replayed ones after a skip may be republished again; consumers dedupe).
+
+    With the local broker this must run inside the process that owns it: a second
+    process would open its own copy of the log.
+    """
+    config = KafkaConfig()
+    stats = {'seen': 0, 'replayed': 0, 'skipped': 0}
+    if not config.enabled:
+        logger.warning("Kafka disabled, nothing to replay")
+        return stats
+
+    group_id = "cortex-dlq-replay-v1" if execute else f"cortex-dlq-replay-dry-{uuid.uuid4().hex[:12]}"
+    consumer = config.create_consumer(group_id)
+    consumer.subscribe([KafkaConfig.TOPIC_DEAD_LETTER])
+    idle_since = time.time()
+    held_back = set()  # Partitions with a filtered-out message not yet replayed
+
+    try:
+        while time.time() - idle_since < idle_timeout:
+            if limit is not None and stats['seen'] >= limit:
+                break
+
+            msg = await asyncio.to_thread(consumer.poll, 1.0)
+            if msg is None or msg.error():
+                continue
+            idle_since = time.time()
+            stats['seen'] += 1
+
+            envelope = _decode(msg.value())
+            if not isinstance(envelope, dict) or 'original_topic' not in envelope:
+                stats['skipped'] += 1  # Unreplayable either way
+                logger.warning("Skipping malformed dead letter", partition=msg.partition(), offset=msg.offset())
+                continue
+            if topic_filter and envelope.get('original_topic') != topic_filter:
+                stats['skipped'] += 1
+                held_back.add(msg.partition())
+                continue
+
+            if on_message is not None:
+                on_message(envelope)
+            if not execute:
+                continue
+
+            futures = kafka_producer_manager.publish_many(
+                envelope['original_topic'],
+                [(envelope.get('original_key') or '', envelope.get('payload'))],
+                headers={ATTEMPT_HEADER: "0"}
+            )
+            await asyncio.wrap_future(futures[0])
+            if msg.partition() not in held_back:
+                consumer.commit(message=msg, asynchronous=False)
+            stats['replayed'] += 1
+            logger.info(
+                "Dead letter replayed",
+                original_topic=envelope['original_topic'],
+                original_key=envelope.get('original_key')
+            )
+    finally:
+        consumer.close()
+
+    return stats
+
+
+# Global instances
+retry_router = RetryRouter()
+retry_worker = RetryWorker()
@@ -29,6 +29,7 @@ HEADERS = {
 
 
 from app.services.crawler_service import crawler_service
+from app.utils.hydration import extract_next_data, find_objects, first_list, get_path
 import json
 
 # ========================================
@@ -83,20 +84,12 @@ async def fetch_dorahacks_hackathons() -> List[Dict[str, Any]]:
         if isinstance(data, list):
             return data
         
-        if isinstance(data, dict):
-            # Try common API response patterns
-            for key in ['results', 'items', 'data', 'hackathons', 'list', 'records']:
-                val = data.get(key)
-                if isinstance(val, list):
-                    return val
-                if isinstance(val, dict):
-                    # Nested: {data: {list: []}} or {data: {items: []}}
-                    for subkey in ['list', 'items', 'results', 'hackathons']:
-                        subval = val.get(subkey)
-                        if isinstance(subval, list):
-                            return subval
-        
-        return []
+        # Try common API response patterns, each also nested: {data: {list: []}} or {data: {items: []}}
+        paths = []
+        for key in ['results', 'items', 'data', 'hackathons', 'list', 'records']:
+            paths.append(key)
+            paths.extend(f"{key}.{sub}" for sub in ['list', 'items', 'results', 'hackathons'])
+        return first_list(data, paths)
     
     try:
         # Try multiple API endpoints (DoraHacks has changed their API structure before)
@@ -130,35 +123,17 @@ async def fetch_dorahacks_hackathons() -> List[Dict[str, Any]]:
         html = await crawler_service.fetch_content(frontend_url)
         
         if html:
-            # Look for __NEXT_DATA__
-            match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html, re.DOTALL)
-            if match:
-                try:
-                    data = json.loads(match.group(1))
-                    
-                    # Recursive search for hackathon-like objects
-                    def find_hackathons(obj, found=None):
-                        if found is None:
-                            found = []
-                        if isinstance(obj, dict):
-                            # DoraHacks hackathons have 'slug' and often 'totalPrize' or 'name'
-                            if 'slug' in obj and ('totalPrize' in obj or 'name' in obj or 'title' in obj):
-                                found.append(obj)
-                            for v in obj.values():
-                                find_hackathons(v, found)
-                        elif isinstance(obj, list):
-                            for item in obj:
-                                find_hackathons(item, found)
-                        return found
-                    
-                    hackathons = find_hackathons(data)
-                    # Deduplicate by slug
-                    unique = {h.get('slug', ''): h for h in hackathons if h.get('slug')}
-                    if unique:
-                        logger.info("DoraHacks frontend scrape success", count=len(unique))
-                        return list(unique.values())
-                except Exception as e:
-                    logger.debug("DoraHacks __NEXT_DATA__ parse failed", error=str(e))
+            # Look for __NEXT_DATA__: DoraHacks hackathons have 'slug' and often 'totalPrize' or 'name'
+            data = extract_next_data(html)
+            if data:
+                unique = find_objects(
+                    data,
+                    lambda obj: 'slug' in obj and ('totalPrize' in obj or 'name' in obj or 'title' in obj),
+                    key='slug',
+                )
+                if unique:
+                    logger.info("DoraHacks frontend scrape success", count=len(unique))
+                    return unique
 
     except Exception as e:
         logger.warning("DoraHacks fetch failed", error=str(e))
@@ -368,10 +343,9 @@ async def fetch_immunefi_bounties() -> List[Dict[str, Any]]:
         # Use crawler_service on main page
         content2 = await crawler_service.fetch_content("https://immunefi.com/explore/")
         if content2:
-            match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', content2)
-            if match:
-                page_data = json.loads(match.group(1))
-                bounties = page_data.get('props', {}).get('pageProps', {}).get('bounties', [])
+            page_data = extract_next_data(content2)
+            if page_data:
+                bounties = get_path(page_data, 'props.pageProps.bounties', [])
                 logger.info("Immunefi page parse success", count=len(bounties))
                 return bounties[:100]
                     
@@ -490,31 +464,13 @@ async def fetch_superteam_bounties() -> List[Dict[str, Any]]:
         frontend_url = "https://earn.superteam.fun/bounties"
         html = await crawler_service.fetch_content(frontend_url)
         if html:
-             match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html)
-             if match:
-                try:
-                    data = json.loads(match.group(1))
-                    # Superteam usually has props.pageProps.bounties or similar
-                    # Recursive search again
-                    def find_bounties(obj):
-                        found = []
-                        if isinstance(obj, dict):
-                            if 'rewardAmount' in obj and 'slug' in obj:
-                                found.append(obj)
-                            for k, v in obj.items():
-                                found.extend(find_bounties(v))
-                        elif isinstance(obj, list):
-                            for item in obj:
-                                found.extend(find_bounties(item))
-                        return found
-                    
-                    bounties = find_bounties(data)
-                    unique = {b['slug']: b for b in bounties}.values()
-                    if unique:
-                         logger.info("Superteam frontend scrape success", count=len(unique))
-                         return list(unique)
-                except:
-                    pass
+             data = extract_next_data(html)
+             if data:
+                # Superteam usually has props.pageProps.bounties or similar; search the whole tree
+                unique = find_objects(data, lambda obj: 'rewardAmount' in obj and 'slug' in obj, key='slug')
+                if unique:
+                     logger.info("Superteam frontend scrape success", count=len(unique))
+                     return unique
 
     except Exception as e:
         logger.warning("Superteam fetch failed", error=str(e))
@@ -740,19 +696,11 @@ async def fetch_kaggle_competitions() -> List[Dict[str, Any]]:
         html = await crawler_service.fetch_content("https://www.kaggle.com/competitions")
         
         if html:
-            import re
-            # Look for __NEXT_DATA__ or window.SSR_DATA patterns
-            match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html, re.DOTALL)
-            if match:
-                try:
-                    data = json.loads(match.group(1))
-                    # Navigate to competitions data
-                    competitions = data.get('props', {}).get('pageProps', {}).get('competitions', [])
-                    if competitions:
-                        logger.info("Kaggle frontend scrape success", count=len(competitions))
-                        return competitions
-                except:
-                    pass
+            # Look for __NEXT_DATA__ and navigate to competitions data
+            competitions = get_path(extract_next_data(html), 'props.pageProps.competitions', [])
+            if competitions:
+                logger.info("Kaggle frontend scrape success", count=len(competitions))
+                return competitions
                     
     except Exception as e:
         logger.warning("Kaggle fetch failed", error=str(e))
@@ -55,6 +55,7 @@ HEADERS = {
 
 
 from app.services.crawler_service import crawler_service
+from app.utils.hydration import extract_next_data, find_objects
 import asyncio
 import json
 
@@ -80,36 +81,20 @@ async def fetch_hackquest_events() -> List[Dict[str, Any]]:
             return []
         
         # PRIORITY 1: Try to extract from __NEXT_DATA__ (more stable than DOM)
-        import re
-        next_data_match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html)
-        if next_data_match:
-            try:
-                data = json.loads(next_data_match.group(1))
-                # Search for hackathon objects in the hydration state
-                def find_hackathons(obj, found=None):
-                    if found is None:
-                        found = []
-                    if isinstance(obj, dict):
-                        # HackQuest hackathon objects usually have 'alias' and 'name' fields
-                        if 'alias' in obj and 'name' in obj and isinstance(obj.get('name'), str):
-                            found.append(obj)
-                        for v in obj.values():
-                            find_hackathons(v, found)
-                    elif isinstance(obj, list):
-                        for item in obj:
-                            find_hackathons(item, found)
-                    return found
-                
-                hackathons = find_hackathons(data)
-                # Deduplicate by alias
-                unique = {h.get('alias', h.get('id', '')): h for h in hackathons if h.get('alias') or h.get('id')}
-                if unique:
-                    logger.info("HackQuest __NEXT_DATA__ parse success", count=len(unique))
-                    return list(unique.values())
-            except Exception as e:
-                logger.debug("HackQuest __NEXT_DATA__ parse failed, falling back to DOM", error=str(e))
+        data = extract_next_data(html)
+        if data:
+            # HackQuest hackathon objects usually have 'alias' and 'name' fields
+            unique = find_objects(
+                data,
+                lambda obj: 'alias' in obj and isinstance(obj.get('name'), str),
+                key=lambda h: h.get('alias') or h.get('id'),
+            )
+            if unique:
+                logger.info("HackQuest __NEXT_DATA__ parse success", count=len(unique))
+                return unique
         
         # FALLBACK: DOM scraping with BeautifulSoup
+        import re
         from bs4 import BeautifulSoup
         soup = BeautifulSoup(html, 'html.parser')
         
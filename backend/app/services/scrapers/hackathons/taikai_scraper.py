@@ -15,6 +15,7 @@ from app.services.flink_processor import generate_opportunity_id
 from app.database import db
 from app.models import Scholarship
 from app.services.crawler_service import crawler_service
+from app.utils.hydration import extract_next_data as extract_next_data_blob, find_objects, first_list, get_path
 
 logger = structlog.get_logger()
 
@@ -141,71 +142,44 @@ async def fetch_taikai_graphql() -> List[Dict[str, Any]]:
     return []
 
 
+def _is_challenge(obj: Dict[str, Any]) -> bool:
+    """TAIKAI challenge/hackathon objects in hydration or Apollo state"""
+    if 'slug' not in obj or not ('prizePool' in obj or 'name' in obj or 'endDate' in obj):
+        return False
+    return (obj.get('__typename') or '').lower() in ['challenge', 'hackathon', ''] or 'organization' in obj
+
+
 def extract_next_data(html: str) -> List[Dict[str, Any]]:
     """
     Extract hackathons from Next.js __NEXT_DATA__ script.
     """
     try:
-        match = re.search(
-            r'<script id="__NEXT_DATA__"[^>]*type="application/json"[^>]*>(.*?)</script>',
-            html,
-            re.DOTALL
-        )
-        
-        if not match:
+        data = extract_next_data_blob(html)
+        if not data:
             return []
-        
-        data = json.loads(match.group(1))
-        
-        # Try various paths to find challenges/hackathons
-        page_props = data.get('props', {}).get('pageProps', {})
-        
-        # Direct challenges list
-        challenges = page_props.get('challenges', [])
-        if challenges:
-            return challenges
-        
-        # In initialState
-        initial_state = page_props.get('initialState', {})
-        challenges = initial_state.get('challenges', {}).get('list', [])
+
+        # Known locations first: direct list, initialState, React Query dehydrated state
+        challenges = first_list(data, [
+            'props.pageProps.challenges',
+            'props.pageProps.initialState.challenges.list',
+        ])
         if challenges:
             return challenges
-        
-        # In dehydratedState (React Query)
-        dehydrated = page_props.get('dehydratedState', {})
-        queries = dehydrated.get('queries', [])
-        for q in queries:
-            query_data = q.get('state', {}).get('data', {})
+
+        for q in get_path(data, 'props.pageProps.dehydratedState.queries', []):
+            query_data = get_path(q, 'state.data')
             if isinstance(query_data, list):
                 return query_data
-            elif isinstance(query_data, dict):
-                items = query_data.get('items', []) or query_data.get('challenges', []) or query_data.get('edges', [])
-                if items:
-                    # Handle edge format
-                    if items and isinstance(items[0], dict) and 'node' in items[0]:
-                        return [item.get('node', {}) for item in items]
-                    return items
-        
-        # Recursive search for challenge-like objects
-        def find_challenges(obj, found=None):
-            if found is None:
-                found = []
-            if isinstance(obj, dict):
-                if 'slug' in obj and ('prizePool' in obj or 'name' in obj or 'endDate' in obj):
-                    if obj.get('__typename', '').lower() in ['challenge', 'hackathon', ''] or 'organization' in obj:
-                        found.append(obj)
-                for v in obj.values():
-                    find_challenges(v, found)
-            elif isinstance(obj, list):
-                for item in obj:
-                    find_challenges(item, found)
-            return found
-        
-        challenges = find_challenges(data)
-        # Deduplicate
-        unique = {c.get('slug', ''): c for c in challenges if c.get('slug')}
-        return list(unique.values())
-        
+            items = first_list(query_data, ['items', 'challenges', 'edges'])
+            if items:
+                # Handle edge format
+                if isinstance(items[0], dict) and 'node' in items[0]:
+                    return [item.get('node', {}) for item in items]
+                return items
+
+        # Anywhere else in the tree, deduplicated by slug
+        return find_objects(data, _is_challenge, key='slug')
+
     except Exception as e:
         logger.debug("TAIKAI __NEXT_DATA__ extraction failed", error=str(e))
         return []
@@ -216,36 +190,24 @@ def extract_apollo_state(html: str) -> List[Dict[str, Any]]:
     Extract from Apollo Client state embedded in the page.
     """
     try:
-        match = re.search(
-            r'<script id="__NEXT_DATA__"[^>]*type="application/json"[^>]*>(.*?)</script>',
-            html,
-            re.DOTALL
-        )
-        
-        if not match:
+        apollo_state = get_path(extract_next_data_blob(html), 'props.pageProps.apolloState')
+        if not isinstance(apollo_state, dict):
             return []
-        
-        data = json.loads(match.group(1))
-        page_props = data.get('props', {}).get('pageProps', {})
-        apollo_state = page_props.get('apolloState', {})
-        
-        if not apollo_state:
-            return []
-        
+
         challenges = []
         for key, value in apollo_state.items():
             if not isinstance(value, dict):
                 continue
-            
+
             # Look for Challenge objects
             if key.startswith('Challenge:') or value.get('__typename') == 'Challenge':
                 if 'name' in value and 'slug' in value:
                     # Ensure it has actual data, not just references
                     if 'prizePool' in value or 'shortDescription' in value or 'endDate' in value:
                         challenges.append(value)
-        
+
         return challenges
-        
+
     except Exception as e:
         logger.debug("TAIKAI Apollo State extraction failed", error=str(e))
         return []
@@ -0,0 +1,251 @@
+"""
+Cortex Stream Windows
+Incremental windowed aggregations over the processed opportunity stream:
+per-source yield, per-type counts, new vs duplicate outcomes and amount totals.
+
+- SlidingWindow: ring of fixed-width buckets plus running totals. Each event touches one
+  bucket; expired buckets are subtracted from the totals as the ring advances, so reads
+  and writes are O(1) per event regardless of window length.
+- TumblingWindow: one open bucket; when time crosses the boundary the closed window is
+  handed to a callback (published to the stats topic).
+"""
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from urllib.parse import urlparse
+import structlog
+
+logger = structlog.get_logger()
+
+Key = Tuple[str, str]  # (dimension, value), e.g. ("source", "devpost.com")
+
+
+def _add(target: Dict[Key, float], counts: Dict[Key, float], sign: int = 1):
+    for key, value in counts.items():
+        total = target.get(key, 0.0) + sign * value
+        if total:
+            target[key] = total
+        else:
+            target.pop(key, None)
+
+
+def _encode(counts: Dict[Key, float]) -> List[List[Any]]:
+    return [[dim, value, amount] for (dim, value), amount in counts.items()]
+
+
+def _decode(rows: List[List[Any]]) -> Dict[Key, float]:
+    return {(dim, value): amount for dim, value, amount in rows}
+
+
+def summarize(counts: Dict[Key, float]) -> Dict[str, Dict[str, float]]:
+    """{dimension: {value: count}} view of a flat window"""
+    summary: Dict[str, Dict[str, float]] = {}
+    for (dim, value), amount in counts.items():
+        summary.setdefault(dim, {})[value] = amount
+    return summary
+
+
+class SlidingWindow:
+    """Window of size_seconds sliding in steps of bucket_seconds"""
+
+    def __init__(self, size_seconds: int, bucket_seconds: int):
+        if size_seconds % bucket_seconds:
+            raise ValueError("size_seconds must be a multiple of bucket_seconds")
+        self.size_seconds = size_seconds
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = size_seconds // bucket_seconds
+        self.buckets: List[Dict[Key, float]] = [dict() for _ in range(self.num_buckets)]
+        self.totals: Dict[Key, float] = {}
+        self.head: Optional[int] = None  # Absolute index of the newest bucket
+
+    def _advance(self, now: float):
+        index = int(now // self.bucket_seconds)
+        if self.head is None:
+            self.head = index
+            return
+        if index <= self.head:
+            return
+        # Expire every slot between the old head and the new one (at most a full ring)
+        for step in range(self.head + 1, min(index, self.head + self.num_buckets) + 1):
+            slot = self.buckets[step % self.num_buckets]
+            if slot:
+                _add(self.totals, slot, -1)
+                slot.clear()
+        self.head = index
+
+    def add(self, counts: Dict[Key, float], now: Optional[float] = None):
+        now = now if now is not None else time.time()
+        self._advance(now)
+        index = int(now // self.bucket_seconds)
+        if index <= self.head - self.num_buckets:
+            return  # Older than the window
+        _add(self.buckets[index % self.num_buckets], counts)
+        _add(self.totals, counts)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[Key, float]:
+        self._advance(now if now is not None else time.time())
+        return dict(self.totals)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {'head': self.head, 'buckets': [_encode(b) for b in self.buckets]}
+
+    def load_state(self, state: Dict[str, Any]):
+        buckets = state.get('buckets') or []
+        if len(buckets) != self.num_buckets:
+            return  # Window shape changed: start empty
+        self.head = state.get('head')
+        self.buckets = [_decode(b) for b in buckets]
+        self.totals = {}
+        for bucket in self.buckets:
+            _add(self.totals, bucket)
+
+
+class TumblingWindow:
+    """Back-to-back, non-overlapping windows of size_seconds"""
+
+    def __init__(self, size_seconds: int, on_close: Optional[Callable[[int, float, Dict[Key, float]], None]] = None):
+        self.size_seconds = size_seconds
+        self.on_close = on_close
+        self.start: Optional[float] = None
+        self.current: Dict[Key, float] = {}
+
+    def advance(self, now: Optional[float] = None):
+        """Close the open window if its end has passed"""
+        now = now if now is not None else time.time()
+        start = (now // self.size_seconds) * self.size_seconds
+        if self.start is None:
+            self.start = start
+            return
+        if start > self.start:
+            closed, closed_start = self.current, self.start
+            self.current, self.start = {}, start
+            if closed and self.on_close:
+                try:
+                    self.on_close(self.size_seconds, closed_start, closed)
+                except Exception as e:
+                    logger.error("Window close handler failed", window=self.size_seconds, error=str(e))
+
+    def add(self, counts: Dict[Key, float], now: Optional[float] = None):
+        self.advance(now)
+        _add(self.current, counts)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {'start': self.start, 'current': _encode(self.current)}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.start = state.get('start')
+        self.current = _decode(state.get('current') or [])
+
+
+def event_source(event: Dict[str, Any]) -> str:
+    """Host the opportunity was discovered on"""
+    url = event.get('source_url') or event.get('url') or ''
+    host = urlparse(url).netloc.lower() if url else ''
+    if host.startswith('www.'):
+        host = host[4:]
+    return host or 'unknown'
+
+
+def event_type(event: Dict[str, Any]) -> str:
+    tags = event.get('type_tags') or []
+    if isinstance(tags, list) and tags:
+        return str(tags[0]).lower()
+    return str(event.get('type') or 'unknown').lower()
+
+
+def event_counts(event: Dict[str, Any], outcome: str) -> Dict[Key, float]:
+    """Window contributions for one processed event (outcome: new | updated | duplicate | near_duplicate)"""
+    source = event_source(event)
+    counts: Dict[Key, float] = {
+        ('outcome', outcome): 1,
+        ('source', source): 1,
+    }
+    if outcome == 'new':
+        counts[('source_new', source)] = 1
+        counts[('type', event_type(event))] = 1
+        try:
+            amount = float(event.get('amount') or 0)
+        except (TypeError, ValueError):
+            amount = 0.0
+        if amount > 0:
+            counts[('amount_total', 'all')] = amount
+            counts[('amount_total', source)] = amount
+    return counts
+
+
+class StreamAggregator:
+    """
+    The Cortex windowed stats: sliding windows for "what happened in the last N minutes"
+    queries and tumbling windows that are published when they close.
+    """
+
+    SLIDING = {'10m': (600, 30), '1h': (3600, 60)}
+    TUMBLING = {'1m': 60, '10m': 600}
+
+    def __init__(self, on_window_closed: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.on_window_closed = on_window_closed
+        self.sliding = {name: SlidingWindow(size, step) for name, (size, step) in self.SLIDING.items()}
+        self.tumbling = {
+            name: TumblingWindow(size, on_close=self._make_close_handler(name))
+            for name, size in self.TUMBLING.items()
+        }
+
+    def _make_close_handler(self, name: str):
+        def handler(size_seconds: int, start: float, counts: Dict[Key, float]):
+            if self.on_window_closed:
+                self.on_window_closed(self.describe(name, start, start + size_seconds, counts))
+        return handler
+
+    @staticmethod
+    def describe(name: str, start: float, end: float, counts: Dict[Key, float]) -> Dict[str, Any]:
+        summary = summarize(counts)
+        outcomes = summary.get('outcome', {})
+        total = sum(outcomes.values())
+        return {
+            'window': name,
+            'window_start': start,
+            'window_end': end,
+            'events': total,
+            'new': outcomes.get('new', 0),
+            'duplicates': outcomes.get('duplicate', 0),
+            'near_duplicates': outcomes.get('near_duplicate', 0),
+            'updates': outcomes.get('updated', 0),
+            'new_rate': round(outcomes.get('new', 0) / total, 4) if total else 0.0,
+            'by_source': summary.get('source', {}),
+            'new_by_source': summary.get('source_new', {}),
+            'by_type': summary.get('type', {}),
+            'amount_total': summary.get('amount_total', {}),
+        }
+
+    def record(self, event: Dict[str, Any], outcome: str, now: Optional[float] = None):
+        now = now if now is not None else time.time()
+        counts = event_counts(event, outcome)
+        for window in self.sliding.values():
+            window.add(counts, now)
+        for window in self.tumbling.values():
+            window.add(counts, now)
+
+    def tick(self, now: Optional[float] = None):
+        """Close due tumbling windows even when no events arrive"""
+        now = now if now is not None else time.time()
+        for window in self.tumbling.values():
+            window.advance(now)
+
+    def query(self, name: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """Current contents of a sliding window, e.g. query('10m')"""
+        now = now if now is not None else time.time()
+        window = self.sliding[name]
+        return self.describe(name, now - window.size_seconds, now, window.snapshot(now))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'sliding': {name: w.to_state() for name, w in self.sliding.items()},
+            'tumbling': {name: w.to_state() for name, w in self.tumbling.items()},
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        for name, window_state in (state.get('sliding') or {}).items():
+            if name in self.sliding:
+                self.sliding[name].load_state(window_state)
+        for name, window_state in (state.get('tumbling') or {}).items():
+            if name in self.tumbling:
+                self.tumbling[name].load_state(window_state)
@@ -0,0 +1,331 @@
+"""
+Tiered Fetcher
+Lightweight HTTP fast path in front of Playwright.
+
+Tier 1 is a pooled httpx request (keep-alive across targets). The response is
+escalated to the browser tier only when it is a WAF challenge, a JavaScript shell
+or too thin to be the real page. JSON endpoints are accepted as-is.
+
+The fetcher remembers per domain which tier works: domains whose HTTP responses
+keep escalating go straight to the browser, with an occasional re-probe in case
+the site changes.
+"""
+import json
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+import httpx
+import structlog
+
+from app.config import settings
+from app.services.crawl_cache import crawl_cache, response_validators
+from app.services.pipeline_metrics import pipeline_metrics
+
+logger = structlog.get_logger()
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,application/json;q=0.8,*/*;q=0.7",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Bot-protection interstitials (Cloudflare, Imperva, PerimeterX, DataDome, Akamai)
+WAF_MARKERS = (
+    "cf-chl", "challenge-platform", "just a moment...", "attention required! | cloudflare",
+    "_incapsula_resource", "px-captcha", "captcha-delivery.com", "datadome",
+    "access denied</title>", "verify you are human",
+)
+
+# Single-page-app mount points that are empty until JavaScript runs
+SHELL_MOUNTS = re.compile(
+    r'<div id="(?:root|app|__next|__nuxt|svelte)"[^>]*>\s*</div>', re.IGNORECASE
+)
+NOSCRIPT_HINTS = ("enable javascript", "javascript is required", "you need to enable javascript")
+
+TAG_RE = re.compile(r'<(script|style)[^>]*>.*?</\1>|<[^>]+>', re.IGNORECASE | re.DOTALL)
+TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+
+
+def domain_of(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def visible_text_length(html: str) -> int:
+    return len(" ".join(TAG_RE.sub(" ", html).split()))
+
+
+def extract_title(html: str) -> str:
+    match = TITLE_RE.search(html[:20000])
+    return " ".join(match.group(1).split()) if match else ""
+
+
+def is_json_response(content_type: str, body: str) -> bool:
+    if 'json' in content_type:
+        return True
+    return body.lstrip()[:1] in ('{', '[') and 'html' not in content_type
+
+
+def classify_response(status: int, content_type: str, body: str, min_text_chars: int) -> Optional[str]:
+    """
+    Why an HTTP response can't stand in for the rendered page (None if it can).
+    Reasons: throttled, waf, http_error, js_shell, thin
+    """
+    if status == 429:
+        return "throttled"
+    lowered = body[:30000].lower()
+    if status == 403 or any(marker in lowered for marker in WAF_MARKERS):
+        return "waf"
+    if status >= 400:
+        return "http_error"
+    if is_json_response(content_type, body):
+        return None if body.strip() else "thin"
+
+    text_chars = visible_text_length(body)
+    if text_chars < min_text_chars:
+        if SHELL_MOUNTS.search(body) or any(hint in lowered for hint in NOSCRIPT_HINTS):
+            return "js_shell"
+        return "thin"
+    return None
+
+
+class FetchedPage:
+    """Result of a tiered fetch"""
+
+    def __init__(self, url: str, text: str, status: int, tier: str, elapsed_ms: float, content_type: str = "",
+                 validators: Optional[Dict[str, Optional[str]]] = None):
+        self.url = url
+        self.text = text
+        self.status = status
+        self.tier = tier
+        self.elapsed_ms = elapsed_ms
+        self.content_type = content_type
+        self.validators = validators or {}  # ETag / Last-Modified for conditional re-crawls
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+    @property
+    def title(self) -> str:
+        return extract_title(self.text)
+
+
+class DomainTierStats:
+    """Which tier has worked for a domain"""
+
+    def __init__(self, http_ok: int = 0, escalated: int = 0, browser_ok: int = 0,
+                 browser_failed: int = 0, skipped: int = 0, http_ms: float = 0.0, browser_ms: float = 0.0):
+        self.http_ok = http_ok
+        self.escalated = escalated
+        self.browser_ok = browser_ok
+        self.browser_failed = browser_failed
+        self.skipped = skipped  # HTTP tier skipped because the domain prefers the browser
+        self.http_ms = http_ms
+        self.browser_ms = browser_ms
+        self.last_reason: Optional[str] = None
+
+    @property
+    def http_attempts(self) -> int:
+        return self.http_ok + self.escalated
+
+    def prefers_browser(self, min_attempts: int) -> bool:
+        """HTTP has been tried enough and almost never sufficed"""
+        return self.http_attempts >= min_attempts and self.http_ok * 5 < self.http_attempts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'http_ok': self.http_ok,
+            'escalated': self.escalated,
+            'browser_ok': self.browser_ok,
+            'browser_failed': self.browser_failed,
+            'skipped': self.skipped,
+            'http_ms': round(self.http_ms, 1),
+            'browser_ms': round(self.browser_ms, 1),
+        }
+
+
+class TieredFetcher:
+    """HTTP first, Playwright when needed; remembers per domain what works"""
+
+    MIN_ATTEMPTS_BEFORE_PREFERENCE = 3
+    REPROBE_EVERY = 20  # Browser-preferring domains still get an HTTP probe this often
+    SAVE_EVERY = 25
+
+    def __init__(self, state_dir: Optional[str] = None, min_text_chars: Optional[int] = None):
+        self.state_dir = state_dir if state_dir is not None else settings.cortex_state_dir
+        self.min_text_chars = min_text_chars or settings.tiered_fetch_min_text_chars
+        self.timeout = settings.tiered_fetch_timeout
+        self.domains: Dict[str, DomainTierStats] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._dirty = 0
+        self._load()
+
+    @property
+    def _state_path(self) -> str:
+        return os.path.join(self.state_dir, "tier_memory.json")
+
+    def _load(self):
+        try:
+            with open(self._state_path, 'r') as f:
+                state = json.load(f)
+            self.domains = {d: DomainTierStats(**s) for d, s in state.get('domains', {}).items()}
+        except (OSError, ValueError, TypeError):
+            self.domains = {}
+
+    def save(self):
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            tmp = self._state_path + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump({'domains': {d: s.to_dict() for d, s in self.domains.items()}}, f)
+            os.replace(tmp, self._state_path)
+            self._dirty = 0
+        except OSError as e:
+            logger.warning("Tier memory save failed", error=str(e))
+
+    def _touch(self):
+        self._dirty += 1
+        if self._dirty >= self.SAVE_EVERY:
+            self.save()
+
+    def domain(self, url: str) -> DomainTierStats:
+        name = domain_of(url)
+        if name not in self.domains:
+            self.domains[name] = DomainTierStats()
+        return self.domains[name]
+
+    def _client_for_requests(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return self._client
+
+    def should_try_http(self, url: str) -> bool:
+        stats = self.domain(url)
+        if not stats.prefers_browser(self.MIN_ATTEMPTS_BEFORE_PREFERENCE):
+            return True
+        if stats.skipped and stats.skipped % self.REPROBE_EVERY == 0:
+            stats.skipped += 1
+            return True  # Periodic re-probe
+        stats.skipped += 1
+        return False
+
+    async def try_http(self, url: str, conditional: bool = False) -> Tuple[Optional[FetchedPage], Optional[str]]:
+        """
+        Tier 1. Returns (page, None) when the HTTP response is good enough,
+        else (None, reason) and the caller escalates to the browser.
+        With conditional=True the crawl cache validators are sent and a 304 comes back
+        as a page with not_modified set (and empty text).
+        """
+        if not self.should_try_http(url):
+            return None, "domain_prefers_browser"
+
+        stats = self.domain(url)
+        headers = crawl_cache.conditional_headers(url) if conditional else {}
+        started = time.perf_counter()
+        validators: Dict[str, Optional[str]] = {}
+        try:
+            response = await self._client_for_requests().get(url, headers=headers)
+            body = response.text
+            status = response.status_code
+            content_type = response.headers.get('content-type', '').lower()
+            validators = response_validators(response.headers)
+            reason = None if status == 304 and headers else classify_response(
+                status, content_type, body, self.min_text_chars
+            )
+        except httpx.HTTPError as e:
+            body, status, content_type, reason = "", 0, "", f"transport:{type(e).__name__}"
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        stats.http_ms += elapsed_ms
+        stats.last_reason = reason
+        if reason is None:
+            if stats.prefers_browser(self.MIN_ATTEMPTS_BEFORE_PREFERENCE):
+                stats.escalated = 0  # Re-probe succeeded: the domain serves plain HTTP again
+            stats.http_ok += 1
+        else:
+            stats.escalated += 1
+        self._touch()
+
+        if reason is not None:
+            logger.debug("HTTP tier escalating", url=url, reason=reason, status=status)
+            return None, reason
+        if status == 304:
+            crawl_cache.mark_not_modified(url)
+        return FetchedPage(url, body, status, TIER_HTTP, elapsed_ms, content_type, validators), None
+
+    def record_browser(self, url: str, ok: bool, elapsed_ms: float):
+        stats = self.domain(url)
+        stats.browser_ms += elapsed_ms
+        if ok:
+            stats.browser_ok += 1
+        else:
+            stats.browser_failed += 1
+        self._touch()
+
+    async def fetch(self, url: str, browser_fetch: Callable[[str], Awaitable[Optional[str]]]) -> Optional[FetchedPage]:
+        """HTTP tier, then browser_fetch(url) if the response needs rendering"""
+        page, _reason = await self.try_http(url)
+        if page is not None:
+            return page
+
+        started = time.perf_counter()
+        text = await browser_fetch(url)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.record_browser(url, text is not None, elapsed_ms)
+        if text is None:
+            return None
+        return FetchedPage(url, text, 200, TIER_BROWSER, elapsed_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        http_ok = sum(s.http_ok for s in self.domains.values())
+        browser = sum(s.browser_ok + s.browser_failed for s in self.domains.values())
+        served = http_ok + browser
+        return {
+            'http_hit_rate': round(http_ok / served, 4) if served else 0.0,
+            'http_served': http_ok,
+            'browser_served': browser,
+            'domains': {
+                name: {
+                    **s.to_dict(),
+                    'preferred_tier': TIER_BROWSER if s.prefers_browser(self.MIN_ATTEMPTS_BEFORE_PREFERENCE) else TIER_HTTP,
+                    'avg_http_ms': round(s.http_ms / s.http_attempts, 1) if s.http_attempts else None,
+                    'last_reason': s.last_reason,
+                }
+                for name, s in self.domains.items()
+            },
+        }
+
+    async def close(self):
+        self.save()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global instance
+tiered_fetcher = TieredFetcher()
+
+
+_TIER_GAUGE = pipeline_metrics.gauge("cortex_fetch_tier", "Pages served per fetch tier", ("tier",))
+_HIT_RATE_GAUGE = pipeline_metrics.gauge("cortex_fetch_http_hit_rate", "Share of pages served by the HTTP tier")
+
+
+def _collect_tier_metrics():
+    stats = tiered_fetcher.get_stats()
+    _TIER_GAUGE.set(stats['http_served'], tier=TIER_HTTP)
+    _TIER_GAUGE.set(stats['browser_served'], tier=TIER_BROWSER)
+    _HIT_RATE_GAUGE.set(stats['http_hit_rate'])
+
+
+pipeline_metrics.register_collector(_collect_tier_metrics)
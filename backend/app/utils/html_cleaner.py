@@ -0,0 +1,141 @@
+"""
+HTML Cleaner
+Fast lxml-based page cleaning for LLM extraction: compact text with links, plus the
+hydration JSON SPAs embed (__NEXT_DATA__, JSON-LD, application/json, Nuxt state).
+
+Non-content elements are stripped by libxml2 in C; the remaining tree is flattened
+to text with block boundaries as newlines and every link's href inline, which is
+what the extraction prompts need at a fraction of the markup's tokens. Card-like
+elements (articles, list items, rows, *card*/*tile* classes) are separated by a blank
+line so the chunker can split pages between listings.
+Use clean_html_async from the event loop: it runs in a small process pool.
+"""
+import asyncio
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import structlog
+import lxml.html
+from lxml import etree
+
+logger = structlog.get_logger()
+
+MAX_CHARS = 60000
+
+# Dropped with their content (tails, i.e. text after the element, are kept)
+DROP_TAGS = (
+    'style', 'svg', 'noscript', 'meta', 'link', 'iframe', 'footer', 'nav',
+    'template', 'canvas', 'object', 'embed', 'head',
+)
+BLOCK_TAGS = (
+    'p', 'div', 'section', 'article', 'main', 'aside', 'header', 'li', 'ul', 'ol', 'tr', 'table',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'dd', 'dt', 'dl', 'blockquote', 'pre', 'form', 'figure',
+)
+CARD_TAGS = ('article', 'li', 'tr', 'section')
+CARD_CLASS_RE = re.compile(r'card|tile|listing|result|hackathon|bounty|scholarship', re.IGNORECASE)
+SKIP_HREF_PREFIXES = ('#', 'javascript:', 'mailto:', 'tel:', 'data:')
+BOUNDARY = "\ue000"  # Private-use marker for card boundaries; becomes a blank line
+
+
+def _hydration_script(script) -> Optional[str]:
+    """Serialized script if it carries hydration JSON, else None"""
+    sid = (script.get('id') or '').strip()
+    stype = (script.get('type') or '').strip().lower()
+    text = script.text or ''
+    keep = sid in ('__NEXT_DATA__', '__NUXT_DATA__') or stype in ('application/ld+json', 'application/json')
+    if not keep and '__NUXT__' not in text:
+        return None
+    attrs = ''.join(f' {name}="{script.get(name)}"' for name in ('id', 'type') if script.get(name))
+    return f"<script{attrs}>{text.strip()}</script>"
+
+
+def _collapse(text: str) -> str:
+    """One line per text run; card boundaries become a single blank line"""
+    out: List[str] = []
+    pending_break = False
+    for line in text.replace(BOUNDARY, "\n" + BOUNDARY + "\n").splitlines():
+        if line == BOUNDARY:
+            pending_break = True
+            continue
+        line = " ".join(line.split())
+        if line:
+            if pending_break and out:
+                out.append("")
+            pending_break = False
+            out.append(line)
+    return "\n".join(out)
+
+
+def clean_html(html: str, max_chars: int = MAX_CHARS) -> str:
+    """Compact text-with-links plus hydration scripts, at most max_chars"""
+    if not html:
+        return ""
+    stripped = html.lstrip()
+    if stripped[:1] in ('{', '['):
+        return stripped[:max_chars]  # JSON API response: already structured
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError) as e:
+        logger.debug("HTML parse failed, using raw text", error=str(e))
+        return _collapse(html)[:max_chars]
+
+    title = " ".join((root.findtext('.//title') or '').split())
+    hydration: List[str] = []
+    for script in root.iter('script'):
+        blob = _hydration_script(script)
+        if blob:
+            hydration.append(blob)
+    etree.strip_elements(root, 'script', *DROP_TAGS, with_tail=False)
+    etree.strip_elements(root, etree.Comment, etree.ProcessingInstruction, with_tail=False)
+
+    for anchor in root.iter('a'):
+        href = (anchor.get('href') or '').strip()
+        if href and not href.startswith(SKIP_HREF_PREFIXES):
+            anchor.tail = f" ({href})" + (anchor.tail or "")
+    for element in root.iter(*BLOCK_TAGS):
+        element.tail = "\n" + (element.tail or "")
+        if element.tag in ('p', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            element.text = "\n" + (element.text or "")
+    for element in root.iter(etree.Element):
+        if element.tag in CARD_TAGS or CARD_CLASS_RE.search(element.get('class') or ''):
+            element.text = BOUNDARY + (element.text or "")
+            element.tail = BOUNDARY + (element.tail or "")
+
+    text = _collapse(root.text_content())
+    return "\n".join(part for part in (title, text, *hydration) if part)[:max_chars]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None:
+        from app.config import settings
+        workers = settings.html_cleaner_workers
+        if workers > 0:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def clean_html_async(html: str, max_chars: int = MAX_CHARS) -> str:
+    """clean_html off the event loop (process pool; a thread when HTML_CLEANER_WORKERS=0)"""
+    if not html:
+        return ""
+    pool = _get_pool()
+    if pool is None:
+        return await asyncio.to_thread(clean_html, html, max_chars)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, clean_html, html, max_chars)
+    except RuntimeError as e:
+        # Pool broken or shut down (e.g. during shutdown): clean in a thread instead
+        logger.warning("HTML cleaner pool unavailable", error=str(e))
+        return await asyncio.to_thread(clean_html, html, max_chars)
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
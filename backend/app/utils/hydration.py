@@ -0,0 +1,181 @@
+"""
+Hydration Extractors
+Locate the JSON state SPAs embed in their HTML (__NEXT_DATA__, JSON-LD, Nuxt) and
+search it for opportunity-shaped objects without recursion.
+"""
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+import structlog
+
+logger = structlog.get_logger()
+
+NEXT_DATA_RE = re.compile(r'<script[^>]*\bid=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+JSON_LD_RE = re.compile(r'<script[^>]*\btype=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+NUXT_DATA_RE = re.compile(r'<script[^>]*\bid=["\']__NUXT_DATA__["\'][^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+NUXT_ASSIGN_RE = re.compile(r'window\.__NUXT__\s*=\s*(\{.*?\})\s*;?\s*</script>', re.DOTALL)
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def _loads(text: str, blob: str) -> Optional[Any]:
+    try:
+        return json.loads(text.strip())
+    except ValueError as e:
+        logger.debug("Hydration blob is not JSON", blob=blob, error=str(e))
+        return None
+
+
+def extract_next_data(html: str) -> Optional[Any]:
+    """The Next.js __NEXT_DATA__ payload (attribute order and quoting tolerant)"""
+    match = NEXT_DATA_RE.search(html or "")
+    return _loads(match.group(1), "__NEXT_DATA__") if match else None
+
+
+def extract_json_ld(html: str) -> List[Any]:
+    """Every JSON-LD document on the page, @graph entries flattened"""
+    documents: List[Any] = []
+    for match in JSON_LD_RE.finditer(html or ""):
+        data = _loads(match.group(1), "ld+json")
+        if data is None:
+            continue
+        for doc in (data if isinstance(data, list) else [data]):
+            if isinstance(doc, dict) and isinstance(doc.get('@graph'), list):
+                documents.extend(doc['@graph'])
+            else:
+                documents.append(doc)
+    return documents
+
+
+def _unflatten_nuxt(values: List[Any]) -> Any:
+    """Nuxt 3 __NUXT_DATA__ is devalue-serialized: containers hold indexes into one flat array"""
+    resolved: Dict[int, Any] = {}
+
+    def resolve(index: Any) -> Any:
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(values):
+            return None
+        if index in resolved:
+            return resolved[index]
+        value = values[index]
+        if isinstance(value, list):
+            if value and isinstance(value[0], str) and value[0] in ('Reactive', 'ShallowReactive', 'Ref', 'ShallowRef', 'EmptyRef'):
+                resolved[index] = None  # Cycle guard
+                resolved[index] = resolve(value[1]) if len(value) > 1 else None
+                return resolved[index]
+            if value and isinstance(value[0], str) and value[0] in ('Date', 'Set', 'Map', 'BigInt', 'RegExp'):
+                resolved[index] = value[1] if len(value) > 1 and value[0] == 'Date' else None
+                return resolved[index]
+            out: List[Any] = []
+            resolved[index] = out
+            out.extend(resolve(i) for i in value)
+            return out
+        if isinstance(value, dict):
+            obj: Dict[str, Any] = {}
+            resolved[index] = obj
+            for key, i in value.items():
+                obj[key] = resolve(i)
+            return obj
+        resolved[index] = value
+        return value
+
+    return resolve(0)
+
+
+def extract_nuxt_state(html: str) -> Optional[Any]:
+    """Nuxt 3 __NUXT_DATA__ (devalue) or a JSON-literal Nuxt 2 window.__NUXT__ assignment"""
+    match = NUXT_DATA_RE.search(html or "")
+    if match:
+        data = _loads(match.group(1), "__NUXT_DATA__")
+        return _unflatten_nuxt(data) if isinstance(data, list) else data
+    match = NUXT_ASSIGN_RE.search(html or "")
+    # Minified Nuxt 2 state is often a JS function call rather than JSON; that is left to the LLM
+    return _loads(match.group(1), "__NUXT__") if match else None
+
+
+def extract_hydration(html: str) -> Dict[str, Any]:
+    """All hydration blobs found on a page, keyed by kind (absent kinds omitted)"""
+    blobs: Dict[str, Any] = {}
+    next_data = extract_next_data(html)
+    if next_data is not None:
+        blobs['next_data'] = next_data
+    nuxt = extract_nuxt_state(html)
+    if nuxt is not None:
+        blobs['nuxt'] = nuxt
+    json_ld = extract_json_ld(html)
+    if json_ld:
+        blobs['json_ld'] = json_ld
+    return blobs
+
+
+def iter_dicts(data: Any) -> Iterator[Dict[str, Any]]:
+    """Every dict in a JSON tree, depth-first in document order (explicit stack, no recursion limit)"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(v for v in reversed(list(node.values())) if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(v for v in reversed(node) if isinstance(v, (dict, list)))
+
+
+def find_objects(
+    data: Any,
+    predicate: Predicate,
+    key: Optional[Union[str, Callable[[Dict[str, Any]], Any]]] = None,
+    descend: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Dicts matching predicate anywhere in data, in document order.
+    key (field name or function) dedupes, dropping matches without one. Matched objects are
+    not searched further unless descend=True, so nested sponsors/organizers don't count twice.
+    """
+    key_fn = (lambda obj: obj.get(key)) if isinstance(key, str) else key
+    found: Dict[Any, Dict[str, Any]] = {}
+    ordered: List[Dict[str, Any]] = []
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            try:
+                matched = predicate(node)
+            except Exception:
+                matched = False
+            if matched:
+                if key_fn is None:
+                    ordered.append(node)
+                else:
+                    ident = key_fn(node)
+                    if isinstance(ident, (str, int)) and ident != '' and ident not in found:
+                        found[ident] = node
+                        ordered.append(node)
+                if not descend:
+                    continue
+            stack.extend(v for v in reversed(list(node.values())) if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(v for v in reversed(node) if isinstance(v, (dict, list)))
+    return ordered
+
+
+def get_path(data: Any, path: str, default: Any = None) -> Any:
+    """Dotted lookup ("props.pageProps.challenges", list indexes allowed: "queries.0.state")"""
+    node = data
+    for part in path.split('.'):
+        if isinstance(node, dict):
+            node = node.get(part)
+        elif isinstance(node, list) and part.isdigit() and int(part) < len(node):
+            node = node[int(part)]
+        else:
+            return default
+        if node is None:
+            return default
+    return node
+
+
+def first_list(data: Any, paths: Iterable[str]) -> List[Any]:
+    """The first non-empty list among candidate paths (APIs move their lists around)"""
+    for path in paths:
+        value = get_path(data, path)
+        if isinstance(value, list) and value:
+            return value
+    return []
@@ -1,7 +1,7 @@
 import json
 import re
 import structlog
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 logger = structlog.get_logger()
 
@@ -54,3 +54,93 @@ def robust_json_loads(text: str) -> Any:
              return json.loads(alt_text)
         except:
              raise e # Re-raise original error if even fallback fails
+
+
+TRAILING_COMMA_RE = re.compile(r',\s*([\]\}])')
+
+
+class JSONArrayStream:
+    """
+    Incremental parser for a JSON array of objects arriving in pieces (streamed LLM output).
+    feed() returns the elements that closed in the new text, so callers can act on the first
+    items while the rest of the array is still being generated.
+
+    Text before the opening bracket (code fences, preamble) and after the closing one is
+    ignored, as are commas between elements, so trailing commas are harmless. A bracket
+    whose first element doesn't start with '{' is prose ("[as requested]"), not the answer,
+    and scanning starts over after it. A lone top-level object is treated as a one-element
+    array. An element that still isn't valid JSON is logged and skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0            # Next buffer index to scan
+        self._start = None       # Buffer index where the open element began
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._top = None         # '[' or '{' once the top-level value has opened
+        self._opened = False     # An element of the top-level array has started
+        self.complete = False    # The top-level value closed
+
+    def feed(self, text: str) -> List[Any]:
+        if self.complete or not text:
+            return []
+        self._buffer += text
+        buffer, items = self._buffer, []
+
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._top is None:
+                if ch in '[{':
+                    self._top, self._depth = ch, 1
+                    if ch == '{':
+                        self._start = i
+            elif self._top == '[' and not self._opened and ch not in ' \t\r\n{]':
+                # Not an array of objects: a bracket in the preamble
+                self._top, self._depth = None, 0
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '[{':
+                if self._depth == 1 and self._top == '[':
+                    self._start, self._opened = i, True
+                self._depth += 1
+            elif ch in ']}':
+                self._depth -= 1
+                if self._start is not None and self._depth == (1 if self._top == '[' else 0):
+                    item = self._decode(buffer[self._start:i + 1])
+                    if item is not None:
+                        items.append(item)
+                    self._start = None
+                if self._depth == 0:
+                    self.complete = True
+                    break
+            i += 1
+
+        # Keep only the open element
+        keep = self._start if self._start is not None else i
+        self._buffer = buffer[keep:]
+        self._pos = i - keep
+        if self._start is not None:
+            self._start = 0
+        return items
+
+    def _decode(self, fragment: str) -> Optional[Any]:
+        try:
+            return json.loads(fragment)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(TRAILING_COMMA_RE.sub(r'\1', fragment))
+        except json.JSONDecodeError as e:
+            logger.warning("Skipping malformed streamed JSON element", error=str(e), text_sample=fragment[:200])
+            return None
+
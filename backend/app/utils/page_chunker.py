@@ -0,0 +1,101 @@
+"""
+Page Chunker
+Splits cleaned pages into token-budgeted chunks for extraction, so long listing pages
+are read in full instead of truncated.
+
+Splits prefer card boundaries (the blank lines html_cleaner emits between listings),
+then line boundaries, and only cut inside a line that alone exceeds the budget. Each
+chunk repeats the tail of the previous one so a card straddling a cut is seen whole
+by at least one chunk; merge_fields folds what the overlap extracts twice into one copy.
+Small pages go the other way: pack_chunks bins them into shared prompts.
+"""
+from typing import Any, Dict, List
+
+CHARS_PER_TOKEN = 4  # Rough Gemini average for English text and URLs
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _units(text: str, budget: int) -> List[str]:
+    """Cards, with oversized cards split into lines and oversized lines into slices"""
+    units: List[str] = []
+    for block in text.split("\n\n"):
+        if not block.strip():
+            continue
+        if len(block) <= budget:
+            units.append(block)
+            continue
+        for line in block.split("\n"):
+            for start in range(0, len(line), budget):
+                units.append(line[start:start + budget])
+    return units
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0, max_chunks: int = 0) -> List[str]:
+    """
+    Chunks of at most max_tokens (estimated), each starting with up to overlap_tokens
+    of the previous chunk's trailing cards. max_chunks > 0 caps the result.
+    """
+    if not text:
+        return []
+    budget = max(1, max_tokens) * CHARS_PER_TOKEN
+    overlap = max(0, min(overlap_tokens * CHARS_PER_TOKEN, budget // 2))
+    if len(text) <= budget:
+        return [text]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    fresh = 0  # Units in current that are not overlap carried from the previous chunk
+    for unit in _units(text, budget):
+        cost = len(unit) + 2
+        if current and size + cost > budget:
+            chunks.append("\n\n".join(current))
+            if max_chunks and len(chunks) >= max_chunks:
+                return chunks
+            carried: List[str] = []
+            carried_size = 0
+            for prev in reversed(current):
+                if carried_size + len(prev) + 2 > overlap or carried_size + len(prev) + 2 + cost > budget:
+                    break
+                carried.insert(0, prev)
+                carried_size += len(prev) + 2
+            current, size, fresh = carried, carried_size, 0
+        current.append(unit)
+        size += cost
+        fresh += 1
+    if current and fresh:
+        chunks.append("\n\n".join(current))
+    return chunks[:max_chunks] if max_chunks else chunks
+
+
+def pack_chunks(sizes: List[int], max_tokens: int, max_per_bin: int = 0) -> List[List[int]]:
+    """
+    Bin chunks (given their token sizes) into prompts of at most max_tokens, first-fit
+    decreasing. Returns bins of chunk indexes in original order; a chunk larger than the
+    budget gets a bin to itself.
+    """
+    bins: List[List[int]] = []
+    loads: List[int] = []
+    for index in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        for b, load in enumerate(loads):
+            if load + sizes[index] <= max_tokens and not (max_per_bin and len(bins[b]) >= max_per_bin):
+                bins[b].append(index)
+                loads[b] += sizes[index]
+                break
+        else:
+            bins.append([index])
+            loads.append(sizes[index])
+    return [sorted(b) for b in sorted(bins, key=min)]
+
+
+def merge_fields(first: Dict[str, Any], item: Dict[str, Any]) -> bool:
+    """Fill fields the first sighting left empty from a later copy; True if any were filled"""
+    filled = False
+    for field, value in item.items():
+        if first.get(field) in (None, "", [], 0) and value not in (None, "", [], 0):
+            first[field] = value
+            filled = True
+    return filled
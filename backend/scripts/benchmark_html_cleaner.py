@@ -0,0 +1,93 @@
+import asyncio
+import json
+import sys
+import os
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from app.utils.html_cleaner import clean_html, clean_html_async, shutdown_pool
+
+DEFAULT_SAMPLES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "cortex-raw-html.json"
+)
+
+
+def legacy_clean_html(html_content: str) -> str:
+    """The previous AIEnrichmentService.clean_html (BeautifulSoup html.parser), as the baseline"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for tag in soup(['style', 'svg', 'path', 'noscript', 'meta', 'link', 'iframe', 'footer', 'nav']):
+        tag.decompose()
+    for script in soup.find_all('script'):
+        sid = (script.get('id') or '').strip()
+        stype = (script.get('type') or '').strip().lower()
+        text = script.string or ''
+        if not (sid == '__NEXT_DATA__' or stype in ['application/ld+json', 'application/json'] or '__NUXT__' in text):
+            script.decompose()
+    body = soup.body
+    return str(body)[:60000] if body else str(soup)[:60000]
+
+
+def load_pages(path: str):
+    """Raw pages from a Kafka topic export (list of records whose value has url/html)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    pages = []
+    for record in records:
+        value = record.get('value') if isinstance(record, dict) else None
+        if isinstance(value, str):
+            value = json.loads(value)
+        if isinstance(value, dict) and value.get('html'):
+            pages.append((value.get('url') or record.get('key') or '?', value['html']))
+    return pages
+
+
+def time_cleaner(fn, pages, rounds: int):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        outputs = [fn(html) for _, html in pages]
+    return (time.perf_counter() - started) / (rounds * len(pages)), outputs
+
+
+async def time_pool(pages, rounds: int) -> float:
+    await clean_html_async(pages[0][1])  # Warm the worker processes
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(clean_html_async(html) for _, html in pages))
+    return time.perf_counter() - started
+
+
+def run_benchmark(path: str, rounds: int):
+    pages = load_pages(path)
+    if not pages:
+        print(f"No pages with html in {path}")
+        return
+    raw_chars = sum(len(html) for _, html in pages)
+
+    legacy_s, legacy_out = time_cleaner(legacy_clean_html, pages, rounds)
+    fast_s, fast_out = time_cleaner(clean_html, pages, rounds)
+
+    print(f"Pages:        {len(pages)} ({raw_chars / 1024:,.0f} KB raw), {rounds} rounds")
+    print(f"{'':14}{'ms/page':>10}{'out KB':>10}{'~tokens':>10}")
+    for name, seconds, outputs in (("bs4 legacy", legacy_s, legacy_out), ("lxml fast", fast_s, fast_out)):
+        out_chars = sum(len(o) for o in outputs)
+        print(f"{name:14}{seconds * 1000:>10.2f}{out_chars / 1024:>10.1f}{out_chars // 4:>10,}")
+    print(f"Speedup:      {legacy_s / fast_s:.1f}x")
+
+    pool_s = asyncio.run(time_pool(pages, rounds))
+    shutdown_pool()
+    print(f"Pool:         {len(pages) * rounds / pool_s:,.0f} pages/s through clean_html_async")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the HTML cleaner against the BeautifulSoup baseline')
+    parser.add_argument('--samples', default=DEFAULT_SAMPLES, help='Kafka export of cortex.raw.html.v1')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    run_benchmark(args.samples, args.rounds)
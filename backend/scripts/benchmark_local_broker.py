@@ -0,0 +1,68 @@
+import asyncio
+import sys
+import os
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.local_broker import LocalBroker
+
+
+async def run_benchmark(messages: int, consumers: int, payload_kb: int, data_dir: str):
+    """
+    Load-test the local broker with no outside services:
+    one producer, N consumers in one group, each polling from a worker thread
+    (the same asyncio.to_thread pattern the pipeline workers use).
+    """
+    broker = LocalBroker(data_dir=data_dir or None, max_backlog=max(1000, messages // 10))
+    producer = broker.producer()
+    payload = ('{"html": "' + "x" * (payload_kb * 1024) + '"}').encode()
+    consumed = 0
+
+    async def consume(group_member: int):
+        nonlocal consumed
+        consumer = broker.consumer("benchmark")
+        consumer.subscribe(["cortex.raw.html.v1"])
+        while consumed < messages:
+            msg = await asyncio.to_thread(consumer.poll, 0.2)
+            if msg is None:
+                continue
+            consumed += 1
+            consumer.commit(message=msg, asynchronous=True)
+
+    async def produce():
+        for n in range(messages):
+            while True:
+                try:
+                    producer.produce("cortex.raw.html.v1", key=str(n), value=payload)
+                    break
+                except BufferError:
+                    await asyncio.to_thread(producer.poll, 0.05)
+            if n % 500 == 0:
+                producer.poll(0)
+                await asyncio.sleep(0)
+        producer.flush()
+
+    started = time.time()
+    await asyncio.gather(produce(), *(consume(i) for i in range(consumers)))
+    elapsed = time.time() - started
+
+    print(f"Messages:   {messages} x {payload_kb} KB")
+    print(f"Consumers:  {consumers} (one group)")
+    print(f"Persisted:  {'yes - ' + data_dir if data_dir else 'no (memory only)'}")
+    print(f"Elapsed:    {elapsed:.2f}s")
+    print(f"Throughput: {messages / elapsed:,.0f} msg/s, {messages * payload_kb / 1024 / elapsed:,.1f} MB/s")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the in-process local broker')
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--consumers', type=int, default=2)
+    parser.add_argument('--payload-kb', type=int, default=4)
+    parser.add_argument('--data-dir', default='', help='Persist segments here (default: memory only)')
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.messages, args.consumers, args.payload_kb, args.data_dir))
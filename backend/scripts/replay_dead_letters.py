@@ -0,0 +1,51 @@
+import asyncio
+import sys
+import os
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.retry_router import replay_dead_letters
+from app.services.kafka_config import KafkaConfig, kafka_producer_manager
+
+
+def print_dead_letter(envelope: dict):
+    print(
+        f"[{envelope.get('original_topic')}] key={envelope.get('original_key')} "
+        f"attempts={envelope.get('attempt')} failed_by={envelope.get('failed_by')} "
+        f"error={str(envelope.get('error'))[:120]}"
+    )
+
+
+async def main(execute: bool, topic: str, limit: int):
+    """
+    Replay dead-lettered messages back to their original topic.
+    Default is a dry run that only lists what is in the DLQ.
+    """
+    print("STARTING DLQ REPLAY" + ("" if execute else " (dry run)"))
+    stats = await replay_dead_letters(
+        execute=execute, topic_filter=topic, limit=limit, on_message=print_dead_letter
+    )
+    kafka_producer_manager.flush()
+
+    print(f"\nSeen {stats['seen']} dead letters, replayed {stats['replayed']}, skipped {stats['skipped']}")
+    if not execute:
+        print("\n⚠️  DRY RUN - Nothing replayed. Run with --execute to republish.")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay ScholarStream dead-lettered Kafka messages')
+    parser.add_argument('--execute', action='store_true', help='Actually republish (default is dry run)')
+    parser.add_argument('--topic', default=None, help='Only replay messages whose original topic matches')
+    parser.add_argument('--limit', type=int, default=None, help='Stop after this many dead letters')
+    args = parser.parse_args()
+
+    if KafkaConfig().use_local_broker:
+        # The local broker lives inside the API process: from here the DLQ would look empty,
+        # or (with LOCAL_BROKER_DIR) its segments and committed offsets would be overwritten
+        print("❌ DLQ replay needs a Confluent cluster; it can't run against the in-process local broker.")
+        sys.exit(1)
+
+    asyncio.run(main(args.execute, args.topic, args.limit))
@@ -0,0 +1,66 @@
+"""
+Stand-ins for Gemini models and streamed responses, shared by the LLM tests
+"""
+import asyncio
+from typing import List, Optional
+
+
+class FakeChunk:
+    """One streamed piece; None behaves like a chunk without text parts"""
+
+    def __init__(self, text: Optional[str]):
+        self._text = text
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            raise ValueError("chunk has no text parts")
+        return self._text
+
+
+class FakeStream:
+    """Streamed response made of the given pieces; can be rate limited mid-stream"""
+
+    def __init__(self, pieces: List[Optional[str]], fail_after: Optional[int] = None):
+        self.pieces = pieces
+        self.fail_after = fail_after
+        self.usage_metadata = None
+
+    @classmethod
+    def of(cls, text: str, size: int = 40) -> "FakeStream":
+        """The whole answer, in a few pieces"""
+        return cls([text[i:i + size] for i in range(0, len(text), size)])
+
+    async def __aiter__(self):
+        for i, piece in enumerate(self.pieces):
+            if i == self.fail_after:
+                raise RuntimeError("429 RESOURCE_EXHAUSTED mid-stream")
+            yield FakeChunk(piece)
+
+
+class FakeModel:
+    """Streams back answer(prompt); records prompts and peak concurrency"""
+
+    delay = 0.0
+
+    def __init__(self):
+        self.prompts: List[str] = []
+        self.active = 0
+        self.peak = 0
+
+    @property
+    def calls(self) -> int:
+        return len(self.prompts)
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        self.prompts.append(prompt)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return FakeStream.of(self.answer(prompt))
+
+    def answer(self, prompt: str) -> str:
+        raise NotImplementedError
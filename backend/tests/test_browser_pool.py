@@ -0,0 +1,100 @@
+"""
+Unit Tests for the Crawler Browser Context Pool
+"""
+import pytest
+from app.services.browser_pool import BrowserPool
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+        self.viewports = []
+        self.healthy = True
+
+    def is_closed(self):
+        return self.closed
+
+    async def set_viewport_size(self, viewport):
+        self.viewports.append(viewport)
+
+    async def set_extra_http_headers(self, headers):
+        pass
+
+    async def goto(self, url):
+        if not self.healthy:
+            raise RuntimeError("Target crashed")
+
+    async def evaluate(self, expression):
+        return 1
+
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.closed = False
+        self.routes = 0
+
+    async def new_page(self):
+        return self.page
+
+    async def route(self, pattern, handler):
+        self.routes += 1
+
+    async def new_cdp_session(self, page):
+        raise RuntimeError("CDP unavailable")
+
+    async def clear_cookies(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    contexts = []
+
+    async def factory():
+        contexts.append(FakeContext())
+        return contexts[-1]
+
+    async def route_handler(profile, route):
+        pass
+
+    pool = BrowserPool(factory, route_handler, ["UA"], [{'width': 1366, 'height': 768}],
+                       max_contexts=2, mb_per_context=1, **kwargs)
+    return pool, contexts
+
+
+class TestBrowserPool:
+    """Test suite for warm context leasing, recycling and health checks"""
+
+    @pytest.mark.asyncio
+    async def test_contexts_are_reused_warm(self):
+        """Sequential leases share one context; routes are registered once"""
+        pool, contexts = make_pool(max_uses=10)
+        for _ in range(3):
+            async with pool.lease("fetch") as page:
+                assert page.viewports
+        assert len(contexts) == 1
+        assert contexts[0].routes == 1
+        assert pool.get_stats()['warm_hits'] == 2
+
+    @pytest.mark.asyncio
+    async def test_recycled_after_max_uses(self):
+        """A context is closed once it reaches max_uses"""
+        pool, contexts = make_pool(max_uses=2)
+        for _ in range(3):
+            async with pool.lease() as page:
+                pass
+        assert contexts[0].closed
+        assert len(contexts) == 2
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_context_is_dropped(self):
+        """A page that fails the release health check is not returned to the pool"""
+        pool, contexts = make_pool(max_uses=10)
+        async with pool.lease() as page:
+            page.healthy = False
+        assert contexts[0].closed
+        assert pool.get_stats()['idle_contexts'] == 0
+        assert pool.get_stats()['health_check_failures'] == 1
@@ -0,0 +1,81 @@
+"""
+Unit Tests for Opportunity Change Data Capture
+"""
+import pytest
+from app.services import flink_processor
+from app.services.kafka_config import KafkaConfig
+from app.services.change_capture import material_fields, diff_fields, build_update_event
+from app.services.flink_processor import CortexFlinkProcessor
+
+
+HACKATHON = {
+    "url": "https://devpost.com/hackathons/global-ai",
+    "name": "Global AI Hackathon",
+    "organization": "OpenBuild",
+    "amount": 10000,
+    "deadline": "2025-12-01",
+}
+
+
+class TestChangeCapture:
+    """Test suite for material-field digests and update deltas"""
+
+    def test_missing_fields_are_not_changes(self):
+        """A sparse re-sighting keeps the stored values"""
+        previous = material_fields(HACKATHON)
+        merged, changes = diff_fields(previous, material_fields({"name": "Global AI Hackathon"}))
+        assert changes == {}
+        assert merged == previous
+
+    def test_changed_amount_and_deadline_produce_delta(self):
+        """Only the fields that moved appear in the delta"""
+        updated = dict(HACKATHON, amount="25000", deadline="2025-12-15T00:00:00Z")
+        merged, changes = diff_fields(material_fields(HACKATHON), material_fields(updated))
+        assert changes == {
+            "amount": {"old": 10000.0, "new": 25000.0},
+            "deadline": {"old": "2025-12-01", "new": "2025-12-15"},
+        }
+        delta = build_update_event("opp_1", updated, changes, detected_at=1.0)
+        assert delta["patch"] == {"amount": "25000", "deadline": "2025-12-15T00:00:00Z"}
+
+    @pytest.mark.asyncio
+    async def test_processor_emits_update_instead_of_dropping(self, tmp_path, monkeypatch):
+        """A known id with a new prize pool is published to opportunity.updated.v1"""
+        published = []
+        monkeypatch.setattr(
+            flink_processor.kafka_producer_manager, "publish_to_stream",
+            lambda topic, key, value, **kwargs: published.append((topic, value)) or True
+        )
+        processor = CortexFlinkProcessor(state_dir=str(tmp_path))
+
+        assert await processor.process_event(dict(HACKATHON)) is not None
+        assert await processor.process_event(dict(HACKATHON)) is None
+        assert not [topic for topic, _ in published if topic == KafkaConfig.TOPIC_OPPORTUNITY_UPDATED]
+
+        assert await processor.process_event(dict(HACKATHON, amount=20000)) is None
+        updates = [value for topic, value in published if topic == KafkaConfig.TOPIC_OPPORTUNITY_UPDATED]
+        assert len(updates) == 1
+        assert updates[0]["changes"] == {"amount": {"old": 10000.0, "new": 20000.0}}
+
+        stats = processor.get_stats()
+        assert stats["updates_emitted"] == 1
+        assert stats["duplicates_dropped"] == 1
+        processor.close()
+
+    @pytest.mark.asyncio
+    async def test_digests_survive_reshard(self, tmp_path, monkeypatch):
+        """The first sighting after a parallelism change is compared with the fields from before it"""
+        published = []
+        monkeypatch.setattr(
+            flink_processor.kafka_producer_manager, "publish_to_stream",
+            lambda topic, key, value, **kwargs: published.append((topic, value)) or True
+        )
+        processor = CortexFlinkProcessor(state_dir=str(tmp_path), parallelism=1)
+        assert await processor.process_event(dict(HACKATHON)) is not None
+        await processor.stop()
+
+        resharded = CortexFlinkProcessor(state_dir=str(tmp_path), parallelism=3)
+        assert await resharded.process_event(dict(HACKATHON, amount=20000)) is None
+        updates = [value for topic, value in published if topic == KafkaConfig.TOPIC_OPPORTUNITY_UPDATED]
+        assert [update["changes"] for update in updates] == [{"amount": {"old": 10000.0, "new": 20000.0}}]
+        await resharded.stop()
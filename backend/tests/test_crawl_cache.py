@@ -0,0 +1,101 @@
+"""
+Unit Tests for the Crawl Cache (validators + content-hash skip)
+"""
+import asyncio
+import sys
+import types
+from concurrent.futures import Future
+
+import httpx
+import pytest
+from app.services import crawler_service as crawler_module
+from app.services import tiered_fetcher as tiered_fetcher_module
+from app.services.cortex.frontier import CrawlFrontier
+from app.services.crawl_cache import CrawlCache, content_hash
+from app.services.tiered_fetcher import TieredFetcher
+
+PAGE = "<html><head><script>var t = 1;</script></head><body><h1>Grants</h1>" + "<p>Listing</p>" * 200 + "</body></html>"
+
+
+class TestCrawlCache:
+    """Test suite for conditional re-crawl state"""
+
+    def test_hash_ignores_markup_and_scripts(self):
+        """Rotating script nonces and whitespace don't count as changes"""
+        reshuffled = PAGE.replace("var t = 1;", "var t = 2;").replace("<h1>", "<h1 class='x'>\n")
+        assert content_hash(PAGE) == content_hash(reshuffled)
+        assert content_hash(PAGE) != content_hash(PAGE.replace("Grants", "Bounties"))
+
+    def test_unchanged_page_skipped_until_expiry(self, tmp_path):
+        """Same content is skipped while fresh and re-sent once the entry is stale"""
+        cache = CrawlCache(state_dir=str(tmp_path), max_age_seconds=3600)
+        url = "https://example.org/grants"
+        assert not cache.is_unchanged(url, PAGE)
+        cache.record_sent(url, PAGE, {'etag': '"v1"', 'last_modified': None})
+
+        assert cache.is_unchanged(url, PAGE)
+        assert cache.conditional_headers(url) == {'If-None-Match': '"v1"'}
+
+        expired = CrawlCache(state_dir=str(tmp_path), max_age_seconds=0)
+        assert not expired.is_unchanged(url, PAGE)
+        assert expired.conditional_headers(url) == {}
+
+    @pytest.mark.asyncio
+    async def test_conditional_request_returns_not_modified(self, tmp_path, monkeypatch):
+        """Stored validators are sent and a 304 comes back as not_modified"""
+        cache = CrawlCache(state_dir=str(tmp_path))
+        monkeypatch.setattr(tiered_fetcher_module, "crawl_cache", cache)
+        url = "https://example.org/grants"
+        cache.record_sent(url, PAGE, {'etag': '"v1"'})
+
+        def handler(request):
+            if request.headers.get('if-none-match') == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, headers={'content-type': 'text/html', 'etag': '"v2"'}, text=PAGE)
+
+        fetcher = TieredFetcher(state_dir=str(tmp_path), min_text_chars=100)
+        fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        page, reason = await fetcher.try_http(url, conditional=True)
+        assert reason is None and page.not_modified
+        assert cache.get_stats()['not_modified'] == 1
+
+        page, _ = await fetcher.try_http(url)
+        assert page.status == 200 and page.validators['etag'] == '"v2"'
+
+    @pytest.mark.asyncio
+    async def test_page_recorded_only_after_kafka_ack(self, tmp_path, monkeypatch):
+        """A page counts as sent once its delivery report succeeds; failures and the fallback are retried"""
+        cache = CrawlCache(state_dir=str(tmp_path))
+        monkeypatch.setattr(crawler_module, "crawl_cache", cache)
+        monkeypatch.setattr(crawler_module, "crawl_frontier", CrawlFrontier(state_dir=str(tmp_path)))
+        monkeypatch.setattr(crawler_module.crawler_service, "kafka_initialized", True)
+        monkeypatch.setattr(crawler_module.crawler_service, "spool_dir", None)
+
+        fallback = []
+
+        async def process_raw_event(key, value):
+            fallback.append(key)
+
+        monkeypatch.setitem(sys.modules, "app.services.cortex.refinery", types.SimpleNamespace(
+            refinery_service=types.SimpleNamespace(process_raw_event=process_raw_event)
+        ))
+        futures = []
+        monkeypatch.setattr(crawler_module.kafka_producer_manager, "publish_many",
+                            lambda topic, messages: futures.append(Future()) or [futures[-1]])
+
+        acked = "https://example.org/acked"
+        task = asyncio.create_task(crawler_module.crawler_service._process_success(acked, PAGE, "t", "general"))
+        await asyncio.sleep(0.05)
+        assert not cache.is_unchanged(acked, PAGE)  # Enqueued, not yet acknowledged
+        futures[-1].set_result((0, 1))
+        await task
+        assert cache.is_unchanged(acked, PAGE)
+
+        failed = "https://example.org/failed"
+        task = asyncio.create_task(crawler_module.crawler_service._process_success(failed, PAGE, "t", "general"))
+        await asyncio.sleep(0.05)
+        futures[-1].set_exception(RuntimeError("broker down"))
+        await task
+        assert fallback == [failed]
+        assert not cache.is_unchanged(failed, PAGE)
@@ -0,0 +1,54 @@
+"""
+Tests for the multi-process crawler worker pool
+"""
+import os
+import pytest
+
+from app.services.crawler_workers import CrawlerWorkerPool, read_spool, shard_by_host, write_spool
+
+
+async def fake_crawl(urls, intent, spool_dir):
+    """Stand-in job: spools one payload per url, like a worker without a shared broker"""
+    refs = [write_spool(spool_dir, {"url": url, "intent": intent, "pid": os.getpid()}) for url in urls]
+    return {"urls": len(urls), "hosts": len({u.split("/")[2] for u in urls}), "seconds": 0.1}, refs
+
+
+class TestCrawlerWorkers:
+    """Host sharding, spooled results and the process pool"""
+
+    def test_shard_by_host_is_stable_and_keeps_hosts_together(self):
+        """Every url of a host goes to the same shard, on every call"""
+        urls = [f"https://{host}.example/{i}" for host in ("a", "b", "c", "d", "e") for i in range(3)]
+        shards = shard_by_host(urls, 3)
+        assert sorted(u for shard in shards for u in shard) == sorted(urls)
+        for shard in shards:
+            for url in shard:
+                host = url.split("/")[2]
+                assert all(u in shard for u in urls if u.split("/")[2] == host)
+        assert shard_by_host(urls, 3) == shards
+
+    def test_spool_round_trip_removes_file(self, tmp_path):
+        """A spooled payload is read back once and the file is deleted"""
+        path = write_spool(str(tmp_path), {"url": "https://a.example", "html": "<p>x</p>"})
+        assert read_spool(path) == {"url": "https://a.example", "html": "<p>x</p>"}
+        assert not os.path.exists(path)
+        assert read_spool(path) is None
+
+    @pytest.mark.asyncio
+    async def test_pool_runs_jobs_in_worker_processes(self, tmp_path):
+        """Shards are crawled in separate processes and summaries merged"""
+        pool = CrawlerWorkerPool(processes=2, job_target=f"{__name__}:fake_crawl",
+                                 spool_dir=str(tmp_path), shared_broker=False)
+        pool.start()
+        try:
+            urls = [f"https://host{i}.example/list" for i in range(6)]
+            shards = shard_by_host(urls, 2)
+            outcomes = [await pool._submit(i, shard, "test") for i, shard in enumerate(shards) if shard]
+            assert sum(summary["urls"] for summary, _ in outcomes) == 6
+            payloads = [read_spool(ref) for _, refs in outcomes for ref in refs]
+            assert sorted(p["url"] for p in payloads) == sorted(urls)
+            assert os.getpid() not in {p["pid"] for p in payloads}
+            assert pool.get_stats()["processes"] == 2
+        finally:
+            pool.stop()
+        assert not pool.running
@@ -0,0 +1,74 @@
+"""
+Unit Tests for the Cortex Dedup Store (Bloom filter + exact on-disk id set)
+"""
+import os
+import pytest
+from app.services.dedup_store import DedupStore, ScalableBloomFilter
+from app.services.flink_processor import CortexFlinkProcessor
+
+
+class TestDedupStore:
+    """Test suite for probabilistic, persistent deduplication state"""
+
+    def test_add_reports_new_ids_once(self, tmp_path):
+        """add() is True for a new id and False afterwards"""
+        store = DedupStore(state_dir=str(tmp_path), capacity=100, error_rate=0.01)
+        assert store.add("opp_1") is True
+        assert store.add("opp_1") is False
+        assert store.contains("opp_1")
+        assert not store.contains("opp_2")
+
+    def test_filter_grows_and_stays_exact(self, tmp_path):
+        """Past its initial capacity the filter adds slices; lookups remain exact"""
+        store = DedupStore(state_dir=str(tmp_path), capacity=50, error_rate=0.01, snapshot_every=10_000)
+        for i in range(500):
+            assert store.add(f"opp_{i}")
+
+        stats = store.get_stats()
+        assert stats['ids'] == 500
+        assert stats['filter_slices'] > 1
+        assert not any(store.contains(f"other_{i}") for i in range(500))
+
+    def test_memory_is_bounded(self):
+        """Growth stops at the byte budget instead of allocating new slices"""
+        bloom = ScalableBloomFilter(initial_capacity=100, error_rate=0.01, max_bytes=1024)
+        for i in range(5000):
+            bloom.add(f"k{i}")
+        assert bloom.size_bytes <= 1024
+        assert "k42" in bloom
+
+    def test_restore_from_snapshot_and_replay(self, tmp_path):
+        """Ids written after the last snapshot are replayed from the exact set on restart"""
+        store = DedupStore(state_dir=str(tmp_path), capacity=100, error_rate=0.01, snapshot_every=10_000)
+        store.add("before_snapshot")
+        store.snapshot()
+        store.add("after_snapshot")
+        store._conn.close()  # Simulate a crash: no final snapshot
+
+        restored = DedupStore(state_dir=str(tmp_path), capacity=100, error_rate=0.01)
+        assert restored.contains("before_snapshot")
+        assert restored.contains("after_snapshot")
+        assert len(restored) == 2
+
+    def test_corrupt_snapshot_is_rebuilt(self, tmp_path):
+        """An unreadable snapshot falls back to rebuilding from the exact set"""
+        store = DedupStore(state_dir=str(tmp_path), capacity=100, error_rate=0.01)
+        store.add("opp_1")
+        store.close()
+        with open(os.path.join(str(tmp_path), "dedup.bloom"), 'wb') as f:
+            f.write(b"garbage")
+
+        restored = DedupStore(state_dir=str(tmp_path), capacity=100, error_rate=0.01)
+        assert restored.contains("opp_1")
+
+    @pytest.mark.asyncio
+    async def test_processor_dedup_survives_restart(self, tmp_path):
+        """The stream processor drops an event it saw before a restart"""
+        event = {"url": "http://test.com", "name": "Test Scholarship"}
+        processor = CortexFlinkProcessor(state_dir=str(tmp_path))
+        assert await processor.process_event(dict(event)) is not None
+        processor.close()
+
+        restarted = CortexFlinkProcessor(state_dir=str(tmp_path))
+        assert await restarted.process_event(dict(event)) is None
+        restarted.close()
@@ -0,0 +1,113 @@
+"""
+Unit Tests for the Yield-Aware Crawl Frontier
+"""
+import asyncio
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from app.services import enrichment_worker as worker_module
+from app.services import flink_processor as flink_module
+from app.services.cortex.frontier import CrawlFrontier, priority
+from app.services.flink_processor import CortexFlinkProcessor
+
+
+def make_frontier(tmp_path):
+    return CrawlFrontier(state_dir=str(tmp_path), base_interval_seconds=1800, max_backoff_seconds=86400)
+
+
+class TestCrawlFrontier:
+    """Test suite for prioritization, budgets and backoff"""
+
+    def test_priority_prefers_yield_per_second(self):
+        """Unexplored targets come first, then new opportunities per crawl-second"""
+        now = time.time()
+        cheap = {'crawls': 3, 'yield_ewma': 4.0, 'cost_ewma': 2.0}
+        slow = {'crawls': 3, 'yield_ewma': 4.0, 'cost_ewma': 20.0}
+        urgent = dict(slow, deadline_ts=now + 86400)
+        assert priority({'crawls': 0}, now) == float('inf')
+        assert priority(cheap, now) > priority(urgent, now) > priority(slow, now)
+
+    def test_select_respects_budget_and_priority(self, tmp_path):
+        """Selection follows priority and stops at the estimated-cost budget"""
+        frontier = make_frontier(tmp_path)
+        urls = [f"https://site{i}.example/" for i in range(4)]
+        frontier.register(urls, source="patrol")
+        for i, url in enumerate(urls):
+            frontier.record_crawl(url, cost_seconds=10.0, ok=True)
+            frontier.record_yield(url, new_count=i)
+        # Make everything due again
+        for url in urls:
+            frontier._update(url, next_due_at=0)
+
+        selected = frontier.select(budget_seconds=25, source="patrol")
+        assert selected == [urls[3], urls[2]]
+
+    def test_unproductive_targets_back_off(self, tmp_path):
+        """Each empty crawl doubles the revisit delay; a productive one resets it"""
+        frontier = make_frontier(tmp_path)
+        url = "https://quiet.example/"
+        frontier.register([url], source="patrol")
+        now = 1_000_000.0
+
+        frontier.record_change(url, changed=False, now=now)
+        frontier.record_yield(url, new_count=0, now=now)
+        target = frontier.get(url)
+        assert target['backoff_level'] == 2
+        assert target['next_due_at'] == now + 1800 * 4
+        assert frontier.select(source="patrol", now=now + 1800) == []
+
+        frontier.record_yield(url, new_count=3, now=now)
+        assert frontier.get(url)['backoff_level'] == 0
+        assert frontier.select(source="patrol", now=now + 1800) == [url]
+
+    @pytest.mark.asyncio
+    async def test_enrichment_batch_records_page_yield(self, tmp_path, monkeypatch):
+        """The main consumer reports new opportunities and the nearest deadline for each crawled page"""
+        frontier = make_frontier(tmp_path)
+        structured_page, llm_page = "https://board.example/", "https://grants.example/"
+        frontier.register([structured_page, llm_page], source="patrol")
+        monkeypatch.setattr(worker_module, "crawl_frontier", frontier)
+
+        processor = CortexFlinkProcessor(state_dir=str(tmp_path / "cortex"))
+        monkeypatch.setattr(flink_module, "cortex_processor", processor)
+        seen = {"title": "Old Grant", "organization": "Fund", "url": "https://grants.example/old"}
+        assert await processor.process_event(dict(seen)) is not None
+
+        deadline = int(time.time()) + 86400
+        listings = [
+            {"id": f"opp_{n}", "name": f"Bounty {n}", "source_url": f"https://board.example/b/{n}",
+             "deadline_timestamp": deadline + n}
+            for n in range(2)
+        ]
+
+        async def stream_pages(items):
+            yield 0, dict(seen, deadline="2020-01-01")
+            yield 0, {"title": "New Grant", "organization": "Fund", "url": "https://grants.example/new"}
+
+        monkeypatch.setattr(worker_module.ai_enrichment_service, "stream_pages", stream_pages)
+        downstream = []
+
+        def publish_many(topic, messages):
+            # The Cortex consumer picks each message up right away and marks it seen
+            downstream.extend(
+                asyncio.ensure_future(processor.process_event(dict(value['enriched_data']))) for _, value in messages
+            )
+            acked = Future()
+            acked.set_result((0, len(downstream)))
+            return [acked]
+
+        monkeypatch.setattr(worker_module.kafka_producer_manager, "publish_many", publish_many)
+
+        await worker_module.EnrichmentWorker()._process_batch([
+            {"url": structured_page, "structured_opportunities": listings},
+            {"url": llm_page, "html": "<html>grants</html>"},
+        ])
+
+        board = frontier.get(structured_page)
+        assert board['new_total'] == 2 and board['deadline_ts'] == deadline
+        grants = frontier.get(llm_page)
+        assert grants['new_total'] == 1 and grants['deadline_ts'] is None
+        await asyncio.gather(*downstream)
+        await processor.stop()
@@ -0,0 +1,47 @@
+"""
+Tests for the lxml HTML cleaner
+"""
+import pytest
+
+from app.config import settings
+from app.utils import html_cleaner
+from app.utils.html_cleaner import clean_html, clean_html_async
+
+PAGE = """<!DOCTYPE html><html><head><title>Open  Hackathons</title>
+<style>.card{color:red}</style><script src="/app.js"></script>
+<script type="application/ld+json">{"@type": "Event", "name": "Hack"}</script></head>
+<body><nav><a href="/login">Log in</a></nav>
+<div class="card"><h3>Solana   Grizzlython</h3><p>$5,000 in prizes</p>
+<a href="https://example.test/grizzlython">View</a><svg><path d="M0"/></svg></div>
+<!-- tracking --><script>window.analytics = {};</script>
+<script id="__NEXT_DATA__" type="application/json">{"props": {"pageProps": {}}}</script>
+<footer>Copyright</footer></body></html>"""
+
+
+class TestHtmlCleaner:
+    """Compact text-with-links that keeps hydration JSON"""
+
+    def test_drops_non_content_and_keeps_hydration(self):
+        """Styles, scripts, nav, footer and comments go; JSON-LD and __NEXT_DATA__ stay"""
+        cleaned = clean_html(PAGE)
+        for junk in ("color:red", "analytics", "Log in", "Copyright", "tracking", "M0", "/app.js"):
+            assert junk not in cleaned
+        assert '<script type="application/ld+json">{"@type": "Event", "name": "Hack"}</script>' in cleaned
+        assert '<script id="__NEXT_DATA__" type="application/json">{"props": {"pageProps": {}}}</script>' in cleaned
+
+    def test_text_with_links_and_collapsed_whitespace(self):
+        """Blocks become lines, whitespace collapses and hrefs follow their link text"""
+        lines = clean_html(PAGE).splitlines()
+        assert lines[0] == "Open Hackathons"
+        assert "Solana Grizzlython" in lines
+        assert "$5,000 in prizes" in lines
+        assert "View (https://example.test/grizzlython)" in lines
+
+    @pytest.mark.asyncio
+    async def test_async_matches_sync_and_passes_json_through(self, monkeypatch):
+        """The off-loop variant returns the same output; JSON documents are untouched"""
+        monkeypatch.setattr(settings, "html_cleaner_workers", 0)
+        monkeypatch.setattr(html_cleaner, "_pool", None)
+        assert await clean_html_async(PAGE) == clean_html(PAGE)
+        assert clean_html('  {"items": [1, 2]}') == '{"items": [1, 2]}'
+        assert clean_html("x" * 10, max_chars=5) == "xxxxx"
@@ -0,0 +1,53 @@
+"""
+Tests for the shared hydration extractors
+"""
+import json
+
+from app.utils.hydration import (
+    extract_hydration, extract_json_ld, extract_next_data, extract_nuxt_state, find_objects, first_list, get_path
+)
+
+
+def page(*scripts):
+    return "<html><head>" + "".join(scripts) + "</head><body><div id='app'></div></body></html>"
+
+
+class TestHydration:
+    """Locating hydration blobs and searching them without the LLM"""
+
+    def test_next_data_objects_found_once_without_nested_matches(self):
+        """Listings are found anywhere, deduped by key, and their sponsors are not counted"""
+        data = {"props": {"pageProps": {"dehydratedState": {"queries": [
+            {"state": {"data": {"items": [
+                {"slug": "alpha", "name": "Alpha", "organization": {"slug": "acme", "name": "Acme"}},
+                {"slug": "beta", "name": "Beta"},
+            ]}}},
+            {"state": {"data": [{"slug": "alpha", "name": "Alpha (again)"}]}},
+        ]}}}}
+        html = page(f'<script type="application/json" id="__NEXT_DATA__">{json.dumps(data)}</script>')
+        next_data = extract_next_data(html)
+
+        found = find_objects(next_data, lambda o: 'slug' in o and 'name' in o, key='slug')
+        assert [o['name'] for o in found] == ["Alpha", "Beta"]
+        assert first_list(next_data, ["props.pageProps.challenges", "props.pageProps.dehydratedState.queries"])
+        assert get_path(next_data, "props.pageProps.dehydratedState.queries.1.state.data.0.slug") == "alpha"
+        assert get_path(next_data, "props.missing.path", []) == []
+
+    def test_nuxt3_devalue_payload_is_unflattened(self):
+        """__NUXT_DATA__ index references resolve into plain objects"""
+        flat = [["Reactive", 1], {"data": 2}, {"bounties": 3}, [4, 5],
+                {"slug": 6, "title": 7}, {"slug": 8, "title": 9}, "one", "First", "two", "Second"]
+        html = page(f'<script type="application/json" id="__NUXT_DATA__" data-ssr="true">{json.dumps(flat)}</script>')
+        state = extract_nuxt_state(html)
+        assert state == {"data": {"bounties": [{"slug": "one", "title": "First"}, {"slug": "two", "title": "Second"}]}}
+
+    def test_json_ld_graph_flattened_and_bad_blobs_ignored(self):
+        """@graph entries become documents; malformed JSON never raises"""
+        graph = {"@context": "https://schema.org", "@graph": [{"@type": "Event", "name": "Hack"}, {"@type": "Organization"}]}
+        html = page(
+            f'<script type="application/ld+json">{json.dumps(graph)}</script>',
+            '<script type="application/ld+json">{not json</script>',
+            '<script id="__NEXT_DATA__" type="application/json">{broken</script>',
+        )
+        assert [d["@type"] for d in extract_json_ld(html)] == ["Event", "Organization"]
+        assert set(extract_hydration(html)) == {"json_ld"}
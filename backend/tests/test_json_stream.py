@@ -0,0 +1,187 @@
+"""
+Tests for the incremental JSON array parser and streamed Reader extraction
+"""
+import asyncio
+from concurrent.futures import Future
+
+import pytest
+
+from app.config import settings
+from app.services import ai_enrichment_service as enrichment_module
+from app.services import enrichment_worker as worker_module
+from app.services import flink_processor as flink_module
+from app.services.cortex import reader_llm as reader_module
+from app.services.cortex.frontier import CrawlFrontier
+from app.services.flink_processor import CortexFlinkProcessor
+from app.services.llm_cache import LLMResultCache
+from app.services.llm_gateway import LLMGateway
+from app.utils import html_cleaner
+from app.utils.json_utils import JSONArrayStream
+from llm_fakes import FakeChunk, FakeStream
+
+
+def feed_in_pieces(text: str, size: int):
+    parser = JSONArrayStream()
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return items, parser.complete
+
+
+class GatedStream:
+    """Sends the first item, then holds the rest of the array until released"""
+
+    def __init__(self, first: str, rest: str, release: asyncio.Event):
+        self.first, self.rest, self.release = first, rest, release
+        self.usage_metadata = None
+
+    async def __aiter__(self):
+        yield FakeChunk(self.first)
+        await self.release.wait()
+        yield FakeChunk(self.rest)
+
+
+class GatedModel:
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, stream=False, generation_config=None):
+        self.calls += 1
+        item = '{{"title": "Card {n}", "organization": "Org", "source_url": "https://example.test/c/{n}"}}'
+        return GatedStream(
+            "```json\n[" + item.format(n=0) + ",",
+            ",\n".join(item.format(n=n) for n in range(1, 5)) + ",\n]\n```",
+            self.release
+        )
+
+
+class GatedDiscoveryModel(GatedModel):
+    """Discovery answer whose second half repeats Card 0 with the deadline the first copy lacked"""
+
+    async def generate_content_async(self, prompt, stream=False, generation_config=None):
+        self.calls += 1
+        item = '{{"page": 1, "title": "Card {n}", "url": "https://example.test/c/{n}"{extra}}}'
+        return GatedStream(
+            "[" + item.format(n=0, extra="") + ",",
+            item.format(n=0, extra=', "deadline": "2030-01-01"') + ", " + item.format(n=1, extra="") + "]",
+            self.release
+        )
+
+
+class TestJSONArrayStream:
+    """Elements come out as they close, whatever the chunking"""
+
+    def test_elements_are_independent_of_chunk_boundaries(self):
+        """Brackets and escaped quotes inside strings don't confuse the scanner"""
+        text = '[{"title": "Prize ]} \\"pool\\"", "tags": ["a", "b"]}, {"nested": {"deep": [1, {"x": 2}]}}]'
+        expected = [{"title": 'Prize ]} "pool"', "tags": ["a", "b"]}, {"nested": {"deep": [1, {"x": 2}]}}]
+        for size in (1, 2, 7, len(text)):
+            assert feed_in_pieces(text, size) == (expected, True)
+
+    def test_tolerates_fences_trailing_commas_and_truncation(self):
+        """Code fences and trailing commas are ignored; a truncated array keeps its closed items"""
+        fenced = 'Sure! ```json\n[\n  {"a": 1, "b": [1, 2,],},\n  {"a": 2},\n]\n```'
+        assert feed_in_pieces(fenced, 5) == ([{"a": 1, "b": [1, 2]}, {"a": 2}], True)
+
+        assert feed_in_pieces('Sure [as requested]: [{"a": 1}]', 3) == ([{"a": 1}], True)
+        assert feed_in_pieces('Nothing found: [ ]', 3) == ([], True)
+        assert feed_in_pieces('{"a": 1}', 3) == ([{"a": 1}], True)
+        assert feed_in_pieces('[{"a": 1}, {"a": "unterminat', 4) == ([{"a": 1}], False)
+        assert feed_in_pieces('[{"a": 1 "b": 2}, {"a": 3}]', 4) == ([{"a": 3}], True)
+
+    @pytest.mark.asyncio
+    async def test_reader_yields_opportunities_before_the_array_closes(self, monkeypatch, tmp_path):
+        """The first opportunity is validated while the model is still writing; complete answers are cached"""
+        monkeypatch.setattr(settings, "gemini_api_key", "test-key")
+        monkeypatch.setattr(settings, "html_cleaner_workers", 0)
+        monkeypatch.setattr(html_cleaner, "_pool", None)
+        monkeypatch.setattr(reader_module, "llm_cache", LLMResultCache(state_dir=str(tmp_path)))
+        model = GatedModel()
+        monkeypatch.setattr(reader_module, "llm_gateway", LLMGateway(tokens_per_minute=0, model_factory=lambda name: model))
+
+        html = "<html><body>" + "".join(
+            f'<div class="card"><h3>Card {n}</h3><p>$1,000 in prizes for building on the platform</p></div>'
+            for n in range(5)
+        ) + "</body></html>"
+        reader = reader_module.ReaderLLM()
+        stream = reader.stream_multiple(html, "https://example.test/")
+
+        first = await asyncio.wait_for(stream.__anext__(), 1.0)
+        assert first.name == "Card 0"
+        assert not model.release.is_set()
+
+        model.release.set()
+        rest = [opp.name async for opp in stream]
+        assert rest == [f"Card {n}" for n in range(1, 5)]
+
+        cached = await reader.parse_multiple(html, "https://example.test/")
+        assert len(cached) == 5
+        assert model.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_worker_publishes_while_streaming_and_updates_merged_copies(self, monkeypatch, tmp_path):
+        """The enrichment worker publishes each card as it closes; a richer overlap copy goes out as an update"""
+        monkeypatch.setattr(settings, "html_cleaner_workers", 0)
+        monkeypatch.setattr(html_cleaner, "_pool", None)
+        monkeypatch.setattr(enrichment_module, "llm_cache", LLMResultCache(state_dir=str(tmp_path)))
+        model = GatedDiscoveryModel()
+        monkeypatch.setattr(enrichment_module, "llm_gateway", LLMGateway(tokens_per_minute=0, model_factory=lambda name: model))
+        monkeypatch.setattr(worker_module, "crawl_frontier", CrawlFrontier(state_dir=str(tmp_path)))
+        processor = CortexFlinkProcessor(state_dir=str(tmp_path / "cortex"))
+        monkeypatch.setattr(flink_module, "cortex_processor", processor)
+        published = []
+
+        def publish_many(topic, messages):
+            published.extend(dict(value['enriched_data']) for _, value in messages)
+            acked = Future()
+            acked.set_result((0, len(published)))
+            return [acked]
+
+        monkeypatch.setattr(worker_module.kafka_producer_manager, "publish_many", publish_many)
+
+        html = "<html><body>" + "".join(
+            f'<div class="card"><h3>Card {n}</h3><p>$1,000 in prizes for building on the platform</p></div>'
+            for n in range(2)
+        ) + "</body></html>"
+        task = asyncio.create_task(
+            worker_module.EnrichmentWorker()._process_batch([{"url": "https://example.test/", "html": html}])
+        )
+        for _ in range(100):
+            if published:
+                break
+            await asyncio.sleep(0.01)
+        assert [opp["title"] for opp in published] == ["Card 0"]
+        assert not model.release.is_set()
+
+        model.release.set()
+        await task
+        assert [(opp["title"], opp.get("deadline")) for opp in published] == [
+            ("Card 0", None), ("Card 0", "2030-01-01"), ("Card 1", None)
+        ]
+        await processor.stop()
+
+    @pytest.mark.asyncio
+    async def test_reader_surfaces_llm_failures_instead_of_an_empty_page(self, monkeypatch, tmp_path):
+        """A rate limit mid-answer raises after the streamed cards, so the page is retried, not settled"""
+        monkeypatch.setattr(settings, "gemini_api_key", "test-key")
+        monkeypatch.setattr(settings, "html_cleaner_workers", 0)
+        monkeypatch.setattr(html_cleaner, "_pool", None)
+        cache = LLMResultCache(state_dir=str(tmp_path))
+        monkeypatch.setattr(reader_module, "llm_cache", cache)
+
+        class RateLimitedModel(GatedModel):
+            async def generate_content_async(self, prompt, stream=False, generation_config=None):
+                gated = await super().generate_content_async(prompt, stream, generation_config)
+                return FakeStream([gated.first, gated.rest], fail_after=1)
+
+        monkeypatch.setattr(reader_module, "llm_gateway",
+                            LLMGateway(tokens_per_minute=0, model_factory=lambda name: RateLimitedModel()))
+
+        html = '<html><body><div class="card"><h3>Card 0</h3><p>$1,000 in prizes</p></div></body></html>'
+        received = []
+        with pytest.raises(RuntimeError, match="429"):
+            async for opp in reader_module.ReaderLLM().stream_multiple(html, "https://example.test/"):
+                received.append(opp.name)
+        assert received == ["Card 0"]
+        assert cache.get_stats()["entries"] == 0
@@ -0,0 +1,147 @@
+"""
+Unit Tests for batch publishing and delivery metrics on KafkaProducerManager
+"""
+import asyncio
+import json
+import pytest
+from confluent_kafka import KafkaException
+
+from app.services import enrichment_worker as worker_module
+from app.services import flink_processor as flink_module
+from app.services.cortex.frontier import CrawlFrontier
+from app.services.flink_processor import CortexFlinkProcessor
+from app.services.kafka_config import KafkaProducerManager
+
+
+class FakeMessage:
+    def __init__(self, topic, partition=0, offset=0):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+
+class StubProducer:
+    """Records produce() calls; tests fire the delivery callbacks by hand"""
+
+    def __init__(self, buffer_full_once=False):
+        self.produced = []
+        self.buffer_full_once = buffer_full_once
+        self.polls = 0
+
+    def produce(self, topic, key, value, callback, headers=None):
+        if self.buffer_full_once:
+            self.buffer_full_once = False
+            raise BufferError("queue full")
+        self.produced.append({'topic': topic, 'key': key, 'value': value, 'callback': callback})
+
+    def poll(self, timeout):
+        self.polls += 1
+        return 0
+
+    def __len__(self):
+        return len(self.produced)
+
+    def deliver(self, index, err=None, offset=0):
+        record = self.produced[index]
+        record['callback'](err, FakeMessage(record['topic'], offset=offset))
+
+
+@pytest.fixture
+def manager():
+    manager = KafkaProducerManager()
+    manager._producer = StubProducer()
+    manager._is_initialized = True
+    return manager
+
+
+class TestKafkaProducerManager:
+    """Delivery futures and producer counters"""
+
+    def test_publish_many_futures_resolve_from_delivery_reports(self, manager):
+        """Each message's future carries its offset, or the delivery error"""
+        futures = manager.publish_many("topic.v1", [("a", {"n": 1}), ("b", {"n": 2})])
+        producer = manager._producer
+        assert [json.loads(p['value']) for p in producer.produced] == [{"n": 1}, {"n": 2}]
+        assert not any(f.done() for f in futures)
+
+        producer.deliver(0, offset=41)
+        producer.deliver(1, err="broker down")
+        assert futures[0].result() == (0, 41)
+        with pytest.raises(KafkaException):
+            futures[1].result()
+
+    def test_raising_callback_still_resolves_future(self, manager):
+        """A broken user callback can't leave an awaiting caller hanging"""
+        def broken(err, msg):
+            raise RuntimeError("callback bug")
+
+        future = manager.publish_many("topic.v1", [("a", {"n": 1})])[0]
+        manager._producer.produced[0]['callback'] = manager._tracking_callback(future, 10, broken)
+        manager._producer.deliver(0, offset=7)
+        assert future.result() == (0, 7)
+
+    def test_metrics_count_enqueues_deliveries_and_buffer_pressure(self, manager):
+        """Enqueued/delivered/failed counters, bytes, and a full queue parked for the poller thread"""
+        manager._producer = StubProducer(buffer_full_once=True)
+        assert manager.publish_to_stream("topic.v1", "k", {"n": 1})
+        manager.publish_many("topic.v1", [("a", {"n": 2}), ("b", {"n": 3})])
+        assert manager._producer.produced == []  # Later messages wait behind the parked one
+        assert manager.get_metrics()['messages_enqueued'] == 0
+
+        manager._drain_backlog()
+        assert [json.loads(p['value'])['n'] for p in manager._producer.produced] == [1, 2, 3]
+        manager._producer.deliver(0)
+        manager._producer.deliver(1)
+        manager._producer.deliver(2, err="timed out")
+
+        metrics = manager.get_metrics()
+        assert metrics['messages_enqueued'] == 3
+        assert metrics['messages_delivered'] == 2
+        assert metrics['messages_failed'] == 1
+        assert metrics['bytes_produced'] == sum(len(p['value']) for p in manager._producer.produced)
+        assert metrics['buffer_full_events'] == 1
+        assert manager._producer.polls == 0  # The caller never blocks on poll()
+        assert metrics['queue_depth'] == 3
+
+    def test_unavailable_producer_fails_futures_immediately(self):
+        """With Kafka disabled every future is already failed, so callers don't wait"""
+        manager = KafkaProducerManager()
+        manager.config.enabled = False
+        futures = manager.publish_many("topic.v1", [("a", {"n": 1})])
+        assert futures[0].done()
+        with pytest.raises(RuntimeError):
+            futures[0].result()
+
+    @pytest.mark.asyncio
+    async def test_enrichment_batch_waits_for_delivery_and_fails_on_loss(self, manager, monkeypatch, tmp_path):
+        """The worker settles a raw page only after its enriched messages are acked; a lost one fails the batch"""
+        monkeypatch.setattr(worker_module, "kafka_producer_manager", manager)
+        monkeypatch.setattr(worker_module, "crawl_frontier", CrawlFrontier(state_dir=str(tmp_path)))
+        processor = CortexFlinkProcessor(state_dir=str(tmp_path / "cortex"))
+        monkeypatch.setattr(flink_module, "cortex_processor", processor)
+        page = {"url": "https://board.example/", "structured_opportunities": [
+            {"id": f"opp_{n}", "name": f"Bounty {n}", "source_url": f"https://board.example/b/{n}"} for n in range(2)
+        ]}
+
+        batch = asyncio.create_task(worker_module.EnrichmentWorker()._process_batch([page]))
+        for _ in range(500):  # The first batch in a process pays for lazy imports
+            if len(manager._producer.produced) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert len(manager._producer.produced) == 2
+        assert not batch.done()  # Enqueued, waiting on the delivery reports
+
+        manager._producer.deliver(0)
+        manager._producer.deliver(1, err="message timed out")
+        with pytest.raises(RuntimeError, match="not delivered"):
+            await batch
+        await processor.stop()
@@ -0,0 +1,46 @@
+"""
+Tests for the LLM extraction result cache
+"""
+from app.services.llm_cache import LLMResultCache
+
+
+class TestLLMResultCache:
+    """Content-keyed reuse of Gemini extractions"""
+
+    def test_hit_requires_same_content_prompt_version_and_model(self, tmp_path):
+        """Only an identical call is served from cache"""
+        cache = LLMResultCache(state_dir=str(tmp_path), ttl_seconds=3600, max_bytes=10 ** 6)
+        key = LLMResultCache.key("reader", "v1", "gemini", "<p>page</p>", "https://a.example")
+        cache.put(key, [{"title": "Hack"}], prompt_chars=4000)
+
+        assert cache.get(key) == [{"title": "Hack"}]
+        for other in (
+            LLMResultCache.key("reader", "v2", "gemini", "<p>page</p>", "https://a.example"),
+            LLMResultCache.key("reader", "v1", "gemini-pro", "<p>page</p>", "https://a.example"),
+            LLMResultCache.key("reader", "v1", "gemini", "<p>page!</p>", "https://a.example"),
+        ):
+            assert cache.get(other) is None
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['misses'], stats['saved_prompt_chars']) == (1, 3, 4000)
+        cache.close()
+
+    def test_entries_expire_after_ttl(self, tmp_path):
+        """Expired entries miss and are removed"""
+        cache = LLMResultCache(state_dir=str(tmp_path), ttl_seconds=60, max_bytes=10 ** 6)
+        cache.put("k", [], now=1000.0)
+        assert cache.get("k", now=1059.0) == []
+        assert cache.get("k", now=1061.0) is None
+        assert cache.get_stats()['entries'] == 0
+        cache.close()
+
+    def test_size_budget_evicts_least_recently_used(self, tmp_path):
+        """Over budget, the entries used longest ago go first"""
+        cache = LLMResultCache(state_dir=str(tmp_path), ttl_seconds=3600, max_bytes=150)
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.put(key, ["x" * 100], now=1000.0 + i)
+        cache.get("a", now=1010.0)  # Recently used: survives
+
+        assert cache.evict(now=1020.0) == 2
+        assert cache.get("a", now=1021.0) is not None
+        assert cache.get("b", now=1021.0) is None and cache.get("c", now=1021.0) is None
+        cache.close()
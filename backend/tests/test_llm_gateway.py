@@ -0,0 +1,171 @@
+"""
+Tests for the LLM gateway's admission control and rate-limit backoff
+"""
+import asyncio
+
+import pytest
+
+from app.services.llm_gateway import LLMGateway
+from llm_fakes import FakeStream
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class BlockingModel:
+    """Each call waits until released, so tests can observe what is in flight"""
+
+    def __init__(self):
+        self.active = []
+        self.release = asyncio.Event()
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.active.append(prompt)
+        await self.release.wait()
+        self.active.remove(prompt)
+        return FakeResponse(prompt)
+
+
+class FlakyModel:
+    """Rate-limited a set number of times, then answers"""
+
+    def __init__(self, failures: int, error: str = "429 RESOURCE_EXHAUSTED"):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError(self.error)
+        return FakeResponse("ok")
+
+
+class StreamingModel:
+    """Rate-limited before streaming a set number of times; can also fail mid-stream"""
+
+    def __init__(self, chunks, failures=0, fail_after=None):
+        self.chunks = chunks
+        self.failures = failures
+        self.fail_after = fail_after
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        return FakeStream(self.chunks, self.fail_after)
+
+
+def gateway(model, **kwargs) -> LLMGateway:
+    options = dict(
+        limits={"interactive": 2, "field_mapping": 1, "background": 1},
+        tokens_per_minute=0,
+        retry_base_seconds=0,
+        model_factory=lambda name: model,
+    )
+    options.update(kwargs)
+    return LLMGateway(**options)
+
+
+class TestLLMGateway:
+    """Priority classes, token budget and 429 handling"""
+
+    @pytest.mark.asyncio
+    async def test_background_burst_does_not_block_interactive(self):
+        """Background calls queue behind their own cap while chat goes straight through"""
+        model = BlockingModel()
+        gw = gateway(model)
+        background = [asyncio.create_task(gw.generate(f"bg{i}", priority="background")) for i in range(3)]
+        await asyncio.sleep(0)
+        chat = asyncio.create_task(gw.generate("chat", priority="interactive"))
+        await asyncio.sleep(0.01)
+
+        assert sorted(model.active) == ["bg0", "chat"]
+        stats = gw.get_stats()["classes"]
+        assert stats["background"]["waiting"] == 2
+        assert stats["interactive"]["waiting"] == 0
+
+        model.release.set()
+        results = await asyncio.gather(chat, *background)
+        assert [r.text for r in results] == ["chat", "bg0", "bg1", "bg2"]
+
+    @pytest.mark.asyncio
+    async def test_token_reserve_is_kept_for_user_facing_classes(self):
+        """Background work can't spend the reserve; interactive can"""
+        now = [0.0]
+        gw = gateway(BlockingModel(), tokens_per_minute=1000, background_reserve=0.2, clock=lambda: now[0],
+                     limits={"interactive": 5, "field_mapping": 5, "background": 5})
+
+        async with gw.slot("background", tokens=700):
+            queued = gw.slot("background", tokens=200)
+            waiter = asyncio.create_task(queued.__aenter__())
+            await asyncio.sleep(0.01)
+            assert not waiter.done()  # 300 left, but 200 of it is reserved
+
+            async with gw.slot("interactive", tokens=250):
+                assert gw.get_stats()["tokens_available"] == 50
+
+            now[0] += 30.0  # Half a minute refills 500 tokens
+            gw._dispatch()
+            await asyncio.wait_for(waiter, 1.0)
+            assert gw.get_stats()["classes"]["background"]["in_flight"] == 2
+            await queued.__aexit__(None, None, None)
+
+    @pytest.mark.asyncio
+    async def test_oversize_background_request_is_admitted(self):
+        """A background prompt bigger than the unreserved budget is capped to it, not queued forever"""
+        now = [0.0]
+        gw = gateway(BlockingModel(), tokens_per_minute=10000, background_reserve=0.2, clock=lambda: now[0],
+                     limits={"interactive": 5, "field_mapping": 5, "background": 5})
+
+        big = gw.slot("background", tokens=9000)
+        await asyncio.wait_for(big.__aenter__(), 1.0)
+        assert gw.get_stats()["tokens_available"] == 2000  # Charged 8000; the reserve is untouched
+        await big.__aexit__(None, None, None)
+
+        now[0] += 60.0
+        gw._dispatch()
+        async with gw.slot("background", tokens=100):
+            assert gw.get_stats()["classes"]["background"]["in_flight"] == 1
+
+    @pytest.mark.asyncio
+    async def test_rate_limits_are_retried_and_other_errors_are_not(self):
+        """429s back off and retry; any other failure surfaces immediately"""
+        flaky = FlakyModel(failures=2)
+        gw = gateway(flaky)
+        response = await gw.generate("prompt", priority="interactive")
+        assert response.text == "ok"
+        assert flaky.calls == 3
+        assert gw.stats["interactive"]["rate_limited"] == 2
+
+        broken = FlakyModel(failures=5, error="400 invalid argument")
+        gw = gateway(broken)
+        with pytest.raises(RuntimeError, match="invalid argument"):
+            await gw.generate("prompt", priority="background")
+        assert broken.calls == 1
+        assert gw.stats["background"]["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_text_and_only_retries_before_first_chunk(self):
+        """Textless chunks are skipped; a 429 mid-stream surfaces instead of replaying the answer"""
+        model = StreamingModel(["Hel", None, "lo"], failures=1)
+        gw = gateway(model)
+        assert [text async for text in gw.stream("hi", priority="interactive")] == ["Hel", "lo"]
+        assert model.calls == 2
+        assert gw.stats["interactive"]["calls"] == 1
+        assert gw.get_stats()["classes"]["interactive"]["in_flight"] == 0
+
+        model = StreamingModel(["Hel", "lo"], fail_after=1)
+        gw = gateway(model)
+        received = []
+        with pytest.raises(RuntimeError, match="mid-stream"):
+            async for text in gw.stream("hi", priority="interactive"):
+                received.append(text)
+        assert received == ["Hel"]
+        assert model.calls == 1
+        assert gw.stats["interactive"]["failed"] == 1
+        assert gw.get_stats()["classes"]["interactive"]["in_flight"] == 0
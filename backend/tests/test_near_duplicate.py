@@ -0,0 +1,91 @@
+"""
+Unit Tests for Near-Duplicate Detection (SimHash + LSH)
+"""
+import pytest
+from app.services.near_duplicate import (
+    NearDuplicateIndex, simhash, opportunity_features, hamming_distance
+)
+from app.services.flink_processor import CortexFlinkProcessor
+
+
+DEVPOST_LISTING = {
+    "name": "Global AI Hackathon 2025",
+    "organization": "OpenBuild Foundation",
+    "amount": 10000,
+    "deadline": "2025-12-01",
+    "url": "https://devpost.com/hackathons/global-ai-2025",
+    "description": "Build AI tools that help students learn. Teams of up to four compete for prizes.",
+}
+
+MLH_LISTING = {
+    "title": "Global AI Hackathon 2025!",
+    "organization": "OpenBuild Foundation",
+    "amount": "10000",
+    "deadline": "2025-12-01",
+    "url": "https://mlh.io/events/global-ai-hackathon",
+    "description": "Build AI tools that help students learn. Teams of up to 4 compete for prizes.",
+}
+
+
+class TestNearDuplicate:
+    """Test suite for SimHash signatures and the LSH candidate index"""
+
+    def test_cross_site_listings_are_close(self):
+        """The same event from two sites lands within a few bits"""
+        a = simhash(opportunity_features(DEVPOST_LISTING))
+        b = simhash(opportunity_features(MLH_LISTING))
+        assert hamming_distance(a, b) <= 3
+
+    def test_index_finds_near_duplicate(self):
+        """A near-duplicate resolves to the id it was first indexed under"""
+        index = NearDuplicateIndex(max_distance=3)
+        index.add("opp_devpost", DEVPOST_LISTING)
+        assert index.find(MLH_LISTING) == "opp_devpost"
+
+    def test_unrelated_and_other_editions_not_matched(self):
+        """Different opportunities, or a different deadline, are not merged"""
+        index = NearDuplicateIndex(max_distance=3)
+        index.add("opp_devpost", DEVPOST_LISTING)
+
+        unrelated = {"name": "Women in STEM Scholarship", "organization": "Tech Fund",
+                     "amount": 2500, "description": "Support for undergraduate women in engineering."}
+        next_year = dict(MLH_LISTING, deadline="2026-12-01")
+        assert index.find(unrelated) is None
+        assert index.find(next_year) is None
+
+    def test_eviction_bounds_index(self):
+        """Oldest entries are evicted from entries, bands and fingerprints"""
+        index = NearDuplicateIndex(max_distance=3, max_entries=2)
+        for i in range(3):
+            index.add(f"opp_{i}", {"name": f"Scholarship number {i} for science"}, fingerprint=f"fp{i}")
+        assert len(index) == 2
+        assert index.find({}, fingerprint="fp0") is None
+        assert index.find({}, fingerprint="fp2") == "opp_2"
+
+    @pytest.mark.asyncio
+    async def test_processor_drops_cross_site_copy(self, tmp_path):
+        """The stream processor keeps the first listing and drops the copy"""
+        processor = CortexFlinkProcessor(state_dir=str(tmp_path))
+
+        assert await processor.process_event(dict(DEVPOST_LISTING)) is not None
+        assert await processor.process_event(dict(MLH_LISTING)) is None
+        assert processor.get_stats()['near_duplicates_dropped'] == 1
+        processor.close()
+
+    @pytest.mark.asyncio
+    async def test_processor_keeps_ids_and_reports_canonical(self, tmp_path):
+        """Upstream ids survive processing; a dropped copy names the listing it duplicates"""
+        processor = CortexFlinkProcessor(state_dir=str(tmp_path))
+
+        original = dict(DEVPOST_LISTING, id="devpost_global_ai_2025")
+        processed = await processor.process_event(original)
+        assert processed['id'] == "devpost_global_ai_2025"
+
+        copy = dict(MLH_LISTING, id="mlh_global_ai")
+        assert await processor.process_event(copy) is None
+        assert copy['id'] == "mlh_global_ai"
+        assert copy['canonical_id'] == processor.near_duplicates.find(DEVPOST_LISTING)
+
+        # The exact stage still keys on content, whatever id the next sighting carries
+        assert await processor.process_event(dict(DEVPOST_LISTING, id="other")) is None
+        processor.close()
@@ -0,0 +1,92 @@
+"""
+Tests for network-response capture and deterministic platform mapping
+"""
+import asyncio
+import json
+import pytest
+
+from app.models import OpportunitySchema
+from app.services.network_capture import NetworkCapture, PlatformMapper, find_items, map_payloads
+
+
+def transform_listing(item):
+    """Stand-in for a platform scraper transform"""
+    if not item.get("title"):
+        return None
+    return OpportunitySchema(
+        id=f"test_{item['slug']}",
+        title=item["title"],
+        name=item["title"],
+        organization="Test Platform",
+        source_url=f"https://example.test/{item['slug']}",
+        source_type="bounty",
+    )
+
+
+def make_mapper():
+    return PlatformMapper(
+        "test",
+        hosts=["example.test"],
+        url_patterns=[r"example\.test/api/listings"],
+        item_keys=["title"],
+        id_keys=["slug"],
+        transform=f"{__name__}:transform_listing",
+    )
+
+
+class FakeResponse:
+    def __init__(self, url, payload, content_type="application/json"):
+        self.url = url
+        self.headers = {"content-type": content_type}
+        self._body = json.dumps(payload).encode()
+
+    async def body(self):
+        return self._body
+
+
+class FakePage:
+    def __init__(self):
+        self.listeners = []
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners.remove(handler)
+
+    def emit(self, response):
+        for handler in list(self.listeners):
+            handler(response)
+
+
+class TestNetworkCapture:
+    """Capture of listing JSON and mapping without the LLM"""
+
+    def test_find_items_in_nested_payload(self):
+        """Listing dicts are found wherever the API nests them"""
+        payload = {"data": {"page": {"items": [{"title": "A", "slug": "a"}, {"title": "B", "slug": "b"}]}},
+                   "meta": [{"total": 2}]}
+        items = find_items(payload, make_mapper())
+        assert [i["slug"] for i in items] == ["a", "b"]
+
+    def test_map_payloads_dedupes_across_pages(self):
+        """The same listing seen in two responses maps to one opportunity"""
+        pages = [[{"title": "A", "slug": "a"}], {"items": [{"title": "A", "slug": "a"}, {"title": "", "slug": "c"}]}]
+        opportunities = map_payloads(make_mapper(), pages)
+        assert [o.id for o in opportunities] == ["test_a"]
+
+    @pytest.mark.asyncio
+    async def test_capture_records_matching_json_and_detaches(self):
+        """Only matching JSON responses are read; collect() removes the listener"""
+        page = FakePage()
+        capture = NetworkCapture(page, make_mapper())
+
+        page.emit(FakeResponse("https://example.test/api/listings?page=1", [{"title": "A", "slug": "a"}]))
+        page.emit(FakeResponse("https://example.test/api/user", [{"title": "X", "slug": "x"}]))
+        page.emit(FakeResponse("https://example.test/api/listings?page=2", "<html>", content_type="text/html"))
+        await asyncio.sleep(0)
+
+        opportunities = await capture.collect()
+        assert [o.title for o in opportunities] == ["A"]
+        assert page.listeners == []
+        capture.detach()  # Idempotent
@@ -0,0 +1,90 @@
+"""
+Tests for token-budgeted page chunking and parallel chunk extraction
+"""
+import re
+
+import pytest
+
+from app.config import settings
+from app.services.cortex import reader_llm as reader_module
+from app.services.llm_cache import LLMResultCache
+from app.services.llm_gateway import LLMGateway
+from app.utils import html_cleaner
+from app.utils.page_chunker import chunk_text, estimate_tokens
+from llm_fakes import FakeModel
+
+CARD = "Card {n}\n$1,000 in prizes\nView (https://example.test/c/{n})"
+
+
+def cards(count: int) -> str:
+    return "\n\n".join(CARD.format(n=n) for n in range(count))
+
+
+class CardModel(FakeModel):
+    """Returns one item per card in the prompt, slowly enough to overlap calls"""
+
+    delay = 0.01
+
+    def answer(self, prompt: str) -> str:
+        numbers = re.findall(r"^\s*Card (\d+)$", prompt, re.MULTILINE)
+        items = ",".join(
+            f'{{"title": "Card {n}", "organization": "Org", "source_url": "https://example.test/c/{n}"}}'
+            for n in numbers
+        )
+        return f"[{items}]"
+
+
+class TestPageChunker:
+    """Chunks respect the token budget, split between cards and overlap"""
+
+    def test_splits_between_cards_within_budget(self):
+        """Every card lands whole in some chunk and no chunk exceeds the budget"""
+        text = cards(40)
+        chunks = chunk_text(text, max_tokens=100)
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+        for n in range(40):
+            assert any(CARD.format(n=n) in chunk for chunk in chunks)
+        assert chunk_text(text, max_tokens=100, max_chunks=2) == chunks[:2]
+        assert chunk_text("short page", max_tokens=100) == ["short page"]
+
+    def test_overlap_and_oversized_lines(self):
+        """Chunks repeat the previous chunk's last card; a giant line is sliced"""
+        chunks = chunk_text(cards(20), max_tokens=60, overlap_tokens=20)
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current.startswith(previous.split("\n\n")[-1])
+
+        blob = '<script id="__NEXT_DATA__">' + "x" * 1000 + "</script>"
+        sliced = chunk_text(blob, max_tokens=50)
+        assert "".join(sliced) == blob
+        assert all(len(chunk) <= 200 for chunk in sliced)
+
+    @pytest.mark.asyncio
+    async def test_reader_extracts_chunks_in_parallel_and_merges(self, monkeypatch, tmp_path):
+        """A long page is read past the old truncation, under the concurrency limit, without duplicates"""
+        monkeypatch.setattr(settings, "gemini_api_key", "test-key")
+        monkeypatch.setattr(settings, "html_cleaner_workers", 0)
+        monkeypatch.setattr(settings, "llm_chunk_tokens", 150)
+        monkeypatch.setattr(settings, "llm_chunk_overlap_tokens", 30)
+        monkeypatch.setattr(settings, "llm_max_chunks_per_page", 50)
+        monkeypatch.setattr(html_cleaner, "_pool", None)
+        monkeypatch.setattr(reader_module, "llm_cache", LLMResultCache(state_dir=str(tmp_path)))
+        model = CardModel()
+        gateway = LLMGateway(
+            limits={"interactive": 1, "field_mapping": 1, "background": 2},
+            tokens_per_minute=0,
+            model_factory=lambda name: model
+        )
+        monkeypatch.setattr(reader_module, "llm_gateway", gateway)
+
+        html = "<html><body>" + "".join(
+            f'<div class="card"><h3>Card {n}</h3><p>$1,000 in prizes</p>'
+            f'<a href="https://example.test/c/{n}">View</a></div>'
+            for n in range(30)
+        ) + "</body></html>"
+        opportunities = await reader_module.ReaderLLM().parse_multiple(html, "https://example.test/", max_items=100)
+
+        names = [opp.name for opp in opportunities]
+        assert sorted(names) == sorted(f"Card {n}" for n in range(30))
+        assert model.calls > 1
+        assert model.peak == 2
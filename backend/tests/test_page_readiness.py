@@ -0,0 +1,75 @@
+"""
+Unit Tests for Event-Driven Page Readiness
+"""
+import pytest
+from app.services.page_readiness import PageReadiness, QUIESCENCE_JS, CONTENT_SIZE_JS
+
+
+class FakePage:
+    """Cards grow with each scroll until `cards_after` is exhausted"""
+
+    def __init__(self, cards_after=(10, 20, 20), selector_present=True, quiet=True):
+        self.cards = list(cards_after)
+        self.selector_present = selector_present
+        self.quiet = quiet
+        self.scrolls = 0
+
+    async def wait_for_selector(self, selector, state=None, timeout=None):
+        if not self.selector_present:
+            raise TimeoutError(selector)
+
+    async def evaluate(self, script, arg=None):
+        if script == QUIESCENCE_JS:
+            return {'reason': 'quiet' if self.quiet else 'timeout', 'ms': 5}
+        if script == CONTENT_SIZE_JS:
+            return self.cards[min(self.scrolls, len(self.cards) - 1)]
+        self.scrolls += 1
+
+
+class TestPageReadiness:
+    """Test suite for readiness profiles, scroll plateaus and learning"""
+
+    @pytest.mark.asyncio
+    async def test_scroll_stops_when_no_new_cards(self, tmp_path):
+        """Scrolling ends at the first scroll that adds nothing"""
+        readiness = PageReadiness(state_dir=str(tmp_path))
+        page = FakePage(cards_after=(10, 20, 20, 30))
+
+        report = await readiness.wait_until_ready(page, "https://devpost.com/hackathons")
+        assert report['selector_hit'] is True
+        assert report['scrolls'] == 1
+        assert page.scrolls == 2
+        assert readiness.get_stats()['devpost.com']['pages'] == 1
+
+    @pytest.mark.asyncio
+    async def test_never_quiet_page_is_still_scrolled(self, tmp_path):
+        """A feed that keeps mutating times out on quiescence but still gets its scrolls"""
+        readiness = PageReadiness(state_dir=str(tmp_path))
+        page = FakePage(cards_after=(10, 20, 30, 30), quiet=False)
+
+        report = await readiness.wait_until_ready(page, "https://devpost.com/hackathons")
+        assert report['timed_out'] is True
+        assert report['scrolls'] == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_selector_is_dropped(self, tmp_path):
+        """A configured selector that never matches stops being waited on"""
+        readiness = PageReadiness(state_dir=str(tmp_path))
+        for _ in range(PageReadiness.SELECTOR_MISS_LIMIT):
+            report = await readiness.wait_until_ready(FakePage(selector_present=False), "https://mlh.io/events")
+            assert report['selector_hit'] is False
+
+        assert readiness.profile_for("https://mlh.io/events").selector is None
+        report = await readiness.wait_until_ready(FakePage(), "https://mlh.io/events")
+        assert report['selector_hit'] is None
+
+    @pytest.mark.asyncio
+    async def test_scroll_cap_is_learned_and_persisted(self, tmp_path):
+        """The cap shrinks to one more than the scrolls that ever helped, across restarts"""
+        readiness = PageReadiness(state_dir=str(tmp_path))
+        for _ in range(3):
+            await readiness.wait_until_ready(FakePage(cards_after=(5, 5)), "https://dorahacks.io/hackathon")
+        readiness.save()
+
+        restored = PageReadiness(state_dir=str(tmp_path))
+        assert restored.profile_for("https://dorahacks.io/hackathon").max_scrolls == 1
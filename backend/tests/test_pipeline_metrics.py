@@ -0,0 +1,61 @@
+"""
+Unit Tests for Pipeline Metrics (Prometheus exposition)
+"""
+import pytest
+from app.services.local_broker import LocalBroker
+from app.services.pipeline_metrics import (
+    MetricsRegistry, ThroughputMeter, ConsumerMetrics, pipeline_metrics
+)
+
+
+class TestPipelineMetrics:
+    """Test suite for the metrics registry and consumer instrumentation"""
+
+    def test_counter_and_histogram_render(self):
+        """Counters and cumulative histogram buckets render in text format"""
+        registry = MetricsRegistry()
+        counter = registry.counter("jobs_total", "Jobs", ("group",))
+        histogram = registry.histogram("job_seconds", "Job time", ("group",), buckets=(0.1, 1))
+
+        counter.inc(group="a")
+        counter.inc(2, group="a")
+        histogram.observe(0.05, group="a")
+        histogram.observe(0.5, group="a")
+        histogram.observe(5, group="a")
+
+        text = registry.render()
+        assert '# TYPE jobs_total counter' in text
+        assert 'jobs_total{group="a"} 3' in text
+        assert 'job_seconds_bucket{group="a",le="0.1"} 1' in text
+        assert 'job_seconds_bucket{group="a",le="1"} 2' in text
+        assert 'job_seconds_bucket{group="a",le="+Inf"} 3' in text
+        assert 'job_seconds_count{group="a"} 3' in text
+
+    def test_throughput_meter_window(self):
+        """Rate only counts events inside the trailing window"""
+        meter = ThroughputMeter(window_seconds=10)
+        meter.record(50, now=1000)
+        meter.record(50, now=1005)
+        assert meter.rate(now=1005) == 10.0
+        assert meter.rate(now=1012) == 5.0
+        assert meter.rate(now=1020) == 0.0
+
+    def test_consumer_lag_reported_from_watermarks(self):
+        """Lag is high watermark minus the consumer's position"""
+        broker = LocalBroker()
+        producer = broker.producer()
+        consumer = broker.consumer("metrics-lag-test")
+        consumer.subscribe(["metrics.lag.v1"])
+        for i in range(5):
+            producer.produce("metrics.lag.v1", value=str(i).encode())
+
+        metrics = ConsumerMetrics("metrics-lag-test")
+        metrics.track(consumer)
+        msg = consumer.poll(0.1)
+        metrics.consumed(msg)
+        metrics.commit(consumer, msg)
+
+        text = pipeline_metrics.render()
+        assert 'cortex_consumer_lag{topic="metrics.lag.v1",group="metrics-lag-test"} 4' in text
+        assert 'cortex_messages_consumed_total{topic="metrics.lag.v1",group="metrics-lag-test"} 1' in text
+        assert 'cortex_commit_seconds_count{group="metrics-lag-test"} 1' in text
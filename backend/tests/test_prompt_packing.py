@@ -0,0 +1,100 @@
+"""
+Tests for prompt packing in the discovery extraction path
+"""
+import json
+import re
+
+import pytest
+
+from app.config import settings
+from app.services import ai_enrichment_service as enrichment_module
+from app.services.ai_enrichment_service import AIEnrichmentService
+from app.services.llm_cache import LLMResultCache
+from app.services.llm_gateway import LLMGateway
+from app.utils import html_cleaner
+from app.utils.page_chunker import pack_chunks
+from llm_fakes import FakeModel
+
+SECTION_RE = re.compile(r"=== START PAGE (\d+)[^=]*URL: (\S+) ===\n(.*?)\n=== END", re.DOTALL)
+
+
+class PageModel(FakeModel):
+    """Answers with one item per card, tagged with the PAGE it was framed in"""
+
+    def __init__(self, attribute: bool = True):
+        super().__init__()
+        self.attribute = attribute
+        self.sections = []  # Pages per prompt
+
+    def answer(self, prompt: str) -> str:
+        sections = SECTION_RE.findall(prompt)
+        self.sections.append(len(sections))
+        items = []
+        for page, url, content in sections:
+            for card in re.findall(r"^Card (\w+)$", content, re.MULTILINE):
+                if self.attribute or len(sections) == 1:
+                    items.append({"page": int(page), "title": f"Card {card}", "url": f"{url}c/{card}"})
+                else:
+                    # Packed answer that can't be traced back to a page
+                    items.append({"title": f"Card {card}", "url": f"https://elsewhere.test/{card}"})
+        return json.dumps(items)
+
+
+def page(host: str, cards) -> dict:
+    html = "<html><body>" + "".join(
+        f'<div class="card"><h3>Card {card}</h3>'
+        f'<p>Bounty for {card}: build the integration and claim a reward paid in USDC</p></div>'
+        for card in cards
+    ) + "</body></html>"
+    return {"url": f"https://{host}/", "html": html}
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "html_cleaner_workers", 0)
+    monkeypatch.setattr(html_cleaner, "_pool", None)
+    monkeypatch.setattr(enrichment_module, "llm_cache", LLMResultCache(state_dir=str(tmp_path)))
+    return AIEnrichmentService()
+
+
+def use_model(monkeypatch, model: PageModel) -> PageModel:
+    gateway = LLMGateway(tokens_per_minute=0, model_factory=lambda name: model)
+    monkeypatch.setattr(enrichment_module, "llm_gateway", gateway)
+    return model
+
+
+class TestPromptPacking:
+    """Small pages share prompts; results are attributed back to their pages"""
+
+    def test_pack_chunks_respects_budget_and_page_cap(self):
+        """First-fit decreasing bins stay under the budget; oversized chunks go alone"""
+        bins = pack_chunks([300, 100, 600, 2000, 200, 100], max_tokens=1000, max_per_bin=3)
+        assert sorted(i for b in bins for i in b) == list(range(6))
+        assert [3] in bins
+        sizes = [300, 100, 600, 2000, 200, 100]
+        assert all(sum(sizes[i] for i in b) <= 1000 or len(b) == 1 for b in bins)
+        assert all(len(b) <= 3 for b in bins)
+        assert len(pack_chunks([10] * 9, max_tokens=1000, max_per_bin=3)) == 3
+
+    @pytest.mark.asyncio
+    async def test_small_pages_share_one_prompt(self, service, monkeypatch):
+        """Three sparse pages go out in one call and come back per page"""
+        model = use_model(monkeypatch, PageModel())
+        items = [page("a.test", ["a1", "a2"]), page("b.test", ["b1"]), page("c.test", ["c1", "c2"])]
+        pages = await service.extract_pages(items)
+
+        assert model.sections == [3]
+        assert [sorted(opp["title"] for opp in found) for found in pages] == [
+            ["Card a1", "Card a2"], ["Card b1"], ["Card c1", "Card c2"]
+        ]
+        assert all("page" not in opp for found in pages for opp in found)
+
+    @pytest.mark.asyncio
+    async def test_unattributable_prompt_is_resplit(self, service, monkeypatch):
+        """A packed answer that can't be traced to its pages is re-extracted in halves"""
+        model = use_model(monkeypatch, PageModel(attribute=False))
+        items = [page("a.test", ["a1"]), page("b.test", ["b1"]), page("c.test", ["c1"])]
+        pages = await service.extract_pages(items)
+
+        assert model.sections == [3, 1, 2, 1, 1]
+        assert [[opp["title"] for opp in found] for found in pages] == [["Card a1"], ["Card b1"], ["Card c1"]]
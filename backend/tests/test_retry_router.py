@@ -0,0 +1,202 @@
+"""
+Unit Tests for Retry Topic Routing
+"""
+import asyncio
+import json
+from concurrent.futures import Future
+import pytest
+from app.services import retry_router as retry_module
+from app.services.kafka_config import KafkaConfig
+from app.services.retry_router import RetryRouter, get_attempt, ATTEMPT_HEADER, replay_dead_letters
+
+
+class FakeMessage:
+    """Minimal stand-in for a confluent_kafka Message"""
+
+    def __init__(self, value, key=b"k", topic="opportunity.enriched.v1", headers=None, partition=0, offset=0):
+        self._value = value
+        self._key = key
+        self._topic = topic
+        self._headers = headers
+        self._partition = partition
+        self._offset = offset
+
+    def value(self):
+        return self._value
+
+    def key(self):
+        return self._key
+
+    def topic(self):
+        return self._topic
+
+    def headers(self):
+        return self._headers
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+
+class FakeConsumer:
+    def __init__(self, messages=()):
+        self.commits = []
+        self.seeks = []
+        self.messages = list(messages)
+
+    def subscribe(self, topics):
+        pass
+
+    def poll(self, timeout):
+        return self.messages.pop(0) if self.messages else None
+
+    def close(self):
+        pass
+
+    def commit(self, message=None, asynchronous=True):
+        self.commits.append((message.partition(), message.offset()))
+
+    def seek(self, tp):
+        self.seeks.append((tp.partition, tp.offset))
+
+
+class TestRetryRouter:
+    """Test suite for retry tier escalation"""
+
+    def test_escalates_through_tiers_then_dead_letters(self):
+        """Each failure moves one tier further, ending in the DLQ"""
+        router = RetryRouter()
+        destinations = [router.next_destination(attempt)[0] for attempt in range(4)]
+
+        assert destinations == [
+            KafkaConfig.TOPIC_RETRY_30S,
+            KafkaConfig.TOPIC_RETRY_5M,
+            KafkaConfig.TOPIC_RETRY_1H,
+            KafkaConfig.TOPIC_DEAD_LETTER,
+        ]
+
+    def test_permanent_failures_skip_retries(self):
+        """Poison messages go straight to the DLQ"""
+        topic, delay = RetryRouter().next_destination(0, permanent=True)
+
+        assert topic == KafkaConfig.TOPIC_DEAD_LETTER
+        assert delay == 0
+
+    def test_attempt_header_is_read(self):
+        """Redelivered messages carry their attempt count"""
+        assert get_attempt(FakeMessage(b"{}")) == 0
+        assert get_attempt(FakeMessage(b"{}", headers=[(ATTEMPT_HEADER, b"2")])) == 2
+
+    def test_envelope_preserves_original_message(self):
+        """The envelope carries everything needed to redeliver"""
+        msg = FakeMessage(json.dumps({"name": "Hack"}).encode(), headers=[(ATTEMPT_HEADER, b"1")])
+        envelope = RetryRouter().build_envelope(msg, RuntimeError("firestore unavailable"), "test", delay=300)
+
+        assert envelope["original_topic"] == "opportunity.enriched.v1"
+        assert envelope["original_key"] == "k"
+        assert envelope["payload"] == {"name": "Hack"}
+        assert envelope["attempt"] == 2
+        assert envelope["not_before"] - envelope["failed_at"] == 300
+
+    @pytest.mark.asyncio
+    async def test_settle_batch_commits_and_rewinds_per_partition(self):
+        """Parked failures are committed past; an unparkable one rewinds only its partition"""
+        router = RetryRouter()
+
+        async def route_failure(msg, error, source, permanent=False):
+            return msg.offset() != 11  # Offset 11 on partition 1 can't be parked
+
+        router.route_failure = route_failure
+        messages = [
+            FakeMessage(b"{}", partition=0, offset=5),
+            FakeMessage(b"{}", partition=1, offset=10),
+            FakeMessage(b"{}", partition=0, offset=6),
+            FakeMessage(b"{}", partition=1, offset=11),
+            FakeMessage(b"{}", partition=1, offset=12),
+        ]
+        router.REROUTE_BACKOFF_SECONDS = 0
+        consumer = FakeConsumer()
+        await router.settle_batch(consumer, messages, {2: (RuntimeError("x"), False), 3: (RuntimeError("x"), False)}, "test")
+
+        assert sorted(consumer.commits) == [(0, 6), (1, 10)]
+        assert consumer.seeks == [(1, 11)]
+
+    @pytest.mark.asyncio
+    async def test_filtered_replay_does_not_commit_past_skipped_letters(self, monkeypatch):
+        """Dry runs use a throwaway group; a filtered run never commits over what it skipped"""
+        def dead_letter(original_topic, offset, partition=0):
+            envelope = {'original_topic': original_topic, 'original_key': 'k', 'payload': {'n': offset}}
+            msg = FakeMessage(json.dumps(envelope).encode(), topic=KafkaConfig.TOPIC_DEAD_LETTER,
+                              partition=partition, offset=offset)
+            msg.error = lambda: None
+            return msg
+
+        letters = [dead_letter("a.v1", 0), dead_letter("b.v1", 1), dead_letter("a.v1", 2),
+                   dead_letter("a.v1", 0, partition=1)]
+        groups, consumers, published = [], [], []
+
+        class FakeConfig(KafkaConfig):
+            enabled = True
+
+            def __init__(self):
+                pass
+
+            def create_consumer(self, group_id):
+                groups.append(group_id)
+                consumers.append(FakeConsumer(letters))
+                return consumers[-1]
+
+        def publish_many(topic, messages, headers=None):
+            published.append((topic, messages[0][1]))
+            future = Future()
+            future.set_result((0, 0))
+            return [future]
+
+        monkeypatch.setattr(retry_module, "KafkaConfig", FakeConfig)
+        monkeypatch.setattr(retry_module.kafka_producer_manager, "publish_many", publish_many)
+
+        listed = []
+        stats = await replay_dead_letters(topic_filter="a.v1", idle_timeout=0.05, on_message=listed.append)
+        assert stats == {'seen': 4, 'replayed': 0, 'skipped': 1}
+        assert len(listed) == 3 and published == [] and consumers[0].commits == []
+
+        stats = await replay_dead_letters(execute=True, topic_filter="a.v1", idle_timeout=0.05)
+        assert stats == {'seen': 4, 'replayed': 3, 'skipped': 1}
+        assert consumers[1].commits == [(0, 0), (1, 0)]  # Partition 0 stops before the skipped letter
+        assert groups[0] != groups[1] == "cortex-dlq-replay-v1"
+
+    @pytest.mark.asyncio
+    async def test_crashed_tier_restarts_with_a_fresh_consumer(self, monkeypatch):
+        """An unexpected error restarts the tier instead of ending it; the message is redelivered"""
+        envelope = {'original_topic': 'a.v1', 'original_key': 'k', 'payload': {}, 'not_before': 0}
+        worker = retry_module.RetryWorker()
+        worker.RESTART_BACKOFF_SECONDS = 0
+        worker.running = True
+        consumers = []
+
+        class CrashingConsumer(FakeConsumer):
+            def poll(self, timeout):
+                raise RuntimeError("broker connection reset")
+
+        class StoppingConsumer(FakeConsumer):
+            def commit(self, message=None, asynchronous=True):
+                super().commit(message, asynchronous)
+                worker.stop()
+
+        def create_consumer(group_id):
+            msg = FakeMessage(json.dumps(envelope).encode(), topic=KafkaConfig.TOPIC_RETRY_30S, offset=7)
+            msg.error = lambda: None
+            consumers.append(CrashingConsumer() if not consumers else StoppingConsumer([msg]))
+            return consumers[-1]
+
+        async def redeliver(delivered):
+            return True
+
+        monkeypatch.setattr(worker.config, "create_consumer", create_consumer)
+        monkeypatch.setattr(worker, "_redeliver", redeliver)
+
+        await asyncio.wait_for(worker._supervise_tier(KafkaConfig.TOPIC_RETRY_30S), 1.0)
+        assert len(consumers) == 2
+        assert consumers[1].commits == [(0, 7)]
@@ -0,0 +1,56 @@
+"""
+Unit Tests for Cortex Stream Windows (tumbling and sliding aggregations)
+"""
+import pytest
+from app.services.stream_windows import SlidingWindow, TumblingWindow, StreamAggregator
+
+
+def _event(source: str, amount: float = 0, type_tag: str = "Hackathon"):
+    return {"url": f"https://{source}/x", "amount": amount, "type_tags": [type_tag]}
+
+
+class TestStreamWindows:
+    """Test suite for incremental windowed aggregations"""
+
+    def test_sliding_window_expires_old_buckets(self):
+        """Totals only include buckets still inside the window"""
+        window = SlidingWindow(size_seconds=60, bucket_seconds=10)
+        window.add({("outcome", "new"): 1}, now=0)
+        window.add({("outcome", "new"): 1}, now=35)
+        assert window.snapshot(now=55)[("outcome", "new")] == 2
+        assert window.snapshot(now=65)[("outcome", "new")] == 1
+        assert window.snapshot(now=500) == {}
+
+    def test_tumbling_window_emits_on_close(self):
+        """A window is handed off once time passes its end"""
+        closed = []
+        window = TumblingWindow(60, on_close=lambda size, start, counts: closed.append((start, counts)))
+        window.add({("outcome", "new"): 1}, now=10)
+        window.add({("outcome", "new"): 1}, now=50)
+        assert closed == []
+        window.advance(now=61)
+        assert closed == [(0, {("outcome", "new"): 2})]
+
+    def test_aggregator_answers_source_yield_queries(self):
+        """Per-source yield, type counts, duplicate rate and amounts over the last 10 minutes"""
+        aggregator = StreamAggregator()
+        aggregator.record(_event("devpost.com", 5000), "new", now=1000)
+        aggregator.record(_event("devpost.com", 1000, "Grant"), "new", now=1100)
+        aggregator.record(_event("mlh.io"), "near_duplicate", now=1200)
+        aggregator.record(_event("www.devpost.com"), "duplicate", now=1300)
+
+        summary = aggregator.query("10m", now=1300)
+        assert summary["events"] == 4
+        assert summary["new_rate"] == 0.5
+        assert summary["by_source"] == {"devpost.com": 3, "mlh.io": 1}
+        assert summary["new_by_source"] == {"devpost.com": 2}
+        assert summary["by_type"] == {"hackathon": 1, "grant": 1}
+        assert summary["amount_total"]["all"] == 6000
+
+    def test_state_round_trip(self):
+        """Checkpointed window state restores the same view"""
+        aggregator = StreamAggregator()
+        aggregator.record(_event("devpost.com", 100), "new", now=1000)
+        restored = StreamAggregator()
+        restored.load_state(aggregator.to_state())
+        assert restored.query("1h", now=1010)["new"] == 1
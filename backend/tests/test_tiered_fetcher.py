@@ -0,0 +1,68 @@
+"""
+Unit Tests for the Tiered Fetcher (HTTP fast path before Playwright)
+"""
+import httpx
+import pytest
+from app.services.tiered_fetcher import TieredFetcher, classify_response, TIER_HTTP, TIER_BROWSER
+
+ARTICLE = "<html><head><title>Grants</title></head><body>" + "<p>Real listing text.</p>" * 200 + "</body></html>"
+SHELL = '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+CHALLENGE = "<html><head><title>Just a moment...</title></head><body>cf-chl</body></html>"
+
+
+def make_fetcher(tmp_path, routes):
+    def handler(request):
+        status, content_type, body = routes[request.url.path]
+        return httpx.Response(status, headers={'content-type': content_type}, text=body)
+
+    fetcher = TieredFetcher(state_dir=str(tmp_path), min_text_chars=500)
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return fetcher
+
+
+class TestTieredFetcher:
+    """Test suite for response classification and per-domain tier memory"""
+
+    def test_classify_response(self):
+        """JS shells, WAF challenges and thin pages escalate; JSON and full pages don't"""
+        assert classify_response(200, "text/html", ARTICLE, 500) is None
+        assert classify_response(200, "application/json", '{"items": []}', 500) is None
+        assert classify_response(200, "text/html", SHELL, 500) == "js_shell"
+        assert classify_response(503, "text/html", CHALLENGE, 500) == "waf"
+        assert classify_response(200, "text/html", "<html><body>hi</body></html>", 500) == "thin"
+        assert classify_response(429, "text/html", "", 500) == "throttled"
+
+    @pytest.mark.asyncio
+    async def test_fast_path_skips_browser(self, tmp_path):
+        """A good HTTP response is returned without calling the browser"""
+        fetcher = make_fetcher(tmp_path, {"/api/hackathons": (200, "application/json", '[{"id": 1}]')})
+
+        async def browser_fetch(url):
+            raise AssertionError("browser should not be used")
+
+        page = await fetcher.fetch("https://dorahacks.io/api/hackathons", browser_fetch)
+        assert page.tier == TIER_HTTP
+        assert page.text == '[{"id": 1}]'
+        assert fetcher.get_stats()['http_hit_rate'] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_domain_learns_browser_tier(self, tmp_path):
+        """After repeated JS shells the domain goes straight to the browser, and it is remembered"""
+        fetcher = make_fetcher(tmp_path, {"/": (200, "text/html", SHELL)})
+        browser_calls = []
+
+        async def browser_fetch(url):
+            browser_calls.append(url)
+            return ARTICLE
+
+        for _ in range(4):
+            page = await fetcher.fetch("https://spa.example/", browser_fetch)
+            assert page.tier == TIER_BROWSER
+
+        stats = fetcher.get_stats()['domains']['spa.example']
+        assert stats['preferred_tier'] == TIER_BROWSER
+        assert stats['escalated'] == 3 and stats['skipped'] == 1
+        await fetcher.close()
+
+        restored = TieredFetcher(state_dir=str(tmp_path))
+        assert not restored.should_try_http("https://spa.example/other")